@@ -0,0 +1,639 @@
+#!/usr/bin/env python3
+"""
+ThermoPi Benchmarks
+Reproducible measurements against a fake sysfs tree and the simulated backend
+
+No Raspberry Pi, root access or RPi.GPIO is needed, so this runs in CI:
+    python3 benchmark.py suite --output results.json
+    python3 benchmark.py suite --compare baseline.json --repeat 5
+    python3 benchmark.py startup --runs 10 --budget 0.1
+    python3 benchmark.py backends --seconds 5 --rate 4
+
+The suite measures the hot loop: sensor and /proc/stat load read latency,
+curve evaluation throughput (single and batched), DataLogger.log_data
+throughput, the control tick latency and jitter, the GUI history chart
+(without a display: canvas calls are recorded) and log analytics
+throughput. Metric names encode their direction: `*_per_s` is
+higher-is-better, `*_us` / `*_ms` lower-is-better (maxima are reported
+but not gated); --compare flags a regression when a metric is worse than
+the baseline by more than the tolerance. Each metric is the median of
+--repeat suite runs, and the default tolerance depends on the metric:
+microbenchmark throughput and tail percentiles move by 20-60 % between
+runs of the same tree, so they get wider bands than medians and means.
+
+On a Pi, `backends --sysfs-root /` measures the real devices (rpi-gpio is
+included when RPi.GPIO is installed).
+
+Exits non-zero when a budget is exceeded.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+STARTUP_LINE = re.compile(r"Fan kontrolü (\d+) ms içinde başladı")
+
+
+def make_fake_sysfs(root: str, temperatures: Optional[Dict[str, float]] = None) -> str:
+    """Create thermal_zone*/temp files (millidegrees) below root; returns root"""
+    temperatures = temperatures or {"thermal_zone0": 52.5}
+    for zone, celsius in temperatures.items():
+        zone_dir = os.path.join(root, "sys/class/thermal", zone)
+        os.makedirs(zone_dir, exist_ok=True)
+        with open(os.path.join(zone_dir, "temp"), "w") as f:
+            f.write(f"{int(celsius * 1000)}\n")
+        with open(os.path.join(zone_dir, "type"), "w") as f:
+            f.write("cpu-thermal\n")
+    return root
+
+
+def make_fake_fan_devices(root: str) -> str:
+    """Create the sysfs files used by the sysfs-pwm, cooling-device and hwmon-pwm backends"""
+    files = {
+        "sys/class/pwm/pwmchip0/export": "",
+        "sys/class/pwm/pwmchip0/unexport": "",
+        "sys/class/pwm/pwmchip0/pwm2/period": "0",
+        "sys/class/pwm/pwmchip0/pwm2/duty_cycle": "0",
+        "sys/class/pwm/pwmchip0/pwm2/enable": "0",
+        "sys/class/thermal/cooling_device0/type": "pwm-fan",
+        "sys/class/thermal/cooling_device0/max_state": "4",
+        "sys/class/thermal/cooling_device0/cur_state": "0",
+        "sys/class/hwmon/hwmon1/name": "pwmfan",
+        "sys/class/hwmon/hwmon1/pwm1": "0",
+        "sys/class/hwmon/hwmon1/pwm1_enable": "2",
+    }
+    for path, content in files.items():
+        path = os.path.join(root, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content + "\n")
+    return root
+
+
+def bench_startup(runs: int = 5, budget: float = 0.1) -> dict:
+    """Headless daemon: process spawn -> first control tick, and in-process startup"""
+    in_process, to_first_tick, total = [], [], []
+    with tempfile.TemporaryDirectory() as tmp:
+        root = make_fake_sysfs(os.path.join(tmp, "root"))
+        command = [sys.executable, os.path.join(HERE, "rpi_fan_controller.py"),
+                   "--daemon", "--backend", "simulated", "--sysfs-root", root,
+                   "--duration", "0", "--startup-budget", str(budget),
+                   "--config", os.path.join(tmp, "none.json"),
+                   "--log-file", os.path.join(tmp, "fan.log")]
+        for _ in range(runs):
+            start = time.perf_counter()
+            proc = subprocess.Popen(command, cwd=tmp, stdout=subprocess.PIPE,
+                                    stderr=subprocess.STDOUT, text=True)
+            first_tick = None
+            for line in proc.stdout:
+                match = STARTUP_LINE.search(line)
+                if match:
+                    first_tick = time.perf_counter() - start
+                    in_process.append(int(match.group(1)) / 1000.0)
+            proc.wait()
+            total.append(time.perf_counter() - start)
+            if proc.returncode != 0 or first_tick is None:
+                raise RuntimeError(f"daemon başlatılamadı (çıkış kodu {proc.returncode})")
+            to_first_tick.append(first_tick)
+
+    return {
+        "runs": runs,
+        "budget_s": budget,
+        "in_process_median_s": statistics.median(in_process),
+        "first_tick_median_s": statistics.median(to_first_tick),
+        "first_tick_max_s": max(to_first_tick),
+        "process_total_median_s": statistics.median(total),
+        "ok": statistics.median(in_process) <= budget,
+    }
+
+
+def _cpu_cost(backend, seconds: float, rate: float) -> dict:
+    """Process CPU time (all threads, incl. software PWM) while writing at `rate` Hz"""
+    duties = [30 + (i * 7) % 41 for i in range(64)]  # Changing duties, like a slewing output
+    backend.open()
+    try:
+        writes = 0
+        start_cpu = time.process_time()
+        start = time.monotonic()
+        next_write = start
+        while time.monotonic() - start < seconds:
+            backend.write(duties[writes % len(duties)])
+            writes += 1
+            next_write += 1.0 / rate
+            delay = next_write - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        elapsed = time.monotonic() - start
+        cpu = time.process_time() - start_cpu
+
+        # Raw cost of one write, without sleeping in between
+        burst = 2000
+        burst_start = time.perf_counter()
+        for i in range(burst):
+            backend.write(duties[i % len(duties)])
+        write_us = (time.perf_counter() - burst_start) / burst * 1e6
+    finally:
+        backend.close()
+    return {"cpu_ms_per_s": cpu / elapsed * 1000, "writes": writes, "write_us": write_us}
+
+
+def bench_backends(seconds: float = 3.0, rate: float = 4.0, sysfs_root: Optional[str] = None,
+                   names=None) -> dict:
+    """CPU cost per second of each fan backend (fake sysfs tree unless sysfs_root is given)"""
+    from fan_backends import BACKENDS, create_backend
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        root = sysfs_root or make_fake_fan_devices(tmp)
+        for name in names or BACKENDS:
+            try:
+                backend = create_backend(name, 18, 25000, root=root)
+                results[name] = _cpu_cost(backend, seconds, rate)
+            except (OSError, RuntimeError, ValueError) as e:
+                results[name] = {"skipped": str(e)}
+    return results
+
+
+def _distribution(samples: List[float], unit: str = "us", scale: float = 1e6) -> dict:
+    """Mean and percentiles of durations given in seconds"""
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))] * scale
+
+    return {
+        f"mean_{unit}": statistics.fmean(ordered) * scale,
+        f"p50_{unit}": pick(0.50),
+        f"p90_{unit}": pick(0.90),
+        f"p99_{unit}": pick(0.99),
+        f"max_{unit}": ordered[-1] * scale,
+    }
+
+
+@contextlib.contextmanager
+def simulated_system(temperature: float = 58.0):
+    """FanController + DataLogger on a fake sysfs tree and the simulated backend"""
+    from fan_backends import SimulatedBackend
+    from rpi_fan_controller import DataLogger, FanController
+    from thermal_sampler import ThermalSampler
+
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        root = make_fake_sysfs(os.path.join(tmp, "root"),
+                               {"thermal_zone0": temperature, "thermal_zone1": temperature - 6})
+        fan_controller = FanController(sampler=ThermalSampler(root=root), backend=SimulatedBackend())
+        data_logger = DataLogger(os.path.join(tmp, "fan.log"), max_queue=1 << 20)
+        try:
+            yield fan_controller, data_logger
+        finally:
+            fan_controller.cleanup()
+            data_logger.close()
+
+
+def bench_sensor(samples: int = 20000) -> dict:
+    """get_cpu_temperature latency, uncached (pread of every sensor) and via the shared snapshot"""
+    results = {}
+    with simulated_system() as (fan_controller, _):
+        for name, max_age in (("uncached", 0.0), ("cached", 0.2)):
+            fan_controller.sample_max_age = max_age
+            durations = []
+            for _ in range(samples):
+                start = time.perf_counter()
+                fan_controller.get_cpu_temperature()
+                durations.append(time.perf_counter() - start)
+            results.update({f"{name}_{key}": value for key, value in _distribution(durations).items()})
+
+    # CPU load feed-forward: one pread and a parse of the aggregate /proc/stat line
+    from cpu_load import CPULoadSampler, write_fake_stat
+    with tempfile.TemporaryDirectory() as root:
+        write_fake_stat(root, busy=123456789, idle=987654321, cpus=4)
+        load_sampler = CPULoadSampler(root)
+        durations = []
+        for _ in range(samples):
+            start = time.perf_counter()
+            load_sampler.sample()
+            durations.append(time.perf_counter() - start)
+        load_sampler.close()
+    results.update({f"load_{key}": value for key, value in _distribution(durations).items()})
+    return results
+
+
+def bench_curve(calls: int = 200000, batch: int = 100000) -> dict:
+    """calculate_auto_speed calls per second, single and batched"""
+    with simulated_system() as (fan_controller, _):
+        temps = [40.0 + (i % 3000) * 0.01 for i in range(batch)]
+        calculate = fan_controller.calculate_auto_speed
+        start = time.perf_counter()
+        for i in range(calls):
+            calculate(temps[i % batch])
+        single = time.perf_counter() - start
+
+        best = float("inf")
+        for _ in range(5):
+            start = time.perf_counter()
+            fan_controller.calculate_auto_speeds(temps)
+            best = min(best, time.perf_counter() - start)
+    return {
+        "single_calls_per_s": calls / single,
+        "single_us": single / calls * 1e6,
+        "batch_items_per_s": batch / best,
+        "batch_size": batch,
+    }
+
+
+def bench_logger(records: int = 100000) -> dict:
+    """DataLogger.log_data enqueue rate and end-to-end (enqueue + drain to disk) rate"""
+    with simulated_system() as (_, data_logger):
+        start = time.perf_counter()
+        for i in range(records):
+            data_logger.log_data(50.0 + (i % 100) * 0.1, i % 101, "Otomatik")
+        enqueue = time.perf_counter() - start
+        data_logger.close()
+        total = time.perf_counter() - start
+        stats = data_logger.writer.stats()
+    return {
+        "enqueue_records_per_s": records / enqueue,
+        "log_data_us": enqueue / records * 1e6,
+        "drained_records_per_s": stats["written"] / total,
+        "dropped": stats["dropped"],
+    }
+
+
+def bench_tick(ticks: int = 5000, seconds: float = 3.0, period: float = 0.01) -> dict:
+    """Control tick latency (engine.tick) and scheduling jitter of the engine thread"""
+    from control_engine import ControlEngine
+    from sampling_scheduler import SamplingScheduler
+
+    results = {}
+    with simulated_system() as (fan_controller, data_logger):
+        engine = ControlEngine(fan_controller, data_logger)
+        engine.submit("set_auto", True)
+        durations = []
+        for _ in range(ticks):
+            start = time.perf_counter()
+            engine.tick()
+            durations.append(time.perf_counter() - start)
+        results.update({f"latency_{key}": value for key, value in _distribution(durations).items()})
+
+        # Fixed period so jitter is measured against a known deadline
+        scheduler = SamplingScheduler(min_period=period, max_period=period)
+        engine = ControlEngine(fan_controller, data_logger, tick_scheduler=scheduler)
+        published = []
+        engine.subscribe(lambda state: published.append(state.monotonic))
+        engine.start()
+        time.sleep(seconds)
+        engine.stop()
+
+    intervals = [abs(b - a - period) for a, b in zip(published, published[1:])]
+    results.update({f"interval_error_{key}": value
+                    for key, value in _distribution(intervals, "ms", 1e3).items()})
+    stats = scheduler.stats()
+    results.update({
+        "period_s": period,
+        "wakeup_jitter_mean_ms": stats["jitter_mean_ms"],
+        "wakeup_jitter_p99_ms": stats["jitter_p99_ms"],
+        "wakeup_jitter_max_ms": stats["jitter_max_ms"],
+        "overruns": stats["overruns"],
+        "threaded_ticks": len(published),
+    })
+    return results
+
+
+def bench_metrics(ticks: int = 5000, scrapes: int = 200) -> dict:
+    """Tick cost with and without instrumentation, and /metrics scrape latency over HTTP"""
+    import urllib.request
+    from control_engine import ControlEngine
+    from metrics import MetricsServer, instrument
+
+    def tick_cost(engine) -> float:
+        best = float("inf")
+        for _ in range(3):
+            start = time.perf_counter()
+            for _ in range(ticks):
+                engine.tick()
+            best = min(best, (time.perf_counter() - start) / ticks)
+        return best
+
+    with simulated_system() as (fan_controller, data_logger):
+        engine = ControlEngine(fan_controller, data_logger)
+        engine.submit("set_auto", True)
+        disabled = tick_cost(engine)
+
+        # Same engine, now instrumented and served
+        server = MetricsServer(instrument(engine), port=0)
+        server.start()
+        try:
+            enabled = tick_cost(engine)
+
+            url = f"http://127.0.0.1:{server.port}/metrics"
+            durations = []
+            for _ in range(scrapes):
+                start = time.perf_counter()
+                with urllib.request.urlopen(url, timeout=5) as response:
+                    body = response.read().decode("utf-8")
+                durations.append(time.perf_counter() - start)
+        finally:
+            server.close()
+
+    expected = ("thermopi_sensor_read_seconds_count", "thermopi_fan_duty_percent",
+                "thermopi_cpu_temperature_celsius", 'thermopi_mode{mode="Otomatik"} 1')
+    missing = [name for name in expected if name not in body]
+    if missing:
+        raise RuntimeError(f"/metrics çıktısında eksik: {', '.join(missing)}")
+
+    results = {
+        "tick_disabled_us": disabled * 1e6,
+        "tick_enabled_us": enabled * 1e6,
+        "overhead_us": (enabled - disabled) * 1e6,
+        "scrape_bytes": len(body),
+    }
+    results.update({f"scrape_{key}": value for key, value in _distribution(durations, "ms", 1e3).items()})
+    return results
+
+
+class _RecordingCanvas:
+    """Stands in for a Tk Canvas: keeps item coordinates and counts calls"""
+
+    def __init__(self):
+        self.items: Dict[int, tuple] = {}
+        self.tags: Dict[int, tuple] = {}
+        self.next_id = 0
+        self.calls = 0
+
+    def create_line(self, *coords, **options):
+        self.calls += 1
+        self.next_id += 1
+        self.items[self.next_id] = coords
+        self.tags[self.next_id] = options.get("tags", ())
+        return self.next_id
+
+    create_text = create_line
+
+    def coords(self, item, *coords):
+        self.calls += 1
+        self.items[item] = coords
+
+    def move(self, tag, dx, dy):
+        self.calls += 1
+
+    def delete(self, target):
+        self.calls += 1
+        for item in [item for item, tags in self.tags.items() if item == target or target in tags]:
+            del self.items[item], self.tags[item]
+
+
+def bench_chart(hours: float = 24.0) -> dict:
+    """GUI history chart: a day of 1 Hz samples, per-sample cost and canvas item count"""
+    from history_chart import LiveChart
+    canvas = _RecordingCanvas()
+    chart = LiveChart(canvas, span=hours * 3600)
+    samples = int(hours * 3600)
+    calls_before = canvas.calls
+    start = time.perf_counter()
+    for i in range(samples):
+        chart.add(float(i), 45.0 + (i % 1800) / 90.0 + (i % 7) * 0.1, (i // 300) % 101)
+    ingest = time.perf_counter() - start
+    calls = canvas.calls - calls_before
+
+    start = time.perf_counter()
+    chart.set_span(hours * 3600)
+    rebuild = time.perf_counter() - start
+    return {
+        "add_us": ingest / samples * 1e6,
+        "canvas_calls_per_sample": calls / samples,
+        "data_items": chart.item_count,
+        "samples": samples,
+        "rebuild_ms": rebuild * 1e3,
+    }
+
+
+def bench_analytics(size: int = 16 << 20) -> dict:
+    """Log analytics: minute rollups of a synthetic text log on all cores"""
+    from log_analytics import LogAnalyzer, generate
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "fan_control_log.txt")
+        generate(path, size, start=1_700_000_000)
+        analyzer = LogAnalyzer(chunk_size=max(1 << 20, size // (4 * (os.cpu_count() or 1))))
+        start = time.perf_counter()
+        minutes = sum(1 for _ in analyzer.minutes([path]))
+        elapsed = time.perf_counter() - start
+    return {
+        "parse_mb_per_s": analyzer.bytes / elapsed / 1e6,
+        "records_per_s": analyzer.records / elapsed,
+        "minutes": minutes,
+        "jobs": analyzer.jobs,
+    }
+
+
+def bench_replay(days: float = 7.0) -> dict:
+    """Trace replay: a week of 1 Hz samples against 36 ramp settings, chunked side by side"""
+    from replay import RampSweep, ThermalModel, Trace, replay
+    from thermal_tuning import synthetic_trace
+
+    week = synthetic_trace(days=days, seed=3)
+    trace = Trace(week.times.tolist(), week.temperature.tolist(), week.duty.tolist(), week.mode.tolist())
+    ramps = RampSweep.grid([45, 50, 55], [60, 65, 70], [20, 30], [80, 100])
+    start = time.perf_counter()
+    replay(trace, ramps, ThermalModel(tau=200.0, fan_gain=2.5, ambient=32.0), threshold=60.0)
+    elapsed = time.perf_counter() - start
+    return {
+        "replay_ms": elapsed * 1e3,
+        "set_days_per_s": ramps.size * days / elapsed,
+        "sets": ramps.size,
+        "samples": len(trace),
+    }
+
+
+def bench_reload(checks: int = 20000, reloads: int = 200) -> dict:
+    """Config hot reload: unchanged-file stat check, and parse + compile + apply of a change"""
+    from config_reload import ConfigWatcher
+    from control_engine import ControlEngine
+
+    with simulated_system() as (fan_controller, data_logger), tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "thermopi.json")
+        with open(path, "w") as f:
+            json.dump({"temp_min": 45, "temp_max": 70}, f)
+        engine = ControlEngine(fan_controller, data_logger)
+        watcher = ConfigWatcher(path, engine, interval=0)
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            watcher.check()
+            start = time.perf_counter()
+            for _ in range(checks):
+                watcher.check()
+            check = (time.perf_counter() - start) / checks
+
+            durations = []
+            for i in range(reloads):
+                start = time.perf_counter()
+                runtime = watcher.check(force=True)
+                fan_controller.apply_config(runtime._replace(temp_hysteresis=1.0 + i % 2))
+                durations.append(time.perf_counter() - start)
+    return {
+        "check_unchanged_us": check * 1e6,
+        **{f"reload_{key}": value for key, value in _distribution(durations).items()},
+        "reloads": watcher.reloads,
+    }
+
+
+SUITE = {
+    "sensor": bench_sensor,
+    "curve": bench_curve,
+    "logger": bench_logger,
+    "tick": bench_tick,
+    "metrics": bench_metrics,
+    "chart": bench_chart,
+    "analytics": bench_analytics,
+    "replay": bench_replay,
+    "reload": bench_reload,
+}
+
+
+def run_suite(names=None, repeat: int = 1) -> dict:
+    """Run the selected benchmarks; returns a JSON-serializable report
+
+    With repeat > 1 every metric is the median over that many runs. Runs
+    are interleaved (whole suite, then again) so a slow spell of the host
+    lands in one run of each benchmark rather than in all runs of one.
+    """
+    names = list(names or SUITE)
+    runs = {name: [] for name in names}
+    for _ in range(max(1, repeat)):
+        for name in names:
+            runs[name].append(SUITE[name]())
+    results = {name: {metric: statistics.median(run[metric] for run in samples)
+                      for metric in samples[0]}
+               for name, samples in runs.items()}
+    return {
+        "meta": {
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+            "repeat": max(1, repeat),
+        },
+        "results": results,
+    }
+
+
+def _direction(metric: str) -> int:
+    """+1 if higher is better, -1 if lower is better, 0 if informational"""
+    if "max_" in metric:
+        return 0  # Single worst samples are too noisy to gate on
+    if metric.startswith("overhead_"):
+        return 0  # Difference of two noisy medians: near zero, either sign
+    if metric.endswith("_per_s"):
+        return 1
+    if metric.endswith(("_us", "_ms")):
+        return -1
+    return 0
+
+
+def default_tolerance(metric: str) -> float:
+    """Relative change allowed before a metric counts as a regression"""
+    if re.search(r"_p9\d_", metric):
+        return 0.5   # Tail percentiles: a few scheduler hiccups move them
+    if metric.endswith("_per_s"):
+        return 0.3   # Throughput microbenchmarks: frequency scaling, cache state
+    return 0.15
+
+
+def compare(report: dict, baseline: dict, tolerance: Optional[float] = None) -> List[dict]:
+    """Metrics worse than the baseline by more than tolerance (relative)
+
+    tolerance=None applies default_tolerance per metric.
+    """
+    regressions = []
+    for bench, metrics in report["results"].items():
+        for metric, value in metrics.items():
+            direction = _direction(metric)
+            reference = baseline.get("results", {}).get(bench, {}).get(metric)
+            if not direction or reference is None or reference <= 0:
+                continue  # A ratio to a zero or negative reference means nothing
+            change = (value - reference) / reference
+            allowed = default_tolerance(metric) if tolerance is None else tolerance
+            if change * direction < -allowed:
+                regressions.append({"benchmark": bench, "metric": metric, "baseline": reference,
+                                    "value": value, "change": change})
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="ThermoPi benchmarkları")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    startup = sub.add_parser("startup", help="Daemon başlangıç süresi")
+    startup.add_argument("--runs", type=int, default=5)
+    startup.add_argument("--budget", type=float, default=0.1,
+                         help="İlk kontrol adımı için süre bütçesi (s)")
+
+    suite = sub.add_parser("suite", help="Sıcak döngü benchmark'ları (JSON çıktı)")
+    suite.add_argument("--only", action="append", choices=sorted(SUITE), help="Yalnızca bu benchmark(lar)")
+    suite.add_argument("--output", help="Sonuçların yazılacağı JSON dosyası")
+    suite.add_argument("--compare", help="Karşılaştırılacak temel (baseline) JSON dosyası")
+    suite.add_argument("--repeat", type=int, default=3,
+                       help="Tekrar sayısı; her metrik tekrarların medyanıdır (varsayılan 3)")
+    suite.add_argument("--tolerance", type=float,
+                       help="Tüm metrikler için gerileme sayılacak göreli kötüleşme "
+                            "(varsayılan metriğe göre: medyan 0.15, hız 0.3, p90/p99 0.5)")
+
+    backends = sub.add_parser("backends", help="Fan arka uçlarının CPU maliyeti")
+    backends.add_argument("--seconds", type=float, default=3.0, help="Arka uç başına ölçüm süresi")
+    backends.add_argument("--rate", type=float, default=4.0, help="Saniyedeki yazım sayısı")
+    backends.add_argument("--sysfs-root", help="Gerçek/sahte sysfs kökü (varsayılan: geçici sahte ağaç)")
+    backends.add_argument("--backend", action="append", dest="names", help="Yalnızca bu arka uç(lar)")
+
+    args = parser.parse_args()
+    if args.command == "suite":
+        report = run_suite(args.only, args.repeat)
+        for bench, metrics in report["results"].items():
+            print(f"📊 {bench}")
+            for metric, value in metrics.items():
+                print(f"  {metric:<32} {value:14.3f}")
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            print(f"💾 Sonuçlar yazıldı: {args.output}")
+        if args.compare:
+            with open(args.compare, "r", encoding="utf-8") as f:
+                regressions = compare(report, json.load(f), args.tolerance)
+            for r in regressions:
+                print(f"❌ Gerileme: {r['benchmark']}.{r['metric']} {r['baseline']:.3f} → "
+                      f"{r['value']:.3f} ({r['change'] * 100:+.1f}%)")
+            if regressions:
+                return 1
+            band = "metriğe göre" if args.tolerance is None else f"{args.tolerance * 100:.0f}%"
+            print(f"✅ Temel değerlere göre gerileme yok (tolerans {band})")
+        return 0
+    if args.command == "startup":
+        result = bench_startup(args.runs, args.budget)
+        print(f"🚀 Başlangıç ({result['runs']} çalıştırma)")
+        print(f"  süreç içi (import → ilk adım): {result['in_process_median_s'] * 1000:6.1f} ms (medyan)")
+        print(f"  başlatma → ilk adım:           {result['first_tick_median_s'] * 1000:6.1f} ms "
+              f"(medyan), en kötü {result['first_tick_max_s'] * 1000:.1f} ms")
+        print(f"  toplam süreç süresi:           {result['process_total_median_s'] * 1000:6.1f} ms")
+        print("✅ Bütçe içinde" if result["ok"] else f"❌ Bütçe aşıldı ({args.budget * 1000:.0f} ms)")
+        return 0 if result["ok"] else 1
+    if args.command == "backends":
+        results = bench_backends(args.seconds, args.rate, args.sysfs_root, args.names)
+        print(f"⚙️  Arka uç CPU maliyeti ({args.rate:g} yazım/s, {args.seconds:g} s)")
+        for name, result in results.items():
+            if "skipped" in result:
+                print(f"  {name:<15} atlandı: {result['skipped']}")
+            else:
+                print(f"  {name:<15} {result['cpu_ms_per_s']:7.3f} ms CPU/s | "
+                      f"{result['write_us']:7.2f} µs/yazım")
+        return 0
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
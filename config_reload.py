@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+ThermoPi Config Reload
+Live reload of thresholds, curve, PID parameters, PWM frequency and pin
+
+The JSON config file (thermopi.json) is checked with a single os.stat every
+few seconds on a watcher thread, or immediately on SIGHUP. A changed file is
+parsed, validated and compiled (FanCurve table, PID parameters) on the
+watcher thread; only the finished RuntimeConfig is handed to the control
+engine as a "reload_config" command, so it is swapped in between two ticks.
+An unreadable or invalid file is reported and the running configuration
+stays in place.
+
+Reloadable keys (all optional; a key removed from the file reverts to its
+startup value):
+
+    {"temp_min": 50, "temp_max": 65, "speed_min": 20, "speed_max": 80,
+     "temp_hysteresis": 2.0, "curve": {"points": [[45, 0], [70, 100]]},
+     "pid": {"setpoint": 57, "kp": 15}, "strategy": "pid",
+     "pin": 18, "pwm_frequency": 25000}
+
+"curve" is a curve object or a curve file path; without it the threshold
+keys build the classic ramp. The PWM frequency is changed in place and a new
+pin is opened (at the current duty) before the old one is released, so the
+fan never stops. The other options (backend, log files, ...) still need a
+restart.
+
+Usage:
+    python3 config_reload.py check [thermopi.json]
+"""
+
+import argparse
+import json
+import math
+import os
+import signal
+import sys
+import threading
+from typing import List, NamedTuple, Optional, Tuple
+
+from fan_curve import FanCurve, load_curve
+
+CONFIG_FILE = "thermopi.json"
+PID_KEYS = ("setpoint", "kp", "ki", "kd", "derivative_tau")
+RUNTIME_KEYS = ("temp_min", "temp_max", "speed_min", "speed_max", "temp_hysteresis",
+                "curve", "pid", "strategy", "pin", "pwm_frequency")
+THRESHOLD_KEYS = ("temp_min", "temp_max", "speed_min", "speed_max")
+STRATEGIES = ("curve", "pid")
+
+
+class RuntimeConfig(NamedTuple):
+    """Everything a reload may change, validated and compiled"""
+    temp_min: float
+    temp_max: float
+    speed_min: float
+    speed_max: float
+    temp_hysteresis: float
+    curve: FanCurve
+    pid: Tuple[Tuple[str, float], ...]  # (name, value) pairs of PID_KEYS
+    strategy: str
+    pin: int
+    pwm_frequency: int
+
+    @classmethod
+    def from_controller(cls, controller, strategy: Optional[str] = None) -> "RuntimeConfig":
+        """The configuration a FanController is currently running with"""
+        return cls(controller.temp_min, controller.temp_max, controller.speed_min,
+                   controller.speed_max, controller.temp_hysteresis, controller.curve,
+                   tuple((key, getattr(controller.pid, key)) for key in PID_KEYS),
+                   strategy or controller.auto_strategy, controller.fan_pin,
+                   controller.pwm_frequency)
+
+    @classmethod
+    def defaults(cls) -> "RuntimeConfig":
+        """The configuration a FanController starts with when no config file sets anything"""
+        from pid_controller import PIDController
+        from rpi_fan_controller import DEFAULT_PIN, DEFAULT_PWM_FREQUENCY, FanController
+
+        pid = PIDController()
+        return cls(FanController.temp_min, FanController.temp_max, FanController.speed_min,
+                   FanController.speed_max, FanController.temp_hysteresis,
+                   FanCurve.from_thresholds(FanController.temp_min, FanController.temp_max,
+                                            FanController.speed_min, FanController.speed_max),
+                   tuple((key, getattr(pid, key)) for key in PID_KEYS), FanController.auto_strategy,
+                   DEFAULT_PIN, DEFAULT_PWM_FREQUENCY)
+
+    def changes(self, other: "RuntimeConfig") -> List[str]:
+        """Names of the fields that differ from other (curves compare by definition)"""
+        changed = []
+        for field, mine, theirs in zip(self._fields, self, other):
+            if field == "curve":
+                if mine is not theirs and mine.to_dict() != theirs.to_dict():
+                    changed.append(field)
+            elif mine != theirs:
+                changed.append(field)
+        return changed
+
+
+def read_config(path: str) -> dict:
+    """Config file as a dict with option-style keys (dashes become underscores)"""
+    with open(path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    if not isinstance(config, dict):
+        raise ValueError(f"{path}: JSON nesnesi bekleniyordu")
+    return {key.replace("-", "_"): value for key, value in config.items()}
+
+
+def _number(config: dict, key: str, default: float, low: float, high: float) -> float:
+    value = config.get(key, default)
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError(f"{key}: sayı bekleniyordu ({value!r})")
+    if not low <= value <= high:
+        raise ValueError(f"{key}: {low:g}-{high:g} aralığında olmalı ({value:g})")
+    return float(value)
+
+
+def _integer(config: dict, key: str, default: int, low: int, high: int) -> int:
+    value = config.get(key, default)
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError(f"{key}: tam sayı bekleniyordu ({value!r})")
+    if not low <= value <= high:
+        raise ValueError(f"{key}: {low}-{high} aralığında olmalı ({value})")
+    return value
+
+
+def compile_config(config: dict, base: RuntimeConfig, directory: str = ".") -> RuntimeConfig:
+    """Validate a config dict and build the RuntimeConfig; raises ValueError
+
+    Keys missing from config take their value from base. Relative curve
+    paths are resolved against directory (the config file's directory).
+    """
+    temp_min = _number(config, "temp_min", base.temp_min, -40.0, 125.0)
+    temp_max = _number(config, "temp_max", base.temp_max, -40.0, 125.0)
+    speed_min = _number(config, "speed_min", base.speed_min, 0.0, 100.0)
+    speed_max = _number(config, "speed_max", base.speed_max, 0.0, 100.0)
+    if temp_min >= temp_max:
+        raise ValueError(f"temp_min ({temp_min:g}) temp_max'tan ({temp_max:g}) küçük olmalı")
+    if speed_min > speed_max:
+        raise ValueError(f"speed_min ({speed_min:g}) speed_max'tan ({speed_max:g}) büyük olamaz")
+    hysteresis = _number(config, "temp_hysteresis", base.temp_hysteresis, 0.0, 20.0)
+
+    # An explicit curve wins over the thresholds, as at startup
+    spec = config.get("curve")
+    if isinstance(spec, dict):
+        curve = FanCurve.from_dict(spec)
+    elif isinstance(spec, str):
+        path = spec if os.path.isabs(spec) else os.path.join(directory, spec)
+        try:
+            curve = load_curve(path)
+        except OSError as e:
+            raise ValueError(f"curve: {path} okunamadı ({e.strerror or e})")
+    elif spec is not None:
+        raise ValueError("curve: eğri nesnesi veya dosya yolu bekleniyordu")
+    elif any(key in config for key in THRESHOLD_KEYS):
+        curve = FanCurve.from_thresholds(temp_min, temp_max, speed_min, speed_max)
+    else:
+        curve = base.curve
+
+    pid = dict(base.pid)
+    overrides = config.get("pid", {})
+    if not isinstance(overrides, dict):
+        raise ValueError("pid: JSON nesnesi bekleniyordu")
+    unknown = sorted(set(overrides) - set(PID_KEYS))
+    if unknown:
+        raise ValueError(f"pid: bilinmeyen parametreler: {', '.join(unknown)}")
+    pid["setpoint"] = _number(overrides, "setpoint", pid["setpoint"], 20.0, 110.0)
+    for key in ("kp", "ki", "kd", "derivative_tau"):
+        pid[key] = _number(overrides, key, pid[key], 0.0, 1e6)
+
+    strategy = config.get("strategy", base.strategy)
+    if strategy not in STRATEGIES:
+        raise ValueError(f"strategy: '{strategy}' geçersiz (seçenekler: {', '.join(STRATEGIES)})")
+
+    return RuntimeConfig(temp_min, temp_max, speed_min, speed_max, hysteresis, curve,
+                         tuple((key, pid[key]) for key in PID_KEYS), strategy,
+                         _integer(config, "pin", base.pin, 0, 27),
+                         _integer(config, "pwm_frequency", base.pwm_frequency, 1, 1_000_000))
+
+
+class ConfigWatcher:
+    """Watches the config file and hands compiled changes to the control engine
+
+    The file is compared by (inode, size, mtime) from one os.stat per check,
+    so an unchanged file costs a single syscall and is never opened.
+    """
+
+    def __init__(self, path: str, engine, interval: float = 2.0, strategy: Optional[str] = None):
+        self.path = path
+        self.engine = engine
+        self.interval = interval  # Seconds between stat checks (0: only on SIGHUP)
+        # Startup values; a key removed from the file falls back to these
+        controller = engine.fan_controller
+        self.base = RuntimeConfig.from_controller(controller, strategy)
+        controller.runtime_config = self.base
+
+        self.reloads = 0
+        self.errors = 0
+        self.is_running = False
+        self._signature: Optional[Tuple[int, int, int]] = None
+        self._static: Optional[dict] = None  # Last seen values of the restart-only keys
+        self._forced = False
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def signature(self) -> Optional[Tuple[int, int, int]]:
+        """Identity of the file's current contents; None if it does not exist"""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def check(self, force: bool = False) -> Optional[RuntimeConfig]:
+        """Reload if the file changed (or force); returns the submitted config"""
+        signature = self.signature()
+        if signature == self._signature and not force:
+            return None
+        self._signature = signature
+        if signature is None:
+            if force:
+                print(f"⚠️ {self.path} bulunamadı - mevcut ayarlar korunuyor")
+            return None
+
+        try:
+            config = read_config(self.path)
+            runtime = compile_config(config, self.base, os.path.dirname(self.path) or ".")
+        except (OSError, ValueError) as e:
+            self.errors += 1
+            print(f"⚠️ Ayar dosyası geçersiz, mevcut ayarlar korunuyor: {e}")
+            return None
+
+        static = {key: value for key, value in config.items() if key not in RUNTIME_KEYS}
+        if self._static is not None:
+            changed = sorted(key for key in set(static) | set(self._static)
+                             if static.get(key) != self._static.get(key))
+            if changed:
+                print(f"⚠️ Bu ayarlar yeniden başlatınca geçerli olur: {', '.join(changed)}")
+        self._static = static
+
+        self.reloads += 1
+        self.engine.submit("reload_config", runtime)
+        return runtime
+
+    def request_reload(self, signum=None, frame=None):
+        """SIGHUP handler: reload on the watcher thread even if the file looks unchanged"""
+        self._forced = True
+        self._wake.set()
+
+    def install_signal_handler(self):
+        """Reload on SIGHUP (call from the main thread)"""
+        signal.signal(signal.SIGHUP, self.request_reload)
+
+    def start(self):
+        """Start the watcher thread"""
+        if self._thread is not None:
+            return
+        self.is_running = True
+        self._thread = threading.Thread(target=self._run, name="config-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 1.0):
+        self.is_running = False
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        while self.is_running:
+            self._wake.wait(self.interval if self.interval > 0 else None)
+            self._wake.clear()
+            if not self.is_running:
+                break
+            forced, self._forced = self._forced, False
+            if forced or self.interval > 0:
+                try:
+                    self.check(forced)
+                except Exception as e:
+                    # The watcher must outlive anything a config file can do to it
+                    print(f"⚠️ Ayar dosyası kontrol edilemedi: {e}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="ThermoPi canlı ayar yenileme")
+    sub = parser.add_subparsers(dest="command", required=True)
+    check = sub.add_parser("check", help="Ayar dosyasını çalışan sisteme dokunmadan doğrula")
+    check.add_argument("path", nargs="?", default=CONFIG_FILE)
+    args = parser.parse_args()
+
+    base = RuntimeConfig.defaults()
+    try:
+        runtime = compile_config(read_config(args.path), base, os.path.dirname(args.path) or ".")
+    except (OSError, ValueError) as e:
+        print(f"❌ {args.path}: {e}")
+        return 1
+    print(f"✅ {args.path} geçerli")
+    for field in runtime.changes(base):
+        value = getattr(runtime, field)
+        if field == "curve":
+            value = f"{len(value.points)} nokta, {value.mode}"
+        elif field == "pid":
+            value = ", ".join(f"{key}={number:g}" for key, number in value)
+        print(f"   {field}: {value}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,4 @@
+"""pytest configuration: the tests import the top-level modules from the repository root"""
+
+# Hardware script: exits at import without RPi.GPIO and drives a real fan
+collect_ignore = ["test_fan.py"]
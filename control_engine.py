@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+ThermoPi Control Engine
+Single owner of sampling, decision, output and logging
+
+One engine thread reads the sensors, decides the duty, drives the output
+stage and logs every tick. Frontends (GUI, terminal, daemons, exporters)
+never touch FanController directly: they read immutable ControlState
+snapshots from a StateChannel and send commands through a coalescing
+CommandQueue, so adding a consumer adds no sensor reads or PWM writes.
+"""
+
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from sampling_scheduler import SamplingScheduler
+
+
+class ChannelState(NamedTuple):
+    """Per-fan part of a ControlState"""
+    name: str
+    output: str                    # Backend label, e.g. "GPIO pin 18"
+    temperature: Optional[float]   # Temperature the channel was controlled from
+    fan_speed: int
+    target_speed: int
+    rpm: Optional[float] = None    # Measured speed (tach-equipped channels only)
+    fan_status: str = "ok"         # "ok", "underspeed" or "stall"
+
+
+class ControlState(NamedTuple):
+    """Immutable snapshot published after every tick"""
+    seq: int
+    monotonic: float
+    wall_time: float
+    temperature: Optional[float]
+    zones: Dict[str, float]
+    fan_speed: int           # Duty actually written to the output
+    target_speed: int        # Duty requested by the controller/user
+    auto: bool
+    strategy: str            # "curve" or "pid"
+    mode: str                # Label used in logs ("Manuel", "Otomatik", "PID")
+    running: bool
+    error: Optional[str] = None
+    channels: Tuple[ChannelState, ...] = ()  # Every fan; fan_speed/target_speed are the first
+    load: Optional[float] = None             # CPU utilization 0-1 (load feed-forward only)
+    boost: int = 0                           # Feed-forward duty included in the targets
+
+
+class StateChannel:
+    """Latest-value pub/sub channel
+
+    Readers get the latest state with a plain attribute read (no lock).
+    Subscriber callbacks run on the publishing thread; the subscriber list
+    is copy-on-write so publishing never holds the lock while calling out.
+    """
+
+    def __init__(self):
+        self._state: Optional[ControlState] = None
+        self._subscribers: List[Callable[[ControlState], None]] = []
+        self._lock = threading.Lock()
+        self._published = threading.Condition(self._lock)
+
+    def latest(self) -> Optional[ControlState]:
+        return self._state
+
+    def subscribe(self, callback: Callable[[ControlState], None]) -> Callable[[], None]:
+        """Register a callback; returns a function that unsubscribes it"""
+        with self._lock:
+            self._subscribers = self._subscribers + [callback]
+
+        def unsubscribe():
+            with self._lock:
+                self._subscribers = [cb for cb in self._subscribers if cb is not callback]
+        return unsubscribe
+
+    def publish(self, state: ControlState):
+        with self._lock:
+            self._state = state
+            subscribers = self._subscribers
+            self._published.notify_all()
+        for callback in subscribers:
+            try:
+                callback(state)
+            except Exception as e:
+                print(f"⚠️ Abone hatası: {e}")
+
+    def wait_for(self, after_seq: int, timeout: Optional[float] = None) -> Optional[ControlState]:
+        """Block until a state newer than after_seq is published"""
+        with self._lock:
+            self._published.wait_for(lambda: self._state is not None and self._state.seq > after_seq,
+                                     timeout)
+            return self._state
+
+
+class CommandQueue:
+    """Coalescing command queue: only the latest value per command is kept"""
+
+    def __init__(self):
+        self._pending: Dict[str, object] = {}
+        self._lock = threading.Lock()
+        self.wake = threading.Event()
+        self.submitted = 0
+        self.coalesced = 0
+
+    def submit(self, name: str, value=None):
+        with self._lock:
+            if name in self._pending:
+                self.coalesced += 1
+            # Re-insert so commands are applied in the order they were last sent
+            self._pending.pop(name, None)
+            self._pending[name] = value
+            self.submitted += 1
+        self.wake.set()
+
+    def drain(self) -> Dict[str, object]:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self.wake.clear()
+        return pending
+
+
+class ControlEngine:
+    """Runs the control loop on one thread and publishes its state"""
+
+    def __init__(self, fan_controller, data_logger=None,
+                 tick_scheduler: Optional[SamplingScheduler] = None):
+        self.fan_controller = fan_controller
+        self.data_logger = data_logger
+        self.tick_scheduler = tick_scheduler if tick_scheduler is not None else SamplingScheduler()
+        self.channel = StateChannel()
+        self.commands = CommandQueue()
+
+        self.auto = False
+        self.is_running = False
+        self._seq = 0
+        self._thread: Optional[threading.Thread] = None
+
+    # --- Frontend API ---
+
+    def start(self):
+        """Start the engine thread"""
+        if self._thread is not None:
+            return
+        self.is_running = True
+        self._thread = threading.Thread(target=self._run, name="control-engine", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the engine thread and wait for it"""
+        self.is_running = False
+        self.commands.wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._thread = None
+
+    def submit(self, name: str, value=None):
+        """Queue a command: set_auto (bool), set_speed (int), set_strategy ("curve"/"pid"),
+        reload_config (config_reload.RuntimeConfig)"""
+        self.commands.submit(name, value)
+
+    def latest(self) -> Optional[ControlState]:
+        return self.channel.latest()
+
+    def subscribe(self, callback: Callable[[ControlState], None]) -> Callable[[], None]:
+        return self.channel.subscribe(callback)
+
+    # --- Engine thread ---
+
+    def _apply_commands(self, temperature: Optional[float]):
+        for name, value in self.commands.drain().items():
+            if name == "set_auto":
+                auto = bool(value)
+                if auto and not self.auto:
+                    self.fan_controller.enter_auto_mode(temperature)
+                self.auto = auto
+            elif name == "set_speed":
+                if self.auto:
+                    print("❌ Otomatik modda manuel hız ayarlanamaz")
+                else:
+                    self.fan_controller.set_fan_speed(int(value))
+            elif name == "set_strategy":
+                self.fan_controller.set_auto_strategy(value)
+            elif name == "reload_config":
+                try:
+                    self.fan_controller.apply_config(value)
+                except Exception as e:
+                    # A reload must never stop the control loop
+                    print(f"⚠️ Ayarlar uygulanamadı: {e}")
+            else:
+                print(f"⚠️ Bilinmeyen komut: {name}")
+
+    def _state(self, snapshot, error: Optional[str] = None) -> ControlState:
+        self._seq += 1
+        controller = self.fan_controller
+        return ControlState(
+            seq=self._seq,
+            monotonic=time.monotonic(),
+            wall_time=time.time(),
+            temperature=snapshot.primary if snapshot is not None else None,
+            zones=dict(snapshot.temperatures) if snapshot is not None else {},
+            fan_speed=controller.get_current_speed(),
+            target_speed=controller.target_speed,
+            auto=self.auto,
+            strategy=controller.auto_strategy,
+            mode=controller.mode_name(self.auto),
+            running=self.is_running and error is None,
+            error=error,
+            channels=tuple(ChannelState(channel.name, channel.label, channel.temperature,
+                                        channel.current_speed, channel.target_speed,
+                                        channel.rpm, channel.fan_status)
+                           for channel in controller.channels),
+            load=controller.load,
+            boost=controller.boost if self.auto else 0,
+        )
+
+    def tick(self) -> ControlState:
+        """One control cycle: commands, sample, decide, output, publish, log"""
+        controller = self.fan_controller
+        temperature = controller.get_cpu_temperature()
+        snapshot = controller.get_thermal_snapshot()
+
+        self._apply_commands(temperature)
+        # Tach feedback for the duty written last tick; a stalled fan is driven at full duty
+        controller.check_fans()
+        if self.auto:
+            # Every channel's duty from this one snapshot, then the writes
+            controller.update_auto(temperature, snapshot)
+        else:
+            # Finish any slew/dwell still pending from the last manual change
+            controller.update_temperatures(temperature, snapshot)
+            controller.load_boost()  # Keeps the load filter warm (and logged) for a switch to auto
+            controller.service_output()
+
+        state = self._state(snapshot)
+        self.channel.publish(state)
+
+        if self.data_logger is not None:
+            primary = state.channels[0] if state.channels else None
+            self.data_logger.log_data(temperature, state.fan_speed, state.mode, load=state.load,
+                                      rpm=primary.rpm if primary else None,
+                                      fan_status=primary.fan_status if primary else "ok")
+
+        # Sample faster while the temperature moves or the fan is ramping
+        self.tick_scheduler.observe(temperature, controller.control_error(temperature, self.auto),
+                                    urgent=not controller.settled)
+        return state
+
+    def _run(self):
+        while self.is_running:
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"❌ Kritik hata - Kontrol döngüsü durduruluyor: {e}")
+                self.is_running = False
+                self.channel.publish(self._state(None, str(e)))
+                break
+
+            # Commands (and stop) wake the engine early so user input is applied promptly
+            self.tick_scheduler.wait(self.commands.wake)
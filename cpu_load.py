@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+ThermoPi CPU Load Feed-Forward
+Raises the fan duty when CPU utilization jumps, before the temperature does
+
+The SoC heats up tens of seconds after a build or inference burst starts,
+so a purely temperature-driven curve always spins the fan up late. The
+feed-forward term watches CPU utilization and adds a duty boost that
+fades as the temperature (and therefore the curve) catches up:
+
+    boost = weight * 100 * max(0, fast - slow)
+
+fast is the utilization smoothed over `smoothing` seconds (ignores single
+tick spikes), slow the utilization smoothed over `horizon` seconds (about
+the board's thermal lag). With horizon 0 the slow term is dropped and the
+boost follows the load level instead of its jumps.
+
+/proc/stat (or /proc/loadavg) is opened once and re-read with pread; only
+the aggregate "cpu" line at the start of the file is parsed.
+
+    python3 rpi_fan_controller.py --daemon --feedforward 0.5
+    python3 cpu_load.py demo      # Fake /proc + recorded load step, replayed with and without
+"""
+
+import argparse
+import math
+import os
+import sys
+import tempfile
+from typing import List, Optional
+
+DEFAULT_ROOT = "/"
+SOURCES = ("stat", "loadavg")
+STAT_READ_SIZE = 256  # The aggregate cpu line is well under this
+LOADAVG_READ_SIZE = 64
+
+
+def _count_cpus(stat_path: str) -> int:
+    """Number of cpuN lines in /proc/stat (read once at open)"""
+    with open(stat_path, "r") as f:
+        count = sum(1 for line in f if line.startswith("cpu") and line[3:4].isdigit())
+    return max(1, count)
+
+
+class CPULoadSampler:
+    """CPU utilization (0-1) from /proc/stat deltas, or normalized /proc/loadavg"""
+
+    def __init__(self, root: str = DEFAULT_ROOT, source: str = "stat"):
+        if source not in SOURCES:
+            raise ValueError(f"Geçersiz yük kaynağı: {source} (seçenekler: {', '.join(SOURCES)})")
+        self.source = source
+        self.stat_path = os.path.join(root, "proc/stat")
+        self.loadavg_path = os.path.join(root, "proc/loadavg")
+        self.cpus = _count_cpus(self.stat_path)
+        path = self.stat_path if source == "stat" else self.loadavg_path
+        self.fd: Optional[int] = os.open(path, os.O_RDONLY)
+        self._busy = self._total = None
+        self.utilization: Optional[float] = None
+
+    def _read_stat(self):
+        raw = os.pread(self.fd, STAT_READ_SIZE, 0)
+        end = raw.find(b"\n")
+        # cpu user nice system idle iowait irq softirq steal (guest time is already in user)
+        values = [int(value) for value in raw[:end if end >= 0 else None].split()[1:9]]
+        total = sum(values)
+        return total - values[3] - values[4], total
+
+    def sample(self) -> Optional[float]:
+        """Utilization since the previous sample; None until two samples exist"""
+        if self.source == "loadavg":
+            load = float(os.pread(self.fd, LOADAVG_READ_SIZE, 0).split()[0])
+            self.utilization = min(1.0, load / self.cpus)
+            return self.utilization
+
+        busy, total = self._read_stat()
+        if self._total is not None and total > self._total:
+            self.utilization = (busy - self._busy) / (total - self._total)
+        # Otherwise no jiffy has elapsed since the last read: keep the last value
+        if self._total is None or total > self._total:
+            self._busy, self._total = busy, total
+        return self.utilization
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class LoadFeedForward:
+    """Duty boost from CPU utilization jumps (see module docstring)"""
+
+    def __init__(self, weight: float = 0.5, horizon: float = 120.0, smoothing: float = 3.0):
+        if weight < 0 or horizon < 0 or smoothing < 0:
+            raise ValueError("İleri besleme ağırlığı ve süreleri negatif olamaz")
+        self.weight = weight
+        self.horizon = horizon
+        self.smoothing = smoothing
+        self.reset()
+
+    def reset(self):
+        self.fast: Optional[float] = None
+        self.slow: Optional[float] = None
+        self.boost = 0
+
+    @staticmethod
+    def _smooth(current: float, target: float, dt: float, tau: float) -> float:
+        if tau <= 0:
+            return target
+        return current + (target - current) * (1.0 - math.exp(-dt / tau))
+
+    def update(self, utilization: Optional[float], dt: float) -> int:
+        """Feed one utilization sample taken dt seconds after the previous one"""
+        if utilization is None:
+            return self.boost
+        if self.fast is None:
+            self.fast = self.slow = utilization
+        else:
+            self.fast = self._smooth(self.fast, utilization, dt, self.smoothing)
+            self.slow = self._smooth(self.slow, utilization, dt, self.horizon)
+        excess = self.fast - self.slow if self.horizon > 0 else self.fast
+        self.boost = min(100, int(self.weight * 100.0 * max(0.0, excess)))
+        return self.boost
+
+    def to_dict(self) -> dict:
+        return {"weight": self.weight, "horizon": self.horizon, "smoothing": self.smoothing}
+
+
+# --- Fake /proc and a demonstration against the replay tooling ---
+
+def write_fake_stat(root: str, busy: int, idle: int, cpus: int = 4):
+    """Write proc/stat below root with the given cumulative busy/idle jiffies"""
+    os.makedirs(os.path.join(root, "proc"), exist_ok=True)
+    per_busy, per_idle = busy // cpus, idle // cpus
+    lines = [f"cpu  {busy} 0 0 {idle} 0 0 0 0 0 0"]
+    lines += [f"cpu{n} {per_busy} 0 0 {per_idle} 0 0 0 0 0 0" for n in range(cpus)]
+    lines.append("intr 0")
+    with open(os.path.join(root, "proc/stat"), "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def load_profile(seconds: int, bursts: List[tuple], idle: float = 0.05) -> List[float]:
+    """Per-second utilization: idle, with (start, length, utilization) bursts"""
+    profile = [idle] * seconds
+    for start, length, utilization in bursts:
+        for t in range(start, min(seconds, start + length)):
+            profile[t] = utilization
+    return profile
+
+
+def demo(weights: Optional[List[float]] = None, horizon: float = 120.0) -> int:
+    """Record a load-step trace through the fake /proc sampler, then replay it with feed-forward"""
+    from fan_curve import FanCurve
+    from log_writer import BatchedLogWriter
+    from replay import CurveBank, FeedForwardController, ThermalModel, load_text_log, replay
+
+    weights = weights or [0.25, 0.5, 1.0]
+    model = ThermalModel()
+    curve = FanCurve.from_thresholds(50, 65, 20, 80)
+    # Build steps a few minutes apart; shorter than the board's thermal lag
+    profile = load_profile(3600, [(300 + 600 * n, 150, 0.95) for n in range(5)])
+    hz, cpus = 100, 4
+
+    with tempfile.TemporaryDirectory() as root:
+        # 1) Utilization as the controller would measure it, from a fake /proc/stat
+        busy = idle = 0
+        write_fake_stat(root, busy, idle, cpus)
+        sampler = CPULoadSampler(root)
+        sampler.sample()
+        measured = []
+        for utilization in profile:
+            ticks = hz * cpus
+            busy += round(ticks * utilization)
+            idle += ticks - round(ticks * utilization)
+            write_fake_stat(root, busy, idle, cpus)
+            measured.append(sampler.sample())
+        sampler.close()
+
+        # 2) A recorded log of the current controller (curve only) under that load
+        log_path = os.path.join(root, "load_step.log")
+        writer = BatchedLogWriter(log_path)
+        start, temp, duty = 1_700_000_000, 50.0, 0
+        for t, utilization in enumerate(measured):
+            writer.write(start + t, temp, duty, "Otomatik", utilization)
+            heat = 0.08 + 0.25 * utilization  # °C/s of heating at this load
+            temp += heat - model.loss_rate(duty) * (temp - model.ambient)
+            duty = curve.evaluate(temp)
+        writer.close()
+        trace = load_text_log(log_path)
+
+    # 3) Replay: the same heat load, curve alone vs. curve plus feed-forward
+    print(f"📂 {len(trace)} kayıt, {len(profile) // 60} dk, {sum(u > 0.5 for u in profile)} s yüklü")
+    print(f"{'İleri besleme':>14} {'Tepe °C':>8} {'Ort. °C':>8} {'Ort. %':>7} {'Enerji':>8}")
+    peaks = []
+    for weight in [0.0] + weights:
+        controller = CurveBank([curve])
+        if weight:
+            controller = FeedForwardController(controller, LoadFeedForward(weight, horizon))
+        result = replay(trace, controller, model, threshold=60.0)
+        peaks.append(result.peak[0])
+        label = "yok" if not weight else f"{weight:g}"
+        print(f"{label:>14} {result.peak[0]:>8.1f} {result.mean_temp[0]:>8.1f} "
+              f"{result.mean_duty[0]:>7.1f} {result.energy[0]:>8.3f}")
+
+    ok = min(peaks[1:]) < peaks[0]
+    print(f"✅ Tepe sıcaklık {peaks[0] - min(peaks[1:]):.1f}°C düştü" if ok
+          else "❌ İleri besleme tepe sıcaklığı düşürmedi")
+    return 0 if ok else 1
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="ThermoPi CPU yükü ileri beslemesi")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    watch = sub.add_parser("watch", help="CPU kullanımını ve ileri besleme katkısını göster")
+    watch.add_argument("--root", default=DEFAULT_ROOT)
+    watch.add_argument("--source", choices=SOURCES, default="stat")
+    watch.add_argument("--weight", type=float, default=0.5)
+    watch.add_argument("--horizon", type=float, default=120.0)
+    watch.add_argument("--interval", type=float, default=1.0)
+
+    run_demo = sub.add_parser("demo", help="Sahte /proc ile yük basamağı ve replay karşılaştırması")
+    run_demo.add_argument("--weights", type=lambda text: [float(v) for v in text.split(",") if v],
+                          default=[0.25, 0.5, 1.0])
+    run_demo.add_argument("--horizon", type=float, default=120.0)
+    args = parser.parse_args()
+
+    if args.command == "demo":
+        return demo(args.weights, args.horizon)
+
+    import time
+    sampler = CPULoadSampler(args.root, args.source)
+    feedforward = LoadFeedForward(args.weight, args.horizon)
+    try:
+        sampler.sample()
+        while True:
+            time.sleep(args.interval)
+            utilization = sampler.sample()
+            boost = feedforward.update(utilization, args.interval)
+            if utilization is not None:
+                print(f"⚡ CPU: {utilization * 100:5.1f}%  ileri besleme: +{boost}%")
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        sampler.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
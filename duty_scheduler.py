@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+ThermoPi Duty Scheduler
+Output stage between the controllers and the PWM hardware
+
+Requested duties are turned into actual PWM writes here: redundant writes
+are dropped, changes are slew-rate limited and held for a minimum dwell
+time, tiny changes inside a deadband are ignored and a fan starting from
+0% first gets a short spin-up kick.
+"""
+
+import time
+from typing import Optional
+
+
+class DutyScheduler:
+    """Decides when and what to write to the PWM output"""
+
+    def __init__(self, slew_up: Optional[float] = 50.0, slew_down: Optional[float] = 10.0,
+                 min_dwell: float = 0.2, deadband: int = 1,
+                 kick_duty: int = 60, kick_time: float = 0.5):
+        self.slew_up = slew_up        # %/s when speeding up (None: unlimited)
+        self.slew_down = slew_down    # %/s when slowing down (None: unlimited)
+        self.min_dwell = min_dwell    # Seconds between two writes
+        self.deadband = deadband      # Ignore non-zero changes smaller than this (%)
+        self.kick_duty = kick_duty    # Duty applied briefly when starting from 0% (0: disabled)
+        self.kick_time = kick_time
+
+        self.output = 0
+        self.target = 0
+        self.last_write: Optional[float] = None
+        self.last_update: Optional[float] = None
+        self.kick_until = 0.0
+
+        self.writes_issued = 0
+        self.writes_suppressed = 0
+        self.kicks = 0
+
+    def reset(self, output: int = 0, now: Optional[float] = None):
+        """Synchronize with a duty written outside the scheduler"""
+        self.output = self.target = output
+        self.last_write = self.last_update = time.monotonic() if now is None else now
+        self.kick_until = 0.0
+
+    def _commit(self, duty: int, now: float) -> int:
+        self.output = duty
+        self.last_write = now
+        self.writes_issued += 1
+        return duty
+
+    def _suppress(self) -> None:
+        self.writes_suppressed += 1
+        return None
+
+    def update(self, target: int, now: Optional[float] = None) -> Optional[int]:
+        """Return the duty to write now, or None if no write is needed"""
+        now = time.monotonic() if now is None else now
+        target = max(0, min(100, int(target)))
+        output = self.output
+
+        # Slew budget accrues from the last write while ramping, but a settled
+        # output only starts moving from the previous update (no jump after idle)
+        slew_ref = self.last_update if self.target == output else self.last_write
+        self.target = target
+        self.last_update = now
+
+        # Stopping is never delayed (no slew, kick or dwell applies to 0%)
+        if target == 0:
+            self.kick_until = 0.0
+            return self._commit(0, now) if output != 0 else self._suppress()
+
+        if now < self.kick_until:
+            return self._suppress()
+
+        if output == 0 and self.kick_duty and target < self.kick_duty:
+            # Stalled fans may not start at low duty: kick first, settle next ticks
+            self.kicks += 1
+            self.kick_until = now + self.kick_time
+            return self._commit(self.kick_duty, now)
+
+        if target == output or abs(target - output) < self.deadband:
+            return self._suppress()
+
+        elapsed = now - self.last_write if self.last_write is not None else None
+        if elapsed is not None and elapsed < self.min_dwell:
+            return self._suppress()
+
+        rate = self.slew_up if target > output else self.slew_down
+        if rate is not None and slew_ref is not None:
+            step = max(1, int(rate * (now - slew_ref)))
+            if target > output:
+                target = min(target, output + step)
+            else:
+                target = max(target, output - step)
+
+        return self._commit(target, now)
+
+    @property
+    def settled(self) -> bool:
+        """True when the output has reached the target"""
+        return self.output == self.target
+
+    def stats(self) -> dict:
+        return {
+            "output": self.output,
+            "target": self.target,
+            "writes_issued": self.writes_issued,
+            "writes_suppressed": self.writes_suppressed,
+            "kicks": self.kicks,
+        }
+
+
+def hysteresis_speed(curve, temperature: float, current: int, band: float) -> int:
+    """Curve output with a temperature hysteresis band
+
+    Rising temperatures follow the curve directly; the speed only drops once
+    the temperature has fallen `band` °C below the point that would give it.
+    """
+    rising = curve(temperature)
+    if rising >= current or band <= 0:
+        return rising
+    falling = curve(temperature + band)
+    return falling if falling < current else current
@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+ThermoPi Fan Backends
+Output drivers that turn a duty (0-100 %) into fan speed
+
+FanController only talks to a FanBackend; the backend is chosen at startup
+with create_backend(). Hardware libraries are imported when a backend is
+opened, never at module import, so headless starts and tests do not pay
+for (or require) them.
+
+Backends:
+    rpi-gpio        RPi.GPIO software PWM (CPU-timed, default)
+    sysfs-pwm       Kernel hardware PWM via /sys/class/pwm (needs a PWM overlay)
+    cooling-device  /sys/class/thermal/cooling_device*/cur_state (Pi 5 fan header)
+    hwmon-pwm       /sys/class/hwmon/hwmon*/pwm1 in manual mode
+    simulated       In-memory, for tests and benchmarks
+
+The sysfs backends take a root directory so they can run against a fake tree.
+Duties are written with os.pwrite on a descriptor kept open for the
+lifetime of the backend (one syscall per write).
+"""
+
+import glob
+import os
+import time
+from typing import Dict, List, Optional, Tuple, Type
+
+DEFAULT_ROOT = "/"
+
+# Raspberry Pi 5 (RP1) hardware PWM channels by BCM pin (dtoverlay=pwm-2chan)
+PI5_PWM_CHANNELS = {12: 0, 13: 1, 18: 2, 19: 3}
+
+
+class FanBackend:
+    """Base class: open once, write duties, close on shutdown"""
+
+    name = "base"
+    sysfs = False    # True if the backend takes a root directory
+    uses_pin = True  # False if the output does not depend on the GPIO pin
+
+    def open(self):
+        """Acquire the hardware; raises on failure"""
+
+    def write(self, duty: int):
+        """Apply a duty in percent (0-100)"""
+        raise NotImplementedError
+
+    def close(self):
+        """Stop the fan and release the hardware"""
+
+    def set_frequency(self, frequency: int) -> bool:
+        """Change the PWM frequency without stopping the output; False if unsupported"""
+        return False
+
+    def describe(self) -> str:
+        """Short label for status displays"""
+        return self.name
+
+
+class RPiGPIOBackend(FanBackend):
+    """Software PWM through the RPi.GPIO library"""
+
+    name = "rpi-gpio"
+
+    def __init__(self, pin: int = 18, frequency: int = 25000):
+        self.pin = pin
+        self.frequency = frequency
+        self.gpio = None
+        self.pwm = None
+
+    def open(self):
+        try:
+            import RPi.GPIO as GPIO
+        except ImportError:
+            raise RuntimeError("RPi.GPIO kütüphanesi bulunamadı! "
+                               "Lütfen şu komutu çalıştırın: pip3 install RPi.GPIO")
+        self.gpio = GPIO
+        # RPi.GPIO rejects any per-pin call before the numbering mode is set
+        GPIO.setmode(GPIO.BCM)
+        # Clean up this pin to avoid conflicts (other channels may own other pins)
+        GPIO.cleanup(self.pin)
+        GPIO.setup(self.pin, GPIO.OUT)
+        self.pwm = GPIO.PWM(self.pin, self.frequency)
+        self.pwm.start(0)
+
+    def write(self, duty: int):
+        self.pwm.ChangeDutyCycle(duty)
+
+    def set_frequency(self, frequency: int) -> bool:
+        self.pwm.ChangeFrequency(frequency)
+        self.frequency = frequency
+        return True
+
+    def close(self):
+        if self.pwm is not None:
+            self.pwm.ChangeDutyCycle(0)  # Fan'ı kapat
+            time.sleep(0.1)
+            self.pwm.stop()
+            self.pwm = None
+        if self.gpio is not None:
+            self.gpio.cleanup(self.pin)
+            self.gpio = None
+
+    def describe(self) -> str:
+        return f"GPIO pin {self.pin}"
+
+
+class SimulatedBackend(FanBackend):
+    """In-memory backend recording every write (tests, benchmarks, CI)"""
+
+    name = "simulated"
+
+    def __init__(self, pin: int = 18, frequency: int = 25000, keep: int = 0):
+        self.pin = pin
+        self.frequency = frequency
+        self.keep = keep          # Number of (monotonic, duty) writes to remember
+        self.duty = 0
+        self.writes = 0
+        self.history: List[Tuple[float, int]] = []
+        self.is_open = False
+
+    def open(self):
+        self.is_open = True
+
+    def write(self, duty: int):
+        self.duty = duty
+        self.writes += 1
+        if self.keep:
+            self.history.append((time.monotonic(), duty))
+            if len(self.history) > self.keep:
+                del self.history[:-self.keep]
+
+    def close(self):
+        self.duty = 0
+        self.is_open = False
+
+    def set_frequency(self, frequency: int) -> bool:
+        self.frequency = frequency
+        return True
+
+    def describe(self) -> str:
+        return f"simüle pin {self.pin}"
+
+
+def _read_text(path: str) -> str:
+    with open(path, "r") as f:
+        return f.read().strip()
+
+
+def _write_text(path: str, value):
+    with open(path, "w") as f:
+        f.write(f"{value}\n")
+
+
+def find_hwmon_chip(root: str, chip_name: str) -> str:
+    """Directory name (hwmonN) of the first hwmon device called chip_name"""
+    pattern = os.path.join(root, "sys/class/hwmon", "hwmon*")
+    for path in sorted(glob.glob(pattern)):
+        try:
+            if _read_text(os.path.join(path, "name")) == chip_name:
+                return os.path.basename(path)
+        except OSError:
+            continue
+    raise OSError(f"{chip_name} adlı hwmon aygıtı bulunamadı")
+
+
+class SysfsAttribute:
+    """Writable sysfs attribute kept open; each write is a single pwrite"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.fd = os.open(path, os.O_WRONLY)
+
+    def write(self, value: int):
+        os.pwrite(self.fd, b"%d\n" % value, 0)
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class SysfsPWMBackend(FanBackend):
+    """Hardware PWM through /sys/class/pwm (no CPU involvement once enabled)"""
+
+    name = "sysfs-pwm"
+    sysfs = True
+
+    def __init__(self, pin: int = 18, frequency: int = 25000, root: str = DEFAULT_ROOT,
+                 chip: int = 0, channel: Optional[int] = None, export_timeout: float = 1.0):
+        self.pin = pin
+        self.frequency = frequency
+        self.root = root
+        self.chip = chip
+        self.channel = channel if channel is not None else PI5_PWM_CHANNELS.get(pin)
+        if self.channel is None:
+            raise ValueError(f"GPIO {pin} için donanım PWM kanalı yok "
+                             f"(desteklenen pinler: {sorted(PI5_PWM_CHANNELS)})")
+        self.export_timeout = export_timeout
+        self.period = int(round(1e9 / frequency))
+        self.duty = 0
+        self.exported = False
+        self.duty_cycle: Optional[SysfsAttribute] = None
+
+    def _path(self, *parts: str) -> str:
+        return os.path.join(self.root, "sys/class/pwm", f"pwmchip{self.chip}", *parts)
+
+    def open(self):
+        channel_dir = self._path(f"pwm{self.channel}")
+        if not os.path.isdir(channel_dir):
+            _write_text(self._path("export"), self.channel)
+            self.exported = True
+            # udev may need a moment to create the attributes and fix permissions
+            deadline = time.monotonic() + self.export_timeout
+            while not os.access(os.path.join(channel_dir, "enable"), os.W_OK):
+                if time.monotonic() > deadline:
+                    raise OSError(f"{channel_dir} oluşturulmadı (PWM overlay etkin mi?)")
+                time.sleep(0.01)
+
+        # duty_cycle must never exceed period, so zero it before changing the period
+        _write_text(os.path.join(channel_dir, "duty_cycle"), 0)
+        _write_text(os.path.join(channel_dir, "period"), self.period)
+        self.duty_cycle = SysfsAttribute(os.path.join(channel_dir, "duty_cycle"))
+        _write_text(os.path.join(channel_dir, "enable"), 1)
+
+    def write(self, duty: int):
+        self.duty_cycle.write(self.period * duty // 100)
+        self.duty = duty
+
+    def set_frequency(self, frequency: int) -> bool:
+        period = int(round(1e9 / frequency))
+        period_path = self._path(f"pwm{self.channel}", "period")
+        # duty_cycle may never exceed period: shrink the duty first, grow the period first
+        if period < self.period:
+            self.duty_cycle.write(period * self.duty // 100)
+            _write_text(period_path, period)
+        else:
+            _write_text(period_path, period)
+            self.duty_cycle.write(period * self.duty // 100)
+        self.period = period
+        self.frequency = frequency
+        return True
+
+    def close(self):
+        if self.duty_cycle is None:
+            return
+        channel_dir = self._path(f"pwm{self.channel}")
+        self.duty_cycle.write(0)
+        self.duty_cycle.close()
+        self.duty_cycle = None
+        _write_text(os.path.join(channel_dir, "enable"), 0)
+        if self.exported:
+            _write_text(self._path("unexport"), self.channel)
+            self.exported = False
+
+    def describe(self) -> str:
+        return f"pwmchip{self.chip}/pwm{self.channel} (GPIO {self.pin})"
+
+
+class CoolingDeviceBackend(FanBackend):
+    """Thermal framework cooling device (e.g. the Pi 5 fan header, type pwm-fan)
+
+    Duties map onto the device's discrete states 0..max_state. Note that the
+    kernel governor of the bound thermal zone also writes cur_state; set the
+    zone policy to user_space for exclusive control.
+    """
+
+    name = "cooling-device"
+    sysfs = True
+    uses_pin = False
+
+    def __init__(self, pin: int = 18, frequency: int = 25000, root: str = DEFAULT_ROOT,
+                 device: Optional[str] = None, device_type: str = "pwm-fan"):
+        self.pin = pin
+        self.frequency = frequency
+        self.root = root
+        self.device = device
+        self.device_type = device_type
+        self.max_state = 0
+        self.state: Optional[int] = None
+        self.cur_state: Optional[SysfsAttribute] = None
+
+    def _find_device(self) -> str:
+        pattern = os.path.join(self.root, "sys/class/thermal", "cooling_device*")
+        for path in sorted(glob.glob(pattern)):
+            try:
+                if _read_text(os.path.join(path, "type")) == self.device_type:
+                    return os.path.basename(path)
+            except OSError:
+                continue
+        raise OSError(f"{self.device_type} türünde cooling device bulunamadı")
+
+    def open(self):
+        if self.device is None:
+            self.device = self._find_device()
+        device_dir = os.path.join(self.root, "sys/class/thermal", self.device)
+        self.max_state = int(_read_text(os.path.join(device_dir, "max_state")))
+        if self.max_state <= 0:
+            raise OSError(f"{self.device}: geçersiz max_state {self.max_state}")
+        self.cur_state = SysfsAttribute(os.path.join(device_dir, "cur_state"))
+        self.state = None
+
+    def write(self, duty: int):
+        # Round up so any non-zero duty keeps the fan spinning
+        state = -(-duty * self.max_state // 100)
+        if state != self.state:
+            self.cur_state.write(state)
+            self.state = state
+
+    def close(self):
+        if self.cur_state is None:
+            return
+        self.cur_state.write(0)
+        self.cur_state.close()
+        self.cur_state = None
+
+    def describe(self) -> str:
+        return f"{self.device} ({self.max_state} kademe)"
+
+
+class HwmonPWMBackend(FanBackend):
+    """hwmon pwm1 attribute (0-255) with pwm1_enable set to manual
+
+    The previous pwm1_enable value is restored on close, handing the fan
+    back to the kernel's automatic control.
+    """
+
+    name = "hwmon-pwm"
+    sysfs = True
+    uses_pin = False
+
+    def __init__(self, pin: int = 18, frequency: int = 25000, root: str = DEFAULT_ROOT,
+                 chip: Optional[str] = None, chip_name: str = "pwmfan", channel: int = 1):
+        self.pin = pin
+        self.frequency = frequency
+        self.root = root
+        self.chip = chip
+        self.chip_name = chip_name
+        self.channel = channel
+        self.saved_enable: Optional[str] = None
+        self.pwm: Optional[SysfsAttribute] = None
+
+    def open(self):
+        if self.chip is None:
+            self.chip = find_hwmon_chip(self.root, self.chip_name)
+        chip_dir = os.path.join(self.root, "sys/class/hwmon", self.chip)
+        enable_path = os.path.join(chip_dir, f"pwm{self.channel}_enable")
+        if os.path.exists(enable_path):
+            self.saved_enable = _read_text(enable_path)
+            _write_text(enable_path, 1)  # 1 = manual
+        self.pwm = SysfsAttribute(os.path.join(chip_dir, f"pwm{self.channel}"))
+
+    def write(self, duty: int):
+        self.pwm.write((duty * 255 + 50) // 100)
+
+    def close(self):
+        if self.pwm is None:
+            return
+        self.pwm.write(0)
+        self.pwm.close()
+        self.pwm = None
+        if self.saved_enable is not None:
+            chip_dir = os.path.join(self.root, "sys/class/hwmon", self.chip)
+            _write_text(os.path.join(chip_dir, f"pwm{self.channel}_enable"), self.saved_enable)
+            self.saved_enable = None
+
+    def describe(self) -> str:
+        return f"{self.chip}/pwm{self.channel}"
+
+
+BACKENDS: Dict[str, Type[FanBackend]] = {
+    RPiGPIOBackend.name: RPiGPIOBackend,
+    SysfsPWMBackend.name: SysfsPWMBackend,
+    CoolingDeviceBackend.name: CoolingDeviceBackend,
+    HwmonPWMBackend.name: HwmonPWMBackend,
+    SimulatedBackend.name: SimulatedBackend,
+}
+
+
+def create_backend(name: str = RPiGPIOBackend.name, pin: int = 18, frequency: int = 25000,
+                   root: str = DEFAULT_ROOT, **options) -> FanBackend:
+    """Instantiate a backend by name (see BACKENDS); root applies to sysfs backends"""
+    try:
+        backend_class = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Bilinmeyen fan arka ucu: {name} (seçenekler: {', '.join(BACKENDS)})")
+    if backend_class.sysfs:
+        options["root"] = root
+    return backend_class(pin=pin, frequency=frequency, **options)
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+ThermoPi Fan Channels
+One fan output each: backend, temperature source, curve and output stage
+
+A channel reads its temperature from the tick's shared ThermalSnapshot:
+either the primary sensor, one named sensor, or an aggregate of several
+(max, mean or weighted mean). FanController computes every channel's duty
+from the same snapshot in one pass and only then writes the outputs.
+
+Channels are configured as a JSON list (or {"channels": [...]}):
+
+    [
+      {"name": "cpu", "backend": "rpi-gpio", "pin": 18},
+      {"name": "case", "backend": "sysfs-pwm", "pin": 12,
+       "sensors": ["thermal_zone0", "hwmon0/temp1"], "aggregate": "weighted",
+       "weights": [0.7, 0.3], "curve": {"points": [[40, 20], [70, 100]]},
+       "tach": {"source": "gpio", "pin": 24, "max_rpm": 3000}}
+    ]
+
+Sensor names are the ThermalSampler names (thermal_zoneN, hwmonN/tempM).
+The optional "tach" entry adds RPM feedback (see tachometer.py): "source"
+is gpio, hwmon or simulated, StallDetector settings (max_rpm, stall_rpm,
+underspeed_ratio, min_duty, grace) go to the detector and the remaining
+keys to the tach source.
+"""
+
+import json
+from typing import List, Optional, Sequence
+
+from duty_scheduler import DutyScheduler
+from fan_backends import DEFAULT_ROOT, FanBackend, create_backend
+from fan_curve import FanCurve, load_curve
+from tachometer import StallDetector, Tachometer, create_tachometer
+
+AGGREGATES = ("max", "mean", "weighted")
+FAILSAFE_DUTY = 100  # Used when none of a channel's sensors could be read
+
+CHANNEL_KEYS = {"name", "backend", "pin", "frequency", "sensors", "aggregate", "weights",
+                "curve", "options", "tach"}
+DETECTOR_KEYS = {"max_rpm", "stall_rpm", "underspeed_ratio", "min_duty", "grace"}
+
+
+class FanChannel:
+    """A fan output with its own temperature source, curve and duty scheduler"""
+
+    def __init__(self, name: str, backend: FanBackend, curve: FanCurve,
+                 sensors: Optional[Sequence[str]] = None, aggregate: str = "max",
+                 weights: Optional[Sequence[float]] = None,
+                 scheduler: Optional[DutyScheduler] = None,
+                 tachometer: Optional[Tachometer] = None,
+                 stall_detector: Optional[StallDetector] = None):
+        if aggregate not in AGGREGATES:
+            raise ValueError(f"{name}: geçersiz birleştirme '{aggregate}' "
+                             f"(seçenekler: {', '.join(AGGREGATES)})")
+        self.sensors = tuple(sensors or ())
+        if aggregate == "weighted":
+            if weights is None or len(weights) != len(self.sensors):
+                raise ValueError(f"{name}: her sensör için bir ağırlık gerekli")
+            if any(weight < 0 for weight in weights) or not sum(weights):
+                raise ValueError(f"{name}: ağırlıklar negatif olmayan ve toplamı sıfırdan büyük olmalı")
+        self.name = name
+        self.backend = backend
+        self.curve = curve
+        self.aggregate = aggregate
+        self.weights = tuple(float(weight) for weight in weights) if weights else None
+        self.scheduler = scheduler if scheduler is not None else DutyScheduler()
+        self.tachometer = tachometer
+        self.stall_detector = stall_detector
+        if tachometer is not None:
+            if stall_detector is None:
+                self.stall_detector = StallDetector()
+            tachometer.attach(self)
+
+        self.current_speed = 0
+        self.target_speed = 0
+        self.base_speed = 0  # Temperature-driven part of target_speed (before feed-forward)
+        self.temperature: Optional[float] = None  # Last temperature the duty was computed from
+        self.rpm: Optional[float] = None          # Last measured speed (None without a tachometer)
+        self.fan_status = "ok"                    # tachometer.STATUSES
+        self.is_open = False
+        self.label = backend.describe()
+
+    def open(self):
+        self.backend.open()
+        self.scheduler.reset(0)
+        self.current_speed = 0
+        self.target_speed = 0
+        self.base_speed = 0
+        self.is_open = True
+        self.label = self.backend.describe()  # Some backends only know their device once open
+        if self.tachometer is not None:
+            try:
+                self.tachometer.open()
+            except Exception as e:
+                # Feedback is optional: the fan is still driven without it
+                print(f"⚠️ {self.name}: devir ölçümü başlatılamadı ({self.tachometer.describe()}): {e}")
+                self.tachometer = None
+        self.rpm = None
+        self.fan_status = "ok"
+
+    def close(self):
+        if not self.is_open:
+            return
+        self.scheduler.reset(0)
+        if self.tachometer is not None:
+            try:
+                self.tachometer.close()
+            except Exception as e:
+                print(f"⚠️ {self.name}: devir ölçümü kapatılamadı: {e}")
+        self.backend.close()
+        self.current_speed = 0
+        self.is_open = False
+
+    def write(self, duty: int):
+        """Drive the output at duty (%) through whichever backend is current"""
+        self.backend.write(duty)
+        self.current_speed = duty
+
+    def measure(self, now: Optional[float] = None) -> Optional[str]:
+        """Read the RPM and judge it against the written duty
+
+        Returns the new status when it changed this tick, else None.
+        """
+        if self.tachometer is None or not self.is_open:
+            return None
+        self.rpm = self.tachometer.read(now)
+        status = self.stall_detector.update(self.current_speed, self.rpm, now)
+        if status == self.fan_status:
+            return None
+        self.fan_status = status
+        return status
+
+    def temperature_from(self, snapshot) -> Optional[float]:
+        """This channel's temperature in a snapshot; None if no sensor could be read"""
+        if snapshot is None:
+            return None
+        if not self.sensors:
+            return snapshot.primary
+        temperatures = snapshot.temperatures
+        if self.aggregate == "weighted":
+            # Weights of unreadable sensors are dropped and the rest renormalized
+            total = weight_sum = 0.0
+            for sensor, weight in zip(self.sensors, self.weights):
+                value = temperatures.get(sensor)
+                if value is not None:
+                    total += weight * value
+                    weight_sum += weight
+            return total / weight_sum if weight_sum else None
+        values = [temperatures[sensor] for sensor in self.sensors if sensor in temperatures]
+        if not values:
+            return None
+        return max(values) if self.aggregate == "max" else sum(values) / len(values)
+
+    def describe(self) -> str:
+        if self.tachometer is not None:
+            return f"{self.name}: {self.label}, {self.tachometer.describe()}"
+        return f"{self.name}: {self.label}"
+
+
+def channel_from_dict(config: dict, index: int = 0, root: str = DEFAULT_ROOT,
+                      default_curve: Optional[FanCurve] = None, default_backend: str = "rpi-gpio",
+                      default_pin: int = 18, default_frequency: int = 25000) -> FanChannel:
+    """Build one channel from its config dictionary"""
+    if not isinstance(config, dict):
+        raise ValueError(f"Kanal {index}: JSON nesnesi bekleniyordu")
+    unknown = sorted(set(config) - CHANNEL_KEYS)
+    if unknown:
+        raise ValueError(f"Kanal {index}: bilinmeyen ayarlar: {', '.join(unknown)}")
+    name = str(config.get("name", f"fan{index}"))
+
+    curve = config.get("curve")
+    if curve is None:
+        curve = default_curve if default_curve is not None else FanCurve.from_thresholds(50, 65, 20, 80)
+    elif isinstance(curve, str):
+        curve = load_curve(curve)
+    else:
+        curve = FanCurve.from_dict(curve)
+
+    sensors = config.get("sensors")
+    if isinstance(sensors, str):
+        sensors = [sensors]
+
+    backend = create_backend(config.get("backend", default_backend),
+                             int(config.get("pin", default_pin)),
+                             int(config.get("frequency", default_frequency)),
+                             root=root, **config.get("options", {}))
+    tachometer, detector = tach_from_dict(config["tach"], name, root) if "tach" in config else (None, None)
+    return FanChannel(name, backend, curve, sensors=sensors,
+                      aggregate=config.get("aggregate", "max"), weights=config.get("weights"),
+                      tachometer=tachometer, stall_detector=detector)
+
+
+def tach_from_dict(config: dict, name: str = "fan", root: str = DEFAULT_ROOT):
+    """(Tachometer, StallDetector) from a channel's "tach" entry"""
+    if not isinstance(config, dict) or "source" not in config:
+        raise ValueError(f"{name}: tach ayarı \"source\" içeren bir JSON nesnesi olmalı")
+    options = dict(config)
+    source = options.pop("source")
+    detector = StallDetector(**{key: options.pop(key) for key in DETECTOR_KEYS & set(options)})
+    if source == "simulated":
+        options.setdefault("max_rpm", detector.max_rpm)  # Simulated fan matches the expected RPM
+    return create_tachometer(source, root=root, **options), detector
+
+
+def load_channels(spec, root: str = DEFAULT_ROOT, **defaults) -> List[FanChannel]:
+    """Channels from a config list or a JSON file path; defaults go to channel_from_dict"""
+    if isinstance(spec, str):
+        with open(spec, "r", encoding="utf-8") as f:
+            spec = json.load(f)
+    if isinstance(spec, dict):
+        spec = spec.get("channels")
+    if not isinstance(spec, list) or not spec:
+        raise ValueError("Kanal yapılandırması boş olmayan bir liste olmalı")
+
+    channels = [channel_from_dict(config, index, root, **defaults)
+                for index, config in enumerate(spec)]
+    names = [channel.name for channel in channels]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Kanal adları benzersiz olmalı: {', '.join(names)}")
+    return channels
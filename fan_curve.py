@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+ThermoPi Fan Curve
+Multi-point temperature -> duty curves compiled into a lookup table
+
+A curve is a list of (temperature °C, duty %) points plus an interpolation
+mode (step, linear or monotone cubic). It is compiled once into a table at
+a fixed temperature resolution, so evaluating a temperature is an index
+computation and a list lookup. evaluate_batch maps whole arrays at once
+(vectorized with NumPy when it is installed).
+
+Config format (JSON):
+    {"points": [[50, 20], [65, 80]], "mode": "linear",
+     "below": 0, "above": 100, "resolution": 0.01}
+"""
+
+import json
+import math
+from typing import List, Optional, Sequence, Tuple
+
+MODES = ("step", "linear", "monotone_cubic")
+DEFAULT_RESOLUTION = 0.01
+
+
+def _numpy():
+    """NumPy if installed; imported on first batch use so startup stays fast"""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def _pchip_slopes(xs: List[float], ys: List[float]) -> List[float]:
+    """Fritsch-Carlson slopes for a monotone cubic Hermite interpolant"""
+    n = len(xs)
+    deltas = [(ys[i + 1] - ys[i]) / (xs[i + 1] - xs[i]) for i in range(n - 1)]
+    if n == 2:
+        return [deltas[0], deltas[0]]
+
+    slopes = [deltas[0]] + [0.0] * (n - 2) + [deltas[-1]]
+    for i in range(1, n - 1):
+        if deltas[i - 1] * deltas[i] <= 0:
+            slopes[i] = 0.0
+        else:
+            # Weighted harmonic mean keeps every segment monotone
+            w1 = 2 * (xs[i + 1] - xs[i]) + (xs[i] - xs[i - 1])
+            w2 = (xs[i + 1] - xs[i]) + 2 * (xs[i] - xs[i - 1])
+            slopes[i] = (w1 + w2) / (w1 / deltas[i - 1] + w2 / deltas[i])
+    return slopes
+
+
+class FanCurve:
+    """Temperature to duty curve with O(1) evaluation"""
+
+    def __init__(self, points: Sequence[Tuple[float, float]], mode: str = "linear",
+                 below: Optional[float] = None, above: Optional[float] = None,
+                 resolution: float = DEFAULT_RESOLUTION):
+        if mode not in MODES:
+            raise ValueError(f"Geçersiz eğri modu: {mode} (seçenekler: {', '.join(MODES)})")
+        if not points:
+            raise ValueError("Fan eğrisi en az bir nokta içermeli")
+        if resolution <= 0:
+            raise ValueError("Çözünürlük pozitif olmalı")
+
+        self.points = [(float(t), float(d)) for t, d in points]
+        xs = [t for t, _ in self.points]
+        if any(b < a for a, b in zip(xs, xs[1:])):
+            raise ValueError("Eğri noktaları sıcaklığa göre sıralı olmalı")
+        if mode == "monotone_cubic" and any(b == a for a, b in zip(xs, xs[1:])):
+            raise ValueError("Monoton kübik eğride aynı sıcaklık iki kez kullanılamaz")
+        for _, duty in self.points:
+            if not 0 <= duty <= 100:
+                raise ValueError(f"Fan hızı 0-100 arasında olmalı: {duty}")
+
+        self.mode = mode
+        self.below = self.points[0][1] if below is None else float(below)
+        self.above = self.points[-1][1] if above is None else float(above)
+        self.resolution = resolution
+        self.t_low = xs[0]
+        self.t_high = xs[-1]
+        self._compile()
+
+    @classmethod
+    def from_thresholds(cls, temp_min: float, temp_max: float,
+                        speed_min: float, speed_max: float) -> "FanCurve":
+        """The classic ramp: off below temp_min, speed_min..speed_max, 100% above temp_max"""
+        return cls([(temp_min, speed_min), (temp_max, speed_max)], "linear", below=0, above=100)
+
+    @classmethod
+    def from_dict(cls, config: dict) -> "FanCurve":
+        """Build a curve from a config dictionary"""
+        try:
+            points = [(float(t), float(d)) for t, d in config["points"]]
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("Eğri yapılandırması 'points': [[sıcaklık, hız], ...] içermeli")
+        return cls(points, config.get("mode", "linear"), config.get("below"),
+                   config.get("above"), config.get("resolution", DEFAULT_RESOLUTION))
+
+    def to_dict(self) -> dict:
+        return {
+            "points": [list(point) for point in self.points],
+            "mode": self.mode,
+            "below": self.below,
+            "above": self.above,
+            "resolution": self.resolution,
+        }
+
+    def exact(self, temperature: float) -> float:
+        """Evaluate the curve analytically (used to compile the table)"""
+        if temperature < self.t_low:
+            return self.below
+        if temperature > self.t_high:
+            return self.above
+
+        points = self.points
+        # Last point at or before the temperature (right-continuous at repeated points)
+        i = 0
+        while i + 1 < len(points) and points[i + 1][0] <= temperature:
+            i += 1
+        if i + 1 == len(points) or self.mode == "step":
+            return points[i][1]
+
+        (x0, y0), (x1, y1) = points[i], points[i + 1]
+        h = x1 - x0
+        s = (temperature - x0) / h
+        if self.mode == "linear":
+            return y0 + (y1 - y0) * s
+
+        m0, m1 = self._slopes[i], self._slopes[i + 1]
+        h00 = (1 + 2 * s) * (1 - s) ** 2
+        h10 = s * (1 - s) ** 2
+        h01 = s * s * (3 - 2 * s)
+        h11 = s * s * (s - 1)
+        return h00 * y0 + h10 * h * m0 + h01 * y1 + h11 * h * m1
+
+    def _compile(self):
+        """Precompute integer duties on a fixed temperature grid"""
+        if self.mode == "monotone_cubic" and len(self.points) > 1:
+            self._slopes = _pchip_slopes([t for t, _ in self.points], [d for _, d in self.points])
+        steps = int(math.floor((self.t_high - self.t_low) / self.resolution + 1e-9))
+        self._inv_resolution = 1.0 / self.resolution
+        self.table = [int(max(0.0, min(100.0, self.exact(self.t_low + i * self.resolution))))
+                      for i in range(steps + 1)]
+        self._below = int(self.below)
+        self._above = int(self.above)
+        self._table_np = None  # Built on the first vectorized evaluate_batch
+
+    def evaluate(self, temperature: float) -> int:
+        """Duty (0-100) for one temperature: range checks plus one table lookup"""
+        if temperature < self.t_low:
+            return self._below
+        if temperature > self.t_high:
+            return self._above
+        index = int((temperature - self.t_low) * self._inv_resolution)
+        table = self.table
+        return table[index] if index < len(table) else table[-1]
+
+    __call__ = evaluate
+
+    def evaluate_batch(self, temperatures):
+        """Map a whole sequence/array of temperatures to duties at once"""
+        np = _numpy()
+        if np is None:
+            evaluate = self.evaluate
+            return [evaluate(t) for t in temperatures]
+
+        if self._table_np is None:
+            self._table_np = np.array(self.table, dtype=np.int16)
+        temps = np.asarray(temperatures, dtype=np.float64)
+        index = ((temps - self.t_low) * self._inv_resolution).astype(np.int64)
+        np.clip(index, 0, len(self.table) - 1, out=index)
+        duties = self._table_np[index]
+        duties = np.where(temps < self.t_low, self._below, duties)
+        return np.where(temps > self.t_high, self._above, duties).astype(np.int16)
+
+    def __repr__(self):
+        return f"FanCurve({self.points}, mode={self.mode!r}, below={self.below}, above={self.above})"
+
+
+def load_curve(path: str) -> FanCurve:
+    """Load a curve from a JSON config file"""
+    with open(path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    # Accept either a bare curve or a full config with a "curve" section
+    return FanCurve.from_dict(config.get("curve", config))
+
+
+def save_curve(curve: FanCurve, path: str):
+    """Write a curve as a JSON config file"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(curve.to_dict(), f, indent=2)
+        f.write("\n")
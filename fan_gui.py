@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+ThermoPi GUI
+Tkinter frontend subscribed to the control engine
+
+Imported only when the GUI interface is selected, so headless and terminal
+starts never load tkinter.
+
+Engine states are coalesced into at most one pending Tk callback, widgets
+are reconfigured only when their text or value changes, and slider drags
+are sent to the engine at most `slider_rate` times per second.
+"""
+
+import time
+import tkinter as tk
+from tkinter import ttk, messagebox
+from typing import Optional
+
+from control_engine import ControlEngine, ControlState
+from history_chart import LiveChart
+
+# Selectable chart spans (label -> seconds); the longest sizes the ring buffer
+CHART_SPANS = {"1 sa": 3600.0, "6 sa": 6 * 3600.0, "24 sa": 24 * 3600.0}
+
+
+class FanControlGUI:
+    """GUI interface using Tkinter"""
+    
+    def __init__(self, fan_controller: "FanController", data_logger: "DataLogger",
+                 engine: Optional[ControlEngine] = None, slider_rate: float = 5.0):
+        self.fan_controller = fan_controller
+        self.data_logger = data_logger
+        self.engine = engine or ControlEngine(fan_controller, data_logger)
+        self.is_auto_mode = False
+        self.is_running = True
+        
+        # Slider drags: at most slider_rate commands per second, the last value always sent
+        self.slider_interval = 1.0 / slider_rate if slider_rate > 0 else 0.0
+        self._slider_value: Optional[int] = None
+        self._slider_job = None
+        self._slider_sent_at = 0.0
+        
+        # Latest engine state waiting for the Tk thread (one pending callback at most)
+        self._pending_state: Optional[ControlState] = None
+        self._widget_values = {}
+        
+        # Create main window
+        self.root = tk.Tk()
+        self.root.title("🌡️ ThermoPi - Akıllı Fan Kontrol")
+        self.root.geometry("640x760")
+        self.root.resizable(True, True)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+        
+        # Set window icon and styling
+        try:
+            self.root.configure(bg='#2b2b2b')
+        except:
+            pass
+        
+        self.setup_gui()
+        self.start_engine()
+    
+    def setup_gui(self):
+        """Setup the GUI components"""
+        # Main frame
+        main_frame = ttk.Frame(self.root, padding="10")
+        main_frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        
+        # Temperature display
+        temp_frame = ttk.LabelFrame(main_frame, text="🌡️ Sıcaklık Durumu", padding="15")
+        temp_frame.grid(row=0, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=8)
+        
+        self.temp_label = ttk.Label(temp_frame, text="CPU Sıcaklığı: --°C", font=("Arial", 16, "bold"))
+        self.temp_label.grid(row=0, column=0)
+        
+        # Mode control
+        mode_frame = ttk.LabelFrame(main_frame, text="🎛️ Kontrol Modu", padding="15")
+        mode_frame.grid(row=1, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=8)
+        
+        self.mode_var = tk.BooleanVar()
+        self.mode_checkbox = ttk.Checkbutton(
+            mode_frame, 
+            text="🤖 Otomatik Mod (Sıcaklık Bazlı)", 
+            variable=self.mode_var,
+            command=self.toggle_mode
+        )
+        self.mode_checkbox.grid(row=0, column=0, sticky=tk.W)
+        
+        self.pid_var = tk.BooleanVar(value=self.fan_controller.auto_strategy == "pid")
+        self.pid_checkbox = ttk.Checkbutton(
+            mode_frame,
+            text=f"🎯 PID (Hedef: {self.fan_controller.pid.setpoint:.0f}°C)",
+            variable=self.pid_var,
+            command=self.toggle_strategy
+        )
+        self.pid_checkbox.grid(row=1, column=0, sticky=tk.W)
+        
+        # Manual control
+        manual_frame = ttk.LabelFrame(main_frame, text="🎯 Manuel Kontrol", padding="15")
+        manual_frame.grid(row=2, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=8)
+        
+        ttk.Label(manual_frame, text="Fan Hızı:", font=("Arial", 12)).grid(row=0, column=0, sticky=tk.W, pady=5)
+        
+        self.speed_var = tk.IntVar()
+        self.speed_scale = ttk.Scale(
+            manual_frame,
+            from_=0,
+            to=100,
+            orient=tk.HORIZONTAL,
+            variable=self.speed_var,
+            command=self.on_speed_change,
+            length=300
+        )
+        self.speed_scale.grid(row=1, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=8)
+        
+        self.speed_label = ttk.Label(manual_frame, text="0%", font=("Arial", 14, "bold"))
+        self.speed_label.grid(row=1, column=2, padx=15)
+        
+        # Status display
+        status_frame = ttk.LabelFrame(main_frame, text="📊 Anlık Durum", padding="15")
+        status_frame.grid(row=3, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=8)
+        
+        self.status_label = ttk.Label(status_frame, text="Mevcut Fan Hızı: 0%", font=("Arial", 14))
+        self.status_label.grid(row=0, column=0, pady=5)
+        
+        # Add system info
+        self.system_label = ttk.Label(status_frame, text="Sistem: Hazırlanıyor...", font=("Arial", 10))
+        self.system_label.grid(row=1, column=0, pady=2)
+        
+        # History chart
+        chart_frame = ttk.LabelFrame(main_frame, text="📈 Geçmiş (Sıcaklık / Fan Hızı)", padding="10")
+        chart_frame.grid(row=4, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=8)
+        
+        self.chart_canvas = tk.Canvas(chart_frame, width=560, height=180, bg="#1e1e1e",
+                                      highlightthickness=0)
+        self.chart_canvas.grid(row=0, column=0, columnspan=2)
+        self.chart = LiveChart(self.chart_canvas, width=560, height=180, span=max(CHART_SPANS.values()))
+        
+        self.span_var = tk.StringVar(value="24 sa")
+        span_box = ttk.Combobox(chart_frame, textvariable=self.span_var, values=list(CHART_SPANS),
+                                state="readonly", width=6)
+        span_box.grid(row=1, column=1, sticky=tk.E, pady=(5, 0))
+        span_box.bind("<<ComboboxSelected>>", self.on_span_change)
+        
+        # Configure grid weights
+        self.root.columnconfigure(0, weight=1)
+        self.root.rowconfigure(0, weight=1)
+        main_frame.columnconfigure(0, weight=1)
+        manual_frame.columnconfigure(0, weight=1)
+    
+    def toggle_mode(self):
+        """Toggle between manual and automatic mode"""
+        self.is_auto_mode = self.mode_var.get()
+        self.engine.submit("set_auto", self.is_auto_mode)
+        
+        if self.is_auto_mode:
+            self.speed_scale.configure(state='disabled')
+            print("🤖 Otomatik moda geçildi")
+        else:
+            self.speed_scale.configure(state='normal')
+            print("🎯 Manuel moda geçildi")
+    
+    def toggle_strategy(self):
+        """Switch automatic mode between the fan curve and PID"""
+        self.engine.submit("set_strategy", "pid" if self.pid_var.get() else "curve")
+    
+    def on_span_change(self, event=None):
+        """Show another time span (rebuilds the chart once from its ring buffer)"""
+        self.chart.set_span(CHART_SPANS[self.span_var.get()])
+    
+    def on_speed_change(self, value):
+        """Handle manual speed slider change"""
+        if self.is_auto_mode:
+            return
+        speed = int(float(value))
+        self._set(self.speed_label, text=f"{speed}%")
+        if speed == self._slider_value:
+            return  # Motion events within the same integer step
+        self._slider_value = speed
+        if self._slider_job is None:
+            delay = self._slider_sent_at + self.slider_interval - time.monotonic()
+            self._slider_job = self.root.after(max(0, int(delay * 1000)), self._send_speed)
+    
+    def _send_speed(self):
+        """Send the latest slider value (trailing edge of the rate limit)"""
+        self._slider_job = None
+        self._slider_sent_at = time.monotonic()
+        self.engine.submit("set_speed", self._slider_value)
+    
+    def _set(self, widget, **options):
+        """Configure a widget only if one of the options differs from what it shows"""
+        key = str(widget)
+        shown = self._widget_values.get(key)
+        if shown != options:
+            widget.config(**options)
+            self._widget_values[key] = options
+    
+    def on_state(self, state: ControlState):
+        """Engine subscriber: hand the latest state over to the Tk main thread"""
+        if not self.is_running:
+            return
+        schedule = self._pending_state is None
+        self._pending_state = state
+        if schedule:
+            self.root.after(0, self._apply_pending_state)
+    
+    def _apply_pending_state(self):
+        state, self._pending_state = self._pending_state, None
+        if state is not None and self.is_running:
+            self.update_display(state)
+    
+    def update_display(self, state: ControlState):
+        """Update GUI display with current values"""
+        if state.error:
+            self._set(self.system_label, text=f"❌ Kontrol durdu: {state.error}")
+            return
+        
+        self.chart.add(state.monotonic, state.temperature, state.fan_speed)
+        
+        temperature = state.temperature
+        fan_speed = state.fan_speed
+        
+        # Temperature with color coding
+        temp_color = "green" if temperature < 50 else "orange" if temperature < 65 else "red"
+        self._set(self.temp_label, text=f"CPU Sıcaklığı: {temperature:.1f}°C")
+        
+        # Status with mode info
+        mode_text = state.mode
+        self._set(self.status_label, text=f"Mevcut Fan Hızı: {fan_speed}% ({mode_text})")
+        
+        # System status
+        if len(state.channels) > 1:
+            outputs = " | ".join(f"{ch.name}: {ch.fan_speed}%" for ch in state.channels)
+            status_text = f"{outputs} | Mod: {mode_text}"
+        else:
+            output = state.channels[0].output if state.channels else "Fan"
+            status_text = f"{output} | PWM: {fan_speed}% | Mod: {mode_text}"
+        if state.load is not None:
+            status_text += f" | Yük: {state.load * 100:.0f}% (+{state.boost}%)"
+        for channel in state.channels:
+            if channel.rpm is None:
+                continue
+            name = f"{channel.name} " if len(state.channels) > 1 else ""
+            status = {"stall": " DURDU", "underspeed": " düşük devir"}.get(channel.fan_status, "")
+            status_text += f" | {name}{channel.rpm:.0f} RPM{status}"
+        self._set(self.system_label, text=status_text)
+        
+        if not self.is_auto_mode and not state.auto and self._slider_job is None:
+            # Slider follows the requested speed (not while a drag is being sent)
+            if self.speed_var.get() != state.target_speed:
+                self.speed_var.set(state.target_speed)
+            self._set(self.speed_label, text=f"{state.target_speed}%")
+    
+    def start_engine(self):
+        """Subscribe to the control engine and start it"""
+        self.unsubscribe = self.engine.subscribe(self.on_state)
+        self.engine.start()
+    
+    def on_closing(self):
+        """Handle window closing"""
+        self.is_running = False
+        if self._slider_job is not None:
+            self.root.after_cancel(self._slider_job)
+        self.unsubscribe()
+        self.engine.stop()
+        self.fan_controller.cleanup()
+        self.data_logger.close()
+        self.root.destroy()
+    
+    def run(self):
+        """Start the GUI main loop"""
+        self.root.mainloop()
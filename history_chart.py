@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+ThermoPi History Chart
+Scrolling temperature/duty chart for a Tk Canvas, drawn from min/max buckets
+
+Samples go into a fixed-size ring buffer and are folded into one min/max
+bucket per `bucket_px` pixels, so a full day of 1 Hz data is drawn with a
+few hundred line items whatever the sample count. Min/max (rather than
+LTTB) is used because it can be maintained incrementally and never hides a
+temperature peak.
+
+Drawing is incremental: a sample only touches the canvas when it changes
+the open bucket's min, max or last value, and starting a new bucket is a
+single canvas.move of all data items plus one new item per series (the
+oldest is deleted). Nothing is redrawn unless the time span changes.
+
+The canvas is only used through create_line/create_text/coords/move/
+delete, so this module does not import tkinter.
+"""
+
+from array import array
+from collections import deque
+from typing import Deque, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+
+class Series(NamedTuple):
+    """One plotted value with its fixed vertical range"""
+    name: str
+    color: str
+    low: float
+    high: float
+
+
+DEFAULT_SERIES = (
+    Series("temperature", "#e4572e", 20.0, 90.0),  # Left axis, °C
+    Series("duty", "#4c9be8", 0.0, 100.0),          # Right axis, %
+)
+
+
+class RingBuffer:
+    """Fixed-capacity ring of rows stored column-wise in float arrays"""
+
+    def __init__(self, capacity: int, columns: int):
+        self.capacity = capacity
+        self.columns = [array("d", bytes(8 * capacity)) for _ in range(columns)]
+        self.start = 0
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def append(self, *values: float):
+        position = (self.start + self.size) % self.capacity
+        for column, value in zip(self.columns, values):
+            column[position] = value
+        if self.size < self.capacity:
+            self.size += 1
+        else:
+            self.start = (self.start + 1) % self.capacity
+
+    def rows(self) -> Iterator[Tuple[float, ...]]:
+        """Rows from oldest to newest"""
+        columns = self.columns
+        for i in range(self.size):
+            position = (self.start + i) % self.capacity
+            yield tuple(column[position] for column in columns)
+
+
+class _Bucket:
+    """Min/max/last of every series over one bucket, plus its canvas items"""
+
+    __slots__ = ("index", "low", "high", "last", "items")
+
+    def __init__(self, index: int, count: int):
+        self.index = index
+        self.low: List[Optional[float]] = [None] * count
+        self.high: List[Optional[float]] = [None] * count
+        self.last: List[Optional[float]] = [None] * count
+        self.items: List[Optional[int]] = [None] * count
+
+    def update(self, values: Sequence[Optional[float]]) -> List[int]:
+        """Fold one sample in; returns the series whose drawing changed"""
+        changed = []
+        for i, value in enumerate(values):
+            if value is None or value != value:  # Missing or NaN
+                continue
+            low, high = self.low[i], self.high[i]
+            if low is None:
+                self.low[i] = self.high[i] = self.last[i] = value
+                changed.append(i)
+                continue
+            dirty = value != self.last[i]
+            if value < low:
+                self.low[i] = value
+            elif value > high:
+                self.high[i] = value
+            self.last[i] = value
+            if dirty:
+                changed.append(i)
+        return changed
+
+
+class LiveChart:
+    """Incrementally drawn min/max chart of the last `span` seconds"""
+
+    def __init__(self, canvas, width: int = 560, height: int = 180, span: float = 86400.0,
+                 bucket_px: int = 2, resolution: float = 1.0,
+                 series: Sequence[Series] = DEFAULT_SERIES, margin: Tuple[int, int, int, int] = (34, 8, 34, 18)):
+        self.canvas = canvas
+        self.width = width
+        self.height = height
+        self.series = list(series)
+        self.bucket_px = bucket_px
+        self.left, self.top, self.right, self.bottom = margin
+        self.plot_width = width - self.left - self.right
+        self.plot_height = height - self.top - self.bottom
+        self.buckets = max(2, self.plot_width // bucket_px)
+
+        # Raw samples (at most one per `resolution` seconds) for rebuilding on a span change
+        self.resolution = resolution
+        self.max_span = span
+        self.ring = RingBuffer(int(span / resolution) + 1, 1 + len(self.series))
+        self._last_raw: Optional[float] = None
+
+        self.visible: Deque[_Bucket] = deque()
+        self.canvas_calls = 0
+        self._drawing = True
+        self.set_span(span)
+
+    # --- Geometry ---
+
+    def _x(self, bucket: _Bucket) -> float:
+        """Bucket x position; the newest bucket sits at the right edge"""
+        newest = self.visible[-1].index
+        return self.left + self.plot_width - (newest - bucket.index) * self.bucket_px
+
+    def _y(self, series: Series, value: float) -> float:
+        fraction = (value - series.low) / (series.high - series.low)
+        fraction = min(1.0, max(0.0, fraction))
+        return self.top + self.plot_height * (1.0 - fraction)
+
+    # --- Drawing ---
+
+    def draw_axes(self):
+        """Static frame, grid and labels (drawn once per span)"""
+        canvas = self.canvas
+        canvas.delete("axes")
+        x0, x1 = self.left, self.left + self.plot_width
+        y0, y1 = self.top, self.top + self.plot_height
+        canvas.create_line(x0, y0, x0, y1, x1, y1, x1, y0, fill="#888888", tags=("axes",))
+        temp, duty = self.series[0], self.series[-1]
+        for step in range(5):
+            fraction = step / 4
+            y = y1 - fraction * self.plot_height
+            canvas.create_line(x0, y, x1, y, fill="#3a3a3a", tags=("axes",))
+            canvas.create_text(x0 - 3, y, text=f"{temp.low + fraction * (temp.high - temp.low):.0f}°",
+                               anchor="e", fill=temp.color, font=("Arial", 8), tags=("axes",))
+            canvas.create_text(x1 + 3, y, text=f"{duty.low + fraction * (duty.high - duty.low):.0f}%",
+                               anchor="w", fill=duty.color, font=("Arial", 8), tags=("axes",))
+        for step in range(5):
+            x = x0 + step / 4 * self.plot_width
+            canvas.create_text(x, y1 + 3, text=_ago(self.span * (1 - step / 4)),
+                               anchor="n", fill="#aaaaaa", font=("Arial", 8), tags=("axes",))
+
+    def _draw(self, bucket: _Bucket, previous: Optional[_Bucket], changed: Sequence[int]):
+        """Create or move the lines of one bucket for the series that changed"""
+        x = self._x(bucket)
+        for i in changed:
+            if bucket.low[i] is None:
+                continue
+            series = self.series[i]
+            coords = [x, self._y(series, bucket.low[i]), x, self._y(series, bucket.high[i])]
+            if previous is not None and previous.last[i] is not None:
+                # Join from the previous bucket's close, end on this bucket's close
+                coords = [self._x(previous), self._y(series, previous.last[i])] + coords
+                coords += [x, self._y(series, bucket.last[i])]
+            item = bucket.items[i]
+            if item is None:
+                bucket.items[i] = self.canvas.create_line(*coords, fill=series.color, tags=("data",))
+            else:
+                self.canvas.coords(item, *coords)
+            self.canvas_calls += 1
+
+    def _advance(self, index: int):
+        """Scroll so that bucket `index` becomes the newest"""
+        if self.visible:
+            shift = index - self.visible[-1].index
+            oldest = index - self.buckets + 1
+            while self.visible and self.visible[0].index < oldest:
+                for item in self.visible.popleft().items:
+                    if item is not None:
+                        self.canvas.delete(item)
+                        self.canvas_calls += 1
+            if self.visible and self._drawing:
+                self.canvas.move("data", -shift * self.bucket_px, 0)
+                self.canvas_calls += 1
+        self.visible.append(_Bucket(index, len(self.series)))
+
+    def _aggregate(self, t: float, values: Sequence[Optional[float]]):
+        index = int(t // self.bucket_seconds)
+        if not self.visible or index > self.visible[-1].index:
+            self._advance(index)
+        elif index < self.visible[-1].index:
+            return  # Out-of-order sample for an already scrolled bucket
+        bucket = self.visible[-1]
+        changed = bucket.update(values)
+        if changed and self._drawing:
+            previous = self.visible[-2] if len(self.visible) > 1 else None
+            self._draw(bucket, previous, changed)
+
+    # --- API ---
+
+    def add(self, t: float, *values: Optional[float]):
+        """Add one sample (monotonic seconds, then one value per series)"""
+        if self._last_raw is None or t - self._last_raw >= self.resolution:
+            self._last_raw = t
+            self.ring.append(t, *(float("nan") if value is None else value for value in values))
+        self._aggregate(t, values)
+
+    def set_span(self, span: float):
+        """Show the last `span` seconds (up to the span given at construction); redraws once"""
+        self.span = min(span, self.max_span)
+        self.bucket_seconds = self.span / self.buckets
+        self.canvas.delete("data")
+        self.visible.clear()
+        self.draw_axes()
+
+        # Aggregate first, then draw every bucket once (no per-bucket scrolling)
+        newest = self._last_raw if self._last_raw is not None else 0.0
+        self._drawing = False
+        try:
+            for row in self.ring.rows():
+                if row[0] > newest - self.span - self.bucket_seconds:
+                    self._aggregate(row[0], row[1:])
+        finally:
+            self._drawing = True
+        all_series = range(len(self.series))
+        for position, bucket in enumerate(self.visible):
+            self._draw(bucket, self.visible[position - 1] if position else None, all_series)
+
+    @property
+    def item_count(self) -> int:
+        """Data line items currently on the canvas"""
+        return sum(item is not None for bucket in self.visible for item in bucket.items)
+
+
+def _ago(seconds: float) -> str:
+    if seconds <= 0:
+        return "şimdi"
+    if seconds >= 3600:
+        return f"-{seconds / 3600:g}sa"
+    if seconds >= 60:
+        return f"-{seconds / 60:g}dk"
+    return f"-{seconds:g}s"
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+ThermoPi History Index
+Time-range aggregate queries over the binary history store
+
+Segments that lie entirely inside the query range are answered from
+their index summary, partially covered segments from their per-block
+summaries, and only the blocks at the range edges (or segments that are
+not indexed yet, e.g. the one being written) are decoded.
+
+Usage:
+    python3 history_index.py query history --start "2026-10-13 02:00" --end "2026-10-13 03:00"
+    python3 history_index.py reindex history
+"""
+
+import argparse
+import bisect
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from history_store import (DEFAULT_BLOCK_SECONDS, HistorySegment, Summary, append_index_entry,
+                           index_segment, list_segments, load_index, segment_name)
+
+FIELDS = ("temp", "duty")
+_BLOCK_FIELD_OFFSET = {"temp": 1, "duty": 5}
+
+
+class HistoryIndex:
+    """Answers min/max/mean queries over a history directory"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.refresh()
+
+    def refresh(self):
+        """Reload the index and the segment list (cheap: one small file and a glob)"""
+        entries = load_index(self.directory)
+        self.paths = {segment_name(path): path for path in list_segments(self.directory)}
+        self.entries = sorted((entry for name, entry in entries.items() if name in self.paths),
+                              key=lambda entry: entry["start"])
+        self.ends = [entry["end"] for entry in self.entries]
+        self.unindexed = [path for name, path in sorted(self.paths.items()) if name not in entries]
+        # Decoded block arrays are cached per segment so repeated queries stay cheap
+        self._block_starts: Dict[str, List[float]] = {}
+
+    def aggregate(self, start: float, end: float, field: str = "temp") -> Summary:
+        """Summary of field over wall-clock range [start, end)"""
+        if field not in FIELDS:
+            raise ValueError(f"Bilinmeyen alan: {field}")
+        result = Summary()
+
+        # First segment whose last sample is not before start
+        i = bisect.bisect_left(self.ends, start)
+        while i < len(self.entries) and self.entries[i]["start"] < end:
+            entry = self.entries[i]
+            if entry["start"] >= start and entry["end"] < end:
+                result.merge(Summary.from_list(entry[field]))
+            else:
+                self._aggregate_blocks(entry, start, end, field, result)
+            i += 1
+
+        for path in self.unindexed:
+            self._scan(path, start, end, field, result)
+        return result
+
+    def _aggregate_blocks(self, entry: dict, start: float, end: float, field: str, result: Summary):
+        """Use block summaries inside the range and decode only the edge blocks"""
+        name = entry["file"]
+        blocks = entry["blocks"]
+        block_seconds = entry.get("block_seconds", DEFAULT_BLOCK_SECONDS)
+        starts = self._block_starts.get(name)
+        if starts is None:
+            starts = self._block_starts[name] = [block[0] for block in blocks]
+
+        offset = _BLOCK_FIELD_OFFSET[field]
+        edges = []
+        j = max(0, bisect.bisect_right(starts, start) - 1)
+        while j < len(blocks) and blocks[j][0] < end:
+            block_start = blocks[j][0]
+            if block_start >= start and block_start + block_seconds <= end:
+                result.merge(Summary.from_list(blocks[j][offset:offset + 4]))
+            elif block_start + block_seconds > start:
+                edges.append((max(start, block_start), min(end, block_start + block_seconds)))
+            j += 1
+
+        for lo, hi in edges:
+            self._scan(self.paths[name], lo, hi, field, result)
+
+    def _scan(self, path: str, start: float, end: float, field: str, result: Summary):
+        """Decode only the records of a segment that fall inside [start, end)"""
+        with HistorySegment(path) as segment:
+            for sample in segment.records(segment.find(start), segment.find(end)):
+                value = sample.temperatures[0] if field == "temp" else sample.duty
+                if value is not None:
+                    result.add(value)
+
+
+def reindex(directory: str, include_newest: bool = False) -> int:
+    """Index closed segments that have no index entry; returns how many were added"""
+    entries = load_index(directory)
+    paths = [path for path in list_segments(directory) if segment_name(path) not in entries]
+    if paths and not include_newest:
+        # The newest segment may still be open in a running controller
+        newest = max(list_segments(directory))
+        paths = [path for path in paths if path != newest]
+
+    for path in paths:
+        with HistorySegment(path) as segment:
+            if segment.count:
+                append_index_entry(directory, index_segment(segment))
+    return len(paths)
+
+
+def parse_time(text: str) -> float:
+    """Parse an epoch number or a local 'YYYY-MM-DD[ HH:MM[:SS]]' timestamp"""
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(text, fmt).timestamp()
+        except ValueError:
+            continue
+    raise argparse.ArgumentTypeError(f"Geçersiz zaman: {text}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="ThermoPi geçmiş sorgulama aracı")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    query = sub.add_parser("query", help="Zaman aralığı için min/max/ortalama")
+    query.add_argument("directory")
+    query.add_argument("--start", type=parse_time, required=True)
+    query.add_argument("--end", type=parse_time, required=True)
+    query.add_argument("--field", choices=FIELDS, default="temp")
+
+    rebuild = sub.add_parser("reindex", help="İndekslenmemiş segmentleri indeksle")
+    rebuild.add_argument("directory")
+    rebuild.add_argument("--include-newest", action="store_true",
+                         help="Açık olabilecek en yeni segmenti de indeksle")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "reindex":
+        added = reindex(args.directory, args.include_newest)
+        print(f"🗂️ {added} segment indekslendi")
+        return 0
+
+    started = time.perf_counter()
+    summary = HistoryIndex(args.directory).aggregate(args.start, args.end, args.field)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    unit = "°C" if args.field == "temp" else "%"
+    if not summary.count:
+        print("📭 Bu aralıkta kayıt yok")
+    else:
+        print(f"📊 {summary.count} kayıt | min {summary.min:.1f}{unit} | max {summary.max:.1f}{unit} "
+              f"| ort {summary.mean:.1f}{unit}")
+    print(f"⏱️ Sorgu süresi: {elapsed_ms:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,498 @@
+#!/usr/bin/env python3
+"""
+ThermoPi History Store
+Compact, fixed-width binary time-series of temperature/fan samples
+
+Samples are appended into preallocated, memory-mapped segment files. Each
+record is a few bytes (a text log line is ~60), and readers map a segment
+directly as an array instead of parsing text.
+
+Closed segments are truncated to their used size, summarized into the
+directory's index file (time range plus min/max/sum per segment and per
+wall-clock block) and optionally gzip-compressed, all on a background
+thread so a rotation never stalls the control tick.
+
+Segment layout (little endian):
+    header (64 bytes): magic, version, zone count, record size, capacity,
+                       record count, base wall time, base monotonic time
+    records:           t_ms (u32, ms since base monotonic time),
+                       temperature per zone (i16, centi-°C),
+                       duty (u8, %), mode | flags << 4 (u8)
+"""
+
+import array
+import glob
+import gzip
+import json
+import mmap
+import os
+import queue
+import shutil
+import struct
+import threading
+import time
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MAGIC = b"TPIH"
+VERSION = 1
+HEADER = struct.Struct("<4sHHHHIIdd")
+HEADER_SIZE = 64
+SEGMENT_SUFFIX = ".tph"
+COMPRESSED_SUFFIX = ".gz"
+INDEX_FILE = "index.jsonl"
+DEFAULT_CAPACITY = 86400  # One day of 1 Hz samples per segment
+DEFAULT_BLOCK_SECONDS = 60
+
+TEMP_MISSING = -32768     # i16 sentinel for a zone that could not be read
+MAX_T_MS = 0xFFFFFFFF
+_STOP = object()          # Ends the closer thread
+
+# Control modes (low nibble of the mode/flags byte)
+MODE_MANUAL = 0
+MODE_AUTO = 1
+MODE_PID = 2
+MODE_NAMES = {MODE_MANUAL: "Manuel", MODE_AUTO: "Otomatik", MODE_PID: "PID"}
+MODE_CODES = {name: code for code, name in MODE_NAMES.items()}
+
+# Sample flags (high nibble)
+FLAG_SENSOR_FAULT = 0x1   # Primary sensor could not be read this tick
+FLAG_OVERRUN = 0x2        # Control tick missed its deadline
+
+
+class Sample(NamedTuple):
+    """One decoded history record"""
+    wall_time: float
+    monotonic: float
+    temperatures: tuple
+    duty: int
+    mode: int
+    flags: int
+
+
+def record_struct(n_zones: int) -> struct.Struct:
+    """Struct for one record with n_zones temperatures"""
+    return struct.Struct(f"<I{n_zones}hBB")
+
+
+def record_dtype(n_zones: int):
+    """NumPy dtype matching record_struct (requires numpy)"""
+    if np is None:
+        raise RuntimeError("NumPy yüklü değil - records() veya column() kullanın")
+    return np.dtype([
+        ("t_ms", "<u4"),
+        ("temps", "<i2", (n_zones,)),
+        ("duty", "u1"),
+        ("mode_flags", "u1"),
+    ])
+
+
+def mode_code(mode) -> int:
+    """Map a mode name ("Manuel"/"Otomatik") or code to its numeric code"""
+    if isinstance(mode, int):
+        return mode
+    return MODE_CODES.get(mode, MODE_MANUAL)
+
+
+def _encode_temp(value: Optional[float]) -> int:
+    if value is None:
+        return TEMP_MISSING
+    return max(-32767, min(32767, int(round(value * 100))))
+
+
+def list_segments(directory: str) -> List[str]:
+    """Segment files (plain or compressed) in a history directory, oldest first"""
+    paths = glob.glob(os.path.join(directory, "history-*" + SEGMENT_SUFFIX))
+    paths += glob.glob(os.path.join(directory, "history-*" + SEGMENT_SUFFIX + COMPRESSED_SUFFIX))
+    return sorted(paths)
+
+
+def segment_name(path: str) -> str:
+    """Index key of a segment (file name without the compression suffix)"""
+    name = os.path.basename(path)
+    return name[:-len(COMPRESSED_SUFFIX)] if name.endswith(COMPRESSED_SUFFIX) else name
+
+
+class Summary:
+    """Running count/min/max/sum of a value stream"""
+
+    __slots__ = ("count", "min", "max", "sum")
+
+    def __init__(self, count: int = 0, minimum: Optional[float] = None,
+                 maximum: Optional[float] = None, total: float = 0.0):
+        self.count = count
+        self.min = minimum
+        self.max = maximum
+        self.sum = total
+
+    def add(self, value: float):
+        if self.count == 0:
+            self.min = self.max = value
+        elif value < self.min:
+            self.min = value
+        elif value > self.max:
+            self.max = value
+        self.count += 1
+        self.sum += value
+
+    def merge(self, other: "Summary"):
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.min, self.max = other.min, other.max
+        else:
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+        self.count += other.count
+        self.sum += other.sum
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+    def to_list(self) -> list:
+        return [self.count, self.min, self.max, round(self.sum, 3)]
+
+    @classmethod
+    def from_list(cls, values: list) -> "Summary":
+        return cls(*values)
+
+    def __repr__(self):
+        return f"Summary(count={self.count}, min={self.min}, max={self.max}, mean={self.mean})"
+
+
+class SegmentIndexer:
+    """Incrementally summarizes one segment per wall-clock block while it is written"""
+
+    def __init__(self, block_seconds: int = DEFAULT_BLOCK_SECONDS):
+        self.block_seconds = block_seconds
+        self.start: Optional[float] = None
+        self.end: Optional[float] = None
+        self.temp = Summary()
+        self.duty = Summary()
+        self.blocks: List[list] = []  # [block_start, temp Summary, duty Summary]
+
+    def add(self, wall_time: float, temperature: Optional[float], duty: int):
+        if self.start is None:
+            self.start = wall_time
+        self.end = wall_time
+
+        block_start = int(wall_time // self.block_seconds) * self.block_seconds
+        if not self.blocks or self.blocks[-1][0] != block_start:
+            self.blocks.append([block_start, Summary(), Summary()])
+        block = self.blocks[-1]
+
+        if temperature is not None:
+            self.temp.add(temperature)
+            block[1].add(temperature)
+        self.duty.add(duty)
+        block[2].add(duty)
+
+    def entry(self, name: str) -> dict:
+        """Serializable index entry for the segment"""
+        return {
+            "file": name,
+            "start": self.start,
+            "end": self.end,
+            "count": self.duty.count,
+            "temp": self.temp.to_list(),
+            "duty": self.duty.to_list(),
+            "block_seconds": self.block_seconds,
+            "blocks": [[b[0]] + b[1].to_list() + b[2].to_list() for b in self.blocks],
+        }
+
+
+def index_segment(segment: "HistorySegment", block_seconds: int = DEFAULT_BLOCK_SECONDS) -> dict:
+    """Build the index entry of an existing segment by scanning it once"""
+    indexer = SegmentIndexer(block_seconds)
+    for sample in segment.records():
+        indexer.add(sample.wall_time, sample.temperatures[0], sample.duty)
+    return indexer.entry(segment_name(segment.path))
+
+
+def append_index_entry(directory: str, entry: dict):
+    """Append one segment summary to the directory index"""
+    with open(os.path.join(directory, INDEX_FILE), "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+
+def load_index(directory: str) -> Dict[str, dict]:
+    """Segment name -> index entry (later entries win)"""
+    entries = {}
+    try:
+        with open(os.path.join(directory, INDEX_FILE), "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # Torn last line after a crash
+                entries[entry["file"]] = entry
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def compress_segment(path: str) -> str:
+    """Gzip a closed segment next to itself and remove the original"""
+    target = path + COMPRESSED_SUFFIX
+    tmp = target + ".tmp"
+    with open(path, "rb") as src, gzip.open(tmp, "wb", compresslevel=6) as dst:
+        shutil.copyfileobj(src, dst)
+    os.replace(tmp, target)
+    os.remove(path)
+    return target
+
+
+class HistorySegment:
+    """Read-only, memory-mapped view of one segment file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        if path.endswith(COMPRESSED_SUFFIX):
+            # Closed, compressed segment: decompress into memory once
+            self._file = None
+            with gzip.open(path, "rb") as f:
+                self._mm = f.read()
+        else:
+            self._file = open(path, "rb")
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.n_zones, self.record_size, _,
+         self.capacity, _, self.base_wall, self.base_mono) = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"Geçersiz geçmiş dosyası: {path}")
+        self.record = record_struct(self.n_zones)
+
+    @property
+    def count(self) -> int:
+        """Number of committed records (re-read so live segments can be followed)"""
+        return HEADER.unpack_from(self._mm, 0)[6]
+
+    def raw(self) -> memoryview:
+        """Zero-copy view of the committed record bytes"""
+        return memoryview(self._mm)[HEADER_SIZE:HEADER_SIZE + self.count * self.record_size]
+
+    def as_numpy(self):
+        """Zero-copy structured NumPy array over the committed records"""
+        return np.frombuffer(self._mm, dtype=record_dtype(self.n_zones),
+                             count=self.count, offset=HEADER_SIZE)
+
+    def find(self, wall_time: float) -> int:
+        """Index of the first record at or after wall_time (binary search, no decoding)"""
+        target = (wall_time - self.base_wall) * 1000.0
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if struct.unpack_from("<I", self._mm, HEADER_SIZE + mid * self.record_size)[0] < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def records(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Sample]:
+        """Decode records [start, stop) one by one"""
+        n = self.n_zones
+        raw = self.raw()
+        stop = len(raw) // self.record_size if stop is None else stop
+        for fields in self.record.iter_unpack(raw[start * self.record_size:stop * self.record_size]):
+            t_ms = fields[0]
+            temps = tuple(None if t == TEMP_MISSING else t / 100.0 for t in fields[1:1 + n])
+            mode_flags = fields[n + 2]
+            yield Sample(self.base_wall + t_ms / 1000.0, self.base_mono + t_ms / 1000.0,
+                         temps, fields[n + 1], mode_flags & 0x0F, mode_flags >> 4)
+
+    def column(self, name: str, zone: int = 0) -> array.array:
+        """One field as an array.array ('t' seconds since base, 'temp' °C, 'duty', 'mode', 'flags')"""
+        index = {"t": 0, "temp": 1 + zone, "duty": self.n_zones + 1,
+                 "mode": self.n_zones + 2, "flags": self.n_zones + 2}[name]
+        values = (fields[index] for fields in self.record.iter_unpack(self.raw()))
+        if name == "t":
+            return array.array("d", (v / 1000.0 for v in values))
+        if name == "temp":
+            return array.array("d", (float("nan") if v == TEMP_MISSING else v / 100.0 for v in values))
+        if name == "mode":
+            return array.array("B", (v & 0x0F for v in values))
+        if name == "flags":
+            return array.array("B", (v >> 4 for v in values))
+        return array.array("B", values)
+
+    def close(self):
+        if self._file is None:
+            return
+        try:
+            self._mm.close()
+        finally:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class HistoryWriter:
+    """Appends samples to preallocated, memory-mapped segment files
+
+    A segment is rotated when it is full (segment_capacity records) or,
+    if segment_seconds is set, when it spans that many seconds.
+    """
+
+    def __init__(self, directory: str, n_zones: int = 1, segment_capacity: int = DEFAULT_CAPACITY,
+                 segment_seconds: Optional[float] = None, compress: bool = False,
+                 block_seconds: int = DEFAULT_BLOCK_SECONDS):
+        self.directory = directory
+        self.n_zones = n_zones
+        self.segment_capacity = segment_capacity
+        self.compress = compress
+        self.block_seconds = block_seconds
+        self.record = record_struct(n_zones)
+        self.path: Optional[str] = None
+        self._file = None
+        self._mm: Optional[mmap.mmap] = None
+        self._count = 0
+        self._base_mono = 0.0
+        self._base_wall = 0.0
+        self._max_t_ms = MAX_T_MS if segment_seconds is None else min(MAX_T_MS, int(segment_seconds * 1000))
+        self._indexer: Optional[SegmentIndexer] = None
+        self._closing: "queue.Queue" = queue.Queue()  # Segments waiting for the closer thread
+        self._closer: Optional[threading.Thread] = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _open_segment(self, wall_time: float, mono_time: float):
+        """Create and preallocate a new segment starting at the given times"""
+        self._close_segment()
+        sequence = 0
+        while True:
+            path = os.path.join(self.directory,
+                                f"history-{int(wall_time):010d}-{sequence:04d}{SEGMENT_SUFFIX}")
+            if not os.path.exists(path):
+                break
+            sequence += 1
+
+        size = HEADER_SIZE + self.segment_capacity * self.record.size
+        f = open(path, "w+b")
+        if hasattr(os, "posix_fallocate"):
+            os.posix_fallocate(f.fileno(), 0, size)
+        else:
+            f.truncate(size)
+        mm = mmap.mmap(f.fileno(), size)
+        HEADER.pack_into(mm, 0, MAGIC, VERSION, self.n_zones, self.record.size, 0,
+                         self.segment_capacity, 0, wall_time, mono_time)
+
+        self.path, self._file, self._mm = path, f, mm
+        self._count = 0
+        self._base_mono = mono_time
+        self._base_wall = wall_time
+        self._indexer = SegmentIndexer(self.block_seconds)
+
+    def append(self, temperatures: Sequence[Optional[float]], duty: int, mode=MODE_MANUAL,
+               flags: int = 0, mono_time: Optional[float] = None, wall_time: Optional[float] = None):
+        """Append one sample; missing zones are stored as TEMP_MISSING"""
+        if mono_time is None:
+            mono_time = time.monotonic()
+        t_ms = int((mono_time - self._base_mono) * 1000)
+        if self._mm is None or self._count >= self.segment_capacity or not 0 <= t_ms <= self._max_t_ms:
+            if wall_time is None:
+                wall_time = time.time()
+            self._open_segment(wall_time, mono_time)
+            t_ms = 0
+
+        temps = [_encode_temp(t) for t in temperatures[:self.n_zones]]
+        temps.extend([TEMP_MISSING] * (self.n_zones - len(temps)))
+        offset = HEADER_SIZE + self._count * self.record.size
+        self.record.pack_into(self._mm, offset, t_ms, *temps, max(0, min(255, int(duty))),
+                              (mode_code(mode) & 0x0F) | ((flags & 0x0F) << 4))
+
+        # Publish the record only after its bytes are in place
+        self._count += 1
+        struct.pack_into("<I", self._mm, 16, self._count)
+        self._indexer.add(self._base_wall + t_ms / 1000.0,
+                          temperatures[0] if temperatures else None, duty)
+
+    def flush(self):
+        """Ask the kernel to write dirty pages of the current segment"""
+        if self._mm is not None:
+            self._mm.flush()
+
+    def _close_segment(self):
+        """Hand the current segment to the closer thread to truncate, index and compress
+
+        msync, truncate, the index append and compression of up to a day of
+        data must not stall the control tick, so this only enqueues. One
+        closer thread takes the segments in order, which keeps the index
+        entries in segment order.
+        """
+        if self._mm is None:
+            return
+        self._closing.put((self.path, self._file, self._mm, self._count, self._indexer))
+        self._mm = None
+        self._file = None
+        self._indexer = None
+        if self._closer is None:
+            self._closer = threading.Thread(target=self._run_closer, name="history-close", daemon=True)
+            self._closer.start()
+
+    def _run_closer(self):
+        while True:
+            segment = self._closing.get()
+            if segment is _STOP:
+                return
+            self._finish_segment(*segment)
+
+    def _finish_segment(self, path: str, f, mm: mmap.mmap, count: int, indexer: SegmentIndexer):
+        try:
+            mm.flush()
+            mm.close()
+            f.truncate(HEADER_SIZE + count * self.record.size)
+            f.close()
+            if not count:
+                os.remove(path)
+                return
+            append_index_entry(self.directory, indexer.entry(os.path.basename(path)))
+        except OSError as e:
+            print(f"⚠️ Geçmiş segmenti kapatılamadı ({path}): {e}")
+            return
+        if self.compress:
+            try:
+                compress_segment(path)
+            except OSError as e:
+                print(f"⚠️ Geçmiş segmenti sıkıştırılamadı ({path}): {e}")
+
+    def close(self):
+        """Close the current segment and wait for every pending close"""
+        self._close_segment()
+        if self._closer is not None:
+            self._closing.put(_STOP)
+            self._closer.join()
+            self._closer = None
+
+
+def iter_history(directory: str, start: Optional[float] = None,
+                 end: Optional[float] = None) -> Iterator[Sample]:
+    """Decode all samples in a history directory, optionally limited to [start, end] wall time"""
+    for path in list_segments(directory):
+        with HistorySegment(path) as segment:
+            for sample in segment.records():
+                if start is not None and sample.wall_time < start:
+                    continue
+                if end is not None and sample.wall_time > end:
+                    break
+                yield sample
+
+
+if __name__ == "__main__":
+    import sys
+
+    directory = sys.argv[1] if len(sys.argv) > 1 else "history"
+    for path in list_segments(directory):
+        with HistorySegment(path) as segment:
+            print(f"📦 {os.path.basename(path)}: {segment.count}/{segment.capacity} kayıt, "
+                  f"{segment.n_zones} bölge, {segment.record_size} bayt/kayıt")
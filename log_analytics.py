@@ -0,0 +1,859 @@
+#!/usr/bin/env python3
+"""
+ThermoPi Log Analytics
+Minute/hour/day rollups of DataLogger text logs, in parallel and in constant memory
+
+Each log is split into newline-aligned byte ranges that worker processes
+parse independently: a range is streamed in blocks, and the worker returns
+one partial Rollup per minute. With NumPy, every line of a block is
+validated and decoded at once against the fixed layout the DataLogger
+writes, and the block is aggregated with bincount/unique; lines of any
+other shape (and every line without NumPy) are matched with the regex.
+The parent consumes the ranges in file order, merges the minute that
+straddles two ranges, attributes the time between the last record of one
+range and the first of the next, and streams the minute rollups through
+the hour/day aggregation into the writers. Only a bounded window of
+ranges is in flight, so memory does not grow with the size of the log.
+
+Per bucket: record count, temperature min/max/mean/p95 (exact, the log has
+0.1 °C resolution), a duty histogram in 10 % bins, and the seconds spent
+in each mode and above the temperature threshold. Time is sample-and-hold:
+a record accounts for the seconds until the next one, unless that gap is
+negative or longer than max_gap (the controller was not running).
+
+Lines that are not DataLogger records (logging handler output, lines cut
+short by a power loss) are skipped and counted. Logs are expected in time
+order; an out-of-order minute is reported as a separate bucket.
+
+    python3 log_analytics.py rollup fan_control_log.txt --level hour -o hourly.csv
+    python3 log_analytics.py rollup old/*.txt --level minute --format json -o minutes.jsonl
+    python3 log_analytics.py rollup fan_control_log.txt --history history_minutes
+    python3 log_analytics.py generate big.log --size 4G
+    python3 log_analytics.py selftest --size 2G
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from collections import defaultdict, deque
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from history_store import MODE_NAMES
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# One DataLogger record; every block handed to the regex starts with a newline
+RECORD = re.compile(rb"\n(\d{4}-\d\d-\d\d \d\d:\d\d):(\d\d) - Temp: (-?\d+\.\d)\xc2\xb0C, "
+                    rb"Fan: (\d+)%, Mode: (\w+)")
+
+# Bucket level -> (label prefix length, strptime format of the prefix, label suffix)
+LEVELS = {
+    "minute": (16, "%Y-%m-%d %H:%M", ""),
+    "hour": (13, "%Y-%m-%d %H", ":00"),
+    "day": (10, "%Y-%m-%d", ""),
+}
+FORMATS = ("csv", "json")
+MODES = tuple(MODE_NAMES.values())
+DUTY_BINS = 10            # 0-9 %, 10-19 %, ..., 90-100 %
+MAX_GAP = 10.0            # Seconds; same default as replay
+DEFAULT_THRESHOLD = 70.0  # °C
+DEFAULT_CHUNK_SIZE = 32 * 1024 * 1024
+DEFAULT_BLOCK_SIZE = 4 * 1024 * 1024
+
+_SECONDS = {b"%02d" % n: n for n in range(61)}  # Cheaper than int() per record
+
+if np is not None:
+    def _pattern(text: bytes, digit: Optional[int] = ord("0")) -> Tuple[int, int, int]:
+        """(mask, value, digit mask) testing up to 8 bytes read as one little-endian word
+
+        In text, `digit` stands for any digit (None: literal text only).
+        """
+        mask = value = digits = 0
+        for k, byte in enumerate(text):
+            if byte == digit:
+                mask |= 0xF0 << 8 * k
+                value |= 0x30 << 8 * k
+                digits |= 0x06 << 8 * k
+            else:
+                mask |= 0xFF << 8 * k
+                value |= byte << 8 * k
+        return mask, value, digits
+
+    # "YYYY-MM-DD HH:MM:SS - Temp: " read as words at offsets 0, 8, 16 and 20
+    _PREFIX = [(0, _pattern(b"0000-00-")), (8, _pattern(b"00 00:00")),
+               (16, _pattern(b":00 - Te")), (20, _pattern(b"- Temp: "))]
+    # Temperature, by length: d.d, dd.d, -d.d, ddd.d, -dd.d (each followed by the degree sign)
+    _TEMPS = [(3, _pattern(b"0.0\xc2")), (4, _pattern(b"00.0\xc2")), (4, _pattern(b"-0.0\xc2")),
+              (5, _pattern(b"000.0\xc2")), (5, _pattern(b"-00.0\xc2"))]
+    _DEGREE = [(0, _pattern("°C, Fa".encode())), (2, _pattern(b"C, Fan: "))]
+    _DUTIES = [(1, _pattern(b"0%")), (2, _pattern(b"00%")), (3, _pattern(b"000%"))]
+    _MODE_LABEL = _pattern(b", Mode: ")  # After the "%"
+    _WORD = np.zeros(256, dtype=bool)  # Bytes \w matches
+    _WORD[np.frombuffer(b"abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_", np.uint8)] = True
+    _PAD = 64  # Zero bytes after a block so word reads never run past it
+
+
+def _matches(words, pattern) -> "np.ndarray":
+    """Which words fit a _pattern (digit bytes: high nibble 3 and still 3 after adding 6)"""
+    mask, value, digits = (np.uint64(part) for part in pattern)
+    ok = (words & mask) == value
+    if digits:
+        high = digits * np.uint64(0x28)  # 0x06 -> 0xF0 per digit byte
+        ok &= ((words + digits) & high) == (value & high)
+    return ok
+
+
+def _byte(words, k: int):
+    return ((words >> np.uint64(8 * k)) & np.uint64(0xFF)).astype(np.int64)
+
+
+def _label_start(label: str, fmt: str) -> int:
+    """Local-time epoch of a bucket label, as written by the DataLogger"""
+    return int(time.mktime(time.strptime(label, fmt)))
+
+
+class Rollup:
+    """Mergeable statistics of one time bucket"""
+
+    __slots__ = ("label", "start", "count", "temps", "duty_sum", "duty_bins",
+                 "mode_seconds", "seconds", "above_seconds")
+
+    def __init__(self, label: str, start: int):
+        self.label = label
+        self.start = start
+        self.count = 0
+        self.temps: Dict[int, int] = {}  # Tenths of a degree -> records
+        self.duty_sum = 0
+        self.duty_bins = [0] * DUTY_BINS
+        self.mode_seconds: Dict[str, int] = {}
+        self.seconds = 0
+        self.above_seconds = 0
+
+    def add_seconds(self, mode: str, above: bool, seconds: int):
+        """Account held time to a record of this bucket"""
+        self.mode_seconds[mode] = self.mode_seconds.get(mode, 0) + seconds
+        self.seconds += seconds
+        if above:
+            self.above_seconds += seconds
+
+    def merge(self, other: "Rollup"):
+        self.count += other.count
+        temps = self.temps
+        for tenths, count in other.temps.items():
+            temps[tenths] = temps.get(tenths, 0) + count
+        self.duty_sum += other.duty_sum
+        self.duty_bins = [a + b for a, b in zip(self.duty_bins, other.duty_bins)]
+        for mode, seconds in other.mode_seconds.items():
+            self.mode_seconds[mode] = self.mode_seconds.get(mode, 0) + seconds
+        self.seconds += other.seconds
+        self.above_seconds += other.above_seconds
+
+    @property
+    def minimum(self) -> Optional[float]:
+        return min(self.temps) / 10.0 if self.temps else None
+
+    @property
+    def maximum(self) -> Optional[float]:
+        return max(self.temps) / 10.0 if self.temps else None
+
+    @property
+    def mean(self) -> Optional[float]:
+        if not self.count:
+            return None
+        return sum(tenths * count for tenths, count in self.temps.items()) / self.count / 10.0
+
+    @property
+    def duty_mean(self) -> Optional[float]:
+        return self.duty_sum / self.count if self.count else None
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Nearest-rank percentile of the temperature (q in 0-1)"""
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for tenths in sorted(self.temps):
+            seen += self.temps[tenths]
+            if seen >= rank:
+                return tenths / 10.0
+        return max(self.temps) / 10.0
+
+    def to_dict(self) -> dict:
+        def rounded(value):
+            return None if value is None else round(value, 2)
+        return {
+            "start": self.label,
+            "samples": self.count,
+            "temp_min": self.minimum,
+            "temp_max": self.maximum,
+            "temp_mean": rounded(self.mean),
+            "temp_p95": self.percentile(0.95),
+            "duty_mean": rounded(self.duty_mean),
+            "duty_hist": list(self.duty_bins),
+            "seconds": self.seconds,
+            "above_seconds": self.above_seconds,
+            "mode_seconds": dict(self.mode_seconds),
+        }
+
+
+class RangeResult:
+    """Minute rollups of one byte range plus what the parent needs to stitch ranges"""
+
+    __slots__ = ("rollups", "lines", "records", "bytes", "first_time", "last_time",
+                 "last_mode", "last_above")
+
+    def __init__(self):
+        self.rollups: List[Rollup] = []  # First appearance order; the last record's minute is last
+        self.lines = 0
+        self.records = 0
+        self.bytes = 0
+        self.first_time: Optional[int] = None
+        self.last_time: Optional[int] = None
+        self.last_mode: Optional[str] = None
+        self.last_above = False
+
+
+# --- Worker side ---
+
+def split_ranges(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Tuple[int, int]]:
+    """Byte ranges of about chunk_size, each ending just after a newline (or at EOF)"""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        start = 0
+        while start < size:
+            end = min(size, start + chunk_size)
+            f.seek(end)
+            while end < size:
+                piece = f.read(4096)
+                newline = piece.find(b"\n")
+                if newline >= 0:
+                    end += newline + 1
+                    break
+                end += len(piece)
+            yield start, min(end, size)
+            start = end
+
+
+def read_blocks(path: str, start: int, end: int,
+                block_size: int = DEFAULT_BLOCK_SIZE) -> Iterator[bytes]:
+    """Whole lines of [start, end) in blocks, each block starting with a newline"""
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start
+        carry = b"\n"
+        while remaining > 0:
+            data = f.read(min(block_size, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            block = carry + data
+            cut = block.rfind(b"\n")
+            if cut > 0:
+                yield block[:cut]
+                carry = block[cut:]
+            else:
+                carry = block  # A single line longer than the block
+        if carry != b"\n":
+            yield carry
+
+
+def analyze_range(path: str, start: int, end: int, threshold: float = DEFAULT_THRESHOLD,
+                  max_gap: float = MAX_GAP, block_size: int = DEFAULT_BLOCK_SIZE) -> RangeResult:
+    """Parse one byte range into per-minute rollups (runs in a worker process)"""
+    if np is not None:
+        return _analyze_range_numpy(path, start, end, threshold, max_gap, block_size)
+    # Per minute: start, record count per temperature and per duty text, held
+    # seconds per mode and per temperature text; converted once at the end
+    minutes: Dict[bytes, tuple] = {}
+    result = RangeResult()
+    result.bytes = end - start
+    key = None
+    base = 0
+    prev_time = 1 << 62  # No record yet: the first gap is negative and not counted
+    prev_mode = prev_temp = b""
+    held_modes = held_temps = defaultdict(int)
+
+    for block in read_blocks(path, start, end, block_size):
+        result.lines += block.count(b"\n")
+        for minute, second, temp, duty, mode in RECORD.findall(block):
+            if minute != key:
+                key = minute
+                raw = minutes.get(minute)
+                if raw is None:
+                    raw = minutes[minute] = (_label_start(minute.decode(), LEVELS["minute"][1]),
+                                             defaultdict(int), defaultdict(int),
+                                             defaultdict(int), defaultdict(int))
+                base, temps, duties, modes, temp_seconds = raw
+                if result.first_time is None:
+                    result.first_time = base + _SECONDS[second]
+            t = base + _SECONDS[second]
+            dt = t - prev_time
+            if 0 < dt <= max_gap:
+                held_modes[prev_mode] += dt
+                held_temps[prev_temp] += dt
+            temps[temp] += 1
+            duties[duty] += 1
+            prev_time, prev_mode, prev_temp = t, mode, temp
+            held_modes, held_temps = modes, temp_seconds
+
+    if key is None:
+        return result
+    result.last_time = prev_time
+    result.last_mode = prev_mode.decode()
+    result.last_above = float(prev_temp) >= threshold
+    # The last record's minute goes last so the parent can add the time up to the next range
+    minutes[key] = minutes.pop(key)
+
+    for minute, (minute_start, temps, duties, mode_seconds, temp_seconds) in minutes.items():
+        rollup = Rollup(minute.decode(), minute_start)
+        for text, count in temps.items():
+            tenths = int(text.replace(b".", b""))  # "5.5" and "05.5" are the same temperature
+            rollup.temps[tenths] = rollup.temps.get(tenths, 0) + count
+        rollup.count = sum(temps.values())
+        for text, count in duties.items():
+            duty = int(text)
+            rollup.duty_sum += duty * count
+            rollup.duty_bins[min(DUTY_BINS - 1, duty // 10)] += count
+        rollup.mode_seconds = {mode.decode(): seconds for mode, seconds in mode_seconds.items()}
+        rollup.seconds = sum(mode_seconds.values())
+        rollup.above_seconds = sum(seconds for text, seconds in temp_seconds.items()
+                                   if float(text) >= threshold)
+        result.records += rollup.count
+        result.rollups.append(rollup)
+    return result
+
+
+def _parse_block(block: bytes, mode_names: List[str]):
+    """Columns (minute YYYYMMDDHHMM, second, tenths of °C, duty, mode index) of a block's records
+
+    The block is read as unaligned little-endian 64-bit words, so each
+    fixed part of the layout the DataLogger writes is one masked compare
+    for all lines at once. Any other line goes through RECORD, so exactly
+    the records RECORD matches are returned, in order. Mode indices refer
+    to mode_names, which grows when RECORD finds a new mode.
+    """
+    data = block + bytes(_PAD)
+    buf = np.frombuffer(data, np.uint8)
+    words = np.ndarray((len(data) - 7,), "<u8", data, 0, (1,))
+    newlines = np.flatnonzero(buf[:len(block)] == 10)
+    start = newlines + 1
+    ok = np.ones(len(start), dtype=bool)
+    for offset, pattern in _PREFIX:
+        ok &= _matches(words[start + offset], pattern)
+    lines = np.flatnonzero(ok)
+    start = start[lines]
+
+    value = words[start + 28]
+    length = np.zeros(len(start), dtype=np.int64)
+    tenths = np.zeros(len(start), dtype=np.int64)
+    digit = [_byte(value, k) - 48 for k in range(5)]
+    decoded = [digit[0] * 10 + digit[2], digit[0] * 100 + digit[1] * 10 + digit[3],
+               -(digit[1] * 10 + digit[3]), digit[0] * 1000 + digit[1] * 100 + digit[2] * 10 + digit[4],
+               -(digit[1] * 100 + digit[2] * 10 + digit[4])]
+    for (size, pattern), number in zip(_TEMPS, decoded):
+        match = _matches(value, pattern)
+        length[match] = size
+        tenths[match] = number[match]
+    ok = length > 0
+    degree = start + 28 + length
+    for offset, pattern in _DEGREE:
+        ok &= _matches(words[degree + offset], pattern)
+
+    duty_at = degree + 10
+    value = words[duty_at]
+    width = np.zeros(len(start), dtype=np.int64)
+    digit = [_byte(value, k) - 48 for k in range(3)]
+    decoded = [digit[0], digit[0] * 10 + digit[1], digit[0] * 100 + digit[1] * 10 + digit[2]]
+    duty = np.zeros(len(start), dtype=np.int64)
+    for (size, pattern), number in zip(_DUTIES, decoded):
+        match = _matches(value, pattern)
+        width[match] = size
+        duty[match] = number[match]
+    ok &= (width > 0) & _matches(words[duty_at + width + 1], _MODE_LABEL)
+
+    # Mode: one of the known names, followed by a non-word byte
+    mode_at = duty_at + width + 9
+    mode = np.full(len(start), -1)
+    for index, name in enumerate(mode_names):
+        encoded = name.encode()
+        match = ~_WORD[buf[mode_at + len(encoded)]]
+        for k in range(0, len(encoded), 8):
+            match &= _matches(words[mode_at + k], _pattern(encoded[k:k + 8], digit=None))
+        mode[match] = index
+    ok &= mode >= 0
+
+    start, lines = start[ok], lines[ok]
+    seconds = words[start + 16]
+    seconds = (_byte(seconds, 1) - 48) * 10 + _byte(seconds, 2) - 48
+    # Minute codes are decoded only where the timestamp changes (once a minute in a 1 Hz log)
+    head, tail = words[start], words[start + 8]
+    change = np.ones(len(start), dtype=bool)
+    change[1:] = (head[1:] != head[:-1]) | (tail[1:] != tail[:-1])
+    codes = [int(block[p:p + 4] + block[p + 5:p + 7] + block[p + 8:p + 10] + block[p + 11:p + 13]
+                 + block[p + 14:p + 16]) for p in start[change].tolist()]
+    columns = [np.array(codes, dtype=np.int64)[np.cumsum(change) - 1], seconds,
+               tenths[ok], duty[ok], mode[ok]]
+
+    # Everything else: the regex decides (logging handler lines, cut records, unusual values)
+    fast = np.zeros(len(newlines), dtype=bool)
+    fast[lines] = True
+    slow = []
+    for line in np.flatnonzero(~fast).tolist():
+        found = RECORD.match(block, int(newlines[line]))
+        if found is None:
+            continue
+        minute, second, temp_text, duty_text, mode_text = found.groups()
+        mode_text = mode_text.decode()
+        if mode_text not in mode_names:
+            mode_names.append(mode_text)
+        slow.append((line, int(minute[:4] + minute[5:7] + minute[8:10] + minute[11:13] + minute[14:]),
+                     _SECONDS[second], int(temp_text.replace(b".", b"")), int(duty_text),
+                     mode_names.index(mode_text)))
+    if slow:
+        order = np.argsort(np.concatenate([lines, [row[0] for row in slow]]), kind="stable")
+        extra = np.array([row[1:] for row in slow], dtype=np.int64).T
+        columns = [np.concatenate([column, more])[order] for column, more in zip(columns, extra)]
+    return columns
+
+
+def _analyze_range_numpy(path: str, start: int, end: int, threshold: float, max_gap: float,
+                         block_size: int) -> RangeResult:
+    """analyze_range with each block parsed and aggregated as NumPy columns"""
+    result = RangeResult()
+    result.bytes = end - start
+    rollups: Dict[int, Rollup] = {}  # YYYYMMDDHHMM -> minute rollup, in order of first appearance
+    mode_names = list(MODES)
+    last: Optional[Rollup] = None    # Minute of the previous record
+    prev_time = prev_mode = prev_tenths = None
+
+    for block in read_blocks(path, start, end, block_size):
+        result.lines += block.count(b"\n")
+        codes, seconds, tenths, duties, modes = _parse_block(block, mode_names)
+        if not len(codes):
+            continue
+        keys, first, group = np.unique(codes, return_index=True, return_inverse=True)
+        for code in keys[np.argsort(first)].tolist():
+            if code not in rollups:
+                year, month, day, hour, minute = (code // 10 ** 8, code // 10 ** 6 % 100, code // 10 ** 4 % 100,
+                                                  code // 100 % 100, code % 100)
+                # Same as _label_start (strptime leaves tm_isdst at -1), without parsing text
+                rollups[code] = Rollup(f"{year:04d}-{month:02d}-{day:02d} {hour:02d}:{minute:02d}",
+                                       int(time.mktime((year, month, day, hour, minute, 0, 0, 0, -1))))
+        targets = [rollups[code] for code in keys.tolist()]
+        times = np.array([rollup.start for rollup in targets], dtype=np.int64)[group] + seconds
+        if result.first_time is None:
+            result.first_time = int(times[0])
+        elif 0 < times[0] - prev_time <= max_gap:
+            # The previous block's last record holds until this block's first one
+            last.add_seconds(mode_names[prev_mode], prev_tenths / 10.0 >= threshold,
+                             int(times[0] - prev_time))
+
+        size = len(keys)
+        counts = np.bincount(group, minlength=size)
+        duty_sums = np.bincount(group, weights=duties, minlength=size)
+        bins = np.bincount(group * DUTY_BINS + np.minimum(DUTY_BINS - 1, duties // 10),
+                           minlength=size * DUTY_BINS).reshape(size, DUTY_BINS)
+        low = int(tenths.min())
+        width = int(tenths.max()) - low + 1
+        pairs, pair_counts = np.unique(group * width + (tenths - low), return_counts=True)
+        pair_bounds = np.searchsorted(pairs, np.arange(size + 1) * width).tolist()
+        values, pair_counts = (pairs % width + low).tolist(), pair_counts.tolist()
+
+        # Each record holds until the next one, accounted to the earlier record's minute
+        gaps = np.diff(times)
+        held = np.where((gaps > 0) & (gaps <= max_gap), gaps, 0)
+        owner = group[:-1]
+        mode_held = np.bincount(owner * len(mode_names) + modes[:-1], weights=held,
+                                minlength=size * len(mode_names)).reshape(size, len(mode_names))
+        above_held = np.bincount(owner, weights=held * (tenths[:-1] / 10.0 >= threshold), minlength=size)
+
+        for index, (rollup, count, duty_sum, row) in enumerate(zip(targets, counts.tolist(),
+                                                                    duty_sums.tolist(), bins.tolist())):
+            a, b = pair_bounds[index], pair_bounds[index + 1]
+            if rollup.count:  # Minute continued from the previous block
+                rollup.duty_bins = [x + y for x, y in zip(rollup.duty_bins, row)]
+                temps = rollup.temps
+                for value, records in zip(values[a:b], pair_counts[a:b]):
+                    temps[value] = temps.get(value, 0) + records
+            else:
+                rollup.duty_bins = row
+                rollup.temps = dict(zip(values[a:b], pair_counts[a:b]))
+            rollup.count += count
+            rollup.duty_sum += int(duty_sum)
+        owners, held_modes = np.nonzero(mode_held)
+        for index, mode, seconds in zip(owners.tolist(), held_modes.tolist(),
+                                        mode_held[owners, held_modes].tolist()):
+            targets[index].add_seconds(mode_names[mode], False, int(seconds))
+        for index, seconds in zip(np.flatnonzero(above_held).tolist(), above_held[above_held > 0].tolist()):
+            targets[index].above_seconds += int(seconds)
+
+        result.records += len(codes)
+        last = targets[group[-1]]
+        prev_time, prev_mode, prev_tenths = int(times[-1]), int(modes[-1]), int(tenths[-1])
+
+    if last is None:
+        return result
+    result.last_time = prev_time
+    result.last_mode = mode_names[prev_mode]
+    result.last_above = prev_tenths / 10.0 >= threshold
+    # The last record's minute goes last so the parent can add the time up to the next range
+    result.rollups = [rollup for rollup in rollups.values() if rollup is not last] + [last]
+    return result
+
+
+# --- Parent side ---
+
+class LogAnalyzer:
+    """Streams minute rollups of one or more logs, parsing byte ranges on a process pool"""
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, max_gap: float = MAX_GAP,
+                 jobs: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 block_size: int = DEFAULT_BLOCK_SIZE):
+        self.threshold = threshold
+        self.max_gap = max_gap
+        self.jobs = jobs or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.block_size = block_size
+        self.lines = 0
+        self.records = 0
+        self.bytes = 0
+        self.ranges = 0
+
+    @property
+    def skipped(self) -> int:
+        """Lines that were not DataLogger records"""
+        return self.lines - self.records
+
+    def _results(self, paths: Iterable[str]) -> Iterator[RangeResult]:
+        """Range results in file order; at most 2 * jobs ranges are parsed ahead"""
+        options = (self.threshold, self.max_gap, self.block_size)
+        tasks = ((path, start, end) for path in paths
+                 for start, end in split_ranges(path, self.chunk_size))
+        if self.jobs == 1:
+            for task in tasks:
+                yield analyze_range(*task, *options)
+            return
+
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(self.jobs) as pool:
+            pending = deque()
+            for task in tasks:
+                pending.append(pool.submit(analyze_range, *task, *options))
+                if len(pending) >= 2 * self.jobs:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def minutes(self, paths: Iterable[str]) -> Iterator[Rollup]:
+        """Minute rollups in file order, with the ranges stitched together"""
+        pending: Optional[Rollup] = None  # Last minute of the previous range (may continue)
+        last_time = last_mode = None
+        last_above = False
+        for result in self._results(paths):
+            self.ranges += 1
+            self.lines += result.lines
+            self.records += result.records
+            self.bytes += result.bytes
+            rollups = result.rollups
+            if not rollups:
+                continue
+            if pending is not None:
+                # The previous range's last record holds until this range's first one
+                dt = result.first_time - last_time
+                if 0 < dt <= self.max_gap:
+                    pending.add_seconds(last_mode, last_above, dt)
+                if rollups[0].label == pending.label:
+                    pending.merge(rollups[0])
+                    rollups = rollups[1:]
+            if rollups:
+                if pending is not None:
+                    yield pending
+                yield from rollups[:-1]
+                pending = rollups[-1]
+            last_time, last_mode, last_above = result.last_time, result.last_mode, result.last_above
+        if pending is not None:
+            yield pending
+
+
+def coarsen(minutes: Iterable[Rollup], level: str = "hour") -> Iterator[Rollup]:
+    """Merge consecutive minute rollups into hour or day buckets"""
+    width, fmt, suffix = LEVELS[level]
+    if level == "minute":
+        yield from minutes
+        return
+    current: Optional[Rollup] = None
+    current_key = None
+    for rollup in minutes:
+        key = rollup.label[:width]
+        if key == current_key:
+            current.merge(rollup)
+            continue
+        if current is not None:
+            yield current
+        current, current_key = rollup, key
+        current.label = key + suffix
+        current.start = _label_start(key, fmt)
+    if current is not None:
+        yield current
+
+
+# --- Writers ---
+
+CSV_FIELDS = (["start", "samples", "temp_min", "temp_max", "temp_mean", "temp_p95", "duty_mean"]
+              + [f"duty_{10 * n}" for n in range(DUTY_BINS)]
+              + ["seconds", "above_seconds"] + [f"{mode}_s" for mode in MODES] + ["other_s"])
+
+
+class CSVRollupWriter:
+    def __init__(self, stream):
+        self.writer = csv.writer(stream)
+        self.writer.writerow(CSV_FIELDS)
+
+    def write(self, rollup: Rollup):
+        row = rollup.to_dict()
+        modes = row.pop("mode_seconds")
+        duty = row.pop("duty_hist")
+        other = sum(seconds for mode, seconds in modes.items() if mode not in MODES)
+        self.writer.writerow(list(row.values())[:7] + duty + [row["seconds"], row["above_seconds"]]
+                             + [modes.get(mode, 0) for mode in MODES] + [other])
+
+    def close(self):
+        pass
+
+
+class JSONRollupWriter:
+    """One JSON object per line, so output streams like the input"""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, rollup: Rollup):
+        self.stream.write(json.dumps(rollup.to_dict(), ensure_ascii=False) + "\n")
+
+    def close(self):
+        pass
+
+
+class HistoryRollupWriter:
+    """One history record per bucket: zones are mean/min/max/p95, duty the mean, mode the dominant one"""
+
+    ZONES = ("mean", "min", "max", "p95")
+
+    def __init__(self, directory: str):
+        from history_store import HistoryWriter
+        self.history = HistoryWriter(directory, n_zones=len(self.ZONES))
+
+    def write(self, rollup: Rollup):
+        if not rollup.count:
+            return
+        mode = max(rollup.mode_seconds, key=rollup.mode_seconds.get) if rollup.mode_seconds else "Manuel"
+        self.history.append([rollup.mean, rollup.minimum, rollup.maximum, rollup.percentile(0.95)],
+                            round(rollup.duty_mean), mode,
+                            mono_time=float(rollup.start), wall_time=float(rollup.start))
+
+    def close(self):
+        self.history.close()
+
+
+# --- Synthetic logs ---
+
+def parse_size(text: str) -> int:
+    """'512M', '4G', '1500000' -> bytes"""
+    text = text.strip().upper().rstrip("B")
+    units = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def generate(path: str, size: int, start: Optional[float] = None, seed: int = 0,
+             threshold: float = DEFAULT_THRESHOLD, max_gap: float = MAX_GAP) -> dict:
+    """Write a synthetic DataLogger log of about `size` bytes; returns the expected totals
+
+    1 Hz records from a drifting temperature with load bursts, mode changes,
+    logging handler lines, truncated records and controller restarts (gaps).
+    """
+    rng = random.Random(seed)
+    t = int(start if start is not None else time.time() - size // 62)
+    t -= t % 60
+    temp, load, mode = 45.0, 0.1, "Otomatik"
+    expected = {"records": 0, "skipped": 0, "seconds": 0, "above_seconds": 0,
+                "mode_seconds": {name: 0 for name in MODES}}
+    prev = None  # (time, mode, above) of the last record
+    written = 0
+    prefix_minute = None
+    prefix = ""
+
+    with open(path, "w", encoding="utf-8") as f:
+        while written < size:
+            lines = []
+            for _ in range(4096):
+                minute = t - t % 60
+                if minute != prefix_minute:
+                    prefix_minute = minute
+                    prefix = time.strftime("%Y-%m-%d %H:%M", time.localtime(minute))
+                stamp = f"{prefix}:{t % 60:02d}"
+
+                roll = rng.random()
+                if roll < 0.0005:
+                    lines.append(f"{stamp},{rng.randrange(1000):03d} - INFO - 🌀 Fan hızı ayarlandı\n")
+                    expected["skipped"] += 1
+                elif roll < 0.0006:
+                    lines.append(f"{stamp} - Temp: {temp:.1f}°C, Fa\n")  # Cut short by a power loss
+                    expected["skipped"] += 1
+
+                if rng.random() < 0.002:
+                    load = rng.choice((0.05, 0.3, 0.95))
+                if rng.random() < 0.0002:
+                    mode = rng.choice(MODES)
+                temp += 0.02 * (35.0 + 45.0 * load - temp) + rng.uniform(-0.3, 0.3)
+                duty = max(0, min(100, int((temp - 40.0) * 3.3)))
+                rounded = round(temp, 1)
+                lines.append(f"{stamp} - Temp: {rounded:.1f}°C, Fan: {duty}%, Mode: {mode}\n")
+
+                expected["records"] += 1
+                if prev is not None and 0 < t - prev[0] <= max_gap:
+                    dt = t - prev[0]
+                    expected["seconds"] += dt
+                    expected["mode_seconds"][prev[1]] += dt
+                    if prev[2]:
+                        expected["above_seconds"] += dt
+                prev = (t, mode, rounded >= threshold)
+                # Mostly 1 Hz; now and then a restart leaves a gap
+                t += rng.randrange(600, 1800) if rng.random() < 0.0001 else 1
+            chunk = "".join(lines)
+            f.write(chunk)
+            written += len(chunk.encode("utf-8"))
+    return expected
+
+
+def _digest(rollups: Iterable[Rollup]) -> Tuple[str, dict]:
+    """Hash of every rollup in order plus summed totals"""
+    digest = hashlib.sha256()
+    totals = {"buckets": 0, "records": 0, "seconds": 0, "above_seconds": 0,
+              "mode_seconds": defaultdict(int)}
+    for rollup in rollups:
+        digest.update(json.dumps(rollup.to_dict(), sort_keys=True).encode())
+        totals["buckets"] += 1
+        totals["records"] += rollup.count
+        totals["seconds"] += rollup.seconds
+        totals["above_seconds"] += rollup.above_seconds
+        for mode, seconds in rollup.mode_seconds.items():
+            totals["mode_seconds"][mode] += seconds
+    return digest.hexdigest(), totals
+
+
+def selftest(size: int = 256 << 20, jobs: Optional[int] = None, chunk_size: int = 4 << 20,
+             directory: Optional[str] = None) -> int:
+    """Generate a log, check parallel rollups against another split and the generator's totals"""
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        path = os.path.join(tmp, "fan_control_log.txt")
+        start = time.perf_counter()
+        expected = generate(path, size)
+        actual_size = os.path.getsize(path)
+        print(f"📝 {actual_size / 1e6:,.0f} MB sentetik kayıt üretildi ({time.perf_counter() - start:.1f} s)")
+
+        # Timed parallel pass, then a sequential pass over differently split ranges;
+        # both are reduced to digests and totals, so memory stays constant
+        parallel = LogAnalyzer(jobs=jobs, chunk_size=chunk_size)
+        start = time.perf_counter()
+        digest, totals = _digest(parallel.minutes([path]))
+        elapsed = time.perf_counter() - start
+        reference = LogAnalyzer(jobs=1, chunk_size=3 * chunk_size + 4093)
+        reference_digest, _ = _digest(reference.minutes([path]))
+
+    print(f"⚡ {parallel.jobs} süreç, {parallel.ranges} aralık: {parallel.bytes / elapsed / 1e6:,.0f} MB/s "
+          f"({parallel.records / elapsed:,.0f} kayıt/s)")
+    checks = {
+        "farklı bölmeyle aynı sonuç": digest == reference_digest,
+        "kayıt sayısı": totals["records"] == expected["records"] == parallel.records,
+        "atlanan satırlar": parallel.skipped == expected["skipped"],
+        "süre": totals["seconds"] == expected["seconds"],
+        "eşik üstü süre": totals["above_seconds"] == expected["above_seconds"],
+        "mod süreleri": all(totals["mode_seconds"].get(mode, 0) == seconds
+                           for mode, seconds in expected["mode_seconds"].items()),
+    }
+    for name, ok in checks.items():
+        print(f"{'✅' if ok else '❌'} {name}")
+    print(f"📊 {totals['buckets']:,} dakika, {parallel.records:,} kayıt, {parallel.skipped:,} satır atlandı")
+    return 0 if all(checks.values()) else 1
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="ThermoPi log analizi")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    rollup = sub.add_parser("rollup", help="Dakika/saat/gün özetleri (CSV, JSON veya geçmiş formatı)")
+    rollup.add_argument("logs", nargs="+", help="Log dosyaları (zaman sırasıyla)")
+    rollup.add_argument("--level", choices=sorted(LEVELS), default="hour")
+    rollup.add_argument("--format", choices=FORMATS, default="csv")
+    rollup.add_argument("-o", "--output", help="Çıktı dosyası (varsayılan: stdout)")
+    rollup.add_argument("--history", metavar="DIR",
+                        help="Özetleri ikili geçmiş formatında bu dizine yaz (bölge: ort/min/maks/p95)")
+    rollup.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Eşik üstü süre için sıcaklık (°C)")
+    rollup.add_argument("--max-gap", type=float, default=MAX_GAP,
+                        help="Daha uzun boşluklar süreye sayılmaz (s)")
+    rollup.add_argument("--jobs", type=int, default=None, help="Süreç sayısı (varsayılan: çekirdek sayısı)")
+    rollup.add_argument("--chunk-size", type=parse_size, default=DEFAULT_CHUNK_SIZE,
+                        help="Süreç başına bayt aralığı (ör. 32M)")
+
+    gen = sub.add_parser("generate", help="Sentetik log üret")
+    gen.add_argument("path")
+    gen.add_argument("--size", type=parse_size, default=1 << 30, help="Boyut (ör. 512M, 4G)")
+    gen.add_argument("--seed", type=int, default=0)
+
+    test = sub.add_parser("selftest", help="Sentetik log üzerinde doğruluk ve hız testi")
+    test.add_argument("--size", type=parse_size, default=256 << 20)
+    test.add_argument("--jobs", type=int, default=None)
+    test.add_argument("--chunk-size", type=parse_size, default=4 << 20)
+    test.add_argument("--dir", help="Geçici dosya dizini")
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        expected = generate(args.path, args.size, seed=args.seed)
+        print(f"📝 {args.path}: {expected['records']:,} kayıt, {expected['skipped']:,} yabancı satır")
+        return 0
+    if args.command == "selftest":
+        return selftest(args.size, args.jobs, args.chunk_size, args.dir)
+
+    analyzer = LogAnalyzer(args.threshold, args.max_gap, args.jobs, args.chunk_size)
+    stream = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    writers = []
+    if args.output or not args.history:
+        writers.append(CSVRollupWriter(stream) if args.format == "csv" else JSONRollupWriter(stream))
+    if args.history:
+        writers.append(HistoryRollupWriter(args.history))
+
+    start = time.perf_counter()
+    buckets = 0
+    try:
+        for bucket in coarsen(analyzer.minutes(args.logs), args.level):
+            for writer in writers:
+                writer.write(bucket)
+            buckets += 1
+    finally:
+        for writer in writers:
+            writer.close()
+        if stream is not sys.stdout:
+            stream.close()
+    elapsed = time.perf_counter() - start
+    print(f"📊 {buckets:,} özet, {analyzer.records:,} kayıt, {analyzer.skipped:,} satır atlandı | "
+          f"{analyzer.bytes / 1e6:,.0f} MB, {analyzer.bytes / max(elapsed, 1e-9) / 1e6:,.0f} MB/s, "
+          f"{analyzer.jobs} süreç", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
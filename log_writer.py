@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+ThermoPi Log Writer
+Background, batched writer for the temperature/fan text log
+
+The control thread only enqueues a small tuple; formatting and disk I/O
+happen on a dedicated thread that keeps one file handle open and writes
+records in batches. Flush and fsync are driven by interval or record
+count, and a full queue drops records (counted) instead of blocking.
+"""
+
+import os
+import queue
+import threading
+import time
+from typing import Optional, Tuple
+
+_STOP = object()
+
+
+class BatchedLogWriter:
+    """Writes DataLogger records from a bounded queue on a background thread"""
+
+    def __init__(self, log_file: str, max_queue: int = 4096,
+                 flush_interval: float = 5.0, flush_records: int = 60,
+                 fsync_interval: Optional[float] = 60.0, fsync_records: Optional[int] = None):
+        self.log_file = log_file
+        self.flush_interval = flush_interval
+        self.flush_records = flush_records
+        self.fsync_interval = fsync_interval
+        self.fsync_records = fsync_records
+
+        # Statistics (enqueued/dropped by the producer, the rest by the writer thread)
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.flushes = 0
+        self.fsyncs = 0
+        self.errors = 0
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._file = None
+        self._closed = False
+        self._last_second = None
+        self._last_stamp = ""
+
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, wall_time: float, temperature: float, fan_speed: int, mode: str,
+              load: Optional[float] = None, rpm: Optional[float] = None,
+              fan_status: str = "ok") -> bool:
+        """Queue one record without blocking; returns False if it was dropped"""
+        if self._closed:
+            return False
+        try:
+            self._queue.put_nowait((wall_time, temperature, fan_speed, mode, load, rpm, fan_status))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.enqueued += 1
+        return True
+
+    def _timestamp(self, wall_time: float) -> str:
+        """Format a timestamp, reusing the string while the second is unchanged"""
+        second = int(wall_time)
+        if second != self._last_second:
+            self._last_second = second
+            self._last_stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(second))
+        return self._last_stamp
+
+    def _format(self, record: Tuple[float, float, int, str, Optional[float], Optional[float], str]) -> str:
+        wall_time, temperature, fan_speed, mode, load, rpm, fan_status = record
+        line = f"{self._timestamp(wall_time)} - Temp: {temperature:.1f}°C, Fan: {fan_speed}%, Mode: {mode}"
+        # CPU utilization is only recorded when load feed-forward is enabled
+        if load is not None:
+            line = f"{line}, Load: {load * 100:.0f}%"
+        # Measured fan speed only with a tachometer; the status only when it is not "ok"
+        if rpm is not None:
+            line = f"{line}, RPM: {rpm:.0f}" if fan_status == "ok" else f"{line}, RPM: {rpm:.0f} ({fan_status})"
+        return line + "\n"
+
+    def _open(self):
+        if self._file is None:
+            self._file = open(self.log_file, "a", encoding="utf-8")
+
+    def _next_timeout(self, pending_flush: int, pending_fsync: int,
+                      last_flush: float, last_fsync: float) -> Optional[float]:
+        """Seconds until the next time-based flush/fsync is due (None: wait for data)"""
+        deadlines = []
+        if pending_flush:
+            deadlines.append(last_flush + self.flush_interval)
+        if pending_fsync and self.fsync_interval is not None:
+            deadlines.append(last_fsync + self.fsync_interval)
+        if not deadlines:
+            return None
+        return max(0.0, min(deadlines) - time.monotonic())
+
+    def _run(self):
+        """Writer thread: drain the queue in batches and apply the flush policy"""
+        pending_flush = 0
+        pending_fsync = 0
+        last_flush = last_fsync = time.monotonic()
+        running = True
+
+        while running:
+            try:
+                item = self._queue.get(timeout=self._next_timeout(pending_flush, pending_fsync,
+                                                                  last_flush, last_fsync))
+            except queue.Empty:
+                item = None
+
+            batch = []
+            while item is not None:
+                if item is _STOP:
+                    running = False
+                    break
+                batch.append(item)
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    item = None
+
+            try:
+                if batch:
+                    self._open()
+                    self._file.write("".join(self._format(record) for record in batch))
+                    self.written += len(batch)
+                    pending_flush += len(batch)
+                    pending_fsync += len(batch)
+
+                now = time.monotonic()
+                if pending_flush and (not running
+                                      or pending_flush >= self.flush_records
+                                      or now - last_flush >= self.flush_interval):
+                    self._file.flush()
+                    self.flushes += 1
+                    pending_flush = 0
+                    last_flush = now
+
+                if pending_fsync and not pending_flush and (
+                        not running
+                        or (self.fsync_records and pending_fsync >= self.fsync_records)
+                        or (self.fsync_interval is not None and now - last_fsync >= self.fsync_interval)):
+                    os.fsync(self._file.fileno())
+                    self.fsyncs += 1
+                    pending_fsync = 0
+                    last_fsync = now
+            except Exception as e:
+                self.errors += 1
+                print(f"Error writing to log file: {e}")
+                pending_flush = pending_fsync = 0
+
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def close(self, timeout: float = 5.0):
+        """Flush everything still queued, fsync and stop the writer thread"""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            print("⚠️ Log kuyruğu boşaltılamadı - bekleyen kayıtlar kaybolabilir")
+            return
+        self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        """Counters for diagnostics"""
+        return {
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "written": self.written,
+            "flushes": self.flushes,
+            "fsyncs": self.fsyncs,
+            "errors": self.errors,
+            "queued": self._queue.qsize(),
+        }
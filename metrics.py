@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+ThermoPi Metrics
+Counters, fixed-bucket histograms and a Prometheus text endpoint
+
+Instrumentation is installed by wrapping the hot methods of a running
+engine (sensor read, curve evaluation, PWM write, log write, tick and loop
+sleep). When metrics are disabled nothing is wrapped, so the control loop
+runs exactly the code it runs without this module.
+
+Every metric has a single writer thread and is updated without locks;
+scrapes copy the counters without taking any lock the control tick uses.
+A scrape may therefore see a histogram mid-update (off by one sample),
+never a blocked tick.
+
+    python3 rpi_fan_controller.py --daemon --metrics-port 9101
+    curl -s localhost:9101/metrics
+"""
+
+import bisect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Seconds; sized for work that takes microseconds to milliseconds on a Pi
+LATENCY_BUCKETS = (5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4,
+                   1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 0.1)
+SLEEP_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Labels = Dict[str, str]
+
+
+def _format_labels(labels: Optional[Labels]) -> str:
+    if not labels:
+        return ""
+    escaped = (f'{key}="{_escape(str(value))}"' for key, value in labels.items())
+    return "{" + ",".join(escaped) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, int) and not isinstance(value, bool):
+        return str(value)
+    value = float(value)
+    if value == float("inf"):
+        return "+Inf"
+    return repr(value)
+
+
+class Counter:
+    """Monotonic counter (single writer)"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self.value = 0
+
+    def inc(self, amount: int = 1):
+        self.value += amount
+
+    def samples(self) -> List[Tuple[str, Optional[Labels], float]]:
+        return [(self.name, None, self.value)]
+
+
+class Histogram:
+    """Fixed-bucket histogram (single writer): one bisect and two adds per sample"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.bounds = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.bounds) + 1)  # Last slot: above the largest bound
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def samples(self) -> List[Tuple[str, Optional[Labels], float]]:
+        counts = list(self.counts)  # Copy first so buckets and count agree
+        total = self.sum
+        samples, cumulative = [], 0
+        for bound, count in zip(self.bounds + (float("inf"),), counts):
+            cumulative += count
+            samples.append((f"{self.name}_bucket", {"le": _format_value(bound)}, cumulative))
+        samples.append((f"{self.name}_sum", None, total))
+        samples.append((f"{self.name}_count", None, cumulative))
+        return samples
+
+
+class CallbackMetric:
+    """Gauge or counter whose values are read by a callback at scrape time"""
+
+    def __init__(self, name: str, help_text: str,
+                 callback: Callable[[], Sequence[Tuple[Optional[Labels], float]]], kind: str = "gauge"):
+        self.name = name
+        self.help = help_text
+        self.callback = callback
+        self.kind = kind
+
+    def samples(self) -> List[Tuple[str, Optional[Labels], float]]:
+        return [(self.name, labels, value) for labels, value in self.callback()]
+
+
+class MetricsRegistry:
+    """Holds the metrics and renders them in Prometheus text format"""
+
+    def __init__(self):
+        self.metrics: Dict[str, object] = {}
+
+    def _add(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Metrik zaten tanımlı: {metric.name}")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._add(Counter(name, help_text))
+
+    def histogram(self, name: str, help_text: str,
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help_text, buckets))
+
+    def gauge(self, name: str, help_text: str,
+              callback: Callable[[], Sequence[Tuple[Optional[Labels], float]]]) -> CallbackMetric:
+        """Gauge read at scrape time; the callback must not take locks the tick uses"""
+        return self._add(CallbackMetric(name, help_text, callback))
+
+    def counter_callback(self, name: str, help_text: str,
+                         callback: Callable[[], Sequence[Tuple[Optional[Labels], float]]]) -> CallbackMetric:
+        """Counter maintained elsewhere (e.g. component stats), read at scrape time"""
+        return self._add(CallbackMetric(name, help_text, callback, kind="counter"))
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self.metrics.values()):
+            try:
+                samples = metric.samples()
+            except Exception as e:
+                lines.append(f"# {metric.name} okunamadı: {e}")
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in samples:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _timed(function: Callable, histogram: Histogram) -> Callable:
+    """Wrap a callable so each call's duration is observed"""
+    clock = time.perf_counter
+    observe = histogram.observe
+
+    def wrapper(*args, **kwargs):
+        start = clock()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            observe(clock() - start)
+
+    wrapper.__wrapped__ = function
+    return wrapper
+
+
+def instrument(engine, registry: Optional[MetricsRegistry] = None) -> MetricsRegistry:
+    """Wrap the engine's hot spots and register state gauges; returns the registry"""
+    registry = registry if registry is not None else MetricsRegistry()
+    controller = engine.fan_controller
+    data_logger = engine.data_logger
+
+    sensor = registry.histogram("thermopi_sensor_read_seconds", "Duration of a full sensor read")
+    # The one method both sample() and snapshot() use to actually read the sensors
+    controller.sampler._sample_locked = _timed(controller.sampler._sample_locked, sensor)
+
+    curve = registry.histogram("thermopi_curve_eval_seconds", "Duration of a fan curve evaluation")
+    controller.calculate_auto_speed = _timed(controller.calculate_auto_speed, curve)
+
+    pwm = registry.histogram("thermopi_pwm_write_seconds", "Duration of a fan backend write")
+    for channel in controller.channels:
+        # On the channel, not its backend: retarget_output may swap the backend later
+        channel.write = _timed(channel.write, pwm)
+
+    tick = registry.histogram("thermopi_tick_seconds", "Duration of a control tick (without sleep)")
+    engine.tick = _timed(engine.tick, tick)
+
+    sleep = registry.histogram("thermopi_loop_sleep_seconds", "Time the control loop slept",
+                               SLEEP_BUCKETS)
+    engine.tick_scheduler.wait = _timed(engine.tick_scheduler.wait, sleep)
+
+    if data_logger is not None:
+        log = registry.histogram("thermopi_log_write_seconds", "Duration of DataLogger.log_data")
+        data_logger.log_data = _timed(data_logger.log_data, log)
+
+        # Attributes, not writer.stats(): qsize() would take the queue lock log_data uses
+        writer = data_logger.writer
+
+        def log_counters():
+            return [({"counter": key}, getattr(writer, key))
+                    for key in ("enqueued", "written", "dropped", "flushes", "fsyncs", "errors")]
+        registry.counter_callback("thermopi_log_records_total", "Background log writer counters",
+                                  log_counters)
+
+    channels = list(controller.channels)
+
+    def output_counters():
+        return [({"channel": channel.name, "counter": key}, getattr(channel.scheduler, key))
+                for channel in channels for key in ("writes_issued", "writes_suppressed", "kicks")]
+    registry.counter_callback("thermopi_output_writes_total", "Duty scheduler write counters",
+                              output_counters)
+
+    # State gauges come from the last published snapshot (a plain attribute read)
+    def state_value(field: str):
+        def callback():
+            state = engine.latest()
+            value = getattr(state, field) if state is not None else None
+            return [] if value is None else [(None, value)]
+        return callback
+
+    def temperatures():
+        state = engine.latest()
+        return [({"sensor": name}, value) for name, value in state.zones.items()] if state else []
+
+    def channel_value(field: str):
+        def callback():
+            state = engine.latest()
+            if state is None:
+                return []
+            values = [(channel.name, getattr(channel, field)) for channel in state.channels]
+            return [({"channel": name}, value) for name, value in values if value is not None]
+        return callback
+
+    def channel_flag(field: str, value):
+        def callback():
+            state = engine.latest()
+            if state is None:
+                return []
+            # Only channels with a tachometer can be judged
+            return [({"channel": channel.name}, int(getattr(channel, field) == value))
+                    for channel in state.channels if channel.rpm is not None]
+        return callback
+
+    def mode():
+        state = engine.latest()
+        return [({"mode": state.mode}, 1)] if state else []
+
+    def ticks():
+        state = engine.latest()
+        return [(None, state.seq)] if state else []
+
+    registry.gauge("thermopi_temperature_celsius", "Latest sensor temperatures", temperatures)
+    registry.gauge("thermopi_cpu_temperature_celsius", "Primary CPU temperature",
+                   state_value("temperature"))
+    registry.gauge("thermopi_fan_temperature_celsius", "Temperature each fan is controlled from",
+                   channel_value("temperature"))
+    registry.gauge("thermopi_fan_duty_percent", "Duty written to each fan", channel_value("fan_speed"))
+    registry.gauge("thermopi_fan_target_percent", "Duty requested by the controller per fan",
+                   channel_value("target_speed"))
+    registry.gauge("thermopi_fan_rpm", "Measured speed of each tach-equipped fan", channel_value("rpm"))
+    registry.gauge("thermopi_fan_stalled", "1 while a fan is detected as stalled",
+                   channel_flag("fan_status", "stall"))
+    registry.gauge("thermopi_fan_underspeed", "1 while a fan runs well below its expected speed",
+                   channel_flag("fan_status", "underspeed"))
+    registry.gauge("thermopi_cpu_utilization_ratio", "CPU utilization (load feed-forward only)",
+                   state_value("load"))
+    registry.gauge("thermopi_feedforward_boost_percent", "Duty added by the load feed-forward",
+                   state_value("boost"))
+    registry.gauge("thermopi_mode", "Active control mode (label)", mode)
+    registry.counter_callback("thermopi_ticks_total", "Control ticks published", ticks)
+    return registry
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: MetricsRegistry = None
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes every few seconds would flood stdout
+
+
+class MetricsServer:
+    """Serves /metrics from a daemon thread"""
+
+    def __init__(self, registry: MetricsRegistry, port: int = 9101, host: str = "127.0.0.1"):
+        handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self.httpd.server_address[1]
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="metrics", daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
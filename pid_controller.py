@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+ThermoPi PID Controller
+Closed-loop fan control holding a target temperature
+
+The controller is reverse acting (hotter than the setpoint -> more duty),
+takes the derivative on the filtered measurement so setpoint changes do
+not kick the fan, stops integrating while the output is saturated
+(anti-windup) and supports bumpless transfer from manual mode. Its state
+serializes to JSON so it survives restarts.
+
+PIDBank runs many parameter sets side by side for replay sweeps.
+
+Run directly for a step-response check against the simulated plant:
+    python3 pid_controller.py
+"""
+
+import json
+import os
+import sys
+import time
+from typing import Dict, NamedTuple, Optional, Sequence
+
+PID_STATE_FILE = "pid_state.json"
+
+
+def _numpy():
+    """NumPy if installed; only sweeps need it, so it is not imported at startup"""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+class PIDController:
+    """Temperature setpoint controller producing a fan duty (0-100)"""
+
+    def __init__(self, setpoint: float = 57.0, kp: float = 15.0, ki: float = 0.05, kd: float = 150.0,
+                 derivative_tau: float = 4.0, output_min: float = 0.0, output_max: float = 100.0):
+        self.setpoint = setpoint
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.derivative_tau = derivative_tau  # Low-pass time constant of the derivative (s)
+        self.output_min = output_min
+        self.output_max = output_max
+
+        self.integral = 0.0
+        self.derivative = 0.0
+        self.last_measurement: Optional[float] = None
+        self.last_time: Optional[float] = None
+        self.output = 0.0
+
+    def reset(self, output: float = 0.0, measurement: Optional[float] = None):
+        """Bumpless transfer: continue from the given output without a jump"""
+        output = max(self.output_min, min(self.output_max, output))
+        error = (measurement - self.setpoint) if measurement is not None else 0.0
+        self.integral = max(self.output_min, min(self.output_max, output - self.kp * error))
+        self.derivative = 0.0
+        self.last_measurement = measurement
+        self.last_time = None
+        self.output = output
+
+    def update(self, measurement: float, dt: Optional[float] = None) -> float:
+        """Compute the next duty for a temperature measurement"""
+        if dt is None:
+            now = time.monotonic()
+            dt = now - self.last_time if self.last_time is not None else 0.0
+            self.last_time = now
+
+        error = measurement - self.setpoint
+
+        if dt > 0 and self.last_measurement is not None:
+            # Derivative on measurement, first-order filtered
+            raw = (measurement - self.last_measurement) / dt
+            alpha = self.derivative_tau / (self.derivative_tau + dt)
+            self.derivative = alpha * self.derivative + (1.0 - alpha) * raw
+        self.last_measurement = measurement
+
+        proportional = self.kp * error
+        derivative = self.kd * self.derivative
+        integral = self.integral + self.ki * error * dt
+        output = proportional + integral + derivative
+
+        # Anti-windup: do not integrate further into saturation
+        if (output > self.output_max and error > 0) or (output < self.output_min and error < 0):
+            integral = self.integral
+            output = proportional + integral + derivative
+        self.integral = max(self.output_min, min(self.output_max, integral))
+
+        self.output = max(self.output_min, min(self.output_max, output))
+        return self.output
+
+    def __call__(self, measurement: float, dt: Optional[float] = None) -> int:
+        return int(round(self.update(measurement, dt)))
+
+    def to_dict(self) -> dict:
+        """Parameters and state for persistence"""
+        return {
+            "setpoint": self.setpoint,
+            "kp": self.kp,
+            "ki": self.ki,
+            "kd": self.kd,
+            "derivative_tau": self.derivative_tau,
+            "output_min": self.output_min,
+            "output_max": self.output_max,
+            "state": {
+                "integral": self.integral,
+                "derivative": self.derivative,
+                "last_measurement": self.last_measurement,
+                "output": self.output,
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PIDController":
+        params = {key: data[key] for key in ("setpoint", "kp", "ki", "kd", "derivative_tau",
+                                             "output_min", "output_max") if key in data}
+        pid = cls(**params)
+        state = data.get("state", {})
+        pid.integral = float(state.get("integral", 0.0))
+        pid.derivative = float(state.get("derivative", 0.0))
+        pid.last_measurement = state.get("last_measurement")
+        pid.output = float(state.get("output", 0.0))
+        return pid
+
+    def save(self, path: str = PID_STATE_FILE):
+        """Atomically write parameters and state"""
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str = PID_STATE_FILE) -> "PIDController":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+
+class PIDBank:
+    """Vectorized PID controllers for replay sweeps (one per parameter set)"""
+
+    # Samples replay.py runs before each time chunk: the integral remembers far longer
+    # than the thermal time constant, so a chunk must start well before it is counted
+    warmup = 14400
+
+    def __init__(self, setpoint: Sequence[float], kp: Sequence[float], ki: Sequence[float],
+                 kd: Sequence[float], derivative_tau: float = 4.0):
+        self.params = list(zip(setpoint, kp, ki, kd))
+        self.size = len(self.params)
+        self.derivative_tau = derivative_tau
+        self._np = np = _numpy()
+        if np is not None:
+            self.setpoint, self.kp, self.ki, self.kd = (np.asarray(column, dtype=np.float64)
+                                                        for column in zip(*self.params))
+        self.reset()
+
+    def reset(self):
+        np = self._np
+        if np is not None:
+            self.integral = np.zeros(self.size)
+            self.derivative = np.zeros(self.size)
+        else:
+            self.controllers = [PIDController(sp, kp, ki, kd, self.derivative_tau)
+                                for sp, kp, ki, kd in self.params]
+        self.last = None
+
+    def __call__(self, temps, dt: float = 0.0):
+        np = self._np
+        if np is None:
+            return [pid(t, dt) for pid, t in zip(self.controllers, temps)]
+
+        temps = np.asarray(temps, dtype=np.float64)
+        error = temps - self.setpoint
+        if np.ndim(dt):
+            # One time step per entry (replay runs time chunks side by side)
+            dt = np.asarray(dt, dtype=np.float64)
+            if self.last is not None:
+                alpha = self.derivative_tau / (self.derivative_tau + dt)
+                raw = np.divide(temps - self.last, dt, out=np.zeros(self.size), where=dt > 0)
+                self.derivative = np.where(dt > 0, alpha * self.derivative + (1.0 - alpha) * raw,
+                                           self.derivative)
+        elif dt > 0 and self.last is not None:
+            alpha = self.derivative_tau / (self.derivative_tau + dt)
+            self.derivative = alpha * self.derivative + (1.0 - alpha) * (temps - self.last) / dt
+        self.last = temps.copy()
+
+        pd = self.kp * error + self.kd * self.derivative
+        integral = self.integral + self.ki * error * dt
+        output = pd + integral
+        windup = ((output > 100.0) & (error > 0)) | ((output < 0.0) & (error < 0))
+        integral = np.where(windup, self.integral, integral)
+        self.integral = np.clip(integral, 0.0, 100.0)
+        return np.round(np.clip(pd + integral, 0.0, 100.0))
+
+    def tile(self, count: int) -> "PIDBank":
+        """The same parameter sets repeated count times (block-major), with fresh state"""
+        return PIDBank(*zip(*(self.params * count)), derivative_tau=self.derivative_tau)
+
+    def describe(self, i: int) -> dict:
+        setpoint, kp, ki, kd = self.params[i]
+        return {"setpoint": setpoint, "kp": kp, "ki": ki, "kd": kd}
+
+
+def step_response(controller, model, duration: int = 7200, busy_load: float = 0.35,
+                  idle_load: float = 0.05, busy_time: int = 120, period: int = 480,
+                  start_temp: float = 45.0):
+    """Simulate repeated load steps (bursts) on the lumped thermal plant; returns (temps, duties)"""
+    temp = start_temp
+    temps, duties = [], []
+    duty = controller(temp, 0.0)
+    for t in range(duration):
+        load = busy_load if t % period < busy_time else idle_load
+        temp += load - model.loss_rate(duty) * (temp - model.ambient)
+        duty = controller(temp, 1.0)
+        temps.append(temp)
+        duties.append(duty)
+    return temps, duties
+
+
+class StepResult(NamedTuple):
+    peak: float       # °C
+    mean_duty: float  # %
+    over: int         # Seconds above the limit
+
+
+def compare_step_response(limit: float = 60.0, warmup: int = 1800) -> Dict[str, StepResult]:
+    """Default curve vs default PID under step_response on the default plant"""
+    from fan_curve import FanCurve
+    from replay import ThermalModel
+
+    model = ThermalModel()
+    curve = FanCurve.from_thresholds(50.0, 65.0, 20.0, 80.0)
+    pid = PIDController()
+    pid.reset(0.0, 45.0)
+    results = {}
+    for name, controller in (("Eğri", lambda temp, dt: curve(temp)), ("PID", pid)):
+        temps, duties = step_response(controller, model)
+        temps, duties = temps[warmup:], duties[warmup:]  # Skip the initial transient
+        results[name] = StepResult(max(temps), sum(duties) / len(duties),
+                                   sum(1 for t in temps if t > limit))
+    return results
+
+
+def main() -> int:
+    limit = 60.0
+    print("🧪 Basamak yanıtı: tekrarlanan yük patlamaları (simüle termal model)")
+    results = compare_step_response(limit)
+    for name, (peak, mean_duty, over) in results.items():
+        print(f"  {name:<5} tepe {peak:5.1f}°C | ort. hız {mean_duty:5.1f}% | {limit:.0f}°C üstü {over:4d} s")
+
+    if all(p <= c for p, c in zip(results["PID"], results["Eğri"])):
+        print("✅ PID aynı veya daha düşük ortalama hızla daha düşük tepe sıcaklık sağladı")
+        return 0
+    print("❌ PID eğriden daha kötü sonuç verdi")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
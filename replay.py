@@ -0,0 +1,611 @@
+#!/usr/bin/env python3
+"""
+ThermoPi Replay
+Offline replay of recorded temperature/duty traces through a thermal model
+
+The recorded trace is inverted through a lumped first-order thermal model
+to recover the heat load the board actually saw. That load is then
+replayed against any controller, so curves and thresholds can be compared
+on real workloads without a Pi. Many parameter sets are simulated side by
+side (NumPy vectors when available), and long traces are cut into
+hour-long chunks that run side by side too, so a week of 1 Hz data takes
+thousands of NumPy steps rather than hundreds of thousands of Python ones.
+Each chunk first replays a warm-up window before it, which the model
+forgets long before the chunk starts (fifteen time constants), so chunked
+temperatures match a one-piece replay to ~1e-9 °C. No GPIO is needed.
+
+Model (per second, T in °C, d in %):
+    dT/dt = q(t) - k(d) * (T - ambient),   k(d) = (1 + fan_gain * d / 100) / tau
+
+Usage:
+    python3 replay.py fan_control_log.txt
+    python3 replay.py --history history --temp-min 45,50,55 --temp-max 60,65,70 --workers 4
+    python3 replay.py fan_control_log.txt --feedforward 0,0.5,1   # Needs a load column or --load-trace
+"""
+
+import argparse
+import itertools
+import math
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Callable, List, NamedTuple, Optional, Sequence
+
+from cpu_load import LoadFeedForward
+from fan_curve import FanCurve, load_curve
+from history_store import MODE_CODES, iter_history
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+LOG_LINE = re.compile(
+    r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}) - Temp: (-?[\d.]+)°C, Fan: (\d+)%, Mode: (\w+)"
+    r"(?:, Load: (\d+)%)?")
+MAX_GAP = 10.0  # Seconds; larger gaps restart the simulation from the recorded temperature
+CHUNK = 3600    # Samples per side-by-side time chunk (0: replay the trace in one piece)
+WARMUP = 3600   # Samples replayed before each chunk so its state no longer depends on the cut
+
+
+class _TraceColumns(NamedTuple):
+    times: list        # Wall-clock seconds
+    temperature: list  # °C
+    duty: list         # %
+    mode: list         # MODE_* codes
+    load: Optional[list] = None  # CPU utilization 0-1, when recorded
+
+
+class Trace(_TraceColumns):
+    """Recorded history as parallel columns; len() is the number of records"""
+
+    __slots__ = ()
+
+    def __len__(self):
+        return len(self.times)
+
+    @classmethod
+    def _make(cls, iterable):
+        # NamedTuple._make (used by _replace) checks len() against the field count
+        return tuple.__new__(cls, iterable)
+
+
+def load_text_log(path: str) -> Trace:
+    """Parse a DataLogger text log (unrelated lines are skipped)"""
+    times, temps, duties, modes, loads = [], [], [], [], []
+    last_stamp, last_time = None, 0.0
+    last_load, has_load = 0.0, False
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            match = LOG_LINE.match(line)
+            if not match:
+                continue
+            stamp = match.group(1)
+            if stamp != last_stamp:
+                last_stamp = stamp
+                last_time = datetime.strptime(stamp, "%Y-%m-%d %H:%M:%S").timestamp()
+            times.append(last_time)
+            temps.append(float(match.group(2)))
+            duties.append(int(match.group(3)))
+            modes.append(MODE_CODES.get(match.group(4), 0))
+            if match.group(5) is not None:
+                last_load, has_load = int(match.group(5)) / 100.0, True
+            loads.append(last_load)
+    return Trace(times, temps, duties, modes, loads if has_load else None)
+
+
+def attach_load(trace: Trace, path: str) -> Trace:
+    """Add a load column from a "wall_time,utilization" file (utilization 0-1 or %)"""
+    points = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            fields = line.replace(",", " ").split()
+            try:
+                wall_time, utilization = float(fields[0]), float(fields[1])
+            except (IndexError, ValueError):
+                continue  # Header or comment
+            points.append((wall_time, utilization / 100.0 if utilization > 1.0 else utilization))
+    if not points:
+        raise ValueError(f"{path}: yük kaydı boş")
+    points.sort()
+
+    # Sample-and-hold: the most recent utilization at or before each trace time
+    loads, index = [], 0
+    for wall_time in trace.times:
+        while index + 1 < len(points) and points[index + 1][0] <= wall_time:
+            index += 1
+        loads.append(points[index][1])
+    return trace._replace(load=loads)
+
+
+def load_history(directory: str, start: Optional[float] = None, end: Optional[float] = None) -> Trace:
+    """Load a binary history directory (primary zone)"""
+    times, temps, duties, modes = [], [], [], []
+    for sample in iter_history(directory, start, end):
+        if sample.temperatures[0] is None:
+            continue
+        times.append(sample.wall_time)
+        temps.append(sample.temperatures[0])
+        duties.append(sample.duty)
+        modes.append(sample.mode)
+    return Trace(times, temps, duties, modes)
+
+
+class ThermalModel:
+    """Lumped first-order thermal model of a board plus fan"""
+
+    def __init__(self, tau: float = 240.0, fan_gain: float = 2.0, ambient: float = 30.0):
+        self.tau = tau
+        self.fan_gain = fan_gain
+        self.ambient = ambient
+
+    def loss_rate(self, duty):
+        """Cooling rate constant k(d) in 1/s"""
+        return (1.0 + self.fan_gain * duty / 100.0) / self.tau
+
+    def heat_input(self, trace: Trace) -> List[float]:
+        """Recover the heat load q(t) (°C/s) the recorded trace implies"""
+        if np is not None:
+            times = np.asarray(trace.times, dtype=np.float64)
+            temps = np.asarray(trace.temperature, dtype=np.float64)
+            if len(times) < 2:
+                return [0.0] * len(times)
+            dt = np.diff(times)
+            valid = (dt > 0) & (dt <= MAX_GAP)
+            q = np.where(valid, np.diff(temps) / np.where(valid, dt, 1.0)
+                         + self.loss_rate(np.asarray(trace.duty[:-1], dtype=np.float64))
+                         * (temps[:-1] - self.ambient), 0.0)
+            return np.append(q, q[-1]).tolist()
+        q = []
+        times, temps, duties = trace.times, trace.temperature, trace.duty
+        for n in range(len(times) - 1):
+            dt = times[n + 1] - times[n]
+            if dt <= 0 or dt > MAX_GAP:
+                q.append(0.0)
+                continue
+            dT = (temps[n + 1] - temps[n]) / dt
+            q.append(dT + self.loss_rate(duties[n]) * (temps[n] - self.ambient))
+        q.append(q[-1] if q else 0.0)
+        return q
+
+    def to_dict(self) -> dict:
+        return {"tau": self.tau, "fan_gain": self.fan_gain, "ambient": self.ambient}
+
+
+# --- Controllers: map a vector of temperatures (one per parameter set) and the
+# --- time step to duties; stateful controllers also provide reset()
+
+class ScalarController:
+    """Wrap any temperature -> duty callable, e.g. FanController.calculate_auto_speed
+
+    Stateful callables such as PIDController take the time step as a second
+    argument (pass_dt=True).
+    """
+
+    def __init__(self, function: Callable[..., int], size: int = 1, pass_dt: bool = False):
+        self.function = function
+        self.size = size
+        self.pass_dt = pass_dt
+
+    def __call__(self, temps, dt: float = 0.0):
+        if self.pass_dt:
+            duties = [self.function(float(t), dt) for t in temps]
+        else:
+            duties = [self.function(float(t)) for t in temps]
+        return np.asarray(duties, dtype=np.float64) if np is not None else duties
+
+    def reset(self):
+        reset = getattr(self.function, "reset", None)
+        if reset is not None:
+            reset()
+
+    def describe(self, i: int) -> dict:
+        return {"controller": getattr(self.function, "__qualname__", repr(self.function))}
+
+
+class RampSweep:
+    """Vectorized classic ramp (calculate_auto_speed) for many threshold sets"""
+
+    def __init__(self, temp_min: Sequence[float], temp_max: Sequence[float],
+                 speed_min: Sequence[float], speed_max: Sequence[float]):
+        self.params = list(zip(temp_min, temp_max, speed_min, speed_max))
+        self.size = len(self.params)
+        if np is not None:
+            self.t0, self.t1, self.s0, self.s1 = (np.asarray(column, dtype=np.float64)
+                                                  for column in zip(*self.params))
+
+    @classmethod
+    def grid(cls, temp_min, temp_max, speed_min, speed_max) -> "RampSweep":
+        """Every combination of the given values (skipping temp_max <= temp_min)"""
+        combos = [c for c in itertools.product(temp_min, temp_max, speed_min, speed_max) if c[1] > c[0]]
+        return cls(*zip(*combos))
+
+    def __call__(self, temps, dt: float = 0.0):
+        if np is None:
+            return [0 if t < t0 else 100 if t > t1 else int(s0 + (s1 - s0) * (t - t0) / (t1 - t0))
+                    for t, (t0, t1, s0, s1) in zip(temps, self.params)]
+        ramp = np.floor(self.s0 + (self.s1 - self.s0) * (temps - self.t0) / (self.t1 - self.t0))
+        return np.where(temps < self.t0, 0.0, np.where(temps > self.t1, 100.0, ramp))
+
+    def tile(self, count: int) -> "RampSweep":
+        """The same parameter sets repeated count times (block-major)"""
+        return RampSweep(*zip(*(self.params * count)))
+
+    def describe(self, i: int) -> dict:
+        t0, t1, s0, s1 = self.params[i]
+        return {"temp_min": t0, "temp_max": t1, "speed_min": s0, "speed_max": s1}
+
+
+class CurveBank:
+    """Vectorized evaluation of several compiled FanCurve tables"""
+
+    def __init__(self, curves: Sequence[FanCurve]):
+        self.curves = list(curves)
+        self.size = len(self.curves)
+        if np is not None:
+            width = max(len(curve.table) for curve in self.curves)
+            self.table = np.array([curve.table + [curve.table[-1]] * (width - len(curve.table))
+                                   for curve in self.curves], dtype=np.float64)
+            self.t_low = np.array([c.t_low for c in self.curves])
+            self.t_high = np.array([c.t_high for c in self.curves])
+            self.inv = np.array([1.0 / c.resolution for c in self.curves])
+            self.below = np.array([int(c.below) for c in self.curves], dtype=np.float64)
+            self.above = np.array([int(c.above) for c in self.curves], dtype=np.float64)
+            self.rows = np.arange(self.size)
+            self.width = width
+
+    def __call__(self, temps, dt: float = 0.0):
+        if np is None:
+            return [curve.evaluate(t) for curve, t in zip(self.curves, temps)]
+        index = np.clip(((temps - self.t_low) * self.inv).astype(np.int64), 0, self.width - 1)
+        duties = self.table[self.rows, index]
+        return np.where(temps < self.t_low, self.below, np.where(temps > self.t_high, self.above, duties))
+
+    def tile(self, count: int) -> "CurveBank":
+        """The same curves repeated count times (block-major)"""
+        return CurveBank(self.curves * count)
+
+    def describe(self, i: int) -> dict:
+        return self.curves[i].to_dict()
+
+
+class FeedForwardController:
+    """Adds the CPU load feed-forward boost to another controller (needs trace.load)"""
+
+    takes_load = True
+
+    def __init__(self, controller, feedforward: LoadFeedForward):
+        self.controller = controller
+        self.feedforward = feedforward
+        self.size = controller.size
+
+    def __call__(self, temps, dt: float = 0.0, load: Optional[float] = None):
+        duties = self.controller(temps, dt)
+        boost = self.feedforward.update(load, dt) if load is not None else 0
+        if not boost:
+            return duties
+        if np is not None:
+            return np.minimum(100.0, np.asarray(duties, dtype=np.float64) + boost)
+        return [min(100, duty + boost) for duty in duties]
+
+    def reset(self):
+        if hasattr(self.controller, "reset"):
+            self.controller.reset()
+        self.feedforward.reset()
+
+    def describe(self, i: int) -> dict:
+        return dict(self.controller.describe(i), feedforward=self.feedforward.to_dict())
+
+
+# --- Simulation ---
+
+class ReplayResult(NamedTuple):
+    """Metrics per parameter set (lists of length `size`)"""
+    peak: list            # Highest simulated temperature (°C)
+    mean_temp: list       # Average temperature (°C)
+    time_over: list       # Seconds above the threshold
+    mean_duty: list       # Average duty (%)
+    energy: list          # Fan energy proxy: full-speed-equivalent hours, sum((d/100)^3 dt)/3600
+    switches: list        # Number of duty changes (PWM writes)
+    duration: float       # Simulated seconds
+
+
+def _replay_numpy(trace, q, controller, model, threshold) -> ReplayResult:
+    size = controller.size
+    times = trace.times
+    load = trace.load if getattr(controller, "takes_load", False) else None
+    temp = np.full(size, float(trace.temperature[0]))
+    duty = np.asarray(controller(temp), dtype=np.float64)
+    peak = temp.copy()
+    temp_sum = np.zeros(size)
+    over = np.zeros(size)
+    duty_sum = np.zeros(size)
+    energy = np.zeros(size)
+    switches = np.zeros(size, dtype=np.int64)
+    duration = 0.0
+    inv_tau, gain, ambient = 1.0 / model.tau, model.fan_gain / 100.0, model.ambient
+
+    for n in range(len(times) - 1):
+        dt = times[n + 1] - times[n]
+        if dt <= 0 or dt > MAX_GAP:
+            # Controller was not running: resume from the recorded temperature
+            temp[:] = trace.temperature[n + 1]
+            continue
+        temp += dt * (q[n] - (1.0 + gain * duty) * inv_tau * (temp - ambient))
+        new_duty = controller(temp, dt, load[n + 1]) if load is not None else controller(temp, dt)
+        new_duty = np.asarray(new_duty, dtype=np.float64)
+        switches += new_duty != duty
+        duty = new_duty
+
+        np.maximum(peak, temp, out=peak)
+        temp_sum += temp * dt
+        over += (temp > threshold) * dt
+        duty_sum += duty * dt
+        energy += (duty / 100.0) ** 3 * dt
+        duration += dt
+
+    span = duration or 1.0
+    return ReplayResult(peak.tolist(), (temp_sum / span).tolist(), over.tolist(),
+                        (duty_sum / span).tolist(), (energy / 3600.0).tolist(),
+                        switches.tolist(), duration)
+
+
+def _replay_chunked(trace, q, controller, model, threshold, chunk: int, warmup: int) -> ReplayResult:
+    """_replay_numpy with the trace cut into chunks replayed side by side
+
+    Chunk c accounts for steps [c·chunk, (c+1)·chunk) but starts simulating
+    `warmup` steps earlier from the recorded temperature; the tiled
+    controller holds one copy of every parameter set per chunk.
+    """
+    size = controller.size
+    times = np.asarray(trace.times, dtype=np.float64)
+    recorded = np.asarray(trace.temperature, dtype=np.float64)
+    q = np.asarray(q, dtype=np.float64)
+    steps = len(times) - 1
+    chunks = -(-steps // chunk)
+    width = warmup + chunk
+    batch = controller.tile(chunks)
+
+    # (chunk, iteration) tables of the step each chunk takes at each iteration
+    index = (np.arange(chunks) * chunk - warmup)[:, None] + np.arange(width)[None, :]
+    active = (index >= 0) & (index < steps)
+    safe = np.clip(index, 0, steps - 1)
+    dt_all = np.diff(times)
+    valid = active & (dt_all[safe] > 0) & (dt_all[safe] <= MAX_GAP)
+    dt = np.where(valid, dt_all[safe], 0.0)
+    heat = q[safe]
+    restart = active & ~valid                   # Gap: resume from the recorded temperature
+    counted = valid & (np.arange(width) >= warmup)[None, :]
+    weight = np.where(counted, dt, 0.0)
+    resume = recorded[safe + 1]
+
+    def columns(table):
+        return table.T[:, :, None]  # Iteration-major, broadcast over the parameter sets
+
+    dt_c, heat_c, weight_c, resume_c = columns(dt), columns(heat), columns(weight), columns(resume)
+    restart_c, counted_c = columns(restart), columns(counted)
+    any_restart = restart.any(axis=0).tolist()
+
+    temp = np.repeat(recorded[np.clip(index[:, 0], 0, steps)][:, None], size, axis=1)
+    duty = np.asarray(batch(temp.ravel()), dtype=np.float64).reshape(chunks, size)
+    peak = np.full((chunks, size), -np.inf)
+    temp_sum = np.zeros((chunks, size))
+    over = np.zeros((chunks, size))
+    duty_sum = np.zeros((chunks, size))
+    energy = np.zeros((chunks, size))
+    switches = np.zeros((chunks, size), dtype=np.int64)
+    inv_tau, gain, ambient = 1.0 / model.tau, model.fan_gain / 100.0, model.ambient
+
+    rise = np.empty((chunks, size))
+    term = np.empty((chunks, size))
+    hot = np.empty((chunks, size), dtype=bool)
+    for j in range(width):
+        if any_restart[j]:
+            temp = np.where(restart_c[j], resume_c[j], temp)
+        step = dt_c[j]
+        # temp += dt * (q - (1 + gain * duty) * inv_tau * (temp - ambient)), in place
+        np.multiply(duty, gain, out=term)
+        term += 1.0
+        term *= inv_tau
+        np.subtract(temp, ambient, out=rise)
+        rise *= term
+        np.subtract(heat_c[j], rise, out=rise)
+        rise *= step
+        temp += rise
+        new_duty = np.asarray(batch(temp.ravel(), np.broadcast_to(step, (chunks, size)).ravel()),
+                              dtype=np.float64).reshape(chunks, size)
+        if j < warmup:
+            duty = new_duty  # Nothing is counted yet in any chunk
+            continue
+        counted_j, w = counted_c[j], weight_c[j]
+        switches += (new_duty != duty) & counted_j
+        duty = new_duty
+
+        np.maximum(peak, temp, out=peak, where=counted_j)
+        np.multiply(temp, w, out=term)
+        temp_sum += term
+        np.greater(temp, threshold, out=hot)
+        np.multiply(hot, w, out=term)
+        over += term
+        np.multiply(duty, w, out=term)
+        duty_sum += term
+        np.multiply(duty, 0.01, out=term)
+        np.multiply(term, term, out=rise)
+        rise *= term
+        rise *= w
+        energy += rise
+
+    duration = float(weight.sum())
+    span = duration or 1.0
+    return ReplayResult(peak.max(axis=0).tolist(), (temp_sum.sum(axis=0) / span).tolist(),
+                        over.sum(axis=0).tolist(), (duty_sum.sum(axis=0) / span).tolist(),
+                        (energy.sum(axis=0) / 3600.0).tolist(), switches.sum(axis=0).tolist(),
+                        duration)
+
+
+def _replay_python(trace, q, controller, model, threshold) -> ReplayResult:
+    size = controller.size
+    times = trace.times
+    load = trace.load if getattr(controller, "takes_load", False) else None
+    temp = [float(trace.temperature[0])] * size
+    duty = list(controller(temp))
+    peak = list(temp)
+    temp_sum = [0.0] * size
+    over = [0.0] * size
+    duty_sum = [0.0] * size
+    energy = [0.0] * size
+    switches = [0] * size
+    duration = 0.0
+    ambient = model.ambient
+
+    for n in range(len(times) - 1):
+        dt = times[n + 1] - times[n]
+        if dt <= 0 or dt > MAX_GAP:
+            temp = [float(trace.temperature[n + 1])] * size
+            continue
+        temp = [t + dt * (q[n] - model.loss_rate(d) * (t - ambient)) for t, d in zip(temp, duty)]
+        new_duty = list(controller(temp, dt, load[n + 1]) if load is not None else controller(temp, dt))
+        for i in range(size):
+            t, d = temp[i], new_duty[i]
+            if d != duty[i]:
+                switches[i] += 1
+            if t > peak[i]:
+                peak[i] = t
+            temp_sum[i] += t * dt
+            if t > threshold:
+                over[i] += dt
+            duty_sum[i] += d * dt
+            energy[i] += (d / 100.0) ** 3 * dt
+        duty = new_duty
+        duration += dt
+
+    span = duration or 1.0
+    return ReplayResult(peak, [s / span for s in temp_sum], over, [s / span for s in duty_sum],
+                        [e / 3600.0 for e in energy], switches, duration)
+
+
+def replay(trace: Trace, controller, model: Optional[ThermalModel] = None,
+           threshold: float = 70.0, heat_input: Optional[List[float]] = None,
+           chunk: int = CHUNK, warmup: int = WARMUP) -> ReplayResult:
+    """Run controller (vectorized over its parameter sets) against a recorded trace
+
+    Controllers that can be tiled (RampSweep, CurveBank, PIDBank) replay
+    long traces in side-by-side time chunks; chunk=0 disables that. A
+    controller's own `warmup` attribute raises the warm-up when its state
+    outlives the thermal model's.
+    """
+    if len(trace) < 2:
+        raise ValueError("Replay için en az iki kayıt gerekli")
+    if getattr(controller, "takes_load", False) and trace.load is None:
+        raise ValueError("İleri besleme için yük kaydı gerekli (Load sütunu veya --load-trace)")
+    model = model or ThermalModel()
+    q = heat_input if heat_input is not None else model.heat_input(trace)
+    if hasattr(controller, "reset"):
+        controller.reset()
+    if np is not None:
+        warmup = max(warmup, getattr(controller, "warmup", 0))
+        if chunk and hasattr(controller, "tile") and len(trace) > 2 * chunk + warmup:
+            return _replay_chunked(trace, q, controller, model, threshold, chunk, warmup)
+        return _replay_numpy(trace, q, controller, model, threshold)
+    return _replay_python(trace, q, controller, model, threshold)
+
+
+def _replay_chunk(args):
+    trace, q, controller, model, threshold = args
+    return replay(trace, controller, model, threshold, q)
+
+
+def sweep(trace: Trace, controllers: Sequence, model: Optional[ThermalModel] = None,
+          threshold: float = 70.0, workers: int = 1) -> List[ReplayResult]:
+    """Replay several (batched) controllers, optionally on a process pool"""
+    model = model or ThermalModel()
+    q = model.heat_input(trace)
+    jobs = [(trace, q, controller, model, threshold) for controller in controllers]
+    if workers <= 1 or len(jobs) == 1:
+        return [_replay_chunk(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_replay_chunk, jobs))
+
+
+def split_ramp(ramps: RampSweep, chunks: int) -> List[RampSweep]:
+    """Split a RampSweep into roughly equal parts for a process pool"""
+    size = math.ceil(ramps.size / max(1, chunks))
+    return [RampSweep(*zip(*ramps.params[i:i + size])) for i in range(0, ramps.size, size)]
+
+
+def merge_results(results: Sequence[ReplayResult]) -> ReplayResult:
+    """Concatenate per-chunk results back into one"""
+    fields = [sum((list(getattr(r, name)) for r in results), [])
+              for name in ReplayResult._fields[:-1]]
+    return ReplayResult(*fields, results[0].duration if results else 0.0)
+
+
+def _floats(text: str) -> List[float]:
+    return [float(value) for value in text.split(",") if value]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="ThermoPi kayıt tekrar oynatma ve simülasyon")
+    parser.add_argument("log", nargs="?", default="fan_control_log.txt", help="Metin log dosyası")
+    parser.add_argument("--history", help="İkili geçmiş dizini (metin log yerine)")
+    parser.add_argument("--threshold", type=float, default=70.0, help="Sıcaklık limiti (°C)")
+    parser.add_argument("--tau", type=float, default=240.0, help="Termal zaman sabiti (s)")
+    parser.add_argument("--fan-gain", type=float, default=2.0, help="Fanın tam hızdaki soğutma katkısı")
+    parser.add_argument("--ambient", type=float, default=30.0, help="Ortam sıcaklığı (°C)")
+    parser.add_argument("--temp-min", type=_floats, default=[50.0])
+    parser.add_argument("--temp-max", type=_floats, default=[65.0])
+    parser.add_argument("--speed-min", type=_floats, default=[20.0])
+    parser.add_argument("--speed-max", type=_floats, default=[80.0])
+    parser.add_argument("--feedforward", type=_floats, default=[0.0],
+                        help="Yük ileri besleme ağırlıkları (0: kapalı), ör. 0,0.5,1")
+    parser.add_argument("--ff-horizon", type=float, default=120.0, help="İleri besleme ufku (s)")
+    parser.add_argument("--load-trace", help="'zaman,kullanım' satırlı CPU yükü kaydı")
+    parser.add_argument("--workers", type=int, default=1, help="Paralel süreç sayısı")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    trace = load_history(args.history) if args.history else load_text_log(args.log)
+    if args.load_trace:
+        trace = attach_load(trace, args.load_trace)
+    print(f"📂 {len(trace)} kayıt yüklendi")
+    if len(trace) < 2:
+        print("❌ Yetersiz veri")
+        return 1
+
+    model = ThermalModel(args.tau, args.fan_gain, args.ambient)
+    ramps = RampSweep.grid(args.temp_min, args.temp_max, args.speed_min, args.speed_max)
+    controllers = split_ramp(ramps, args.workers) if args.workers > 1 else [ramps]
+    if os.path.exists("fan_curve.json"):
+        controllers.append(CurveBank([load_curve("fan_curve.json")]))
+    weights = [weight for weight in args.feedforward if weight > 0]
+    if weights:
+        if trace.load is None:
+            print("❌ İleri besleme için yük kaydı gerekli (Load sütunu veya --load-trace)")
+            return 1
+        controllers = [FeedForwardController(controller, LoadFeedForward(weight, args.ff_horizon))
+                       for weight in weights for controller in controllers] + (
+            controllers if 0.0 in args.feedforward else [])
+
+    started = time.perf_counter()
+    results = sweep(trace, controllers, model, args.threshold, args.workers)
+    elapsed = time.perf_counter() - started
+
+    rows = []
+    for controller, result in zip(controllers, results):
+        for i in range(controller.size):
+            rows.append((result.time_over[i], result.energy[i], controller.describe(i),
+                         result.peak[i], result.mean_duty[i], result.switches[i]))
+    rows.sort(key=lambda row: (row[0], row[1]))
+
+    print(f"⏱️ {len(rows)} parametre seti, {results[0].duration / 3600:.1f} saat veri: {elapsed:.2f} s")
+    print(f"{'Limit üstü (s)':>15} {'Enerji':>8} {'Tepe °C':>8} {'Ort. %':>7} {'Geçiş':>6}  Parametreler")
+    for over, energy, params, peak, mean_duty, switches in rows[:args.top]:
+        print(f"{over:>15.0f} {energy:>8.2f} {peak:>8.1f} {mean_duty:>7.1f} {switches:>6}  {params}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
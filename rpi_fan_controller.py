@@ -5,64 +5,151 @@ A comprehensive fan control system with GUI and terminal interfaces
 Supports both manual and automatic temperature-based fan control
 
 ⚠️  UYARI: Bu program sadece Raspberry Pi 5'te çalışır!
-🔧 GPIO pin 18'e bağlı PWM fan gerektirir
+🔧 Varsayılan: GPIO pin 18'e bağlı PWM fan (--pin, --backend veya --channels ile değiştirilir)
 🔐 Sudo yetkisi gerekebilir: sudo python3 rpi_fan_controller.py
+
+tkinter and RPi.GPIO are imported only when the GUI / GPIO backend is used,
+so the headless daemon (--interface daemon) starts without them.
 """
 
-import tkinter as tk
-from tkinter import ttk, messagebox
-import threading
 import time
+
+STARTED_AT = time.monotonic()  # Startup budget is measured from here
+
+import argparse
+import atexit
+import json
 import logging
+import signal
 import sys
 import os
-from datetime import datetime
-from typing import Optional, Callable
+import threading
+from typing import List, Optional, Callable
+
+from config_reload import RUNTIME_KEYS, ConfigWatcher
+from control_engine import ControlEngine, ControlState
+from duty_scheduler import DutyScheduler, hysteresis_speed
+from fan_backends import BACKENDS, FanBackend, create_backend
+from fan_channels import FAILSAFE_DUTY, FanChannel, load_channels
+from fan_curve import FanCurve, load_curve
+from pid_controller import PID_STATE_FILE, PIDController
+from log_writer import BatchedLogWriter
+from thermal_sampler import DEFAULT_ROOT, ThermalSampler, ThermalSnapshot
+
+CURVE_FILE = "fan_curve.json"
+CONFIG_FILE = "thermopi.json"
+DEFAULT_PIN = 18
+DEFAULT_PWM_FREQUENCY = 25000
 
-try:
-    import RPi.GPIO as GPIO
-except ImportError:
-    print("HATA: RPi.GPIO kütüphanesi bulunamadı!")
-    print("Lütfen şu komutu çalıştırın: pip3 install RPi.GPIO")
-    sys.exit(1)
 
 class FanController:
-    """Core fan controller class handling hardware PWM and temperature reading"""
-    
-    def __init__(self, fan_pin: int = 18, pwm_frequency: int = 25000):
+    """Core fan controller class handling hardware PWM and temperature reading
+    
+    Drives one or more FanChannels. Without an explicit channel list a single
+    channel is built from backend/curve/scheduler and follows the primary
+    CPU sensor; backend, curve, scheduler and the speeds refer to that
+    first channel.
+    """
+    
+    # Temperature thresholds for automatic mode (defaults; set per instance by config and reload)
+    temp_min = 50.0  # Below this: fan off
+    temp_max = 65.0  # Above this: fan at 100%
+    speed_min = 20   # Minimum speed when fan starts
+    speed_max = 80   # Maximum speed before 100%
+    temp_hysteresis = 2.0  # Automatic mode slows down only after cooling this much
+    # Automatic mode strategy: "curve" (open loop) or "pid" (holds pid.setpoint, first channel)
+    auto_strategy = "curve"
+    
+    def __init__(self, fan_pin: int = DEFAULT_PIN, pwm_frequency: int = DEFAULT_PWM_FREQUENCY,
+                 sampler: Optional[ThermalSampler] = None, curve: Optional[FanCurve] = None,
+                 scheduler: Optional[DutyScheduler] = None, pid: Optional[PIDController] = None,
+                 pid_state_file: Optional[str] = None, backend: Optional[FanBackend] = None,
+                 channels: Optional[List[FanChannel]] = None, feedforward=None, load_sampler=None,
+                 tachometer=None, stall_detector=None):
         self.fan_pin = fan_pin
         self.pwm_frequency = pwm_frequency
-        self.pwm = None
-        self.current_speed = 0
-        self.target_speed = 0
         self.is_initialized = False
         
-        # Temperature thresholds for automatic mode
-        self.temp_min = 50.0  # Below this: fan off
-        self.temp_max = 65.0  # Above this: fan at 100%
-        self.speed_min = 20   # Minimum speed when fan starts
-        self.speed_max = 80   # Maximum speed before 100%
+        if channels:
+            self.channels = list(channels)
+        else:
+            # Compiled curve used by automatic mode (defaults to the ramp above);
+            # the output stage does slew limiting, dwell, spin-up kick and write suppression
+            backend = backend if backend is not None else create_backend("rpi-gpio", fan_pin, pwm_frequency)
+            curve = curve if curve is not None else FanCurve.from_thresholds(
+                self.temp_min, self.temp_max, self.speed_min, self.speed_max)
+            self.channels = [FanChannel("fan", backend, curve, scheduler=scheduler,
+                                        tachometer=tachometer, stall_detector=stall_detector)]
+        
+        self.pid_state_file = pid_state_file
+        self.pid = pid if pid is not None else self.load_pid_state()
+        self.pid_save_interval = 300.0
+        self._pid_saved_at = time.monotonic()
+        
+        # One shared snapshot per tick for every caller (loops, status display)
+        self.sampler = sampler if sampler is not None else ThermalSampler()
+        self.sample_max_age = 0.2  # Shorter than the fastest tick (SamplingScheduler.min_period)
+        
+        # Optional CPU load feed-forward (cpu_load.LoadFeedForward), added on top of every channel
+        self.feedforward = feedforward
+        if feedforward is not None and load_sampler is None:
+            from cpu_load import CPULoadSampler
+            load_sampler = CPULoadSampler(self.sampler.root)
+        self.load_sampler = load_sampler
+        self.load: Optional[float] = None  # Last CPU utilization (0-1)
+        self.boost = 0                     # Last feed-forward duty
+        self._load_at: Optional[float] = None
+        
+        # Last applied config_reload.RuntimeConfig (set once a ConfigWatcher is attached)
+        self.runtime_config = None
         
         self.initialize_gpio()
     
+    @property
+    def primary(self) -> FanChannel:
+        """The first channel (the only one in single-fan setups)"""
+        return self.channels[0]
+    
+    @property
+    def backend(self) -> FanBackend:
+        return self.channels[0].backend
+    
+    @property
+    def scheduler(self) -> DutyScheduler:
+        return self.channels[0].scheduler
+    
+    @property
+    def curve(self) -> FanCurve:
+        return self.channels[0].curve
+    
+    @curve.setter
+    def curve(self, curve: FanCurve):
+        self.channels[0].curve = curve
+    
+    @property
+    def current_speed(self) -> int:
+        return self.channels[0].current_speed
+    
+    @property
+    def target_speed(self) -> int:
+        return self.channels[0].target_speed
+    
+    @property
+    def settled(self) -> bool:
+        """True when every channel's output has reached its target"""
+        return all(channel.scheduler.settled for channel in self.channels)
+    
     def initialize_gpio(self):
-        """Initialize GPIO and PWM for fan control"""
+        """Initialize the output backends (GPIO PWM by default) for fan control"""
         try:
-            # GPIO cleanup first to avoid conflicts
-            GPIO.cleanup()
-            GPIO.setmode(GPIO.BCM)
-            GPIO.setup(self.fan_pin, GPIO.OUT)
-            self.pwm = GPIO.PWM(self.fan_pin, self.pwm_frequency)
-            
-            # Start PWM and detect current state
-            self.pwm.start(0)
-            time.sleep(0.1)  # Allow PWM to stabilize
+            for channel in self.channels:
+                channel.open()
+                print(f"✅ Fan kontrolcüsü {channel.label} üzerinde başlatıldı")
             
             # Try to detect current fan state based on temperature
             self.detect_current_fan_speed()
             
             self.is_initialized = True
-            print(f"✅ Fan kontrolcüsü GPIO pin {self.fan_pin} üzerinde başlatıldı")
             print(f"🌀 Tespit edilen fan hızı: {self.current_speed}%")
             
         except Exception as e:
@@ -73,289 +160,393 @@ class FanController:
     def detect_current_fan_speed(self):
         """Initialize fan to known state"""
         # Start with fan off and let the system control it properly
-        self.current_speed = 0
-        self.target_speed = 0
+        for channel in self.channels:
+            channel.current_speed = 0
+            channel.target_speed = 0
         print("🌀 Fan başlangıç durumu: 0% (Kapalı)")
     
     def set_fan_speed(self, speed_percent: int):
-        """Set fan speed as percentage (0-100)"""
+        """Set fan speed as percentage (0-100) on every channel"""
         speed_percent = max(0, min(100, speed_percent))
-        self.target_speed = speed_percent
+        for channel in self.channels:
+            channel.target_speed = speed_percent
         
-        if self.pwm and self.is_initialized:
+        if self.is_initialized:
+            self.service_output()
+        else:
+            print(f"❌ GPIO başlatılmamış - Fan kontrolü yapılamıyor")
+    
+    def service_output(self):
+        """Move each PWM output towards its target_speed; writes only when needed"""
+        if not self.is_initialized:
+            return
+        multi = len(self.channels) > 1
+        for channel in self.channels:
+            duty = channel.scheduler.update(channel.target_speed)
+            if duty is None:
+                continue
             try:
-                self.pwm.ChangeDutyCycle(speed_percent)
-                self.current_speed = speed_percent  # Update immediately
-                print(f"🌀 Fan hızı ayarlandı: {speed_percent}%")
+                channel.write(duty)
+                if multi:
+                    print(f"🌀 {channel.name} fan hızı ayarlandı: {duty}%")
+                else:
+                    print(f"🌀 Fan hızı ayarlandı: {duty}%")
             except Exception as e:
-                print(f"❌ Fan hızı ayarlama hatası: {e}")
+                print(f"❌ Fan hızı ayarlama hatası ({channel.name}): {e}")
+    
+    def update_temperatures(self, temperature: Optional[float],
+                            snapshot: Optional[ThermalSnapshot] = None) -> List[Optional[float]]:
+        """Resolve every channel's temperature from one snapshot"""
+        temperatures = []
+        for channel in self.channels:
+            if channel.sensors:
+                channel.temperature = channel.temperature_from(snapshot)
+            else:
+                channel.temperature = temperature  # Primary sensor, already read this tick
+            temperatures.append(channel.temperature)
+        return temperatures
+    
+    def check_fans(self) -> List[FanChannel]:
+        """Measure every tach-equipped channel; returns the channels whose status changed"""
+        changed = []
+        multi = len(self.channels) > 1
+        for channel in self.channels:
+            status = channel.measure()
+            if status is None:
+                continue
+            changed.append(channel)
+            fan = f"{channel.name} fanı" if multi else "Fan"
+            rpm = f"{channel.rpm:.0f} RPM" if channel.rpm is not None else "RPM yok"
+            if status == "stall":
+                print(f"🛑 {fan} durdu ({rpm}, hedef {channel.current_speed}%)")
+            elif status == "underspeed":
+                print(f"⚠️ {fan} düşük devirde ({rpm}, hedef {channel.current_speed}%)")
+            else:
+                print(f"✅ {fan} normal devirde ({rpm})")
+        return changed
+    
+    def load_boost(self) -> int:
+        """Feed-forward duty from the current CPU utilization (0 when disabled)"""
+        if self.feedforward is None:
+            return 0
+        now = time.monotonic()
+        dt = now - self._load_at if self._load_at is not None else 0.0
+        self._load_at = now
+        try:
+            self.load = self.load_sampler.sample()
+        except (OSError, ValueError, IndexError) as e:
+            print(f"⚠️ CPU yükü okunamadı: {e}")
+            self.load = None
+        self.boost = self.feedforward.update(self.load, dt) if self.load is not None else 0
+        return self.boost
+    
+    def compute_duties(self, temperature: float,
+                       snapshot: Optional[ThermalSnapshot] = None) -> List[int]:
+        """Decide every channel's duty from the same readings, without writing"""
+        boost = self.load_boost()
+        duties = []
+        for index, (channel, channel_temp) in enumerate(
+                zip(self.channels, self.update_temperatures(temperature, snapshot))):
+            if channel_temp is None:
+                duties.append(FAILSAFE_DUTY)  # No readable sensor: cool rather than guess
+                continue
+            if channel.fan_status == "stall":
+                # Full duty is the strongest restart attempt; the curve/PID resume once it spins
+                duties.append(FAILSAFE_DUTY)
+                continue
+            if index == 0 and self.auto_strategy == "pid":
+                base = self.pid(channel_temp)
+                if self.pid_state_file and time.monotonic() - self._pid_saved_at >= self.pid_save_interval:
+                    self.save_pid_state()
+            else:
+                # Hysteresis acts on the temperature part, so a fading boost is not held
+                curve = self.calculate_auto_speed if index == 0 else channel.curve.evaluate
+                base = hysteresis_speed(curve, channel_temp, channel.base_speed, self.temp_hysteresis)
+            channel.base_speed = base
+            duties.append(min(100, base + boost))
+        return duties
+    
+    def update_auto(self, temperature: float, snapshot: Optional[ThermalSnapshot] = None) -> int:
+        """Automatic mode step: all duties from one snapshot, then schedule every output"""
+        duties = self.compute_duties(temperature, snapshot)
+        for channel, duty in zip(self.channels, duties):
+            channel.target_speed = max(0, min(100, duty))
+        
+        if self.is_initialized:
+            self.service_output()
         else:
             print(f"❌ GPIO başlatılmamış - Fan kontrolü yapılamıyor")
+        return duties[0]
+    
+    def enter_auto_mode(self, temperature: Optional[float] = None):
+        """Bumpless transfer into automatic mode from the current output"""
+        if temperature is None:
+            latest = self.sampler.latest
+            temperature = latest.primary if latest is not None else None
+        self.pid.reset(self.target_speed, temperature)
+    
+    def set_auto_strategy(self, strategy: str):
+        """Select "curve" or "pid" for automatic mode"""
+        if strategy not in ("curve", "pid"):
+            raise ValueError(f"Geçersiz strateji: {strategy}")
+        if strategy == "pid" and self.auto_strategy != "pid":
+            self.enter_auto_mode()
+        self.auto_strategy = strategy
+        label = f"PID (hedef {self.pid.setpoint:.0f}°C)" if strategy == "pid" else "Eğri"
+        print(f"🎯 Otomatik strateji: {label}")
+    
+    def control_error(self, temperature: float, auto: bool) -> Optional[float]:
+        """Distance from the PID setpoint while PID is active (drives faster sampling)"""
+        if auto and self.auto_strategy == "pid":
+            return temperature - self.pid.setpoint
+        return None
+    
+    def mode_name(self, auto: bool) -> str:
+        """Mode label used in logs and displays"""
+        if not auto:
+            return "Manuel"
+        return "PID" if self.auto_strategy == "pid" else "Otomatik"
+    
+    def load_pid_state(self) -> PIDController:
+        """Restore PID parameters and state from pid_state_file if present"""
+        if self.pid_state_file and os.path.exists(self.pid_state_file):
+            try:
+                pid = PIDController.load(self.pid_state_file)
+                print(f"🎯 PID durumu yüklendi: {self.pid_state_file}")
+                return pid
+            except (OSError, ValueError, TypeError) as e:
+                print(f"⚠️ PID durumu okunamadı: {e}")
+        return PIDController()
+    
+    def save_pid_state(self):
+        """Persist PID parameters and state so they survive restarts"""
+        self._pid_saved_at = time.monotonic()
+        if not self.pid_state_file:
+            return
+        try:
+            self.pid.save(self.pid_state_file)
+        except OSError as e:
+            print(f"⚠️ PID durumu kaydedilemedi: {e}")
+    
+    def get_output_stats(self) -> dict:
+        """PWM write counters from the output stage"""
+        return self.scheduler.stats()
     
     def get_current_speed(self) -> int:
         """Get current fan speed"""
         return self.current_speed
     
+    def get_thermal_snapshot(self) -> ThermalSnapshot:
+        """Get the shared snapshot of all thermal sensors for this tick"""
+        return self.sampler.snapshot(max_age=self.sample_max_age)
+    
     def get_cpu_temperature(self) -> float:
         """Read CPU temperature from thermal zone"""
         try:
-            with open('/sys/class/thermal/thermal_zone0/temp', 'r') as f:
-                temp_raw = f.read().strip()
-                temp_celsius = float(temp_raw) / 1000.0
-                return temp_celsius
+            temp_celsius = self.get_thermal_snapshot().primary
+            if temp_celsius is None:
+                raise OSError(f"{self.sampler.primary_path} okunamadı")
+            return temp_celsius
         except Exception as e:
             print(f"❌ Sıcaklık okuma hatası: {e}")
-            print("🔧 Thermal zone dosyasını kontrol edin: /sys/class/thermal/thermal_zone0/temp")
+            print(f"🔧 Thermal zone dosyasını kontrol edin: {self.sampler.primary_path}")
             raise Exception("Sıcaklık sensörü erişilemez - Program durduruluyor")
     
+    def set_curve(self, curve: FanCurve):
+        """Replace the automatic mode curve"""
+        self.curve = curve
+    
+    def apply_config(self, config):
+        """Swap in a compiled config_reload.RuntimeConfig between ticks; only changes are touched"""
+        previous = self.runtime_config
+        changed = config.changes(previous) if previous is not None else list(config._fields)
+        if not changed:
+            print("🔁 Ayarlar yeniden yüklendi: değişiklik yok")
+            return
+        
+        if "pin" in changed or "pwm_frequency" in changed:
+            pin, frequency = self.retarget_output(config.pin, config.pwm_frequency)
+            config = config._replace(pin=pin, pwm_frequency=frequency)
+            if previous is not None:
+                changed = config.changes(previous)  # Without an output change that was refused
+        self.temp_min, self.temp_max = config.temp_min, config.temp_max
+        self.speed_min, self.speed_max = config.speed_min, config.speed_max
+        self.temp_hysteresis = config.temp_hysteresis
+        if "curve" in changed:
+            self.set_curve(config.curve)
+        if "pid" in changed:
+            for key, value in config.pid:
+                setattr(self.pid, key, value)
+            # Continue from the current output so new gains or setpoint do not kick the fan
+            self.pid.reset(self.pid.output, self.pid.last_measurement)
+        if "strategy" in changed and config.strategy != self.auto_strategy:
+            self.set_auto_strategy(config.strategy)
+        
+        self.runtime_config = config
+        if changed:
+            print(f"🔁 Ayarlar yeniden yüklendi: {', '.join(changed)}")
+    
+    def retarget_output(self, pin: int, frequency: int):
+        """Move the fan output to a new pin and/or PWM frequency without stopping it
+        
+        Returns the (pin, frequency) actually in effect afterwards.
+        """
+        if len(self.channels) > 1:
+            print("⚠️ Çoklu kanalda pin ve PWM frekansı kanal dosyasından gelir - yeniden başlatma gerekir")
+            return self.fan_pin, self.pwm_frequency
+        channel = self.primary
+        backend = channel.backend
+        try:
+            if pin != self.fan_pin and backend.uses_pin:
+                # The new output runs at the current duty before the old one is released
+                replacement = create_backend(backend.name, pin, frequency,
+                                             root=getattr(backend, "root", DEFAULT_ROOT))
+                try:
+                    replacement.open()
+                    replacement.write(channel.current_speed)
+                except Exception:
+                    try:
+                        replacement.close()
+                    except Exception:
+                        pass
+                    raise
+                channel.backend = replacement
+                channel.label = replacement.describe()
+                try:
+                    backend.close()
+                except Exception as e:
+                    print(f"⚠️ Eski fan çıkışı kapatılamadı: {e}")
+                print(f"🔌 Fan çıkışı taşındı: {channel.label}")
+            elif frequency != self.pwm_frequency:
+                if not backend.set_frequency(frequency):
+                    print(f"⚠️ {channel.label}: PWM frekansı çalışırken değiştirilemiyor")
+                    frequency = self.pwm_frequency
+                else:
+                    print(f"📶 PWM frekansı: {frequency} Hz")
+        except Exception as e:
+            print(f"❌ Fan çıkışı değiştirilemedi, mevcut çıkış korunuyor: {e}")
+            return self.fan_pin, self.pwm_frequency
+        self.fan_pin, self.pwm_frequency = pin, frequency
+        return pin, frequency
+    
     def calculate_auto_speed(self, temperature: float) -> int:
         """Calculate fan speed based on temperature for automatic mode"""
-        if temperature < self.temp_min:
-            return 0
-        elif temperature > self.temp_max:
-            return 100
-        else:
-            # Linear interpolation between temp_min and temp_max
-            temp_range = self.temp_max - self.temp_min
-            speed_range = self.speed_max - self.speed_min
-            temp_ratio = (temperature - self.temp_min) / temp_range
-            speed = self.speed_min + (speed_range * temp_ratio)
-            return int(speed)
+        return self.curve.evaluate(temperature)
+    
+    def calculate_auto_speeds(self, temperatures):
+        """Vectorized calculate_auto_speed for whole temperature arrays"""
+        return self.curve.evaluate_batch(temperatures)
     
     def cleanup(self):
         """Clean up GPIO resources"""
-        try:
-            if self.pwm:
-                self.pwm.ChangeDutyCycle(0)  # Fan'ı kapat
-                time.sleep(0.1)
-                self.pwm.stop()
-                print("🌀 Fan durduruldu")
-            
-            if self.is_initialized:
-                GPIO.cleanup()
-                print("🧹 GPIO temizlendi")
-                
-        except Exception as e:
-            print(f"⚠️ Cleanup hatası: {e}")
+        stopped = False
+        for channel in self.channels:
+            # Also channels opened before a later one failed to initialize
+            try:
+                if channel.is_open:
+                    channel.close()
+                    stopped = True
+            except Exception as e:
+                print(f"⚠️ Cleanup hatası ({channel.name}): {e}")
+        if stopped:
+            print("🌀 Fan durduruldu")
+            print("🧹 GPIO temizlendi")
         
-        self.current_speed = 0
+        self.save_pid_state()
+        self.sampler.close()
+        if self.load_sampler is not None:
+            self.load_sampler.close()
         self.is_initialized = False
 
 
 class DataLogger:
     """Handle logging of temperature and fan speed data"""
     
-    def __init__(self, log_file: str = "fan_control_log.txt"):
+    def __init__(self, log_file: str = "fan_control_log.txt", history_dir: Optional[str] = None,
+                 history_zones: int = 1, history_compress: bool = False,
+                 tiers: bool = False, tiers_dir: Optional[str] = None, **writer_options):
         self.log_file = log_file
         self.setup_logging()
+        
+        # Disk I/O happens on the writer thread; log_data only enqueues
+        self.writer = BatchedLogWriter(log_file, **writer_options)
+        
+        # Optional compact binary history (memory-mapped, no syscall per sample)
+        self.history = None
+        if history_dir:
+            from history_store import HistoryWriter
+            self.history = HistoryWriter(history_dir, n_zones=history_zones, compress=history_compress)
+        
+        # Optional fixed-memory 1 s / 1 min / 1 h rollups (persisted when tiers_dir is set)
+        self.tiers = None
+        if tiers or tiers_dir:
+            from tiered_history import TieredHistory
+            self.tiers = TieredHistory(tiers_dir)
+        atexit.register(self.close)
     
     def setup_logging(self):
         """Setup logging configuration"""
+        # Data records are written by the batched writer; logging only goes to stdout
         logging.basicConfig(
             level=logging.INFO,
             format='%(asctime)s - %(levelname)s - %(message)s',
             handlers=[
-                logging.FileHandler(self.log_file),
                 logging.StreamHandler(sys.stdout)
             ]
         )
         self.logger = logging.getLogger(__name__)
     
-    def log_data(self, temperature: float, fan_speed: int, mode: str):
-        """Log temperature and fan speed data"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log_entry = f"{timestamp} - Temp: {temperature:.1f}°C, Fan: {fan_speed}%, Mode: {mode}"
+    def log_data(self, temperature: float, fan_speed: int, mode: str,
+                 zones: Optional[list] = None, flags: int = 0, load: Optional[float] = None,
+                 rpm: Optional[float] = None, fan_status: str = "ok"):
+        """Log temperature and fan speed data (CPU load and RPM when they are measured)"""
+        now = time.time()
+        self.writer.write(now, temperature, fan_speed, mode, load, rpm, fan_status)
         
-        try:
-            with open(self.log_file, 'a') as f:
-                f.write(log_entry + "\n")
-        except Exception as e:
-            print(f"Error writing to log file: {e}")
-
-
-class FanControlGUI:
-    """GUI interface using Tkinter"""
-    
-    def __init__(self, fan_controller: FanController, data_logger: DataLogger):
-        self.fan_controller = fan_controller
-        self.data_logger = data_logger
-        self.is_auto_mode = False
-        self.is_running = True
-        
-        # Create main window
-        self.root = tk.Tk()
-        self.root.title("🌡️ ThermoPi - Akıllı Fan Kontrol")
-        self.root.geometry("600x500")
-        self.root.resizable(True, True)
-        self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
-        
-        # Set window icon and styling
-        try:
-            self.root.configure(bg='#2b2b2b')
-        except:
-            pass
-        
-        self.setup_gui()
-        self.start_background_thread()
-    
-    def setup_gui(self):
-        """Setup the GUI components"""
-        # Main frame
-        main_frame = ttk.Frame(self.root, padding="10")
-        main_frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
-        
-        # Temperature display
-        temp_frame = ttk.LabelFrame(main_frame, text="🌡️ Sıcaklık Durumu", padding="15")
-        temp_frame.grid(row=0, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=8)
-        
-        self.temp_label = ttk.Label(temp_frame, text="CPU Sıcaklığı: --°C", font=("Arial", 16, "bold"))
-        self.temp_label.grid(row=0, column=0)
-        
-        # Mode control
-        mode_frame = ttk.LabelFrame(main_frame, text="🎛️ Kontrol Modu", padding="15")
-        mode_frame.grid(row=1, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=8)
-        
-        self.mode_var = tk.BooleanVar()
-        self.mode_checkbox = ttk.Checkbutton(
-            mode_frame, 
-            text="🤖 Otomatik Mod (Sıcaklık Bazlı)", 
-            variable=self.mode_var,
-            command=self.toggle_mode
-        )
-        self.mode_checkbox.grid(row=0, column=0, sticky=tk.W)
+        if self.tiers is not None:
+            self.tiers.add(now, temperature, fan_speed)
         
-        # Manual control
-        manual_frame = ttk.LabelFrame(main_frame, text="🎯 Manuel Kontrol", padding="15")
-        manual_frame.grid(row=2, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=8)
-        
-        ttk.Label(manual_frame, text="Fan Hızı:", font=("Arial", 12)).grid(row=0, column=0, sticky=tk.W, pady=5)
-        
-        self.speed_var = tk.IntVar()
-        self.speed_scale = ttk.Scale(
-            manual_frame,
-            from_=0,
-            to=100,
-            orient=tk.HORIZONTAL,
-            variable=self.speed_var,
-            command=self.on_speed_change,
-            length=300
-        )
-        self.speed_scale.grid(row=1, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=8)
-        
-        self.speed_label = ttk.Label(manual_frame, text="0%", font=("Arial", 14, "bold"))
-        self.speed_label.grid(row=1, column=2, padx=15)
-        
-        # Status display
-        status_frame = ttk.LabelFrame(main_frame, text="📊 Anlık Durum", padding="15")
-        status_frame.grid(row=3, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=8)
-        
-        self.status_label = ttk.Label(status_frame, text="Mevcut Fan Hızı: 0%", font=("Arial", 14))
-        self.status_label.grid(row=0, column=0, pady=5)
-        
-        # Add system info
-        self.system_label = ttk.Label(status_frame, text="Sistem: Hazırlanıyor...", font=("Arial", 10))
-        self.system_label.grid(row=1, column=0, pady=2)
-        
-        # Configure grid weights
-        self.root.columnconfigure(0, weight=1)
-        self.root.rowconfigure(0, weight=1)
-        main_frame.columnconfigure(0, weight=1)
-        manual_frame.columnconfigure(0, weight=1)
-    
-    def toggle_mode(self):
-        """Toggle between manual and automatic mode"""
-        self.is_auto_mode = self.mode_var.get()
-        
-        if self.is_auto_mode:
-            self.speed_scale.configure(state='disabled')
-            print("🤖 Otomatik moda geçildi")
-        else:
-            self.speed_scale.configure(state='normal')
-            print("🎯 Manuel moda geçildi")
-    
-    def on_speed_change(self, value):
-        """Handle manual speed slider change"""
-        if not self.is_auto_mode:
-            speed = int(float(value))
-            self.fan_controller.set_fan_speed(speed)
-            self.speed_label.config(text=f"{speed}%")
-    
-    def update_display(self, temperature: float, fan_speed: int):
-        """Update GUI display with current values"""
-        # Temperature with color coding
-        temp_color = "green" if temperature < 50 else "orange" if temperature < 65 else "red"
-        self.temp_label.config(text=f"CPU Sıcaklığı: {temperature:.1f}°C")
-        
-        # Status with mode info
-        mode_text = "Otomatik" if self.is_auto_mode else "Manuel"
-        self.status_label.config(text=f"Mevcut Fan Hızı: {fan_speed}% ({mode_text})")
-        
-        # System status
-        status_text = f"GPIO Pin 18 | PWM: {fan_speed}% | Mod: {mode_text}"
-        self.system_label.config(text=status_text)
-        
-        if not self.is_auto_mode:
-            self.speed_var.set(fan_speed)
-            self.speed_label.config(text=f"{fan_speed}%")
-    
-    def background_worker(self):
-        """Background thread for temperature monitoring and fan control"""
-        while self.is_running:
+        if self.history is not None:
             try:
-                temperature = self.fan_controller.get_cpu_temperature()
-                
-                if self.is_auto_mode:
-                    # Automatic mode: calculate speed based on temperature
-                    target_speed = self.fan_controller.calculate_auto_speed(temperature)
-                    self.fan_controller.set_fan_speed(target_speed)
-                
-                # Always get current speed from controller
-                current_speed = self.fan_controller.get_current_speed()
-                
-                # Update GUI in main thread
-                self.root.after(0, self.update_display, temperature, current_speed)
-                
-                # Log data
-                mode = "Otomatik" if self.is_auto_mode else "Manuel"
-                self.data_logger.log_data(temperature, current_speed, mode)
-                
-                time.sleep(1)  # Update every second
-                
+                self.history.append(zones if zones else [temperature], fan_speed, mode, flags)
             except Exception as e:
-                print(f"❌ Kritik hata - Arka plan işlem durduruluyor: {e}")
-                self.is_running = False
-                break
-    
-    def start_background_thread(self):
-        """Start the background monitoring thread"""
-        self.worker_thread = threading.Thread(target=self.background_worker, daemon=True)
-        self.worker_thread.start()
-    
-    def on_closing(self):
-        """Handle window closing"""
-        self.is_running = False
-        self.fan_controller.cleanup()
-        self.root.destroy()
-    
-    def run(self):
-        """Start the GUI main loop"""
-        self.root.mainloop()
+                print(f"Error writing to history store: {e}")
+    
+    def close(self):
+        """Flush pending records and stop the background writer"""
+        if self.writer.closed:
+            return
+        self.writer.close()
+        if self.history is not None:
+            self.history.close()
+        if self.tiers is not None:
+            self.tiers.close()
+        stats = self.writer.stats()
+        if stats["dropped"]:
+            print(f"⚠️ Log kuyruğu dolduğu için {stats['dropped']} kayıt atlandı")
 
 
 class TerminalInterface:
     """Terminal-based interface for fan control"""
     
-    def __init__(self, fan_controller: FanController, data_logger: DataLogger):
+    def __init__(self, fan_controller: FanController, data_logger: DataLogger,
+                 engine: Optional[ControlEngine] = None):
         self.fan_controller = fan_controller
         self.data_logger = data_logger
+        self.engine = engine or ControlEngine(fan_controller, data_logger)
         self.is_auto_mode = False
         self.is_running = True
     
     def display_status(self):
         """Display current status"""
-        temperature = self.fan_controller.get_cpu_temperature()
-        fan_speed = self.fan_controller.get_current_speed()
-        mode = "Otomatik" if self.is_auto_mode else "Manuel"
+        state = self.engine.latest() or self.engine.channel.wait_for(0, timeout=5.0)
+        if state is None or state.error:
+            print(f"❌ Durum alınamadı: {state.error if state else 'kontrol motoru yanıt vermiyor'}")
+            return
+        
+        temperature = state.temperature
+        fan_speed = state.fan_speed
+        mode = state.mode
         
         # Temperature status with emoji
         temp_emoji = "❄️" if temperature < 45 else "🌡️" if temperature < 60 else "🔥"
@@ -367,9 +558,32 @@ class TerminalInterface:
         print(f"{temp_emoji} CPU Sıcaklığı: {temperature:.1f}°C")
         print(f"{fan_emoji} Fan Hızı: {fan_speed}%")
         print(f"⚙️  Kontrol Modu: {mode}")
-        print(f"🔌 GPIO Pin: 18 (PWM)")
+        if state.load is not None:
+            print(f"⚡ CPU Yükü: {state.load * 100:.0f}% (ileri besleme +{state.boost}%)")
+        if len(state.channels) > 1:
+            for channel in state.channels:
+                channel_temp = f"{channel.temperature:.1f}°C" if channel.temperature is not None else "--"
+                print(f"🔌 {channel.name} ({channel.output}): {channel.fan_speed}% "
+                      f"[hedef {channel.target_speed}%, {channel_temp}]{self.format_rpm(channel)}")
+        else:
+            for channel in state.channels:
+                print(f"🔌 Çıkış: {channel.output}")
+                if channel.rpm is not None:
+                    print(f"🔄 Fan Devri:{self.format_rpm(channel)}")
         print("=" * 40)
     
+    @staticmethod
+    def format_rpm(channel) -> str:
+        """RPM and fan status suffix for a ChannelState ("" without a tachometer)"""
+        if channel.rpm is None:
+            return ""
+        text = f" {channel.rpm:.0f} RPM"
+        if channel.fan_status == "stall":
+            return text + " 🛑 durdu"
+        if channel.fan_status == "underspeed":
+            return text + " ⚠️ düşük devir"
+        return text
+    
     def show_menu(self):
         """Display menu options"""
         print("\n📋 Seçenekler:")
@@ -377,13 +591,15 @@ class TerminalInterface:
         print("2. 🎯 Fan hızını ayarla (Sadece manuel modda)")
         print("3. 📊 Mevcut durumu görüntüle")
         print("4. 🚪 Çıkış")
+        print("5. 🎯 Otomatik stratejiyi değiştir (Eğri/PID)")
         print("Seçiminiz: ", end="")
     
     def handle_input(self, choice: str):
         """Handle user input"""
         if choice == "1":
             self.is_auto_mode = not self.is_auto_mode
-            mode = "Otomatik" if self.is_auto_mode else "Manuel"
+            self.engine.submit("set_auto", self.is_auto_mode)
+            mode = self.fan_controller.mode_name(self.is_auto_mode)
             print(f"✅ {mode} moda geçildi")
             
         elif choice == "2":
@@ -393,7 +609,7 @@ class TerminalInterface:
                 try:
                     speed = int(input("🎯 Fan hızını girin (0-100%): "))
                     speed = max(0, min(100, speed))
-                    self.fan_controller.set_fan_speed(speed)
+                    self.engine.submit("set_speed", speed)
                     print(f"✅ Fan hızı {speed}% olarak ayarlandı")
                 except ValueError:
                     print("❌ Geçersiz giriş. Lütfen 0-100 arası bir sayı girin")
@@ -405,38 +621,18 @@ class TerminalInterface:
             self.is_running = False
             print("👋 Çıkılıyor...")
             
+        elif choice == "5":
+            state = self.engine.latest()
+            current = state.strategy if state else self.fan_controller.auto_strategy
+            self.engine.submit("set_strategy", "curve" if current == "pid" else "pid")
+            
         else:
             print("❌ Geçersiz seçim. Lütfen tekrar deneyin.")
     
-    def run_monitoring_loop(self):
-        """Run the monitoring loop in background"""
-        while self.is_running:
-            try:
-                temperature = self.fan_controller.get_cpu_temperature()
-                
-                if self.is_auto_mode:
-                    target_speed = self.fan_controller.calculate_auto_speed(temperature)
-                    self.fan_controller.set_fan_speed(target_speed)
-                
-                # Get current speed from controller
-                current_speed = self.fan_controller.get_current_speed()
-                
-                # Log data
-                mode = "Otomatik" if self.is_auto_mode else "Manuel"
-                self.data_logger.log_data(temperature, current_speed, mode)
-                
-                time.sleep(1)
-                
-            except Exception as e:
-                print(f"❌ Kritik hata - İzleme döngüsü durduruluyor: {e}")
-                self.is_running = False
-                break
-    
     def run(self):
         """Run the terminal interface"""
-        # Start monitoring in background thread
-        monitor_thread = threading.Thread(target=self.run_monitoring_loop, daemon=True)
-        monitor_thread.start()
+        # The engine owns sampling, control and logging on its own thread
+        self.engine.start()
         
         print("🌡️ ThermoPi - Terminal Modu")
         print("=" * 50)
@@ -453,68 +649,326 @@ class TerminalInterface:
             self.is_running = False
         
         finally:
+            self.engine.stop()
+            self.fan_controller.cleanup()
+            self.data_logger.close()
+
+
+class DaemonInterface:
+    """Headless, non-interactive mode for systemd services and boot"""
+    
+    def __init__(self, fan_controller: FanController, data_logger: DataLogger,
+                 engine: Optional[ControlEngine] = None, strategy: str = "curve",
+                 duration: Optional[float] = None, startup_budget: float = 0.1):
+        self.fan_controller = fan_controller
+        self.data_logger = data_logger
+        self.engine = engine or ControlEngine(fan_controller, data_logger)
+        self.strategy = strategy
+        self.duration = duration              # Seconds to run (None: until SIGTERM/SIGINT)
+        self.startup_budget = startup_budget  # Seconds from process start to first control tick
+        self.stop_event = threading.Event()
+        self.error: Optional[str] = None
+    
+    def request_stop(self, signum=None, frame=None):
+        """Signal handler: finish the current tick and shut down"""
+        self.stop_event.set()
+    
+    def on_state(self, state: ControlState):
+        """Engine subscriber: stop when the control loop dies"""
+        if state.error:
+            self.error = state.error
+            self.stop_event.set()
+    
+    def run(self) -> int:
+        """Run until stopped; returns a process exit code"""
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, self.request_stop)
+        self.engine.subscribe(self.on_state)
+        
+        # Queued before the first tick, so the very first decision is automatic
+        if self.strategy != self.fan_controller.auto_strategy:
+            self.engine.submit("set_strategy", self.strategy)
+        self.engine.submit("set_auto", True)
+        self.engine.start()
+        
+        try:
+            state = self.engine.channel.wait_for(0, timeout=5.0)
+            if state is None or state.error:
+                print(f"❌ Kontrol başlatılamadı: {state.error if state else 'zaman aşımı'}")
+                return 1
+            
+            startup = state.monotonic - STARTED_AT
+            print(f"🚀 Fan kontrolü {startup * 1000:.0f} ms içinde başladı "
+                  f"({state.temperature:.1f}°C → hedef {state.target_speed}%, {state.mode})")
+            if startup > self.startup_budget:
+                print(f"⚠️ Başlangıç bütçesi aşıldı: {startup * 1000:.0f} ms > "
+                      f"{self.startup_budget * 1000:.0f} ms")
+            
+            self.stop_event.wait(self.duration)
+            return 1 if self.error else 0
+        
+        finally:
+            self.engine.stop()
             self.fan_controller.cleanup()
+            self.data_logger.close()
+
+
+def detect_board(root: str = "/") -> Optional[str]:
+    """Board model string; None if it cannot be determined"""
+    # The device-tree model is a few bytes; /proc/cpuinfo is only the fallback
+    for path in ("proc/device-tree/model", "sys/firmware/devicetree/base/model"):
+        try:
+            with open(os.path.join(root, path), "rb") as f:
+                return f.read().rstrip(b"\0\n").decode("utf-8", "replace")
+        except OSError:
+            continue
+    try:
+        with open(os.path.join(root, "proc/cpuinfo"), "r") as f:
+            for line in f:
+                if line.startswith("Model"):
+                    return line.split(":", 1)[1].strip()
+        return ""
+    except OSError:
+        return None
+
+
+def load_config(path: str) -> dict:
+    """Command line defaults from a JSON config file (keys are option names)"""
+    with open(path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    if not isinstance(config, dict):
+        raise ValueError(f"{path}: JSON nesnesi bekleniyordu")
+    return {key.replace("-", "_"): value for key, value in config.items()}
+
 
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="ThermoPi - Raspberry Pi 5 Akıllı Fan Kontrol Sistemi")
+    parser.add_argument("--interface", choices=("gui", "terminal", "daemon"),
+                        help="Arayüz (verilmezse sorulur)")
+    parser.add_argument("--daemon", dest="interface", action="store_const", const="daemon",
+                        help="--interface daemon kısayolu")
+    parser.add_argument("--config", default=CONFIG_FILE,
+                        help=f"JSON ayar dosyası (varsayılan: {CONFIG_FILE}, varsa)")
+    parser.add_argument("--reload-interval", type=float, default=2.0,
+                        help="Ayar dosyası değişiklik kontrolü aralığı (s); 0: yalnızca SIGHUP ile yenile")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="rpi-gpio",
+                        help="Fan çıkış arka ucu")
+    parser.add_argument("--pin", type=int, default=DEFAULT_PIN, help="PWM GPIO pini (BCM)")
+    parser.add_argument("--pwm-frequency", type=int, default=DEFAULT_PWM_FREQUENCY, help="PWM frekansı (Hz)")
+    parser.add_argument("--channels", metavar="JSON",
+                        help="Çoklu fan kanalı dosyası (ayar dosyasında liste de olabilir)")
+    parser.add_argument("--tach", choices=("gpio", "hwmon", "simulated"),
+                        help="Fan devir ölçümü kaynağı: durma/düşük devir tespiti (verilmezse kapalı)")
+    parser.add_argument("--tach-pin", type=int, help="Tach girişi GPIO pini (BCM, --tach gpio)")
+    parser.add_argument("--pulses-per-rev", type=int, default=2, help="Tur başına tach darbesi")
+    parser.add_argument("--max-rpm", type=float, default=5000.0, help="%%100 hızda beklenen devir")
+    parser.add_argument("--strategy", choices=("curve", "pid"), default="curve",
+                        help="Daemon modunda otomatik strateji")
+    parser.add_argument("--curve", default=CURVE_FILE, help="Fan eğrisi dosyası")
+    parser.add_argument("--feedforward", type=float, metavar="WEIGHT",
+                        help="CPU yükü ileri besleme ağırlığı, ör. 0.5 (verilmezse kapalı)")
+    parser.add_argument("--ff-horizon", type=float, default=120.0,
+                        help="İleri besleme ufku (s); 0: yük seviyesini doğrudan izle")
+    parser.add_argument("--ff-source", choices=("stat", "loadavg"), default="stat",
+                        help="Yük kaynağı: /proc/stat kullanımı veya /proc/loadavg")
+    parser.add_argument("--sysfs-root", "--thermal-root", dest="sysfs_root", default=DEFAULT_ROOT,
+                        help="Sensör ve fan arka uçları için sysfs kök dizini (testler için)")
+    parser.add_argument("--log-file", default="fan_control_log.txt", help="Metin log dosyası")
+    parser.add_argument("--history-dir", help="İkili geçmiş dizini (opsiyonel)")
+    parser.add_argument("--tiers-dir", help="Katmanlı geçmiş dizini: 1 sn/1 dk/1 sa özetler, sabit bellek (opsiyonel)")
+    parser.add_argument("--duration", type=float,
+                        help="Daemon çalışma süresi (s); verilmezse SIGTERM'e kadar")
+    parser.add_argument("--slider-rate", type=float, default=5.0,
+                        help="GUI hız kaydırıcısının saniyedeki en fazla komut sayısı")
+    parser.add_argument("--startup-budget", type=float, default=0.1,
+                        help="İlk kontrol adımına kadar izin verilen süre (s)")
+    parser.add_argument("--metrics-port", type=int,
+                        help="Prometheus metrik uç noktası portu (verilmezse kapalı)")
+    parser.add_argument("--metrics-host", default="127.0.0.1", help="Metrik sunucusu adresi")
+    parser.add_argument("--telemetry", metavar="HOST:PORT",
+                        help="Her adımı UDP ile bu toplayıcıya gönder (verilmezse kapalı)")
+    parser.add_argument("--node-name", help="Telemetri düğüm adı (varsayılan: hostname)")
+    parser.add_argument("--status-file", nargs="?", const="default", metavar="PATH",
+                        help="Güncel durumu paylaşımlı bellek dosyasına yaz "
+                             "(yol verilmezse /dev/shm/thermopi-status; verilmezse kapalı)")
+    parser.add_argument("--skip-board-check", action="store_true",
+                        help="Raspberry Pi model kontrolünü atla")
+    return parser
 
-def main():
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Command line options; values from the config file act as defaults"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if os.path.exists(args.config):
+        config = load_config(args.config)
+        # Thresholds, PID and inline curves are applied by the ConfigWatcher, not argparse
+        options = set(vars(args))
+        unknown = sorted(set(config) - options - set(RUNTIME_KEYS))
+        if unknown:
+            print(f"⚠️ {args.config}: bilinmeyen ayarlar yok sayıldı: {', '.join(unknown)}")
+        parser.set_defaults(**{key: value for key, value in config.items()
+                               if key in options and not (key == "curve" and isinstance(value, dict))})
+        args = parser.parse_args(argv)
+    return args
+
+
+def main(argv=None) -> int:
     """Main function to run the application"""
+    try:
+        args = parse_args(argv)
+    except (OSError, ValueError) as e:
+        print(f"❌ Ayar dosyası okunamadı: {e}")
+        return 1
+    
     print("🌡️ ThermoPi - Raspberry Pi 5 Akıllı Fan Kontrol Sistemi")
     print("=" * 60)
     
-    # Check if running on Raspberry Pi
-    try:
-        with open('/proc/cpuinfo', 'r') as f:
-            cpuinfo = f.read()
-            if 'Raspberry Pi' not in cpuinfo:
-                print("⚠️  Bu program sadece Raspberry Pi'de çalışır!")
-                return
-    except:
-        print("⚠️  Sistem bilgisi okunamadı - Raspberry Pi kontrolü yapılamıyor")
-    
-    print("🎨 Arayüz seçin:")
-    print("1. 🖥️  GUI (Grafiksel Arayüz)")
-    print("2. ⌨️  Terminal (Komut Satırı)")
-    
-    try:
-        choice = input("\n🎯 Seçiminizi yapın (1 veya 2): ").strip()
-    except KeyboardInterrupt:
-        print("\n👋 Çıkılıyor...")
-        return
+    # Check if running on Raspberry Pi (the simulated backend runs anywhere)
+    if not args.skip_board_check and args.backend != "simulated":
+        model = detect_board()
+        if model is None:
+            print("⚠️  Sistem bilgisi okunamadı - Raspberry Pi kontrolü yapılamıyor")
+        elif 'Raspberry Pi' not in model:
+            print("⚠️  Bu program sadece Raspberry Pi'de çalışır!")
+            return 1
+    
+    choice = {"gui": "1", "terminal": "2", "daemon": "3"}.get(args.interface)
+    if choice is None:
+        print("🎨 Arayüz seçin:")
+        print("1. 🖥️  GUI (Grafiksel Arayüz)")
+        print("2. ⌨️  Terminal (Komut Satırı)")
+        
+        try:
+            choice = input("\n🎯 Seçiminizi yapın (1 veya 2): ").strip()
+        except KeyboardInterrupt:
+            print("\n👋 Çıkılıyor...")
+            return 0
+        except EOFError:
+            print("\n❌ Girdi yok - servis olarak çalıştırmak için --daemon kullanın")
+            return 1
     
     # Initialize components
     print("🔧 Donanım başlatılıyor...")
     try:
-        fan_controller = FanController()
-        data_logger = DataLogger()
+        curve = None
+        if isinstance(args.curve, str) and os.path.exists(args.curve):
+            curve = load_curve(args.curve)
+            print(f"📈 Fan eğrisi yüklendi: {args.curve} ({len(curve.points)} nokta, {curve.mode})")
+        backend, channels = None, None
+        if args.channels:
+            # Channel entries without their own backend/pin/curve use the global options
+            channels = load_channels(args.channels, root=args.sysfs_root, default_curve=curve,
+                                     default_backend=args.backend, default_pin=args.pin,
+                                     default_frequency=args.pwm_frequency)
+            print(f"🌀 {len(channels)} fan kanalı: {', '.join(ch.name for ch in channels)}")
+        else:
+            backend = create_backend(args.backend, args.pin, args.pwm_frequency, root=args.sysfs_root)
+        tachometer = stall_detector = None
+        if args.tach:
+            if channels:
+                raise ValueError("Çoklu kanalda devir ölçümü kanal dosyasındaki \"tach\" ile ayarlanır")
+            from fan_channels import tach_from_dict
+            tach = {"source": args.tach, "max_rpm": args.max_rpm}
+            if args.tach != "hwmon":  # hwmon reports RPM already; the kernel knows the pulse count
+                tach["pulses_per_rev"] = args.pulses_per_rev
+            if args.tach == "gpio":
+                tach["pin"] = args.tach_pin
+            tachometer, stall_detector = tach_from_dict(tach, root=args.sysfs_root)
+            print(f"🔄 Devir ölçümü: {tachometer.describe()}")
+        sampler = ThermalSampler(root=args.sysfs_root)
+        feedforward = load_sampler = None
+        if args.feedforward:
+            from cpu_load import CPULoadSampler, LoadFeedForward
+            feedforward = LoadFeedForward(args.feedforward, horizon=args.ff_horizon)
+            load_sampler = CPULoadSampler(args.sysfs_root, args.ff_source)
+            print(f"⚡ Yük ileri beslemesi: ağırlık {args.feedforward:g}, ufuk {args.ff_horizon:g} s "
+                  f"({args.ff_source})")
+        fan_controller = FanController(args.pin, args.pwm_frequency, sampler=sampler, curve=curve,
+                                       pid_state_file=PID_STATE_FILE, backend=backend,
+                                       channels=channels, feedforward=feedforward,
+                                       load_sampler=load_sampler, tachometer=tachometer,
+                                       stall_detector=stall_detector)
+        data_logger = DataLogger(args.log_file, history_dir=args.history_dir, tiers_dir=args.tiers_dir)
+        engine = ControlEngine(fan_controller, data_logger)
+        if args.metrics_port is not None:
+            # Instrumentation is only installed when requested (zero cost otherwise)
+            from metrics import MetricsServer, instrument
+            metrics_server = MetricsServer(instrument(engine), args.metrics_port, args.metrics_host)
+            metrics_server.start()
+            print(f"📈 Metrikler: http://{args.metrics_host}:{metrics_server.port}/metrics")
+        if args.telemetry:
+            from telemetry import TelemetrySender, parse_address
+            sender = TelemetrySender(*parse_address(args.telemetry), node=args.node_name)
+            engine.subscribe(sender.on_state)
+            print(f"📡 Telemetri: {args.telemetry} ({sender.node.decode()})")
+        if args.status_file:
+            from status_page import DEFAULT_PATH, StatusWriter
+            status_writer = StatusWriter(DEFAULT_PATH if args.status_file == "default" else args.status_file,
+                                         interval=engine.tick_scheduler.max_period)
+            engine.subscribe(status_writer.on_state)
+            atexit.register(status_writer.close)
+            print(f"🗒️  Durum sayfası: {status_writer.path}")
+        watcher = ConfigWatcher(args.config, engine, interval=args.reload_interval,
+                                strategy=args.strategy)
+        # Settings only the config file carries (thresholds, PID, ...) are queued for the first tick
+        watcher.check()
+        watcher.install_signal_handler()
+        watcher.start()
     except Exception as e:
         print(f"❌ Başlatma hatası: {e}")
         print("🔧 Sudo ile çalıştırmayı deneyin: sudo python3 rpi_fan_controller.py")
-        return
+        return 1
     
     if choice == "1":
-        # Run GUI interface
+        # Run GUI interface (tkinter is only imported here)
         print("🖥️  GUI modu başlatılıyor...")
         try:
-            gui = FanControlGUI(fan_controller, data_logger)
+            from fan_gui import FanControlGUI
+            gui = FanControlGUI(fan_controller, data_logger, engine, slider_rate=args.slider_rate)
             gui.run()
         except Exception as e:
             print(f"❌ GUI çalıştırma hatası: {e}")
             fan_controller.cleanup()
+            return 1
     
     elif choice == "2":
         # Run terminal interface
         print("⌨️  Terminal modu başlatılıyor...")
         try:
-            terminal = TerminalInterface(fan_controller, data_logger)
+            terminal = TerminalInterface(fan_controller, data_logger, engine)
             terminal.run()
         except Exception as e:
             print(f"❌ Terminal arayüzü hatası: {e}")
             fan_controller.cleanup()
+            return 1
+    
+    elif choice == "3":
+        # Headless: a service must not run without fan control, so fail loudly
+        if not fan_controller.is_initialized:
+            fan_controller.cleanup()
+            data_logger.close()
+            return 1
+        print("🛰️  Daemon modu başlatılıyor...")
+        daemon = DaemonInterface(fan_controller, data_logger, engine, strategy=args.strategy,
+                                 duration=args.duration, startup_budget=args.startup_budget)
+        return daemon.run()
     
     else:
         print("❌ Geçersiz seçim. Çıkılıyor...")
         fan_controller.cleanup()
+        return 1
+    
+    return 0
+
+
+def __getattr__(name):
+    # FanControlGUI moved to fan_gui so importing this module never loads tkinter
+    if name == "FanControlGUI":
+        from fan_gui import FanControlGUI
+        return FanControlGUI
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+ThermoPi Sampling Scheduler
+Drift-free, adaptive tick timing for the monitoring loops
+
+Ticks are scheduled on absolute monotonic deadlines, so time spent reading
+sensors, writing the PWM and logging does not accumulate as drift. The
+period adapts between min_period and max_period: it shortens immediately
+when the temperature changes quickly (|dT/dt|) or the control error is
+large, and backs off gradually while the system is steady. Wake-up jitter
+and overruns are recorded.
+"""
+
+import collections
+import math
+import threading
+import time
+from typing import Optional
+
+
+class SamplingScheduler:
+    """Chooses the next tick deadline and sleeps until it"""
+
+    def __init__(self, min_period: float = 0.25, max_period: float = 2.0,
+                 slow_rate: float = 0.02, fast_rate: float = 0.5,
+                 error_band: float = 3.0, backoff: float = 1.25, rate_smoothing: float = 0.5):
+        self.min_period = min_period
+        self.max_period = max_period
+        self.slow_rate = slow_rate        # |dT/dt| (°C/s) at or below which max_period is used
+        self.fast_rate = fast_rate        # |dT/dt| (°C/s) at or above which min_period is used
+        self.error_band = error_band      # |error| (°C) beyond which min_period is used
+        self.backoff = backoff            # Max period growth factor per tick
+        self.rate_smoothing = rate_smoothing
+
+        self.period = min_period
+        self.rate = 0.0
+        self._last_temp: Optional[float] = None
+        self._last_time: Optional[float] = None
+        self._deadline: Optional[float] = None
+
+        self.ticks = 0
+        self.overruns = 0
+        self.jitter_max = 0.0
+        self._jitter_sum = 0.0
+        self._jitter_recent = collections.deque(maxlen=1024)
+
+    def _target_period(self, error: Optional[float], urgent: bool) -> float:
+        if urgent or (error is not None and abs(error) >= self.error_band):
+            return self.min_period
+
+        rate = abs(self.rate)
+        if rate >= self.fast_rate:
+            return self.min_period
+        if rate <= self.slow_rate:
+            return self.max_period
+        # Log-linear between the two rates
+        ratio = math.log(rate / self.slow_rate) / math.log(self.fast_rate / self.slow_rate)
+        return self.max_period * (self.min_period / self.max_period) ** ratio
+
+    def observe(self, temperature: float, error: Optional[float] = None,
+                urgent: bool = False, now: Optional[float] = None) -> float:
+        """Feed this tick's measurement; returns the period chosen for the next tick"""
+        now = time.monotonic() if now is None else now
+        if self._last_time is not None and now > self._last_time:
+            raw = (temperature - self._last_temp) / (now - self._last_time)
+            self.rate = self.rate_smoothing * self.rate + (1.0 - self.rate_smoothing) * raw
+        self._last_temp = temperature
+        self._last_time = now
+
+        target = self._target_period(error, urgent)
+        # Speed up at once, slow down gradually
+        self.period = target if target < self.period else min(target, self.period * self.backoff)
+        return self.period
+
+    def wait(self, stop_event: Optional[threading.Event] = None) -> bool:
+        """Sleep until the next deadline; returns False if stop_event was set"""
+        now = time.monotonic()
+        if self._deadline is None:
+            self._deadline = now
+        self._deadline += self.period
+
+        if self._deadline <= now:
+            # Work took longer than a period: count it and re-anchor instead of bursting
+            self.overruns += 1
+            self._deadline = now
+        else:
+            timeout = self._deadline - now
+            if stop_event is not None:
+                if stop_event.wait(timeout):
+                    return False
+            else:
+                time.sleep(timeout)
+
+        jitter = time.monotonic() - self._deadline
+        self.ticks += 1
+        self._jitter_sum += jitter
+        self._jitter_recent.append(jitter)
+        if jitter > self.jitter_max:
+            self.jitter_max = jitter
+        return stop_event is None or not stop_event.is_set()
+
+    def stats(self) -> dict:
+        """Timing statistics (jitter in milliseconds)"""
+        recent = sorted(self._jitter_recent)
+        p99 = recent[min(len(recent) - 1, int(len(recent) * 0.99))] if recent else 0.0
+        return {
+            "ticks": self.ticks,
+            "overruns": self.overruns,
+            "period": self.period,
+            "rate": self.rate,
+            "jitter_mean_ms": (self._jitter_sum / self.ticks * 1000) if self.ticks else 0.0,
+            "jitter_p99_ms": p99 * 1000,
+            "jitter_max_ms": self.jitter_max * 1000,
+        }
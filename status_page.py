@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+ThermoPi Status Page
+Latest controller state in a small memory-mapped file, for other local processes
+
+The control engine writes every published state into a fixed-layout
+region (by default /dev/shm/thermopi-status, i.e. RAM) guarded by a
+seqlock: the sequence counter is made odd before the payload is copied
+in and even afterwards. Readers map the file once; a read is two 8-byte
+loads and one payload copy from the mapping, with no syscall and no lock
+the control loop could wait on. A read that overlapped a write sees an
+odd or changed counter and retries.
+
+Python cannot issue memory barriers, so on weakly ordered CPUs (the Pi's
+ARM cores) the payload also carries a CRC32; a copy that passes the
+sequence check but was torn anyway fails the CRC and is retried too.
+
+Staleness: the payload holds the engine's CLOCK_MONOTONIC timestamp and
+its longest tick interval, so a reader can tell a dead controller (no
+heartbeat) from a stopped one (running flag cleared on exit).
+
+This module only uses the standard library, so consumers can copy it.
+
+    python3 rpi_fan_controller.py --daemon --status-file
+    python3 status_page.py read                 # Exit 0 fresh, 1 stale/stopped, 2 unavailable
+    python3 status_page.py read --watch 1 --json
+    python3 status_page.py selftest             # Writer process at full speed vs. reader
+
+    from status_page import StatusReader
+    reader = StatusReader()
+    status = reader.read()
+    if reader.is_stale(status): ...
+"""
+
+import argparse
+import math
+import mmap
+import os
+import struct
+import sys
+import time
+import zlib
+from typing import NamedTuple, Optional, Tuple
+
+DEFAULT_PATH = ("/dev/shm/thermopi-status" if os.path.isdir("/dev/shm")
+                else os.path.join("/tmp", "thermopi-status"))
+MAGIC = b"TPSS"
+VERSION = 1
+MAX_CHANNELS = 8
+STALE_FACTOR = 3.0  # A state older than this many tick intervals is stale
+
+# Layout (little endian):
+#   header:  magic, version, payload size (8 bytes), then the u64 sequence counter
+#   payload: crc32 of the rest, writer pid, tick, monotonic, wall time, longest
+#            tick interval, temperature, load, fan, target, boost, flags,
+#            channel count, mode, error, then MAX_CHANNELS x (name, temperature, fan, target)
+HEADER = struct.Struct("<4sHH")
+SEQ = struct.Struct("<Q")
+SEQ_OFFSET = HEADER.size
+PAYLOAD_OFFSET = SEQ_OFFSET + SEQ.size
+FIXED = struct.Struct("<IIQdddddhhhBB12s64s")
+CHANNEL = struct.Struct("<16sfhh")
+PAYLOAD_SIZE = FIXED.size + MAX_CHANNELS * CHANNEL.size
+REGION_SIZE = PAYLOAD_OFFSET + PAYLOAD_SIZE
+
+FLAG_AUTO = 0x1
+FLAG_RUNNING = 0x2
+FLAG_ERROR = 0x4
+FLAG_PID = 0x8
+
+
+class StatusUnavailable(Exception):
+    """No consistent state could be read (not written yet, or the writer died mid-write)"""
+
+
+class ChannelStatus(NamedTuple):
+    name: str
+    temperature: Optional[float]
+    fan_speed: int
+    target_speed: int
+
+
+class Status(NamedTuple):
+    """One consistent snapshot of the controller"""
+    seq: int                   # Seqlock counter (even)
+    pid: int                   # Writer process
+    tick: int                  # Engine state sequence number
+    monotonic: float           # Writer's time.monotonic() (CLOCK_MONOTONIC, system-wide)
+    wall_time: float
+    interval: float            # Longest tick interval of the writer
+    temperature: Optional[float]
+    load: Optional[float]
+    fan_speed: int
+    target_speed: int
+    boost: int
+    auto: bool
+    strategy: str
+    running: bool
+    mode: str
+    error: Optional[str]
+    channels: Tuple[ChannelStatus, ...]
+
+    @property
+    def age(self) -> float:
+        """Seconds since the writer published this state"""
+        return time.monotonic() - self.monotonic
+
+
+def _text(raw: bytes) -> str:
+    return raw.split(b"\0", 1)[0].decode("utf-8", "replace")
+
+
+def _optional(value: float) -> Optional[float]:
+    return None if math.isnan(value) else value
+
+
+def _number(value: Optional[float]) -> float:
+    return math.nan if value is None else float(value)
+
+
+class StatusWriter:
+    """Publishes engine states into the status region (subscribe on_state to the engine)"""
+
+    def __init__(self, path: str = DEFAULT_PATH, interval: float = 2.0):
+        self.path = path
+        self.interval = interval
+        # An existing file is reused (same inode) so readers that mapped it keep working
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size != REGION_SIZE:
+                os.ftruncate(fd, REGION_SIZE)
+            self.mm: Optional[mmap.mmap] = mmap.mmap(fd, REGION_SIZE)
+        finally:
+            os.close(fd)
+        magic, version, size = HEADER.unpack_from(self.mm, 0)
+        self.seq = SEQ.unpack_from(self.mm, SEQ_OFFSET)[0] if (magic, version, size) == (
+            MAGIC, VERSION, PAYLOAD_SIZE) else 0
+        self.seq += self.seq & 1  # A previous writer may have died mid-write
+        HEADER.pack_into(self.mm, 0, MAGIC, VERSION, PAYLOAD_SIZE)
+        self._payload = bytearray(PAYLOAD_SIZE)
+        self.pid = os.getpid()
+        self.writes = 0
+
+    def write(self, tick: int, monotonic: float, wall_time: float, temperature: Optional[float],
+              fan_speed: int, target_speed: int, mode: str, auto: bool = False,
+              strategy: str = "curve", running: bool = True, error: Optional[str] = None,
+              load: Optional[float] = None, boost: int = 0, channels=()):
+        """Publish one state; channels are (name, temperature, fan_speed, target_speed)"""
+        if self.mm is None:
+            return
+        payload = self._payload
+        flags = ((FLAG_AUTO if auto else 0) | (FLAG_RUNNING if running else 0)
+                 | (FLAG_ERROR if error else 0) | (FLAG_PID if strategy == "pid" else 0))
+        channels = channels[:MAX_CHANNELS]
+        FIXED.pack_into(payload, 0, 0, self.pid, tick, monotonic, wall_time, self.interval,
+                        _number(temperature), _number(load), fan_speed, target_speed, boost,
+                        flags, len(channels), mode.encode()[:12], (error or "").encode()[:64])
+        offset = FIXED.size
+        for name, channel_temp, fan, target in channels:
+            CHANNEL.pack_into(payload, offset, name.encode()[:16], _number(channel_temp), fan, target)
+            offset += CHANNEL.size
+        payload[offset:] = bytes(PAYLOAD_SIZE - offset)
+        self._publish()
+        self.writes += 1
+
+    def _publish(self):
+        """Checksum the payload and copy it in under the seqlock"""
+        payload = self._payload
+        struct.pack_into("<I", payload, 0, zlib.crc32(memoryview(payload)[4:]))
+        mm = self.mm
+        self.seq += 1  # Odd while the payload is being replaced
+        SEQ.pack_into(mm, SEQ_OFFSET, self.seq)
+        mm[PAYLOAD_OFFSET:REGION_SIZE] = payload
+        self.seq += 1
+        SEQ.pack_into(mm, SEQ_OFFSET, self.seq)
+
+    def on_state(self, state):
+        """ControlEngine subscriber"""
+        self.write(state.seq, state.monotonic, state.wall_time, state.temperature,
+                   state.fan_speed, state.target_speed, state.mode, state.auto, state.strategy,
+                   state.running, state.error, state.load, state.boost,
+                   [(ch.name, ch.temperature, ch.fan_speed, ch.target_speed) for ch in state.channels])
+
+    def mark_stopped(self):
+        """Clear the running flag so readers see a clean stop rather than a dead writer"""
+        if self.mm is None:
+            return
+        fixed = list(FIXED.unpack_from(self._payload, 0))
+        fixed[3] = time.monotonic()
+        fixed[11] &= ~FLAG_RUNNING
+        FIXED.pack_into(self._payload, 0, *fixed)
+        self._publish()
+
+    def close(self):
+        if self.mm is None:
+            return
+        if self.writes:
+            self.mark_stopped()
+        self.mm.close()
+        self.mm = None
+
+
+class StatusReader:
+    """Consistent, lock-free reads of the status region"""
+
+    def __init__(self, path: str = DEFAULT_PATH, retries: int = 1000):
+        self.path = path
+        self.retries = retries
+        self.mm: Optional[mmap.mmap] = None
+        self.retried = 0  # Reads that had to be repeated (overlapped a write)
+        self.open()
+
+    def open(self):
+        """Map the file (again, e.g. after the controller recreated it)"""
+        self.close()
+        try:
+            fd = os.open(self.path, os.O_RDONLY)
+        except FileNotFoundError:
+            raise StatusUnavailable(f"{self.path} yok (denetleyici --status-file ile mi çalışıyor?)")
+        try:
+            self.inode = os.fstat(fd).st_ino
+            self.mm = mmap.mmap(fd, REGION_SIZE, prot=mmap.PROT_READ)
+        finally:
+            os.close(fd)
+        magic, version, size = HEADER.unpack_from(self.mm, 0)
+        if (magic, version, size) != (MAGIC, VERSION, PAYLOAD_SIZE):
+            self.close()
+            raise StatusUnavailable(f"{self.path}: tanınmayan durum dosyası")
+
+    def read(self) -> Status:
+        """Latest consistent state; raises StatusUnavailable after `retries` torn reads"""
+        mm = self.mm
+        unpack_seq = SEQ.unpack_from
+        for attempt in range(self.retries):
+            before = unpack_seq(mm, SEQ_OFFSET)[0]
+            if before & 1 == 0 and before:
+                payload = mm[PAYLOAD_OFFSET:REGION_SIZE]
+                if unpack_seq(mm, SEQ_OFFSET)[0] == before and \
+                        struct.unpack_from("<I", payload, 0)[0] == zlib.crc32(payload[4:]):
+                    return self._decode(before, payload)
+            elif not before:
+                raise StatusUnavailable("Henüz durum yazılmadı")
+            self.retried += 1
+            if attempt > 10:
+                time.sleep(0)  # Let a preempted writer finish
+        raise StatusUnavailable("Tutarlı durum okunamadı (yazıcı yazarken durmuş olabilir)")
+
+    @staticmethod
+    def _decode(seq: int, payload: bytes) -> Status:
+        (_, pid, tick, monotonic, wall_time, interval, temperature, load, fan, target, boost,
+         flags, count, mode, error) = FIXED.unpack_from(payload, 0)
+        channels = []
+        for index in range(min(count, MAX_CHANNELS)):
+            name, ch_temp, ch_fan, ch_target = CHANNEL.unpack_from(payload, FIXED.size + index * CHANNEL.size)
+            channels.append(ChannelStatus(_text(name), _optional(ch_temp), ch_fan, ch_target))
+        return Status(seq, pid, tick, monotonic, wall_time, interval, _optional(temperature),
+                      _optional(load), fan, target, boost, bool(flags & FLAG_AUTO),
+                      "pid" if flags & FLAG_PID else "curve", bool(flags & FLAG_RUNNING),
+                      _text(mode), _text(error) or None, tuple(channels))
+
+    @staticmethod
+    def is_stale(status: Status, max_age: Optional[float] = None) -> bool:
+        """True if the controller stopped or has not published for too long"""
+        if max_age is None:
+            max_age = STALE_FACTOR * max(status.interval, 0.5)
+        return not status.running or status.age > max_age
+
+    def replaced(self) -> bool:
+        """True if the file at path is no longer the one mapped (one stat syscall)"""
+        try:
+            return os.stat(self.path).st_ino != self.inode
+        except OSError:
+            return True
+
+    def close(self):
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+
+
+# --- Command line ---
+
+def _print_status(status: Status, stale: bool):
+    state = "🟢 çalışıyor" if not stale else "🔴 durdu" if not status.running else "🟠 bayat"
+    temperature = "--" if status.temperature is None else f"{status.temperature:.1f}"
+    print(f"{state} | 🌡️ {temperature}°C | 🌀 {status.fan_speed}% (hedef {status.target_speed}%) | "
+          f"{status.mode} | {status.age:.1f} s önce | pid {status.pid}")
+    if len(status.channels) > 1:
+        for channel in status.channels:
+            temp = "--" if channel.temperature is None else f"{channel.temperature:.1f}"
+            print(f"   {channel.name}: {temp}°C, {channel.fan_speed}%")
+    if status.error:
+        print(f"❌ {status.error}")
+
+
+def _selftest_writer(path: str, seconds: float, done):
+    writer = StatusWriter(path, interval=0.1)
+    tick = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        tick += 1
+        # Every field derives from the tick so the reader can check consistency
+        writer.write(tick, time.monotonic(), time.time(), tick % 1000 / 10.0, tick % 101,
+                     (tick * 7) % 101, ("Manuel", "Otomatik", "PID")[tick % 3], bool(tick & 1),
+                     channels=[(f"fan{tick % 10}", tick % 500 / 10.0, tick % 101, tick % 13)] * (tick % 4))
+    done.value = tick
+    writer.close()
+
+
+def selftest(seconds: float = 3.0, path: Optional[str] = None) -> int:
+    """A writer process publishing as fast as it can against a reader checking every snapshot"""
+    import multiprocessing
+    import tempfile
+
+    with tempfile.TemporaryDirectory(dir="/dev/shm" if os.path.isdir("/dev/shm") else None) as tmp:
+        path = path or os.path.join(tmp, "status")
+        StatusWriter(path).close()  # Create the file before the reader maps it
+        done = multiprocessing.Value("q", 0)
+        process = multiprocessing.Process(target=_selftest_writer, args=(path, seconds, done))
+        process.start()
+        reader = StatusReader(path)
+        reads = torn = unavailable = 0
+        spent = 0.0
+        last_tick = 0
+        while process.is_alive():
+            began = time.perf_counter()
+            try:
+                status = reader.read()
+            except StatusUnavailable:
+                unavailable += 1
+                continue
+            spent += time.perf_counter() - began
+            reads += 1
+            tick = status.tick
+            ok = (status.temperature == tick % 1000 / 10.0 and status.fan_speed == tick % 101
+                  and status.target_speed == (tick * 7) % 101
+                  and status.mode == ("Manuel", "Otomatik", "PID")[tick % 3]
+                  and status.auto == bool(tick & 1) and len(status.channels) == tick % 4
+                  and all(ch.name == f"fan{tick % 10}" and ch.target_speed == tick % 13
+                          for ch in status.channels)
+                  and tick >= last_tick)
+            torn += not ok
+            last_tick = tick
+        process.join()
+        final = reader.read()
+        stopped = StatusReader.is_stale(final) and not final.running
+        reader.close()
+
+    print(f"✍️  {done.value:,} yazım | 📖 {reads:,} okuma, {spent / max(1, reads) * 1e6:.1f} µs/okuma, "
+          f"{reader.retried:,} tekrar")
+    ok = reads > 0 and torn == 0 and stopped
+    print(f"{'✅' if torn == 0 else '❌'} Tutarsız anlık görüntü: {torn}")
+    print(f"{'✅' if stopped else '❌'} Yazıcı kapanınca durdu olarak görüldü")
+    return 0 if ok else 1
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="ThermoPi paylaşımlı bellek durum sayfası")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    read = sub.add_parser("read", help="Güncel durumu oku (çıkış kodu: 0 güncel, 1 bayat/durdu, 2 yok)")
+    read.add_argument("--path", default=DEFAULT_PATH)
+    read.add_argument("--max-age", type=float, help="Bayat sayılma süresi (s; varsayılan 3 adım aralığı)")
+    read.add_argument("--json", action="store_true")
+    read.add_argument("--watch", type=float, metavar="SECONDS", help="Bu aralıkla sürekli oku")
+
+    test = sub.add_parser("selftest", help="Tam hızda yazan süreç ile okuyucu tutarlılık testi")
+    test.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    if args.command == "selftest":
+        return selftest(args.seconds)
+
+    try:
+        reader = StatusReader(args.path)
+        while True:
+            status = reader.read()
+            stale = reader.is_stale(status, args.max_age)
+            if stale and reader.replaced():
+                reader.open()  # The controller was restarted with a new file
+                continue
+            if args.json:
+                import json
+                data = status._asdict()
+                data["channels"] = [channel._asdict() for channel in status.channels]
+                data["age"] = status.age
+                data["stale"] = stale
+                print(json.dumps(data, ensure_ascii=False))
+            else:
+                _print_status(status, stale)
+            if not args.watch:
+                return 1 if stale else 0
+            time.sleep(args.watch)
+    except StatusUnavailable as e:
+        print(f"❌ {e}")
+        return 2
+    except KeyboardInterrupt:
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
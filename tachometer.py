@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+"""
+ThermoPi Tachometer
+Fan speed feedback: RPM measurement and stall / under-speed detection
+
+The duty only says what was asked of the fan; the tach signal says whether
+it is turning. A Tachometer belongs to a FanChannel and is read once per
+control tick; a StallDetector compares the RPM with what the written duty
+should give and reports "ok", "underspeed" or "stall". In automatic mode a
+stalled channel is driven at full duty (the strongest restart attempt and
+the most airflow left), every change of status is printed, and the RPM
+is written to the log.
+
+Sources:
+    gpio       Tach wire on a GPIO pin, edges counted by RPi.GPIO callbacks
+    hwmon      /sys/class/hwmon/hwmon*/fan1_input (e.g. the Pi 5 fan header)
+    simulated  Edges from an EdgeGenerator thread, following the written duty
+
+Edge sources do the least possible work per edge: the callback increments
+one integer. The RPM is derived per tick from (time, edge count) samples
+in a sliding window, so the per-edge cost does not depend on the window.
+
+Usage:
+    python3 tachometer.py selftest [--rates 1000 3000 6000]
+"""
+
+import argparse
+import collections
+import os
+import sys
+import threading
+import time
+from typing import Callable, Deque, Dict, List, Optional, Tuple, Type
+
+from fan_backends import DEFAULT_ROOT, find_hwmon_chip
+
+STATUSES = ("ok", "underspeed", "stall")
+STATUS_LABELS = {"ok": "normal", "underspeed": "düşük devir", "stall": "durdu"}
+
+
+class Tachometer:
+    """Base class: open once, read the RPM every tick, close on shutdown"""
+
+    name = "base"
+    sysfs = False  # True if the source takes a root directory
+
+    def attach(self, channel):
+        """Called once by the FanChannel that owns this tachometer"""
+
+    def open(self):
+        """Acquire the input; raises on failure"""
+
+    def read(self, now: Optional[float] = None) -> Optional[float]:
+        """Current RPM; None while it cannot be determined yet"""
+        raise NotImplementedError
+
+    def close(self):
+        """Release the input"""
+
+    def describe(self) -> str:
+        return self.name
+
+
+class EdgeCounter(Tachometer):
+    """RPM from counted tach edges over a sliding window
+
+    edge() is the only per-edge work: one integer increment from a single
+    producer thread (GPIO callback thread or EdgeGenerator).
+    """
+
+    name = "edges"
+
+    def __init__(self, pulses_per_rev: int = 2, window: float = 2.0, min_span: float = 0.25):
+        if pulses_per_rev <= 0:
+            raise ValueError("Tur başına darbe sayısı pozitif olmalı")
+        self.pulses_per_rev = pulses_per_rev  # Most PC fans: 2 tach pulses per revolution
+        self.window = window                  # Seconds of edges the RPM is averaged over
+        self.min_span = min_span              # Shorter spans are too coarse to report
+        self.edges = 0
+        self.rpm: Optional[float] = None
+        self._samples: Deque[Tuple[float, int]] = collections.deque()
+
+    def edge(self, channel=None):
+        self.edges += 1
+
+    def read(self, now: Optional[float] = None) -> Optional[float]:
+        now = time.monotonic() if now is None else now
+        edges = self.edges
+        samples = self._samples
+        samples.append((now, edges))
+        # Keep one sample at or before the window start so the whole window is covered
+        while len(samples) > 2 and samples[1][0] <= now - self.window:
+            samples.popleft()
+        start, start_edges = samples[0]
+        span = now - start
+        if span >= self.min_span:
+            self.rpm = (edges - start_edges) * 60.0 / (span * self.pulses_per_rev)
+        return self.rpm
+
+    def reset(self):
+        self._samples.clear()
+        self.rpm = None
+
+
+class GPIOTachometer(EdgeCounter):
+    """Tach wire (open collector, pulled up) counted on falling edges via RPi.GPIO"""
+
+    name = "gpio"
+
+    def __init__(self, pin: int, pulses_per_rev: int = 2, window: float = 2.0, pull_up: bool = True):
+        super().__init__(pulses_per_rev, window)
+        self.pin = pin
+        self.pull_up = pull_up
+        self.gpio = None
+
+    def open(self):
+        try:
+            import RPi.GPIO as GPIO
+        except ImportError:
+            raise RuntimeError("RPi.GPIO kütüphanesi bulunamadı! "
+                               "Lütfen şu komutu çalıştırın: pip3 install RPi.GPIO")
+        GPIO.setmode(GPIO.BCM)
+        if self.pull_up:
+            GPIO.setup(self.pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+        else:
+            GPIO.setup(self.pin, GPIO.IN)
+        GPIO.add_event_detect(self.pin, GPIO.FALLING, callback=self.edge)
+        self.gpio = GPIO
+        self.reset()
+
+    def close(self):
+        if self.gpio is not None:
+            self.gpio.remove_event_detect(self.pin)
+            self.gpio.cleanup(self.pin)  # The tach input only, never the PWM pin
+            self.gpio = None
+
+    def describe(self) -> str:
+        return f"tach GPIO {self.pin}"
+
+
+class HwmonTachometer(Tachometer):
+    """Kernel-measured RPM from a hwmon fanN_input attribute (one pread per tick)"""
+
+    name = "hwmon"
+    sysfs = True
+
+    def __init__(self, root: str = DEFAULT_ROOT, chip: Optional[str] = None,
+                 chip_name: str = "pwmfan", channel: int = 1):
+        self.root = root
+        self.chip = chip
+        self.chip_name = chip_name
+        self.channel = channel
+        self.fd: Optional[int] = None
+
+    def open(self):
+        if self.chip is None:
+            self.chip = find_hwmon_chip(self.root, self.chip_name)
+        self.fd = os.open(os.path.join(self.root, "sys/class/hwmon", self.chip,
+                                       f"fan{self.channel}_input"), os.O_RDONLY)
+
+    def read(self, now: Optional[float] = None) -> Optional[float]:
+        try:
+            return float(int(os.pread(self.fd, 32, 0)))
+        except (OSError, ValueError):
+            return None
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def describe(self) -> str:
+        return f"{self.chip or self.chip_name}/fan{self.channel}_input"
+
+
+class EdgeGenerator:
+    """Thread calling edge() at a given rate, like the RPi.GPIO callback thread
+
+    Wakes every `period` seconds and issues the edges that fell due since
+    the last wakeup, one call each, so the per-edge callback cost is real
+    while the wakeup rate stays bounded at several kHz.
+    """
+
+    def __init__(self, edge: Callable[[], None], rate: Callable[[], float], period: float = 0.001):
+        self.edge = edge
+        self.rate = rate        # Edges per second, read at every wakeup
+        self.period = period
+        self.generated = 0
+        self.is_running = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self.is_running = True
+        self._thread = threading.Thread(target=self._run, name="tach-edges", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.is_running = False
+        if self._thread is not None:
+            self._thread.join(1.0)
+        self._thread = None
+
+    def _run(self):
+        edge, rate, period = self.edge, self.rate, self.period
+        due = 0.0
+        last = time.monotonic()
+        while self.is_running:
+            time.sleep(period)
+            now = time.monotonic()
+            due += rate() * (now - last)
+            last = now
+            count = int(due)
+            due -= count
+            for _ in range(count):
+                edge()
+            self.generated += count
+
+
+class SimulatedTachometer(EdgeCounter):
+    """Simulated fan: RPM follows the channel's written duty with a spin-up lag
+
+    fault injects failures: None (healthy), "stall" (rotor blocked) or a
+    factor below 1 (worn bearing, clogged intake).
+    """
+
+    name = "simulated"
+
+    def __init__(self, max_rpm: float = 5000.0, min_duty: int = 10, tau: float = 0.5,
+                 pulses_per_rev: int = 2, window: float = 2.0, period: float = 0.001):
+        super().__init__(pulses_per_rev, window)
+        self.max_rpm = max_rpm    # At 100% duty
+        self.min_duty = min_duty  # Below this the motor does not turn
+        self.tau = tau            # Spin-up/down time constant (s)
+        self.fault = None
+        self.true_rpm = 0.0
+        self.duty: Callable[[], float] = lambda: 0.0
+        self._updated = time.monotonic()
+        self.generator = EdgeGenerator(self.edge, self._rate, period)
+
+    def attach(self, channel):
+        self.duty = lambda: channel.current_speed
+
+    def _rate(self) -> float:
+        now = time.monotonic()
+        duty = self.duty()
+        if self.fault == "stall" or duty < self.min_duty:
+            target = 0.0
+        else:
+            target = self.max_rpm * duty / 100.0 * (self.fault if self.fault is not None else 1.0)
+        alpha = min(1.0, (now - self._updated) / self.tau) if self.tau > 0 else 1.0
+        self._updated = now
+        self.true_rpm += alpha * (target - self.true_rpm)
+        return self.true_rpm * self.pulses_per_rev / 60.0
+
+    def open(self):
+        self.reset()
+        self._updated = time.monotonic()
+        self.generator.start()
+
+    def close(self):
+        self.generator.stop()
+
+    def describe(self) -> str:
+        return f"simüle tach ({self.max_rpm:.0f} RPM)"
+
+
+class StallDetector:
+    """Judges the measured RPM against the duty that was written
+
+    A condition must hold for `grace` seconds before it is reported (and
+    clear for as long before it is withdrawn), which covers spin-up, slew
+    and the measurement window. Duties below min_duty are not judged: many
+    fans legitimately stop there.
+    """
+
+    def __init__(self, max_rpm: float = 5000.0, stall_rpm: float = 200.0,
+                 underspeed_ratio: float = 0.5, min_duty: int = 20, grace: float = 3.0):
+        self.max_rpm = max_rpm                    # RPM expected at 100% duty
+        self.stall_rpm = stall_rpm                # Below this the fan counts as stopped
+        self.underspeed_ratio = underspeed_ratio  # Fraction of the expected RPM still accepted
+        self.min_duty = min_duty
+        self.grace = grace
+
+        self.status = "ok"
+        self.events = {"stall": 0, "underspeed": 0}  # Transitions into each fault
+        self._candidate = "ok"
+        self._since: Optional[float] = None
+
+    def judge(self, duty: int, rpm: Optional[float]) -> str:
+        """Instantaneous verdict, without debouncing"""
+        if rpm is None or duty < self.min_duty:
+            return "ok"
+        if rpm < self.stall_rpm:
+            return "stall"
+        if rpm < self.underspeed_ratio * self.max_rpm * duty / 100.0:
+            return "underspeed"
+        return "ok"
+
+    def update(self, duty: int, rpm: Optional[float], now: Optional[float] = None) -> str:
+        """Debounced status after one measurement"""
+        now = time.monotonic() if now is None else now
+        verdict = self.judge(duty, rpm)
+        if verdict == self.status:
+            self._candidate, self._since = verdict, None
+        elif verdict != self._candidate or self._since is None:
+            self._candidate, self._since = verdict, now
+        elif now - self._since >= self.grace:
+            self.status = verdict
+            self._since = None
+            if verdict in self.events:
+                self.events[verdict] += 1
+        return self.status
+
+
+TACHOMETERS: Dict[str, Type[Tachometer]] = {
+    GPIOTachometer.name: GPIOTachometer,
+    HwmonTachometer.name: HwmonTachometer,
+    SimulatedTachometer.name: SimulatedTachometer,
+}
+
+
+def create_tachometer(name: str, pin: Optional[int] = None, root: str = DEFAULT_ROOT,
+                      **options) -> Tachometer:
+    """Instantiate a tach source by name (see TACHOMETERS)"""
+    try:
+        tach_class = TACHOMETERS[name]
+    except KeyError:
+        raise ValueError(f"Bilinmeyen devir kaynağı: {name} (seçenekler: {', '.join(TACHOMETERS)})")
+    if tach_class is GPIOTachometer:
+        if pin is None:
+            raise ValueError("gpio devir kaynağı için tach pini gerekli")
+        options["pin"] = pin
+    if tach_class.sysfs:
+        options["root"] = root
+    return tach_class(**options)
+
+
+def _cpu_per_edge(rate: float, seconds: float) -> Tuple[float, float, float]:
+    """(measured/true rate ratio, process CPU share, CPU µs per edge) at a fixed edge rate"""
+    counter = EdgeCounter(window=seconds)
+    generator = EdgeGenerator(counter.edge, lambda: rate)
+    cpu = time.process_time()
+    start = time.monotonic()
+    counter.read(start)
+    generator.start()
+    time.sleep(seconds)
+    generator.stop()
+    measured = counter.read()
+    elapsed = time.monotonic() - start
+    cpu = time.process_time() - cpu
+    expected = generator.generated * 60.0 / (elapsed * counter.pulses_per_rev)
+    return measured / expected, cpu / elapsed, cpu / max(1, generator.generated) * 1e6
+
+
+def stall_timeline(phases=((None, "sağlam"), ("stall", "durdu"), (0.3, "aşınmış"), (None, "sağlam")),
+                   duty: int = 60, seconds: float = 1.5) -> List[Tuple[str, str, float]]:
+    """Simulated fan at a fixed duty through a sequence of faults
+
+    Returns (label, detector status, RPM) at the end of each phase.
+    """
+    tach = SimulatedTachometer(max_rpm=5000, tau=0.1, window=0.5)
+    tach.duty = lambda: duty
+    detector = StallDetector(max_rpm=5000, grace=0.5)
+    tach.open()
+    try:
+        timeline = []
+        for fault, label in phases:
+            tach.fault = fault
+            deadline = time.monotonic() + seconds
+            status = detector.status
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                status = detector.update(duty, tach.read())
+            timeline.append((label, status, tach.rpm or 0.0))
+    finally:
+        tach.close()
+    return timeline
+
+
+def selftest(rates=(1000.0, 3000.0, 6000.0), seconds: float = 2.0):
+    """Edge generator at several kHz (accuracy, CPU cost), then stall detection end to end
+
+    Reports the measurements; the pass/fail checks live in tests/test_tachometer.py.
+    """
+    for rate in rates:
+        ratio, share, per_edge = _cpu_per_edge(rate, seconds)
+        print(f"   {rate:.0f} kenar/s: ölçüm/gerçek {ratio:.4f}, "
+              f"CPU %{share * 100:.1f} ({per_edge:.2f} µs/kenar, uyanmalar dahil)")
+
+    # A fan at 60% that stalls, wears, then recovers
+    timeline = stall_timeline()
+    for label, status, rpm in timeline:
+        print(f"   {label:8s}: {rpm:6.0f} RPM → {STATUS_LABELS[status]}")
+    print(f"   Durma/düşük devir tespiti: {' → '.join(status for _, status, _ in timeline)}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="ThermoPi fan devir ölçümü")
+    sub = parser.add_subparsers(dest="command", required=True)
+    test = sub.add_parser("selftest", help="Simüle kenar üreteci ile doğruluk, CPU maliyeti ve durma tespiti")
+    test.add_argument("--rates", type=float, nargs="+", default=[1000.0, 3000.0, 6000.0],
+                      help="Kenar hızları (Hz)")
+    test.add_argument("--seconds", type=float, default=2.0, help="Hız başına süre (s)")
+    args = parser.parse_args()
+    selftest(args.rates, args.seconds)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
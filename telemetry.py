@@ -0,0 +1,505 @@
+#!/usr/bin/env python3
+"""
+ThermoPi Telemetry
+Fleet monitoring: UDP sender in the control loop, asyncio collector, load generator
+
+Each node sends one small datagram per control tick with the data
+DataLogger.log_data records (time, temperature, duty, mode, load, RPM and
+fan status). Sending uses a non-blocking socket with a pre-resolved
+address: a full socket buffer or unreachable collector drops the datagram
+and never delays the tick.
+
+The collector keeps rolling per-node statistics and raises alerts for nodes
+running hot, with a fan pegged at 100 %, or with a stalled or underspeed
+fan.
+
+Datagram (little endian, 25 bytes + node name):
+    magic "TPT2" | seq u32 | wall time f64 | temp centi-°C i16 | duty u8
+    | mode | flags << 4 u8 | name length u8 | name (UTF-8, <= 64 bytes)
+    | load % u8 (255: unknown) | rpm u16 (65535: no tachometer) | fan status u8
+
+Version 1 ("TPT1", no trailer after the name) is still accepted from
+nodes that were not upgraded; their load and fan are reported as unknown.
+
+Usage:
+    python3 rpi_fan_controller.py --daemon --telemetry 10.0.0.5:9123
+    python3 telemetry.py collect --port 9123
+    python3 telemetry.py loadgen --host 127.0.0.1 --port 9123 --nodes 300 --rate 50
+    python3 telemetry.py selftest --nodes 300 --rate 50 --duration 10
+"""
+
+import argparse
+import asyncio
+import collections
+import multiprocessing
+import socket
+import struct
+import sys
+import time
+from typing import Callable, Deque, Dict, List, NamedTuple, Optional, Tuple
+
+from history_store import MODE_CODES, MODE_NAMES, TEMP_MISSING
+from tachometer import STATUS_LABELS, STATUSES
+
+MAGIC = b"TPT2"
+MAGIC_V1 = b"TPT1"  # Same header, no trailer
+HEADER = struct.Struct("<4sIdhBBB")
+TRAILER = struct.Struct("<BHB")
+LOAD_MISSING = 0xFF
+RPM_MISSING = 0xFFFF
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+MAX_NAME = 64
+DEFAULT_PORT = 9123
+
+
+class TelemetrySample(NamedTuple):
+    node: str
+    seq: int
+    wall_time: float
+    temperature: Optional[float]
+    duty: int
+    mode: str
+    flags: int
+    load: Optional[float] = None  # CPU utilization 0-1
+    rpm: Optional[int] = None     # None without a tachometer
+    fan_status: str = "ok"
+
+
+def encode(node: bytes, seq: int, wall_time: float, temperature: Optional[float],
+           duty: int, mode: int, flags: int = 0, load: Optional[float] = None,
+           rpm: Optional[float] = None, fan_status: str = "ok") -> bytes:
+    """Pack one sample; node is the already-encoded name"""
+    temp = TEMP_MISSING if temperature is None else max(-32767, min(32767, int(round(temperature * 100))))
+    load = LOAD_MISSING if load is None else max(0, min(100, int(round(load * 100))))
+    rpm = RPM_MISSING if rpm is None else max(0, min(RPM_MISSING - 1, int(round(rpm))))
+    return (HEADER.pack(MAGIC, seq & 0xFFFFFFFF, wall_time, temp, duty,
+                        (mode & 0x0F) | (flags << 4), len(node))
+            + node + TRAILER.pack(load, rpm, STATUS_CODES.get(fan_status, 0)))
+
+
+def decode(data: bytes) -> TelemetrySample:
+    """Unpack one datagram (either version); raises ValueError if it is not a telemetry datagram"""
+    if len(data) < HEADER.size:
+        raise ValueError("datagram çok kısa")
+    magic, seq, wall_time, temp, duty, mode_flags, name_length = HEADER.unpack_from(data)
+    end = HEADER.size + name_length
+    if magic == MAGIC and len(data) == end + TRAILER.size:
+        load, rpm, status = TRAILER.unpack_from(data, end)
+    elif magic == MAGIC_V1 and len(data) == end:
+        load, rpm, status = LOAD_MISSING, RPM_MISSING, 0
+    else:
+        raise ValueError("geçersiz telemetri datagramı")
+    node = data[HEADER.size:end].decode("utf-8", "replace")
+    return TelemetrySample(node, seq, wall_time, None if temp == TEMP_MISSING else temp / 100.0,
+                           duty, MODE_NAMES.get(mode_flags & 0x0F, "?"), mode_flags >> 4,
+                           None if load == LOAD_MISSING else load / 100.0,
+                           None if rpm == RPM_MISSING else rpm,
+                           STATUSES[status] if status < len(STATUSES) else "ok")
+
+
+def fan_feedback(channels) -> Tuple[Optional[float], str]:
+    """(rpm, status) of the worst-off tachometer-equipped channel; (None, "ok") without one"""
+    rpm, status = None, "ok"
+    for channel in channels:
+        if channel.rpm is None:
+            continue
+        if rpm is None or STATUS_CODES[channel.fan_status] > STATUS_CODES[status] \
+                or (channel.fan_status == status and channel.rpm < rpm):
+            rpm, status = channel.rpm, channel.fan_status
+    return rpm, status
+
+
+def parse_address(address: str, default_port: int = DEFAULT_PORT) -> Tuple[str, int]:
+    """"host:port" or "host" -> (host, port)"""
+    host, _, port = address.rpartition(":")
+    if not host:
+        return address, default_port
+    return host.strip("[]"), int(port)
+
+
+class TelemetrySender:
+    """Fire-and-forget UDP sender; subscribe on_state to a ControlEngine"""
+
+    def __init__(self, host: str, port: int = DEFAULT_PORT, node: Optional[str] = None):
+        self.node = (node or socket.gethostname()).encode("utf-8")[:MAX_NAME]
+        # Resolve once: a DNS lookup must never happen inside a tick
+        family, _, _, _, self.address = socket.getaddrinfo(host, port, type=socket.SOCK_DGRAM)[0]
+        self.sock = socket.socket(family, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        self.seq = 0
+        self.sent = 0
+        self.dropped = 0
+
+    def send(self, wall_time: float, temperature: Optional[float], duty: int, mode, flags: int = 0,
+             load: Optional[float] = None, rpm: Optional[float] = None, fan_status: str = "ok"):
+        mode = MODE_CODES.get(mode, 0) if isinstance(mode, str) else mode
+        self.seq += 1
+        try:
+            self.sock.sendto(encode(self.node, self.seq, wall_time, temperature, duty, mode, flags,
+                                    load, rpm, fan_status),
+                             self.address)
+            self.sent += 1
+        except OSError:
+            # Includes BlockingIOError (buffer full) and ECONNREFUSED from a previous send
+            self.dropped += 1
+
+    def on_state(self, state):
+        """ControlEngine subscriber (runs on the engine thread)"""
+        if state.error is None:
+            rpm, fan_status = fan_feedback(state.channels)
+            self.send(state.wall_time, state.temperature, state.fan_speed, state.mode,
+                      load=state.load, rpm=rpm, fan_status=fan_status)
+
+    def close(self):
+        self.sock.close()
+
+
+class NodeStats:
+    """Rolling statistics for one node over its last `window` samples"""
+
+    __slots__ = ("node", "window", "samples", "temp_sum", "duty_sum", "lost", "last_seq",
+                 "mode", "wall_time", "last_seen", "hot", "pegged_since", "pegged",
+                 "load", "rpm", "fan_status")
+
+    def __init__(self, node: str, window: int):
+        self.node = node
+        self.window: Deque[Tuple[float, int]] = collections.deque(maxlen=window)
+        self.samples = 0
+        self.temp_sum = 0.0
+        self.duty_sum = 0
+        self.lost = 0
+        self.last_seq: Optional[int] = None
+        self.mode = 0
+        self.wall_time = 0.0          # Node clock of the latest sample
+        self.last_seen = time.monotonic()
+        self.hot = False
+        self.pegged_since: Optional[float] = None
+        self.pegged = False
+        self.load: Optional[float] = None  # Latest values (None: unknown or not reported)
+        self.rpm: Optional[int] = None
+        self.fan_status = "ok"
+
+    def add(self, temp: float, duty: int):
+        window = self.window
+        if len(window) == window.maxlen:
+            old_temp, old_duty = window[0]
+            self.temp_sum -= old_temp
+            self.duty_sum -= old_duty
+        window.append((temp, duty))
+        self.temp_sum += temp
+        self.duty_sum += duty
+
+    @property
+    def mean_temp(self) -> float:
+        return self.temp_sum / len(self.window) if self.window else float("nan")
+
+    @property
+    def mean_duty(self) -> float:
+        return self.duty_sum / len(self.window) if self.window else float("nan")
+
+    def peak_temp(self) -> float:
+        return max(t for t, _ in self.window) if self.window else float("nan")
+
+    def summary(self) -> dict:
+        return {
+            "node": self.node,
+            "samples": self.samples,
+            "lost": self.lost,
+            "mean_temp": self.mean_temp,
+            "peak_temp": self.peak_temp(),
+            "mean_duty": self.mean_duty,
+            "mode": MODE_NAMES.get(self.mode, "?"),
+            "hot": self.hot,
+            "pegged": self.pegged,
+            "load": self.load,
+            "rpm": self.rpm,
+            "fan_status": self.fan_status,
+            "age": time.monotonic() - self.last_seen,
+        }
+
+
+class Alert(NamedTuple):
+    wall_time: float
+    node: str
+    kind: str        # "hot", "pegged", "stall" or "underspeed"
+    active: bool     # False when the condition cleared
+    value: float
+
+
+class TelemetryCollector:
+    """Ingests datagrams, keeps per-node rolling stats and raises alerts"""
+
+    def __init__(self, window: int = 60, hot_threshold: float = 75.0, hot_clear: float = 3.0,
+                 pegged_duty: int = 100, pegged_seconds: float = 30.0,
+                 on_alert: Optional[Callable[[Alert], None]] = None):
+        self.window = window                  # Samples per node kept for rolling stats
+        self.hot_threshold = hot_threshold    # Rolling mean temperature that raises "hot" (°C)
+        self.hot_clear = hot_clear            # Clears once this far below the threshold
+        self.pegged_duty = pegged_duty
+        self.pegged_seconds = pegged_seconds  # Duty >= pegged_duty this long raises "pegged"
+        self.on_alert = on_alert
+        self.nodes: Dict[bytes, NodeStats] = {}
+        self.alerts: Deque[Alert] = collections.deque(maxlen=1000)
+        self.received = 0
+        self.invalid = 0
+
+    def _alert(self, stats: NodeStats, kind: str, active: bool, value: float):
+        alert = Alert(time.time(), stats.node, kind, active, value)
+        self.alerts.append(alert)
+        if self.on_alert is not None:
+            self.on_alert(alert)
+
+    def ingest(self, data: bytes):
+        """Process one datagram (hot path: two unpacks, one dict lookup)"""
+        self.received += 1
+        try:
+            magic, seq, wall_time, temp, duty, mode_flags, name_length = HEADER.unpack_from(data)
+        except struct.error:
+            self.invalid += 1
+            return
+        end = HEADER.size + name_length
+        if magic == MAGIC and len(data) == end + TRAILER.size:
+            load, rpm, status = TRAILER.unpack_from(data, end)
+        elif magic == MAGIC_V1 and len(data) == end:
+            load, rpm, status = LOAD_MISSING, RPM_MISSING, 0
+        else:
+            self.invalid += 1
+            return
+
+        key = data[HEADER.size:end]
+        stats = self.nodes.get(key)
+        if stats is None:
+            stats = self.nodes[key] = NodeStats(key.decode("utf-8", "replace"), self.window)
+
+        if stats.last_seq is not None and seq > stats.last_seq + 1:
+            stats.lost += seq - stats.last_seq - 1
+        stats.last_seq = seq
+        stats.samples += 1
+        now = time.monotonic()
+        stats.last_seen = now
+        stats.wall_time = wall_time
+        stats.mode = mode_flags & 0x0F
+        stats.load = None if load == LOAD_MISSING else load / 100.0
+        stats.rpm = None if rpm == RPM_MISSING else rpm
+        fan_status = STATUSES[status] if status < len(STATUSES) else "ok"
+        if fan_status != stats.fan_status:
+            # A fault is alerted by kind and cleared when the fan is back to "ok" or
+            # changes fault; faults need a tachometer, so rpm is present
+            if stats.fan_status != "ok":
+                self._alert(stats, stats.fan_status, False, stats.rpm or 0)
+            if fan_status != "ok":
+                self._alert(stats, fan_status, True, stats.rpm or 0)
+            stats.fan_status = fan_status
+        if temp == TEMP_MISSING:
+            return
+        stats.add(temp / 100.0, duty)
+
+        mean = stats.temp_sum / len(stats.window)
+        if not stats.hot and mean >= self.hot_threshold:
+            stats.hot = True
+            self._alert(stats, "hot", True, mean)
+        elif stats.hot and mean < self.hot_threshold - self.hot_clear:
+            stats.hot = False
+            self._alert(stats, "hot", False, mean)
+
+        if duty >= self.pegged_duty:
+            if stats.pegged_since is None:
+                stats.pegged_since = now
+            elif not stats.pegged and now - stats.pegged_since >= self.pegged_seconds:
+                stats.pegged = True
+                self._alert(stats, "pegged", True, duty)
+        else:
+            stats.pegged_since = None
+            if stats.pegged:
+                stats.pegged = False
+                self._alert(stats, "pegged", False, duty)
+
+    def summary(self) -> List[dict]:
+        return [stats.summary() for stats in self.nodes.values()]
+
+
+def _drain(sock: socket.socket, ingest: Callable[[bytes], None], batch: int = 4096):
+    """Reader callback: consume every queued datagram (asyncio transports read one per wakeup)"""
+    recv = sock.recv
+    for _ in range(batch):
+        try:
+            data = recv(2048)
+        except (BlockingIOError, InterruptedError):
+            return
+        ingest(data)
+
+
+async def serve(collector: TelemetryCollector, host: str = "0.0.0.0", port: int = DEFAULT_PORT,
+                report_interval: float = 10.0, duration: Optional[float] = None,
+                ready: Optional[Callable[[], None]] = None):
+    """Run the collector until cancelled (or for `duration` seconds)"""
+    loop = asyncio.get_running_loop()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8 << 20)  # Absorb bursts
+    sock.bind((host, port))
+    sock.setblocking(False)
+    loop.add_reader(sock.fileno(), _drain, sock, collector.ingest)
+    if ready is not None:
+        ready()
+
+    start = last_time = time.monotonic()
+    last_count = 0
+    try:
+        while duration is None or time.monotonic() - start < duration:
+            await asyncio.sleep(report_interval if duration is None
+                                else min(report_interval, max(0.0, duration - (time.monotonic() - start))))
+            now = time.monotonic()
+            rate = (collector.received - last_count) / (now - last_time) if now > last_time else 0.0
+            last_time, last_count = now, collector.received
+            hot = sum(1 for s in collector.nodes.values() if s.hot)
+            pegged = sum(1 for s in collector.nodes.values() if s.pegged)
+            faulty = sum(1 for s in collector.nodes.values() if s.fan_status != "ok")
+            print(f"📡 {len(collector.nodes)} düğüm | {rate:,.0f} örnek/s | "
+                  f"sıcak: {hot} | fan %100: {pegged} | fan arızası: {faulty} | "
+                  f"geçersiz: {collector.invalid}")
+    finally:
+        loop.remove_reader(sock.fileno())
+        sock.close()
+
+
+def run_loadgen(host: str, port: int, nodes: int = 300, rate: float = 50.0, duration: float = 10.0,
+                hot_nodes: int = 5, pegged_nodes: int = 5, stalled_nodes: int = 5) -> dict:
+    """Simulate `nodes` controllers, each sending `rate` samples/s, from one socket"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    address = (host, port)
+    names = [f"pi-{i:04d}".encode() for i in range(nodes)]
+    seqs = [0] * nodes
+    interval = 1.0 / (nodes * rate)
+    sent = dropped = 0
+    start = time.monotonic()
+    deadline = start
+    i = 0
+    while True:
+        now = time.monotonic()
+        if now - start >= duration:
+            break
+        node = i % nodes
+        # A few nodes run hot, a few have their fan pegged, a few a stalled fan
+        # (failsafe duty, no RPM), the rest idle around 50 °C
+        rpm, status = 1800 + (i % 100), "ok"
+        if node < hot_nodes:
+            temp, duty = 82.0 + (i % 7) * 0.1, 90
+        elif node < hot_nodes + pegged_nodes:
+            temp, duty = 68.0, 100
+        elif node < hot_nodes + pegged_nodes + stalled_nodes:
+            temp, duty, rpm, status = 64.0, 100, 0, "stall"
+        else:
+            temp, duty = 48.0 + (i % 50) * 0.1, 30
+        seqs[node] += 1
+        try:
+            sock.sendto(encode(names[node], seqs[node], time.time(), temp, duty, 1,
+                               load=(i % 80) / 100.0, rpm=rpm, fan_status=status), address)
+            sent += 1
+        except OSError:
+            dropped += 1
+        i += 1
+        deadline += interval
+        if deadline - now > 0.002:
+            time.sleep(deadline - now)
+    sock.close()
+    elapsed = time.monotonic() - start
+    return {"sent": sent, "dropped": dropped, "rate": sent / elapsed}
+
+
+def _loadgen_process(host, port, nodes, rate, duration, results):
+    results.put(run_loadgen(host, port, nodes, rate, duration))
+
+
+def selftest(nodes: int = 300, rate: float = 50.0, duration: float = 10.0, port: int = 0) -> int:
+    """Collector in this process, load generator in another, both on localhost"""
+    collector = TelemetryCollector(pegged_seconds=min(5.0, duration / 3))
+
+    async def run():
+        sock_port = port or _free_port()
+        results = multiprocessing.Queue()
+        generator = multiprocessing.Process(target=_loadgen_process,
+                                            args=("127.0.0.1", sock_port, nodes, rate, duration, results))
+        server = asyncio.create_task(serve(collector, "127.0.0.1", sock_port,
+                                           report_interval=max(1.0, duration / 5),
+                                           duration=duration + 1.0, ready=generator.start))
+        await server
+        generator.join()
+        return results.get(timeout=5)
+
+    sent = asyncio.run(run())
+    lost = sent["sent"] - collector.received
+    hot = sorted(s.node for s in collector.nodes.values() if s.hot)
+    pegged = sorted(s.node for s in collector.nodes.values() if s.pegged)
+    stalled = sorted(s.node for s in collector.nodes.values() if s.fan_status == "stall")
+    print(f"📤 Gönderilen: {sent['sent']:,} ({sent['rate']:,.0f}/s) | "
+          f"📥 Alınan: {collector.received:,} | kayıp: {lost:,} ({lost / max(1, sent['sent']) * 100:.2f}%)")
+    print(f"🔥 Sıcak düğümler: {', '.join(hot) or '-'}")
+    print(f"💨 Fanı %100'de kalan düğümler: {', '.join(pegged) or '-'}")
+    print(f"🛑 Fanı duran düğümler: {', '.join(stalled) or '-'}")
+    ok = len(collector.nodes) == nodes and hot and pegged and stalled
+    print("✅ Toplayıcı tüm düğümleri izledi ve uyarıları üretti" if ok else "❌ Beklenen sonuç alınamadı")
+    return 0 if ok else 1
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _print_alert(alert: Alert):
+    state = "⚠️ UYARI" if alert.active else "✅ düzeldi"
+    if alert.kind in STATUS_LABELS:
+        print(f"{state}: {alert.node} fan {STATUS_LABELS[alert.kind]} ({alert.value:.0f} RPM)")
+        return
+    label = {"hot": "sıcak", "pegged": "fan %100"}[alert.kind]
+    print(f"{state}: {alert.node} {label} ({alert.value:.1f})")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="ThermoPi filo telemetrisi")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    collect = sub.add_parser("collect", help="Telemetri toplayıcısını çalıştır")
+    collect.add_argument("--host", default="0.0.0.0")
+    collect.add_argument("--port", type=int, default=DEFAULT_PORT)
+    collect.add_argument("--hot", type=float, default=75.0, help="Sıcak uyarı eşiği (°C, kayan ortalama)")
+    collect.add_argument("--pegged-seconds", type=float, default=30.0,
+                         help="Fan bu kadar süre %%100'de kalırsa uyar")
+    collect.add_argument("--window", type=int, default=60, help="Düğüm başına kayan pencere (örnek)")
+    collect.add_argument("--report", type=float, default=10.0, help="Özet aralığı (s)")
+
+    loadgen = sub.add_parser("loadgen", help="Çok düğümlü yük üreteci")
+    loadgen.add_argument("--host", default="127.0.0.1")
+    loadgen.add_argument("--port", type=int, default=DEFAULT_PORT)
+    loadgen.add_argument("--nodes", type=int, default=300)
+    loadgen.add_argument("--rate", type=float, default=50.0, help="Düğüm başına örnek/s")
+    loadgen.add_argument("--duration", type=float, default=10.0)
+
+    test = sub.add_parser("selftest", help="Toplayıcı + yük üreteci (localhost)")
+    test.add_argument("--nodes", type=int, default=300)
+    test.add_argument("--rate", type=float, default=50.0)
+    test.add_argument("--duration", type=float, default=10.0)
+
+    args = parser.parse_args()
+    if args.command == "collect":
+        collector = TelemetryCollector(window=args.window, hot_threshold=args.hot,
+                                       pegged_seconds=args.pegged_seconds, on_alert=_print_alert)
+        print(f"📡 Telemetri toplayıcısı {args.host}:{args.port} üzerinde dinliyor")
+        try:
+            asyncio.run(serve(collector, args.host, args.port, args.report))
+        except KeyboardInterrupt:
+            print("\n👋 Çıkılıyor...")
+        return 0
+    if args.command == "loadgen":
+        result = run_loadgen(args.host, args.port, args.nodes, args.rate, args.duration)
+        print(f"📤 {result['sent']:,} örnek gönderildi ({result['rate']:,.0f}/s), "
+              f"{result['dropped']} düşürüldü")
+        return 0
+    if args.command == "selftest":
+        return selftest(args.nodes, args.rate, args.duration)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,34 @@
+"""Regression gating in benchmark.compare"""
+
+import benchmark
+from benchmark import compare, run_suite
+
+
+def report(**metrics):
+    return {"results": {"curve": metrics}}
+
+
+def test_default_tolerance_depends_on_metric():
+    baseline = report(batch_items_per_s=1000.0, single_us=1.0, latency_p99_us=10.0, batch_size=100)
+    # Same tree, noisy run: throughput -19 %, tail +40 %, median +10 %
+    noisy = report(batch_items_per_s=810.0, single_us=1.1, latency_p99_us=14.0, batch_size=50)
+    assert compare(noisy, baseline) == []
+    slower = report(batch_items_per_s=600.0, single_us=1.2, latency_p99_us=16.0, batch_size=100)
+    assert [r["metric"] for r in compare(slower, baseline)] == ["batch_items_per_s", "single_us",
+                                                                 "latency_p99_us"]
+    assert [r["metric"] for r in compare(noisy, baseline, tolerance=0.15)] == ["batch_items_per_s",
+                                                                               "latency_p99_us"]
+
+
+def test_overhead_and_non_positive_references_are_not_gated():
+    baseline = report(overhead_us=0.02, tick_us=0.0, lag_us=-1.0, tick_enabled_us=5.0)
+    current = report(overhead_us=0.4, tick_us=3.0, lag_us=2.0, tick_enabled_us=5.2)
+    assert compare(current, baseline) == []
+
+
+def test_repeated_runs_report_the_median(monkeypatch):
+    values = iter([5.0, 1.0, 3.0])
+    monkeypatch.setitem(benchmark.SUITE, "fake", lambda: {"fake_us": next(values)})
+    result = run_suite(["fake"], repeat=3)
+    assert result["results"] == {"fake": {"fake_us": 3.0}}
+    assert result["meta"]["repeat"] == 3
@@ -0,0 +1,96 @@
+"""Fan backends without fan hardware"""
+
+import sys
+import types
+
+import pytest
+
+from fan_backends import RPiGPIOBackend
+
+
+class FakeGPIO(types.ModuleType):
+    """Stand-in for RPi.GPIO that enforces its call-order rules"""
+
+    BCM, BOARD, OUT = 11, 10, 0
+
+    def __init__(self):
+        super().__init__("RPi.GPIO")
+        self.mode = None
+        self.calls = []
+        self.configured = set()
+
+    def _need_mode(self):
+        if self.mode is None:
+            raise RuntimeError("Please set pin numbering mode using GPIO.setmode(GPIO.BOARD) "
+                               "or GPIO.setmode(GPIO.BCM)")
+
+    def setmode(self, mode):
+        if self.mode is not None and self.mode != mode:
+            raise ValueError("A different mode has already been set!")
+        self.mode = mode
+        self.calls.append(("setmode", mode))
+
+    def cleanup(self, channel=None):
+        if channel is not None:
+            self._need_mode()
+            self.configured.discard(channel)
+        else:
+            self.configured.clear()
+            self.mode = None
+        self.calls.append(("cleanup", channel))
+
+    def setup(self, channel, direction):
+        self._need_mode()
+        self.configured.add(channel)
+        self.calls.append(("setup", channel))
+
+    def PWM(self, channel, frequency):
+        if channel not in self.configured:
+            raise RuntimeError("You must setup() the GPIO channel as an output first")
+        gpio = self
+
+        class PWM:
+            def start(self, duty):
+                gpio.calls.append(("start", duty))
+
+            def ChangeDutyCycle(self, duty):
+                gpio.calls.append(("duty", duty))
+
+            def ChangeFrequency(self, frequency):
+                gpio.calls.append(("frequency", frequency))
+
+            def stop(self):
+                gpio.calls.append(("stop", channel))
+
+        return PWM()
+
+
+@pytest.fixture
+def gpio(monkeypatch):
+    fake = FakeGPIO()
+    package = types.ModuleType("RPi")
+    package.GPIO = fake
+    monkeypatch.setitem(sys.modules, "RPi", package)
+    monkeypatch.setitem(sys.modules, "RPi.GPIO", fake)
+    monkeypatch.setattr("time.sleep", lambda seconds: None)
+    return fake
+
+
+def test_rpi_gpio_backend_sets_mode_before_touching_the_pin(gpio):
+    backend = RPiGPIOBackend(pin=18, frequency=25000)
+    backend.open()
+    assert gpio.calls == [("setmode", FakeGPIO.BCM), ("cleanup", 18), ("setup", 18), ("start", 0)]
+    backend.write(55)
+    assert backend.set_frequency(100)
+    backend.close()
+    assert gpio.calls[4:] == [("duty", 55), ("frequency", 100), ("duty", 0), ("stop", 18), ("cleanup", 18)]
+    assert gpio.configured == set()
+
+
+def test_rpi_gpio_backend_reopens_on_another_pin(gpio):
+    first, second = RPiGPIOBackend(pin=18), RPiGPIOBackend(pin=13)
+    first.open()
+    second.open()  # The new output is opened before the old one is released (retarget_output)
+    first.close()
+    assert gpio.configured == {13}
+    second.close()
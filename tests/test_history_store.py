@@ -0,0 +1,57 @@
+"""HistoryWriter segment rotation"""
+
+import os
+import threading
+import time
+
+import history_store
+from history_store import (HEADER_SIZE, HistorySegment, HistoryWriter, iter_history, list_segments,
+                           load_index, record_struct)
+
+
+def test_rotation_closes_segments_in_background(tmp_path, monkeypatch):
+    directory = str(tmp_path)
+    release = threading.Event()
+    append_entry = history_store.append_index_entry
+
+    def slow_append(*args):
+        release.wait(5.0)  # A slow disk: the index append blocks until released
+        append_entry(*args)
+
+    monkeypatch.setattr(history_store, "append_index_entry", slow_append)
+    writer = HistoryWriter(directory, segment_capacity=5)
+    started = time.perf_counter()
+    for i in range(17):  # Rotates three times while the first close is still blocked
+        writer.append([40.0 + i], i, history_store.MODE_AUTO, mono_time=100.0 + i, wall_time=1000.0 + i)
+    assert time.perf_counter() - started < 1.0
+    assert load_index(directory) == {}
+
+    release.set()
+    writer.close()
+    index = load_index(directory)
+    segments = list_segments(directory)
+    assert len(segments) == 4 and len(index) == 4
+    assert list(index) == [os.path.basename(path) for path in segments]  # Appended in segment order
+    size = record_struct(1).size
+    assert [os.path.getsize(path) for path in segments] == [HEADER_SIZE + n * size for n in (5, 5, 5, 2)]
+    assert [sample.duty for sample in iter_history(directory)] == list(range(17))
+
+
+def test_compressed_rotation(tmp_path):
+    directory = str(tmp_path)
+    writer = HistoryWriter(directory, segment_capacity=4, compress=True)
+    for i in range(10):
+        writer.append([50.0], i, mono_time=float(i), wall_time=2000.0 + i)
+    writer.close()
+    segments = list_segments(directory)
+    assert all(path.endswith(".gz") for path in segments) and len(segments) == 3
+    with HistorySegment(segments[0]) as segment:
+        assert segment.count == 4
+    assert [sample.duty for sample in iter_history(directory)] == list(range(10))
+
+
+def test_empty_segment_is_removed(tmp_path):
+    writer = HistoryWriter(str(tmp_path))
+    writer._open_segment(3000.0, 0.0)
+    writer.close()
+    assert list_segments(str(tmp_path)) == []
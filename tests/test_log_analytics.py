@@ -0,0 +1,79 @@
+"""Log rollups against the generator's totals"""
+
+import os
+
+import pytest
+
+import log_analytics
+from log_analytics import LogAnalyzer, _digest, analyze_range, coarsen, generate
+
+EDGE_CASES = """2026-01-01 00:00:00 - Temp: 5.5°C, Fan: 0%, Mode: Manuel
+2026-01-01 00:00:01 - Temp: -0.5°C, Fan: 100%, Mode: Otomatik
+2026-01-01 00:00:02 - Temp: 05.5°C, Fan: 7%, Mode: PID, Load: 40%
+2026-01-01 00:00:03 - Temp: 100.0°C, Fan: 100%, Mode: PID, Load: 40%, RPM: 0 (stall)
+2026-01-01 00:00:04 - Temp: -12.5°C, Fan: 10%, Mode: Failsafe
+2026-01-01 00:00:05 - Temp: 1234.5°C, Fan: 10%, Mode: Otomatik
+2026-01-01 00:00:06 - Temp: 55.5°C, Fan: 1000%, Mode: Otomatik
+2026-01-01 00:00:07 - Temp: 55.5°C, Fan: 10%, Mode: PIDX
+2026-01-01 00:00:08 - Temp: 55.5°C, Fan: 10%, Mode: Otomatik\r
+2026-01-01 00:00:09 - Temp: 55.5°C, Fan: 10%, Mode: 
+2026-01-01 00:00:10,123 - INFO - 🌀 Fan hızı ayarlandı
+2026-01-01 00:00:11 - Temp: 55.°C, Fan: 10%, Mode: Manuel
+2026-01-01 00:00:12 - Temp: 70.0°C, Fan: 10%, Mode: Manuel
+2026-01-01 00:00:14 - Temp: 69.9°C, Fan: 10%, Mode: Manuel
+2026-01-01 00:01:30 - Temp: 71.9°C, Fan: 10%, Mode: Manuel
+2026-01-01 00:00:59 - Temp: 60.0°C, Fan: 55%, Mode: Otomatik
+x2026-01-01 00:01:01 - Temp: 60.0°C, Fan: 55%, Mode: Otomatik
+2026-01-01 00:01:02 - Temp: 60.0°C, Fan: 55%, Mode: Otomatik"""
+
+
+@pytest.fixture(scope="module")
+def log(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("logs") / "fan_control_log.txt")
+    return path, generate(path, 4 << 20, start=1_700_000_000, seed=5)
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_rollups_match_generated_totals(log, jobs):
+    path, expected = log
+    analyzer = LogAnalyzer(jobs=jobs, chunk_size=1 << 20, block_size=256 << 10)
+    digest, totals = _digest(analyzer.minutes([path]))
+    assert analyzer.records == totals["records"] == expected["records"]
+    assert analyzer.skipped == expected["skipped"]
+    assert totals["seconds"] == expected["seconds"]
+    assert totals["above_seconds"] == expected["above_seconds"]
+    assert dict(totals["mode_seconds"]) == {mode: seconds for mode, seconds in expected["mode_seconds"].items()
+                                            if seconds}
+
+    # Different range and block boundaries give the same minutes
+    reference = LogAnalyzer(jobs=1, chunk_size=3 << 20, block_size=(1 << 20) + 7)
+    assert _digest(reference.minutes([path]))[0] == digest
+
+
+def test_hour_rollups_add_up(log):
+    path, expected = log
+    hours = list(coarsen(LogAnalyzer(jobs=1).minutes([path]), "hour"))
+    assert sum(hour.count for hour in hours) == expected["records"]
+    assert all(hour.label.endswith(":00") for hour in hours)
+
+
+def test_bulk_and_regex_parsing_agree(tmp_path, monkeypatch):
+    if log_analytics.np is None:
+        pytest.skip("NumPy yok: yalnızca düzenli ifade yolu var")
+    path = tmp_path / "edge.log"
+    path.write_text(EDGE_CASES, encoding="utf-8")
+    size = os.path.getsize(path)
+
+    def run(block_size):
+        result = analyze_range(str(path), 0, size, threshold=70.0, block_size=block_size)
+        return ([rollup.to_dict() for rollup in result.rollups], result.records, result.lines,
+                result.first_time, result.last_time, result.last_mode, result.last_above)
+
+    bulk = [run(block_size) for block_size in (16, 100, 1 << 20)]
+    monkeypatch.setattr(log_analytics, "np", None)
+    regex = [run(block_size) for block_size in (16, 100, 1 << 20)]
+    assert bulk[0][1] == 14
+    assert all(result == regex[-1] for result in bulk + regex)
+    minute = bulk[0][0][0]
+    assert minute["temp_min"] == -12.5 and minute["temp_max"] == 1234.5
+    assert minute["mode_seconds"] == {"Manuel": 3, "Otomatik": 10, "PID": 2, "Failsafe": 1, "PIDX": 1}
@@ -0,0 +1,57 @@
+"""Prometheus exposition over HTTP"""
+
+import contextlib
+import io
+import re
+import urllib.request
+
+from benchmark import simulated_system
+from control_engine import ControlEngine
+from duty_scheduler import DutyScheduler
+from metrics import MetricsServer, instrument
+
+
+def scrape(server) -> str:
+    with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics", timeout=5) as response:
+        assert response.status == 200
+        return response.read().decode("utf-8")
+
+
+def sample(body: str, name: str) -> float:
+    match = re.search(rf"^{re.escape(name)} (\S+)$", body, re.MULTILINE)
+    assert match, f"{name} yok"
+    return float(match.group(1))
+
+
+def set_speed(engine, speed: int):
+    engine.submit("set_speed", speed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine.tick()
+
+
+def test_pwm_writes_counted_after_output_is_retargeted():
+    with simulated_system() as (fan_controller, data_logger):
+        # Every requested speed is written at once (no slew, dwell or kick)
+        fan_controller.primary.scheduler = DutyScheduler(None, None, min_dwell=0.0, kick_duty=0)
+        engine = ControlEngine(fan_controller, data_logger)
+        server = MetricsServer(instrument(engine), port=0)
+        server.start()
+        try:
+            set_speed(engine, 40)
+            body = scrape(server)
+            writes = sample(body, "thermopi_pwm_write_seconds_count")
+            assert writes >= 1
+            assert 'thermopi_mode{mode="Manuel"} 1' in body
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                fan_controller.retarget_output(fan_controller.fan_pin + 5, fan_controller.pwm_frequency)
+            replacement = fan_controller.primary.backend
+            assert replacement.pin == fan_controller.fan_pin
+            before = replacement.writes
+            set_speed(engine, 70)
+
+            assert replacement.writes > before
+            assert sample(scrape(server), "thermopi_pwm_write_seconds_count") == \
+                writes + replacement.writes - before
+        finally:
+            server.close()
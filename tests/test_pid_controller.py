@@ -0,0 +1,15 @@
+"""PID against the default curve on the simulated plant"""
+
+import pytest
+
+from pid_controller import compare_step_response
+
+
+def test_pid_beats_curve_on_load_steps():
+    results = compare_step_response(limit=60.0)
+    curve, pid = results["Eğri"], results["PID"]
+    assert curve.peak == pytest.approx(61.9, abs=0.05)
+    assert pid.peak == pytest.approx(59.5, abs=0.05)
+    assert pid.peak < curve.peak
+    assert pid.over < curve.over
+    assert pid.mean_duty <= curve.mean_duty
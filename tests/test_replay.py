@@ -0,0 +1,66 @@
+"""Chunked replay of recorded traces"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from pid_controller import PIDBank
+from replay import RampSweep, ThermalModel, Trace, attach_load, replay
+from thermal_tuning import synthetic_trace
+
+MODEL = ThermalModel(tau=200.0, fan_gain=2.5, ambient=32.0)
+
+
+def as_lists(trace):
+    return Trace(trace.times.tolist(), trace.temperature.tolist(), trace.duty.tolist(),
+                 trace.mode.tolist())
+
+
+@pytest.fixture(scope="module")
+def week():
+    return as_lists(synthetic_trace(days=7.0, seed=3))
+
+
+@pytest.fixture(scope="module")
+def day():
+    trace = as_lists(synthetic_trace(days=1.0, seed=4))
+    # A 5-minute gap (daemon stopped): the replay resumes from the recorded temperature
+    times = trace.times[:40000] + [t + 300.0 for t in trace.times[40000:]]
+    return trace._replace(times=times)
+
+
+def test_week_of_samples_replays_every_setting(week):
+    ramps = RampSweep.grid([45, 50, 55], [60, 65, 70], [20, 30], [80, 100])
+    result = replay(week, ramps, MODEL, threshold=60.0)
+    assert result.duration == pytest.approx(7 * 86400 - 1)
+    assert len(result.peak) == ramps.size
+
+
+def test_chunked_ramps_match_single_pass(day):
+    ramps = RampSweep.grid([45, 55], [65], [20], [80, 100])
+    chunked = replay(day, ramps, MODEL, threshold=60.0, chunk=3600)
+    single = replay(day, ramps, MODEL, threshold=60.0, chunk=0)
+    assert chunked.duration == single.duration == 86400 - 2  # The step across the gap is not counted
+    assert chunked.peak == pytest.approx(single.peak, abs=1e-6)
+    assert chunked.mean_temp == pytest.approx(single.mean_temp, abs=1e-3)
+    assert chunked.mean_duty == pytest.approx(single.mean_duty, rel=1e-3)
+    assert chunked.switches == pytest.approx(single.switches, rel=1e-3)
+
+
+def test_chunked_pid_matches_single_pass(day):
+    day = Trace(*(column[:50000] for column in day[:4]))
+    pid = PIDBank([50.0, 55.0], [15.0, 10.0], [0.05, 0.02], [150.0, 50.0])
+    chunked = replay(day, pid, MODEL, threshold=60.0, chunk=3600)
+    single = replay(day, pid, MODEL, threshold=60.0, chunk=0)
+    assert chunked.peak == pytest.approx(single.peak, abs=1e-3)
+    assert chunked.mean_temp == pytest.approx(single.mean_temp, abs=1e-3)
+    assert chunked.mean_duty == pytest.approx(single.mean_duty, rel=1e-3)
+
+
+def test_attach_load_keeps_trace_type(tmp_path):
+    trace = Trace([0.0, 1.0, 2.0, 3.0], [50.0, 50.5, 51.0, 51.0], [0, 0, 20, 20], [0, 0, 0, 0])
+    path = tmp_path / "load.csv"
+    path.write_text("wall_time,utilization\n0,10\n2,90\n", encoding="utf-8")
+    loaded = attach_load(trace, str(path))
+    assert isinstance(loaded, Trace) and len(loaded) == 4
+    assert loaded.load == [0.1, 0.1, 0.9, 0.9]
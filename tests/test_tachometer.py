@@ -0,0 +1,57 @@
+"""RPM measurement and stall / under-speed detection"""
+
+import pytest
+
+from tachometer import EdgeCounter, StallDetector, _cpu_per_edge, stall_timeline
+
+
+def test_edge_counter_rpm_over_window():
+    counter = EdgeCounter(pulses_per_rev=2, window=2.0)
+    assert counter.read(0.0) is None
+    counter.edges = 10
+    assert counter.read(0.1) is None  # Shorter than min_span
+    # 100 edges/s with 2 pulses per revolution: 3000 RPM
+    for step in range(1, 41):
+        counter.edges = 100 * step // 10
+        counter.read(step / 10)
+    assert counter.rpm == pytest.approx(3000.0)
+    # The fan stops: the window drains to 0 RPM within its length
+    for step in range(41, 62):
+        counter.read(step / 10)
+    assert counter.rpm == 0.0
+
+
+@pytest.mark.parametrize("rate", [1000.0, 3000.0, 6000.0])
+def test_generated_edges_measured_within_one_percent(rate):
+    ratio, _, _ = _cpu_per_edge(rate, seconds=1.0)
+    assert ratio == pytest.approx(1.0, abs=0.01)
+
+
+def test_stall_detector_debounces_transitions():
+    detector = StallDetector(max_rpm=5000, grace=3.0)
+    assert detector.update(60, 3000, now=0.0) == "ok"
+    assert detector.update(60, 0, now=1.0) == "ok"     # Not yet held for the grace period
+    assert detector.update(60, 3000, now=2.0) == "ok"  # Recovered: the candidate is dropped
+    assert detector.update(60, 0, now=3.0) == "ok"
+    assert detector.update(60, 0, now=6.0) == "stall"
+    assert detector.update(60, 1000, now=7.0) == "stall"
+    assert detector.update(60, 1000, now=10.0) == "underspeed"
+    assert detector.update(60, 2900, now=11.0) == "underspeed"
+    assert detector.update(60, 2900, now=14.0) == "ok"
+    assert detector.events == {"stall": 1, "underspeed": 1}
+
+
+def test_stall_detector_ignores_low_duty_and_missing_rpm():
+    detector = StallDetector(max_rpm=5000, min_duty=20, grace=0.0)
+    assert detector.judge(10, 0) == "ok"
+    assert detector.judge(60, None) == "ok"
+    assert detector.judge(20, 150) == "stall"
+    assert detector.judge(100, 2400) == "underspeed"
+    assert detector.judge(100, 2600) == "ok"
+
+
+def test_simulated_fan_stall_and_wear_are_flagged_and_cleared():
+    timeline = stall_timeline()
+    assert [status for _, status, _ in timeline] == ["ok", "stall", "underspeed", "ok"]
+    rpms = [rpm for _, _, rpm in timeline]
+    assert rpms[0] == pytest.approx(3000, rel=0.05) and rpms[1] < 200
@@ -0,0 +1,52 @@
+"""Telemetry datagrams and collector alerts"""
+
+from control_engine import ChannelState
+from telemetry import (HEADER, MAGIC_V1, TelemetryCollector, decode, encode, fan_feedback)
+
+
+def channel(name, rpm=None, fan_status="ok"):
+    return ChannelState(name, "simulated", 50.0, 40, 40, rpm, fan_status)
+
+
+def test_datagram_round_trip():
+    sample = decode(encode(b"raf1-pi07", 7, 1.7e9, 61.25, 45, 1, load=0.42, rpm=2310.4,
+                           fan_status="underspeed"))
+    assert sample.node == "raf1-pi07" and sample.seq == 7 and sample.wall_time == 1.7e9
+    assert sample.temperature == 61.25 and sample.duty == 45 and sample.mode == "Otomatik"
+    assert (sample.load, sample.rpm, sample.fan_status) == (0.42, 2310, "underspeed")
+
+    unknown = decode(encode(b"pi", 1, 0.0, None, 0, 0))
+    assert (unknown.temperature, unknown.load, unknown.rpm, unknown.fan_status) == (None, None, None, "ok")
+
+
+def test_version_1_datagram_is_accepted():
+    data = HEADER.pack(MAGIC_V1, 3, 1.7e9, 5000, 30, 1, 2) + b"pi"
+    sample = decode(data)
+    assert (sample.node, sample.temperature, sample.duty) == ("pi", 50.0, 30)
+    assert (sample.load, sample.rpm, sample.fan_status) == (None, None, "ok")
+
+    collector = TelemetryCollector()
+    collector.ingest(data)
+    collector.ingest(data[:-1])  # Truncated
+    assert collector.invalid == 1 and len(collector.nodes) == 1
+
+
+def test_fan_feedback_reports_worst_channel():
+    assert fan_feedback([channel("cpu")]) == (None, "ok")
+    assert fan_feedback([channel("cpu", 2400.0), channel("case", 1800.0)]) == (1800.0, "ok")
+    assert fan_feedback([channel("cpu", 0.0, "stall"), channel("case", 600.0, "underspeed"),
+                         channel("nvme")]) == (0.0, "stall")
+
+
+def test_collector_alerts_on_stalled_fan():
+    collector = TelemetryCollector()
+    statuses = ["ok", "ok", "stall", "stall", "underspeed", "ok"]
+    rpms = [2400, 2380, 0, 0, 700, 2350]
+    for seq, (status, rpm) in enumerate(zip(statuses, rpms), 1):
+        collector.ingest(encode(b"pi-0001", seq, 1.7e9 + seq, 64.0, 100, 1, load=0.9, rpm=rpm,
+                                fan_status=status))
+    assert [(a.kind, a.active, a.value) for a in collector.alerts] == [
+        ("stall", True, 0), ("stall", False, 700), ("underspeed", True, 700),
+        ("underspeed", False, 2350)]
+    summary = collector.summary()[0]
+    assert (summary["rpm"], summary["fan_status"], summary["load"]) == (2350, "ok", 0.9)
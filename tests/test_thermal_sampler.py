@@ -0,0 +1,104 @@
+"""ThermalSampler against a fake sysfs tree"""
+
+import os
+
+import pytest
+
+from thermal_sampler import ThermalSampler, ThermalSensor, discover_sensors
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def rewrite_in_place(path, text):
+    """Replace the contents without a new inode, as sysfs does"""
+    with open(path, "r+") as f:
+        f.truncate(0)
+        f.write(text)
+
+
+@pytest.fixture
+def root(tmp_path):
+    thermal = tmp_path / "sys/class/thermal"
+    write(str(thermal / "thermal_zone0/temp"), "52500\n")
+    write(str(thermal / "thermal_zone0/type"), "cpu-thermal\n")
+    write(str(thermal / "thermal_zone10/temp"), "-5000\n")
+    write(str(thermal / "thermal_zone2/temp"), "61000\n")
+    os.makedirs(thermal / "thermal_zone3")  # No temp attribute: not a sensor
+    hwmon = tmp_path / "sys/class/hwmon/hwmon1"
+    write(str(hwmon / "name"), "nvme\n")
+    write(str(hwmon / "temp1_input"), "40125\n")
+    write(str(hwmon / "temp1_label"), "Composite\n")
+    return str(tmp_path)
+
+
+def test_discovery_order_names_and_labels(root):
+    sensors = discover_sensors(root)
+    assert [s.name for s in sensors] == ["thermal_zone0", "thermal_zone2", "thermal_zone10", "hwmon1/temp1"]
+    labels = {s.name: s.label for s in sensors}
+    assert labels["thermal_zone0"] == "cpu-thermal"
+    assert labels["thermal_zone2"] == "thermal_zone2"  # No type file: falls back to the name
+    assert labels["hwmon1/temp1"] == "nvme:Composite"
+
+
+def test_millidegree_parsing(root):
+    with ThermalSampler(root) as sampler:
+        snapshot = sampler.sample()
+    assert snapshot.primary == 52.5
+    assert snapshot.temperatures == {"thermal_zone0": 52.5, "thermal_zone2": 61.0,
+                                     "thermal_zone10": -5.0, "hwmon1/temp1": 40.125}
+    assert snapshot.max_temperature() == 61.0
+
+
+def test_descriptors_are_reused(root, monkeypatch):
+    sampler = ThermalSampler(root)
+    opened = []
+    monkeypatch.setattr(os, "open", lambda *args, **kwargs: opened.append(args) or -1)
+    zone = os.path.join(root, "sys/class/thermal/thermal_zone0/temp")
+    try:
+        assert sampler.sample().primary == 52.5
+        rewrite_in_place(zone, "70250\n")
+        assert sampler.sample().primary == 70.25
+        rewrite_in_place(zone, "9000\n")  # Shorter than before: read from offset 0, not appended
+        assert sampler.sample().primary == 9.0
+    finally:
+        sampler.close()
+    assert opened == []
+
+
+def test_snapshot_is_shared_within_max_age(root):
+    with ThermalSampler(root) as sampler:
+        first = sampler.snapshot(max_age=60.0)
+        rewrite_in_place(os.path.join(root, "sys/class/thermal/thermal_zone0/temp"), "80000\n")
+        assert sampler.snapshot(max_age=60.0) is first
+        assert sampler.snapshot(max_age=0.0).primary == 80.0
+
+
+def test_garbled_zone_is_left_out(root):
+    with ThermalSampler(root) as sampler:
+        rewrite_in_place(os.path.join(root, "sys/class/thermal/thermal_zone2/temp"), "garbage\n")
+        snapshot = sampler.sample()
+    assert "thermal_zone2" not in snapshot.temperatures
+    assert snapshot.primary == 52.5
+
+
+def test_missing_zone_file(root, capsys):
+    missing = ThermalSensor("thermal_zone9", "gone", os.path.join(root, "sys/class/thermal/thermal_zone9/temp"))
+    sensors = discover_sensors(root) + [missing]
+    with ThermalSampler(root, sensors=sensors) as sampler:
+        snapshot = sampler.sample()
+    assert "thermal_zone9" not in snapshot.temperatures
+    assert "Sensör açılamadı" in capsys.readouterr().out
+
+
+def test_missing_primary_zone(tmp_path):
+    write(str(tmp_path / "sys/class/thermal/thermal_zone1/temp"), "45000\n")
+    with ThermalSampler(str(tmp_path)) as sampler:
+        assert sampler.primary == "thermal_zone1"  # First discovered sensor stands in
+        assert sampler.sample().primary == 45.0
+    with ThermalSampler(str(tmp_path / "empty")) as sampler:
+        assert sampler.sensors == []
+        assert sampler.sample().primary is None
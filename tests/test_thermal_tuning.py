@@ -0,0 +1,58 @@
+"""Thermal model fitting and writing tuned settings"""
+
+import json
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from config_reload import RuntimeConfig, compile_config, read_config
+from thermal_tuning import _current_params, fit_model, synthetic_trace, write_config
+
+TRUTH = dict(tau=200.0, fan_gain=2.5, ambient=32.0, idle_heat=0.04, load_heat=0.22)
+
+
+def test_fit_model_recovers_synthetic_plant():
+    fit = fit_model(synthetic_trace(days=2.0, seed=2, **TRUTH))
+    for name, expected in TRUTH.items():
+        assert getattr(fit, name) == pytest.approx(expected, rel=0.05), name
+    assert fit.rmse < 0.2  # Close to the 0.1 °C noise plus 0.1 °C rounding
+
+
+def test_write_curve_into_fresh_file(tmp_path):
+    path = str(tmp_path / "thermopi.json")
+    tuned = {"temp_min": 55.0, "temp_max": 68.0, "speed_min": 15, "speed_max": 90, "strategy": "curve"}
+    assert write_config(path, tuned) == []
+    config = read_config(path)
+    assert config == tuned
+    runtime = compile_config(config, RuntimeConfig.defaults())
+    assert runtime.temp_min == 55.0 and runtime.strategy == "curve"
+    assert dict(runtime.pid) == dict(RuntimeConfig.defaults().pid)
+
+
+def test_write_pid_keeps_other_keys_and_drops_explicit_curve(tmp_path):
+    path = tmp_path / "thermopi.json"
+    path.write_text(json.dumps({"pin": 12, "curve": {"points": [[40, 0], [70, 100]]},
+                                "pid": {"derivative_tau": 6.0}}), encoding="utf-8")
+    tuned = {"temp_min": 52.0, "temp_max": 66.0, "speed_min": 20, "speed_max": 80,
+             "pid": {"setpoint": 60.0, "kp": 10.0, "ki": 0.04, "kd": 60.0}, "strategy": "pid"}
+    assert write_config(str(path), tuned) == ["curve"]
+    config = read_config(str(path))
+    assert config["pin"] == 12 and "curve" not in config
+    assert config["pid"] == {"derivative_tau": 6.0, "setpoint": 60.0, "kp": 10.0, "ki": 0.04, "kd": 60.0}
+    assert _current_params(str(path))["pid"] == {"setpoint": 60.0, "kp": 10.0, "ki": 0.04, "kd": 60.0}
+
+
+def test_write_rejects_invalid_result(tmp_path):
+    path = str(tmp_path / "thermopi.json")
+    with pytest.raises(ValueError, match="setpoint"):
+        write_config(path, {"pid": {"setpoint": 5.0}})
+    assert not (tmp_path / "thermopi.json").exists()
+
+
+def test_current_params_default_to_controller_defaults():
+    defaults = RuntimeConfig.defaults()
+    current = _current_params(None)
+    assert current["curve"] == {"temp_min": defaults.temp_min, "temp_max": defaults.temp_max,
+                                "speed_min": defaults.speed_min, "speed_max": defaults.speed_max}
+    assert current["pid"] == {key: value for key, value in defaults.pid if key != "derivative_tau"}
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+ThermoPi Thermal Sampler
+Persistent-handle, multi-zone temperature sampling for all sysfs sensors
+
+Every thermal_zone* and hwmon temp*_input file is opened once and re-read
+with pread at offset 0, so a sample costs one syscall per sensor and no
+open/close. All sensors are read together into one snapshot per tick that
+every caller shares.
+"""
+
+import glob
+import os
+import re
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+DEFAULT_ROOT = "/"
+PRIMARY_ZONE = "thermal_zone0"
+READ_SIZE = 32  # Sysfs temperature values are short millidegree integers
+
+
+class ThermalSensor(NamedTuple):
+    """A discovered temperature input"""
+    name: str    # Stable key, e.g. "thermal_zone0" or "hwmon1/temp1"
+    label: str   # Human readable type/label reported by the kernel
+    path: str
+
+
+class ThermalSnapshot(NamedTuple):
+    """Batched reading of all sensors taken at one instant"""
+    timestamp: float                  # time.monotonic() of the read
+    temperatures: Dict[str, float]    # Sensor name -> °C (missing if read failed)
+    primary: Optional[float]          # Primary (CPU) sensor in °C
+
+    def max_temperature(self) -> Optional[float]:
+        """Hottest sensor in the snapshot"""
+        return max(self.temperatures.values()) if self.temperatures else None
+
+
+def _natural_key(path: str):
+    """Sort thermal_zone10 after thermal_zone9"""
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", path)]
+
+
+def _read_text(path: str, default: str = "") -> str:
+    """Read a small sysfs attribute once (used only during discovery)"""
+    try:
+        with open(path, "r") as f:
+            return f.read().strip()
+    except OSError:
+        return default
+
+
+def discover_sensors(root: str = DEFAULT_ROOT) -> List[ThermalSensor]:
+    """Find every thermal zone and hwmon temperature input below root"""
+    sensors = []
+
+    thermal_dir = os.path.join(root, "sys/class/thermal")
+    for zone_dir in sorted(glob.glob(os.path.join(thermal_dir, "thermal_zone*")), key=_natural_key):
+        temp_path = os.path.join(zone_dir, "temp")
+        if os.path.exists(temp_path):
+            name = os.path.basename(zone_dir)
+            label = _read_text(os.path.join(zone_dir, "type"), name)
+            sensors.append(ThermalSensor(name, label, temp_path))
+
+    hwmon_dir = os.path.join(root, "sys/class/hwmon")
+    for chip_dir in sorted(glob.glob(os.path.join(hwmon_dir, "hwmon*")), key=_natural_key):
+        chip = os.path.basename(chip_dir)
+        chip_name = _read_text(os.path.join(chip_dir, "name"), chip)
+        for temp_path in sorted(glob.glob(os.path.join(chip_dir, "temp*_input")), key=_natural_key):
+            channel = os.path.basename(temp_path)[:-len("_input")]
+            label = _read_text(os.path.join(chip_dir, f"{channel}_label"), channel)
+            sensors.append(ThermalSensor(f"{chip}/{channel}", f"{chip_name}:{label}", temp_path))
+
+    return sensors
+
+
+class ThermalSampler:
+    """Keeps one descriptor open per sensor and produces shared snapshots"""
+
+    def __init__(self, root: str = DEFAULT_ROOT, primary: str = PRIMARY_ZONE,
+                 sensors: Optional[List[ThermalSensor]] = None):
+        self.root = root
+        self.sensors = sensors if sensors is not None else discover_sensors(root)
+        self._fds: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._latest: Optional[ThermalSnapshot] = None
+
+        names = [sensor.name for sensor in self.sensors]
+        if primary in names:
+            self.primary = primary
+        else:
+            self.primary = names[0] if names else primary
+
+        for sensor in self.sensors:
+            try:
+                self._fds[sensor.name] = os.open(sensor.path, os.O_RDONLY)
+            except OSError as e:
+                print(f"⚠️ Sensör açılamadı ({sensor.path}): {e}")
+
+    @property
+    def primary_path(self) -> str:
+        """Path of the primary sensor (for error messages)"""
+        for sensor in self.sensors:
+            if sensor.name == self.primary:
+                return sensor.path
+        return os.path.join(self.root, "sys/class/thermal", PRIMARY_ZONE, "temp")
+
+    def _read_fd(self, fd: int) -> float:
+        """Re-read an open sysfs attribute from offset zero"""
+        if hasattr(os, "pread"):
+            raw = os.pread(fd, READ_SIZE, 0)
+        else:
+            os.lseek(fd, 0, os.SEEK_SET)
+            raw = os.read(fd, READ_SIZE)
+        return int(raw) / 1000.0
+
+    def sample(self) -> ThermalSnapshot:
+        """Read all sensors now and publish the result as the latest snapshot"""
+        with self._lock:
+            return self._sample_locked()
+
+    def _sample_locked(self) -> ThermalSnapshot:
+        temperatures = {}
+        for name, fd in self._fds.items():
+            try:
+                temperatures[name] = self._read_fd(fd)
+            except (OSError, ValueError):
+                # Sensor vanished or returned garbage - leave it out of this tick
+                continue
+
+        snapshot = ThermalSnapshot(time.monotonic(), temperatures, temperatures.get(self.primary))
+        self._latest = snapshot
+        return snapshot
+
+    def snapshot(self, max_age: float = 0.0) -> ThermalSnapshot:
+        """Return the latest snapshot if younger than max_age, otherwise sample"""
+        latest = self._latest
+        if latest is not None and time.monotonic() - latest.timestamp <= max_age:
+            return latest
+
+        with self._lock:
+            # Another thread may have sampled while we waited for the lock
+            latest = self._latest
+            if latest is not None and time.monotonic() - latest.timestamp <= max_age:
+                return latest
+            return self._sample_locked()
+
+    @property
+    def latest(self) -> Optional[ThermalSnapshot]:
+        """Most recent snapshot without touching the sensors"""
+        return self._latest
+
+    def close(self):
+        """Close all sensor descriptors"""
+        with self._lock:
+            for fd in self._fds.values():
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+            self._fds.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == "__main__":
+    sampler = ThermalSampler()
+    print(f"🌡️ {len(sampler.sensors)} sensör bulundu")
+    snapshot = sampler.sample()
+    for sensor in sampler.sensors:
+        value = snapshot.temperatures.get(sensor.name)
+        text = f"{value:.1f}°C" if value is not None else "okunamadı"
+        print(f"  {sensor.name:<20} {sensor.label:<24} {text}")
+    sampler.close()
@@ -0,0 +1,584 @@
+#!/usr/bin/env python3
+"""
+ThermoPi Thermal Tuning
+Fits a node's thermal model from its history and tunes the automatic mode
+
+The auto-mode constants (50 °C, 65 °C, 20 %, 80 %) suit no board in
+particular. This tool fits the lumped first-order model used by replay.py
+to a node's own temperature / duty / load record, then searches the curve
+thresholds and/or PID parameters that minimize
+
+    cost = peak_weight × peak (°C)
+         + over_weight × time above the limit (% of the record)
+         + duty_weight × mean duty (%)
+
+and writes the winner as a config FanController loads (thermopi.json keys).
+
+Model (per second, T in °C, d duty 0-1, u CPU load 0-1):
+    dT/dt = idle_heat + load_heat × u - (1 + fan_gain × d) / tau × (T - ambient)
+
+Fitting is one linear least-squares problem: the temperature change over
+`stride` samples is regressed on the summed terms of the model, which
+averages out sensor quantization. Searching replays the recorded heat
+load (recovered through the fitted model, as in replay.py) against every
+candidate at once: the record is cut into day-long chunks that run side by
+side, so one NumPy step advances all chunks × candidates by `step`
+seconds with the exact solution of the model over that step.
+
+Usage:
+    python3 thermal_tuning.py tune fan_control_log.txt --output thermopi.json
+    python3 thermal_tuning.py tune --history history --strategy pid --limit 65
+    python3 thermal_tuning.py selftest [--days 30]
+
+Needs NumPy.
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from config_reload import THRESHOLD_KEYS, RuntimeConfig, compile_config, read_config
+from pid_controller import PIDBank
+from replay import MAX_GAP, RampSweep, ReplayResult, ThermalModel, Trace, load_history, load_text_log
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+STRATEGIES = ("curve", "pid", "both")
+
+# Search space: (name, first-round grid, "lin"/"log" refinement, lower bound, upper bound).
+# Temperatures are relative to the limit.
+CURVE_SPACE = (
+    ("temp_min", (-30.0, -25.0, -20.0, -15.0, -10.0, -5.0), "lin", -60.0, 0.0),
+    ("temp_max", (-20.0, -15.0, -10.0, -5.0, 0.0, 5.0), "lin", -50.0, 10.0),
+    ("speed_min", (0.0, 15.0, 30.0, 45.0), "lin", 0.0, 100.0),
+    ("speed_max", (40.0, 60.0, 80.0, 100.0), "lin", 0.0, 100.0),
+)
+PID_SPACE = (
+    ("setpoint", (-15.0, -10.0, -6.0, -3.0), "lin", -40.0, 0.0),
+    ("kp", (4.0, 10.0, 25.0, 60.0), "log", 0.5, 500.0),
+    ("ki", (0.01, 0.04, 0.15), "log", 0.001, 2.0),
+    ("kd", (0.0, 60.0, 200.0), "log", 0.0, 2000.0),
+)
+
+
+class ModelFit(NamedTuple):
+    """Fitted first-order model of one node"""
+    tau: float        # Time constant with the fan off (s)
+    fan_gain: float   # Extra cooling at 100 % duty, relative to fan off
+    ambient: float    # Temperature the board relaxes to without heat input (°C)
+    idle_heat: float  # Heating rate at zero load (°C/s)
+    load_heat: float  # Additional heating rate at 100 % CPU load (°C/s; 0 without a load record)
+    rmse: float       # Error of the fitted temperature change over one stride (°C)
+    samples: int      # Windows used in the fit
+
+    def thermal_model(self) -> ThermalModel:
+        return ThermalModel(self.tau, self.fan_gain, self.ambient)
+
+    def steady_state(self, duty: float, load: float = 0.0) -> float:
+        """Temperature the model settles at for a constant duty (%) and load"""
+        heat = self.idle_heat + self.load_heat * load
+        return self.ambient + heat * self.tau / (1.0 + self.fan_gain * duty / 100.0)
+
+
+class Cost(NamedTuple):
+    """Weights of the tuning objective (see module docstring)"""
+    peak_weight: float = 1.0
+    over_weight: float = 5.0
+    duty_weight: float = 0.2
+
+    def evaluate(self, result: ReplayResult):
+        """Cost per parameter set of a replay result"""
+        span = result.duration or 1.0
+        return (self.peak_weight * np.asarray(result.peak)
+                + self.over_weight * 100.0 * np.asarray(result.time_over) / span
+                + self.duty_weight * np.asarray(result.mean_duty))
+
+
+class Tuned(NamedTuple):
+    """Best parameter set found for one strategy"""
+    strategy: str
+    params: Dict[str, float]
+    cost: float
+    peak: float
+    time_over: float   # Seconds above the limit
+    mean_duty: float
+    evaluated: int     # Candidates simulated
+
+
+def _columns(trace: Trace):
+    times = np.asarray(trace.times, dtype=np.float64)
+    temps = np.asarray(trace.temperature, dtype=np.float64)
+    duties = np.asarray(trace.duty, dtype=np.float64) / 100.0
+    load = np.asarray(trace.load, dtype=np.float64) if trace.load is not None else None
+    return times, temps, duties, load
+
+
+def fit_model(trace: Trace, stride: int = 10) -> ModelFit:
+    """Least-squares fit of the model to a recorded trace; raises ValueError
+
+    Every window of `stride` consecutive valid steps gives one equation:
+    T[n+s] - T[n] = sum over the window of dt × (c0 + cu·u + cT·T + cdT·d·T + cd·d).
+    """
+    times, temps, duties, load = _columns(trace)
+    if len(times) <= stride + 10:
+        raise ValueError("Model için yetersiz veri")
+    if np.ptp(duties) < 0.05:
+        raise ValueError("Kayıtta fan hızı neredeyse hiç değişmiyor - fan etkisi ölçülemez")
+
+    dt = np.diff(times)
+    valid = (dt > 0) & (dt <= MAX_GAP)
+    dt = np.where(valid, dt, 0.0)
+    T, d = temps[:-1], duties[:-1]
+    terms = [dt, dt * T, dt * d * T, dt * d]
+    if load is not None and np.ptp(load) > 0.01:
+        terms.insert(1, dt * load[:-1])
+    else:
+        load = None  # A constant load is indistinguishable from idle heat
+
+    # Window sums from cumulative sums; windows containing a gap are dropped
+    X = np.stack(terms, axis=1)
+    cumulative = np.vstack([np.zeros((1, X.shape[1])), np.cumsum(X, axis=0)])
+    sums = cumulative[stride:] - cumulative[:-stride]
+    gaps = np.concatenate([[0], np.cumsum(~valid)])
+    usable = (gaps[stride:] - gaps[:-stride]) == 0
+    rise = (temps[stride:] - temps[:-stride])[usable]
+    sums = sums[usable]
+    if len(rise) < 10:
+        raise ValueError("Model için yeterli kesintisiz kayıt yok")
+
+    coef, _, rank, _ = np.linalg.lstsq(sums, rise, rcond=None)
+    if rank < sums.shape[1]:
+        raise ValueError("Model belirlenemiyor (kayıt yeterince çeşitli değil)")
+    rmse = float(np.sqrt(np.mean((sums @ coef - rise) ** 2)))
+    if load is not None:
+        c0, c_load, c_temp, c_duty_temp, c_duty = coef
+    else:
+        (c0, c_temp, c_duty_temp, c_duty), c_load = coef, 0.0
+
+    if c_temp >= 0 or c_duty_temp >= 0:
+        raise ValueError("Uydurulan model kararsız (sıcaklık kendiliğinden düşmüyor veya fan soğutmuyor)")
+    tau = -1.0 / c_temp
+    fan_gain = c_duty_temp / c_temp
+    ambient = -c_duty / c_duty_temp
+    return ModelFit(float(tau), float(fan_gain), float(ambient), float(c0 + c_temp * ambient),
+                    float(c_load), rmse, int(len(rise)))
+
+
+class Bins(NamedTuple):
+    """Trace resampled to chunks × bins for the batched simulation"""
+    heat: "np.ndarray"     # Mean heat input over each bin (°C/s)
+    span: "np.ndarray"     # Recorded seconds in each bin (0: no data)
+    restart: "np.ndarray"  # Reset to the recorded temperature at the bin start
+    start: "np.ndarray"    # Recorded temperature at the start of each bin
+    step: float
+    duration: float
+
+
+def resample(trace: Trace, model: ThermalModel, step: float = 30.0, chunk: float = 86400.0) -> Bins:
+    """Recover the heat input through model and average it over `step`-second bins"""
+    times, temps, duties, _ = _columns(trace)
+    dt = np.diff(times)
+    valid = (dt > 0) & (dt <= MAX_GAP)
+    safe = np.where(valid, dt, 1.0)
+    # As ThermalModel.heat_input: the load that reproduces the record under the recorded duties
+    heat = (np.diff(temps) / safe
+            + (1.0 + model.fan_gain * duties[:-1]) / model.tau * (temps[:-1] - model.ambient))
+    weight = np.where(valid, dt, 0.0)
+
+    chunk = max(chunk, step)
+    per_chunk = int(math.ceil(chunk / step))
+    offset = times[:-1] - times[0]
+    flat = (offset // chunk).astype(np.int64) * per_chunk + ((offset % chunk) // step).astype(np.int64)
+    chunks = int(flat[-1] // per_chunk) + 1
+    size = chunks * per_chunk
+
+    span = np.bincount(flat, weights=weight, minlength=size)
+    heat_sum = np.bincount(flat, weights=heat * weight, minlength=size)
+    gap = np.bincount(flat, weights=~valid, minlength=size) > 0
+    _, first = np.unique(flat, return_index=True)
+    start = np.zeros(size)
+    start[flat[first]] = temps[first]
+
+    span = span.reshape(chunks, per_chunk)
+    heat = np.divide(heat_sum.reshape(chunks, per_chunk), span, out=np.zeros_like(span), where=span > 0)
+    filled = span > 0
+    previous_ok = np.ones_like(filled)
+    previous_ok[:, 1:] = filled[:, :-1] & ~gap.reshape(chunks, per_chunk)[:, :-1]
+    previous_ok[:, 0] = False
+    restart = filled & ~previous_ok
+    start = start.reshape(chunks, per_chunk)
+    # Chunks start from their first recorded temperature even before their first restart
+    first_filled = np.argmax(filled, axis=1)
+    start[:, 0] = start[np.arange(chunks), first_filled]
+    return Bins(heat, span, restart, start, float(step), float(span.sum()))
+
+
+def simulate(bins: Bins, model: ThermalModel, controller, limit: float = 70.0) -> ReplayResult:
+    """Replay the binned heat input against a batched controller (replay.py interface)
+
+    The controller holds one entry per chunk × parameter set, chunk-major
+    (see tile_params). Temperatures are advanced with the exact solution of
+    the model for a duty held over each bin.
+    """
+    chunks, count = bins.heat.shape
+    size = controller.size // chunks
+    if size * chunks != controller.size:
+        raise ValueError("Denetleyici boyutu parça sayısının katı olmalı")
+    if hasattr(controller, "reset"):
+        controller.reset()
+
+    temp = np.repeat(bins.start[:, :1], size, axis=1)
+    duty = np.asarray(controller(temp.ravel(), 0.0), dtype=np.float64).reshape(chunks, size)
+    peak = temp.copy()
+    temp_sum = np.zeros((chunks, size))
+    over = np.zeros((chunks, size))
+    duty_sum = np.zeros((chunks, size))
+    energy = np.zeros((chunks, size))
+    switches = np.zeros((chunks, size), dtype=np.int64)
+
+    k_off = 1.0 / model.tau
+    k_fan = model.fan_gain / 100.0 / model.tau
+    ambient, step = model.ambient, bins.step
+    heat_columns = bins.heat.T[:, :, None]
+    span_columns = bins.span.T[:, :, None]
+    start_columns = bins.start.T[:, :, None]
+    restart_columns = bins.restart.T[:, :, None]
+    any_restart = bins.restart.any(axis=0).tolist()
+
+    for b in range(count):
+        if any_restart[b]:
+            # Controller was not running before this bin: resume from the recorded temperature
+            temp = np.where(restart_columns[b], start_columns[b], temp)
+        span = span_columns[b]
+        rate = k_off + k_fan * duty
+        settle = ambient + heat_columns[b] / rate
+        temp = settle + (temp - settle) * np.exp(-rate * span)
+        new_duty = np.asarray(controller(temp.ravel(), step), dtype=np.float64).reshape(chunks, size)
+        switches += new_duty != duty
+        duty = new_duty
+
+        np.maximum(peak, temp, out=peak)
+        temp_sum += temp * span
+        over += (temp > limit) * span
+        duty_sum += duty * span
+        energy += (duty * 0.01) ** 3 * span
+
+    duration = bins.duration or 1.0
+    return ReplayResult(peak.max(axis=0).tolist(), (temp_sum.sum(axis=0) / duration).tolist(),
+                        over.sum(axis=0).tolist(), (duty_sum.sum(axis=0) / duration).tolist(),
+                        (energy.sum(axis=0) / 3600.0).tolist(), switches.sum(axis=0).tolist(),
+                        bins.duration)
+
+
+def tile_params(params: Sequence[Tuple[float, ...]], chunks: int) -> List[Tuple[float, ...]]:
+    """Parameter sets repeated once per chunk, chunk-major as simulate() expects"""
+    return list(params) * chunks
+
+
+def _bank(strategy: str, params: Sequence[Tuple[float, ...]], chunks: int):
+    tiled = tile_params(params, chunks)
+    if strategy == "curve":
+        return RampSweep(*zip(*tiled))
+    return PIDBank(*zip(*tiled))
+
+
+def _absolute(strategy: str, relative: Tuple[float, ...], limit: float) -> Tuple[float, ...]:
+    """Search coordinates (temperatures relative to the limit) to controller parameters"""
+    if strategy == "curve":
+        t0, t1, s0, s1 = relative
+        return limit + t0, limit + t1, s0, s1
+    setpoint, kp, ki, kd = relative
+    return limit + setpoint, kp, ki, kd
+
+
+def _feasible(strategy: str, relative: Tuple[float, ...]) -> bool:
+    if strategy == "curve":
+        t0, t1, s0, s1 = relative
+        return t1 >= t0 + 2.0 and s1 >= s0
+    return True
+
+
+def _neighbourhood(space, best: Tuple[float, ...], scale: float) -> List[Tuple[float, ...]]:
+    """Every combination of best ± one (shrinking) step per parameter"""
+    axes = []
+    for (name, grid, kind, low, high), value in zip(space, best):
+        if kind == "log":
+            factor = 2.0 ** scale
+            if value > 0:
+                values = (value / factor, value, value * factor)
+            else:  # Zero is a valid gain that a ratio cannot leave: try the smallest grid value instead
+                values = (0.0, min(v for v in grid if v > 0) * scale)
+        else:
+            delta = (max(grid) - min(grid)) / max(1, len(grid) - 1) * scale
+            values = (value - delta, value, value + delta)
+        axes.append(sorted({min(high, max(low, v)) for v in values}))
+    combos = [()]
+    for axis in axes:
+        combos = [combo + (v,) for combo in combos for v in axis]
+    return combos
+
+
+def search(strategy: str, bins: Bins, model: ThermalModel, cost: Cost, limit: float = 70.0,
+           rounds: int = 4) -> Tuned:
+    """Grid search followed by rounds of local refinement around the best set"""
+    space = CURVE_SPACE if strategy == "curve" else PID_SPACE
+    chunks = bins.heat.shape[0]
+    combos = [()]
+    for name, grid, kind, low, high in space:
+        combos = [combo + (v,) for combo in combos for v in grid]
+
+    seen: Dict[Tuple[float, ...], Tuple[float, int, ReplayResult]] = {}
+    best, scale = None, 0.5
+    for _ in range(max(1, rounds)):
+        candidates = [c for c in dict.fromkeys(combos) if _feasible(strategy, c) and c not in seen]
+        if candidates:
+            controller = _bank(strategy, [_absolute(strategy, c, limit) for c in candidates], chunks)
+            result = simulate(bins, model, controller, limit)
+            for i, (candidate, value) in enumerate(zip(candidates, cost.evaluate(result))):
+                seen[candidate] = (float(value), i, result)
+        best = min(seen, key=lambda c: seen[c][0])
+        combos = _neighbourhood(space, best, scale)
+        scale /= 2.0
+
+    value, i, result = seen[best]
+    params = dict(zip((name for name, *_ in space), _absolute(strategy, best, limit)))
+    return Tuned(strategy, params, value, result.peak[i], result.time_over[i], result.mean_duty[i],
+                 len(seen))
+
+
+def evaluate(strategy: str, params: Dict[str, float], bins: Bins, model: ThermalModel,
+             cost: Cost, limit: float = 70.0) -> Tuned:
+    """Cost of one given parameter set (e.g. the current config) on the same bins"""
+    space = CURVE_SPACE if strategy == "curve" else PID_SPACE
+    values = tuple(params[name] for name, *_ in space)
+    result = simulate(bins, model, _bank(strategy, [values], bins.heat.shape[0]), limit)
+    return Tuned(strategy, dict(params), float(cost.evaluate(result)[0]), result.peak[0],
+                 result.time_over[0], result.mean_duty[0], 1)
+
+
+def tuned_config(results: Sequence[Tuned]) -> dict:
+    """thermopi.json keys for the tuned parameters; "strategy" selects the cheapest"""
+    config = {}
+    for tuned in results:
+        if tuned.strategy == "curve":
+            p = tuned.params
+            config.update(temp_min=round(p["temp_min"] * 2) / 2, temp_max=round(p["temp_max"] * 2) / 2,
+                          speed_min=int(round(p["speed_min"])), speed_max=int(round(p["speed_max"])))
+        else:
+            config["pid"] = {key: round(value, 4) for key, value in tuned.params.items()}
+    config["strategy"] = min(results, key=lambda tuned: tuned.cost).strategy
+    return config
+
+
+def write_config(path: str, tuned: dict) -> List[str]:
+    """Merge tuned keys into a config file (created if missing); returns the keys removed
+
+    The result is validated with the reload rules before it replaces the
+    file, so a running controller picks it up through its ConfigWatcher.
+    """
+    config = {}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        if not isinstance(config, dict):
+            raise ValueError(f"{path}: JSON nesnesi bekleniyordu")
+    removed = []
+    if "temp_min" in tuned and "curve" in config:
+        removed.append("curve")  # An explicit curve would override the tuned thresholds
+        del config["curve"]
+    if "pid" in tuned and isinstance(config.get("pid"), dict):
+        tuned = dict(tuned, pid=dict(config["pid"], **tuned["pid"]))
+    config.update(tuned)
+
+    compile_config({key.replace("-", "_"): value for key, value in config.items()}, RuntimeConfig.defaults(),
+                   os.path.dirname(os.path.abspath(path)))
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    os.replace(tmp, path)
+    return removed
+
+
+def _current_params(config_path: Optional[str]) -> Dict[str, Dict[str, float]]:
+    """Parameters the node runs with now (config file over FanController defaults)
+
+    An explicit "curve" in the config is not represented; the thresholds are compared.
+    """
+    runtime = RuntimeConfig.defaults()
+    if config_path and os.path.exists(config_path):
+        config = read_config(config_path)
+        config.pop("curve", None)
+        runtime = compile_config(config, runtime)
+    pid = dict(runtime.pid)
+    return {"curve": {key: float(getattr(runtime, key)) for key in THRESHOLD_KEYS},
+            "pid": {name: pid[name] for name, *_ in PID_SPACE}}
+
+
+def tune(trace: Trace, strategies: Sequence[str] = ("curve", "pid"), cost: Cost = Cost(),
+         limit: float = 70.0, step: Optional[float] = None, stride: int = 10, rounds: int = 4,
+         config_path: Optional[str] = None, verbose: bool = True):
+    """Fit, then search; returns (fit, [Tuned per strategy], {strategy: current Tuned})"""
+    started = time.perf_counter()
+    fit = fit_model(trace, stride)
+    model = fit.thermal_model()
+    fitted = time.perf_counter()
+    if step is None:
+        step = float(min(30.0, max(2.0, round(fit.tau / 8.0))))  # Well below the time constant
+    bins = resample(trace, model, step)
+    if verbose:
+        print(f"🧮 Model ({fitted - started:.2f} s): τ {fit.tau:.0f} s, fan kazancı {fit.fan_gain:.2f}, "
+              f"ortam {fit.ambient:.1f}°C, boşta ısınma {fit.idle_heat * 60:.2f}°C/dk, "
+              f"yük ısınması {fit.load_heat * 60:.2f}°C/dk (hata {fit.rmse:.2f}°C, {fit.samples} pencere)")
+        print(f"   Boşta denge: fan kapalı {fit.steady_state(0):.1f}°C, %100 fan {fit.steady_state(100):.1f}°C; "
+              f"simülasyon {bins.heat.shape[0]} parça × {bins.heat.shape[1]} adım ({step:g} s)")
+
+    current = _current_params(config_path)
+    results, baselines = [], {}
+    for strategy in strategies:
+        began = time.perf_counter()
+        baselines[strategy] = evaluate(strategy, current[strategy], bins, model, cost, limit)
+        tuned = search(strategy, bins, model, cost, limit, rounds)
+        results.append(tuned)
+        if verbose:
+            print(f"🔎 {strategy}: {tuned.evaluated} aday, {time.perf_counter() - began:.2f} s")
+    return fit, results, baselines
+
+
+def _describe(tuned: Tuned, duration: float) -> str:
+    share = 100.0 * tuned.time_over / duration if duration else 0.0
+    return (f"maliyet {tuned.cost:7.2f} | tepe {tuned.peak:5.1f}°C | limit üstü %{share:5.2f} | "
+            f"ort. hız {tuned.mean_duty:5.1f}%")
+
+
+def synthetic_trace(days: float = 30.0, tau: float = 200.0, fan_gain: float = 2.5, ambient: float = 32.0,
+                    idle_heat: float = 0.04, load_heat: float = 0.22, noise: float = 0.1,
+                    seed: int = 1) -> Trace:
+    """1 Hz record of a simulated node under the default ramp, with bursty CPU load"""
+    rng = np.random.default_rng(seed)
+    count = int(days * 86400)
+    # Load: bursts of random level and length, as a compile/inference node sees
+    lengths = rng.integers(60, 1800, size=count // 60 + 2)
+    levels = np.where(rng.random(len(lengths)) < 0.4, rng.uniform(0.5, 1.0, len(lengths)),
+                      rng.uniform(0.0, 0.15, len(lengths)))
+    load = np.repeat(levels, lengths)[:count]
+    load = np.clip(np.round(load * 100) / 100, 0.0, 1.0)
+
+    curve = RuntimeConfig.defaults().curve
+    table = [curve.evaluate(t / 10.0) for t in range(0, 1201)]
+    temps, duties = [0.0] * count, [0] * count
+    temp, duty = ambient + idle_heat * tau, 0
+    heat = (idle_heat + load_heat * load).tolist()
+    k_off, k_fan = 1.0 / tau, fan_gain / 100.0 / tau
+    for n in range(count):
+        temps[n] = temp
+        duties[n] = duty
+        temp += heat[n] - (k_off + k_fan * duty) * (temp - ambient)
+        duty = table[min(1200, max(0, int(temp * 10)))]
+    recorded = np.round((np.asarray(temps) + rng.normal(0.0, noise, count)) * 10) / 10
+    times = 1.7e9 + np.arange(count, dtype=np.float64)
+    return Trace(times, recorded, np.asarray(duties), np.zeros(count, dtype=np.int64), load)
+
+
+def selftest(days: float = 30.0) -> bool:
+    """Recover a known model from a synthetic record, then tune it within a time budget"""
+    truth = dict(tau=200.0, fan_gain=2.5, ambient=32.0, idle_heat=0.04, load_heat=0.22)
+    started = time.perf_counter()
+    trace = synthetic_trace(days, **truth)
+    print(f"🧪 {days:g} günlük 1 Hz sentetik kayıt ({len(trace)} örnek): "
+          f"{time.perf_counter() - started:.1f} s")
+
+    started = time.perf_counter()
+    fit, results, baselines = tune(trace, limit=70.0)
+    elapsed = time.perf_counter() - started
+
+    ok = True
+    for name, expected in truth.items():
+        value = getattr(fit, name)
+        passed = abs(value - expected) <= 0.05 * abs(expected)
+        ok &= passed
+        print(f"{'✅' if passed else '❌'} {name}: {value:.4g} (gerçek {expected:g})")
+
+    duration = len(trace)
+    for tuned in results:
+        baseline = baselines[tuned.strategy]
+        passed = tuned.cost <= baseline.cost
+        ok &= passed
+        print(f"{'✅' if passed else '❌'} {tuned.strategy:5s} mevcut : {_describe(baseline, duration)}")
+        print(f"   {tuned.strategy:5s} ayarlı : {_describe(tuned, duration)}  {tuned.params}")
+
+    budget = 20.0  # The simulation loop runs per step, not per day: a month takes about as long
+    passed = elapsed <= budget
+    ok &= passed
+    print(f"{'✅' if passed else '❌'} Uydurma + arama: {elapsed:.1f} s (bütçe {budget:.0f} s, tek çekirdek)")
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="ThermoPi termal model uydurma ve otomatik ayar")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("tune", help="Kayıttan model uydur, eğri/PID ara ve ayar dosyası yaz")
+    run.add_argument("log", nargs="?", default="fan_control_log.txt", help="Metin log dosyası")
+    run.add_argument("--history", help="İkili geçmiş dizini (metin log yerine; yük içermez)")
+    run.add_argument("--strategy", choices=STRATEGIES, default="both", help="Aranacak otomatik strateji")
+    run.add_argument("--limit", type=float, default=70.0, help="Sıcaklık limiti (°C)")
+    run.add_argument("--peak-weight", type=float, default=Cost().peak_weight, help="Tepe sıcaklık ağırlığı (°C başına)")
+    run.add_argument("--over-weight", type=float, default=Cost().over_weight,
+                     help="Limit üstü süre ağırlığı (kaydın %%'si başına)")
+    run.add_argument("--duty-weight", type=float, default=Cost().duty_weight, help="Ortalama fan hızı ağırlığı (%% başına)")
+    run.add_argument("--step", type=float, help="Simülasyon adımı (s); verilmezse τ/8, en fazla 30")
+    run.add_argument("--stride", type=int, default=10, help="Model uydurma penceresi (örnek)")
+    run.add_argument("--rounds", type=int, default=4, help="Arama turu sayısı (ızgara + iyileştirme)")
+    run.add_argument("--config", default="thermopi.json", help="Mevcut ayarlar (karşılaştırma için)")
+    run.add_argument("--output", help="Ayarların yazılacağı dosya (var olan anahtarlar korunur; "
+                                      "verilmezse yalnızca gösterilir)")
+    test = sub.add_parser("selftest", help="Sentetik kayıtla model doğruluğu ve ayar süresi")
+    test.add_argument("--days", type=float, default=30.0, help="Sentetik kayıt uzunluğu (gün)")
+    args = parser.parse_args()
+
+    if np is None:
+        print("❌ NumPy kütüphanesi bulunamadı! Lütfen şu komutu çalıştırın: pip3 install numpy")
+        return 1
+    if args.command == "selftest":
+        return 0 if selftest(args.days) else 1
+
+    started = time.perf_counter()
+    trace = load_history(args.history) if args.history else load_text_log(args.log)
+    print(f"📂 {len(trace)} kayıt yüklendi ({time.perf_counter() - started:.1f} s)"
+          + ("" if trace.load is not None else " - yük sütunu yok, ısınma tek terimle modellenir"))
+    strategies = ("curve", "pid") if args.strategy == "both" else (args.strategy,)
+    cost = Cost(args.peak_weight, args.over_weight, args.duty_weight)
+    try:
+        fit, results, baselines = tune(trace, strategies, cost, args.limit, args.step, args.stride,
+                                       args.rounds, args.config)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    duration = trace.times[-1] - trace.times[0]
+    for tuned in results:
+        print(f"📊 {tuned.strategy:5s} mevcut : {_describe(baselines[tuned.strategy], duration)}")
+        print(f"   {tuned.strategy:5s} ayarlı : {_describe(tuned, duration)}")
+    config = tuned_config(results)
+    print(json.dumps(config, indent=2, ensure_ascii=False))
+    if args.output:
+        try:
+            removed = write_config(args.output, config)
+        except (OSError, ValueError) as e:
+            print(f"❌ Ayar dosyası yazılamadı: {e}")
+            return 1
+        if removed:
+            print(f"⚠️ {args.output}: eşikleri geçersiz kılacağı için kaldırıldı: {', '.join(removed)}")
+        print(f"💾 Ayarlar yazıldı: {args.output} (çalışan kontrolcü dosyayı kendisi yeniden yükler)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
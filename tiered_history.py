@@ -0,0 +1,502 @@
+#!/usr/bin/env python3
+"""
+ThermoPi Tiered History
+Fixed-memory temperature/duty history: 1 s for an hour, 1 min for a week, 1 h forever
+
+Every tier is a ring of rollup buckets (count and min/max/sum/last of
+temperature and duty) stored column-wise in preallocated float arrays.
+A sample is folded into the open bucket of each tier in place, so the
+minute and hour rollups are always up to date and nothing is allocated
+per sample; memory is fixed by the tier capacities whatever the uptime.
+
+With a directory, closed hour buckets are also appended to hours.bin
+(80 bytes per hour, never pruned) and all three rings are snapshotted to
+recent.bin every hour and on close, so a restart resumes where it left
+off. Hours that have dropped out of the in-memory ring are read back from
+hours.bin by binary search.
+
+query() picks the coarsest tier whose resolution is still fine enough,
+falls back to coarser tiers for the part of the range that tier no
+longer holds, and merges buckets up to the requested resolution.
+
+    python3 tiered_history.py query tiers --start 2026-10-01 --end 2026-10-08 --points 300
+    python3 tiered_history.py soak --days 30      # RSS stays flat over simulated uptime
+"""
+
+import argparse
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from typing import Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+# Bucket columns; a bucket's mean is sum / count
+COLUMNS = ("start", "count", "temp_min", "temp_max", "temp_sum", "temp_last",
+           "duty_min", "duty_max", "duty_sum", "duty_last")
+RECORD = struct.Struct("<" + "d" * len(COLUMNS))
+FILE_HEADER = struct.Struct("<4sHHd")  # magic, version, tier count (snapshot), resolution (archive)
+TIER_HEADER = struct.Struct("<dIII")   # resolution, capacity, size, head; then the columns
+SNAPSHOT_MAGIC = b"TPIS"
+ARCHIVE_MAGIC = b"TPIA"
+VERSION = 1
+HOURS_FILE = "hours.bin"
+SNAPSHOT_FILE = "recent.bin"
+
+# (resolution in seconds, buckets kept in memory)
+DEFAULT_TIERS = (
+    (1.0, 3600),          # 1 s for an hour
+    (60.0, 7 * 1440),     # 1 min for a week
+    (3600.0, 366 * 24),   # 1 h for a year in memory; older hours come from hours.bin
+)
+
+
+class Bucket(NamedTuple):
+    """One query result row"""
+    start: float
+    seconds: float
+    count: int
+    temp_min: float
+    temp_max: float
+    temp_mean: float
+    temp_last: float
+    duty_min: float
+    duty_max: float
+    duty_mean: float
+    duty_last: float
+
+
+def _to_bucket(row: Sequence[float], seconds: float) -> Bucket:
+    start, count, tmin, tmax, tsum, tlast, dmin, dmax, dsum, dlast = row
+    return Bucket(start, seconds, int(count), tmin, tmax, tsum / count, tlast,
+                  dmin, dmax, dsum / count, dlast)
+
+
+def _merge_rows(a: list, b: Sequence[float]):
+    """Fold row b (later in time) into row a in place"""
+    a[1] += b[1]
+    a[2] = min(a[2], b[2])
+    a[3] = max(a[3], b[3])
+    a[4] += b[4]
+    a[5] = b[5]
+    a[6] = min(a[6], b[6])
+    a[7] = max(a[7], b[7])
+    a[8] += b[8]
+    a[9] = b[9]
+
+
+class RollupTier:
+    """Ring of `capacity` rollup buckets of `resolution` seconds; the newest one is open"""
+
+    def __init__(self, resolution: float, capacity: int):
+        self.resolution = resolution
+        self.capacity = capacity
+        self.columns = [array("d", bytes(8 * capacity)) for _ in COLUMNS]
+        self.head = 0   # Slot of the oldest bucket
+        self.size = 0
+        self.open_start: Optional[float] = None
+        self._slot = 0  # Slot of the open bucket
+
+    def _position(self, index: int) -> int:
+        return (self.head + index) % self.capacity
+
+    def add(self, t: float, temp: float, duty: float) -> Optional[Tuple[float, ...]]:
+        """Fold one sample in; returns the bucket that was closed by it, if any"""
+        start = t - t % self.resolution
+        closed = None
+        if self.open_start is None or start > self.open_start:
+            if self.open_start is not None:
+                closed = self.row(self.size - 1)
+            self._open(start, temp, duty)
+            return closed
+        # Same bucket, or the clock stepped back: fold into the open bucket
+        (_, count, tmin, tmax, tsum, tlast, dmin, dmax, dsum, dlast) = self.columns
+        slot = self._slot
+        count[slot] += 1
+        if temp < tmin[slot]:
+            tmin[slot] = temp
+        if temp > tmax[slot]:
+            tmax[slot] = temp
+        tsum[slot] += temp
+        tlast[slot] = temp
+        if duty < dmin[slot]:
+            dmin[slot] = duty
+        if duty > dmax[slot]:
+            dmax[slot] = duty
+        dsum[slot] += duty
+        dlast[slot] = duty
+        return None
+
+    def _open(self, start: float, temp: float, duty: float):
+        self.append((start, 1, temp, temp, temp, temp, duty, duty, duty, duty))
+
+    def append(self, row: Sequence[float]):
+        """Add a complete bucket as the newest (evicting the oldest when full)"""
+        if self.size < self.capacity:
+            slot = self._position(self.size)
+            self.size += 1
+        else:
+            slot = self.head
+            self.head = (self.head + 1) % self.capacity
+        for column, value in zip(self.columns, row):
+            column[slot] = value
+        self._slot = slot
+        self.open_start = row[0]
+
+    def row(self, index: int) -> Tuple[float, ...]:
+        slot = self._position(index)
+        return tuple(column[slot] for column in self.columns)
+
+    @property
+    def oldest(self) -> Optional[float]:
+        return self.columns[0][self.head] if self.size else None
+
+    def _find(self, t: float) -> int:
+        """Index of the first bucket starting at or after t (starts are ascending)"""
+        starts = self.columns[0]
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            if starts[self._position(middle)] < t:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def rows(self, start: float, end: float) -> Iterator[Tuple[float, ...]]:
+        """Buckets overlapping [start, end), oldest first"""
+        index = self._find(start - self.resolution)
+        while index < self.size:
+            row = self.row(index)
+            if row[0] >= end:
+                break
+            if row[0] + self.resolution > start:
+                yield row
+            index += 1
+
+
+class RollupArchive:
+    """Append-only file of closed buckets (fixed-size records, ascending start)"""
+
+    def __init__(self, path: str, resolution: float):
+        self.path = path
+        self.resolution = resolution
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        self.file = open(path, "a+b")
+        if size < FILE_HEADER.size:
+            self.file.truncate(0)
+            self.file.write(FILE_HEADER.pack(ARCHIVE_MAGIC, VERSION, 0, resolution))
+            self.file.flush()
+        elif (size - FILE_HEADER.size) % RECORD.size:
+            # A record cut short by a crash: drop it so appends stay aligned
+            self.file.truncate(size - (size - FILE_HEADER.size) % RECORD.size)
+
+    def __len__(self) -> int:
+        return (os.fstat(self.file.fileno()).st_size - FILE_HEADER.size) // RECORD.size
+
+    def append(self, row: Sequence[float]):
+        self.file.write(RECORD.pack(*row))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def record(self, index: int) -> Tuple[float, ...]:
+        return RECORD.unpack(os.pread(self.file.fileno(), RECORD.size,
+                                      FILE_HEADER.size + index * RECORD.size))
+
+    def tail(self, count: int) -> Iterator[Tuple[float, ...]]:
+        total = len(self)
+        for index in range(max(0, total - count), total):
+            yield self.record(index)
+
+    def rows(self, start: float, end: float) -> Iterator[Tuple[float, ...]]:
+        """Records overlapping [start, end), found by binary search"""
+        low, high = 0, len(self)
+        while low < high:
+            middle = (low + high) // 2
+            if self.record(middle)[0] + self.resolution <= start:
+                low = middle + 1
+            else:
+                high = middle
+        total = len(self)
+        while low < total:
+            row = self.record(low)
+            if row[0] >= end:
+                break
+            yield row
+            low += 1
+
+    def close(self):
+        self.file.close()
+
+
+class TieredHistory:
+    """Raw/minute/hour rings with incremental rollups and an optional on-disk hour archive"""
+
+    def __init__(self, directory: Optional[str] = None,
+                 tiers: Sequence[Tuple[float, int]] = DEFAULT_TIERS):
+        self.tiers = [RollupTier(resolution, capacity) for resolution, capacity in tiers]
+        self.directory = directory
+        self.archive: Optional[RollupArchive] = None
+        self._lock = threading.Lock()
+        self._writer: Optional[threading.Thread] = None
+        self._archived_until = float("-inf")  # Start of the newest archived bucket
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self.archive = RollupArchive(os.path.join(directory, HOURS_FILE), self.tiers[-1].resolution)
+            if len(self.archive):
+                self._archived_until = self.archive.record(len(self.archive) - 1)[0]
+            self._restore()
+
+    # --- Writing ---
+
+    def add(self, t: float, temp: float, duty: float):
+        """Fold one sample (wall time, °C, %) into every tier"""
+        with self._lock:
+            closed = None
+            for tier in self.tiers:
+                closed = tier.add(t, temp, duty)
+            if closed is None or self.archive is None or closed[0] <= self._archived_until:
+                return
+            self._archived_until = closed[0]
+            # An hour closed: archive it and snapshot the rings off the control thread
+            snapshot = self._snapshot_bytes()
+        self._write_in_background(closed, snapshot)
+
+    def _snapshot_bytes(self) -> bytes:
+        """All rings as they are in memory (a memcpy per column; caller holds the lock)"""
+        chunks = [FILE_HEADER.pack(SNAPSHOT_MAGIC, VERSION, len(self.tiers), 0.0)]
+        for tier in self.tiers:
+            chunks.append(TIER_HEADER.pack(tier.resolution, tier.capacity, tier.size, tier.head))
+            chunks.extend(column.tobytes() for column in tier.columns)
+        return b"".join(chunks)
+
+    def _write(self, closed: Optional[Sequence[float]], snapshot: bytes):
+        try:
+            if closed is not None:
+                self.archive.append(closed)
+            path = os.path.join(self.directory, SNAPSHOT_FILE)
+            with open(path + ".tmp", "wb") as f:
+                f.write(snapshot)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            print(f"⚠️ Katmanlı geçmiş yazılamadı: {e}")
+
+    def _write_in_background(self, closed: Sequence[float], snapshot: bytes):
+        if self._writer is not None:
+            self._writer.join()  # Keep archive records in order
+        self._writer = threading.Thread(target=self._write, args=(closed, snapshot),
+                                        name="tiered-history", daemon=True)
+        self._writer.start()
+
+    def _restore(self):
+        """Reload the rings from the snapshot, or the hour ring from the archive"""
+        path = os.path.join(self.directory, SNAPSHOT_FILE)
+        restored = set()
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            magic, version, count, _ = FILE_HEADER.unpack_from(data, 0)
+            if magic != SNAPSHOT_MAGIC or version != VERSION:
+                raise ValueError("tanınmayan anlık görüntü")
+            offset = FILE_HEADER.size
+            for _ in range(count):
+                resolution, capacity, size, head = TIER_HEADER.unpack_from(data, offset)
+                offset += TIER_HEADER.size
+                saved = RollupTier(resolution, capacity)
+                for column in saved.columns:
+                    column[:] = array("d", data[offset:offset + 8 * capacity])
+                    offset += 8 * capacity
+                saved.size, saved.head = size, head
+                for tier in self.tiers:
+                    if tier.resolution == resolution:
+                        for index in range(max(0, size - tier.capacity), size):
+                            tier.append(saved.row(index))
+                        restored.add(resolution)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, struct.error) as e:
+            print(f"⚠️ Katmanlı geçmiş anlık görüntüsü okunamadı ({path}): {e}")
+
+        coarsest = self.tiers[-1]
+        if coarsest.resolution not in restored:
+            # No snapshot (e.g. after a crash): the closed hours are still in the archive
+            for row in self.archive.tail(coarsest.capacity):
+                coarsest.append(row)
+
+    def close(self):
+        """Snapshot the rings (including the open buckets) and close the archive"""
+        if self.archive is None:
+            return
+        if self._writer is not None:
+            self._writer.join()
+        with self._lock:
+            snapshot = self._snapshot_bytes()
+        self._write(None, snapshot)
+        self.archive.close()
+        self.archive = None
+
+    # --- Queries ---
+
+    def tier_for(self, resolution: float) -> int:
+        """Index of the coarsest tier whose resolution is at most `resolution`"""
+        index = 0
+        for i, tier in enumerate(self.tiers):
+            if tier.resolution <= resolution:
+                index = i
+        return index
+
+    def query(self, start: float, end: float, resolution: Optional[float] = None,
+              points: Optional[int] = None) -> List[Bucket]:
+        """Buckets covering [start, end) at `resolution` seconds (or about `points` buckets)
+
+        Parts of the range older than the chosen tier keeps are filled from
+        coarser tiers, so old data comes back at the finest resolution still held.
+        """
+        if points:
+            resolution = (end - start) / points
+        resolution = max(resolution or self.tiers[0].resolution, self.tiers[0].resolution)
+
+        with self._lock:
+            pieces = []  # (tier resolution, rows), newest piece first
+            boundary = end
+            sources = self.tiers[self.tier_for(resolution):]
+            if self.archive is not None:
+                sources.append(self.archive)
+            for source in sources:
+                if boundary <= start:
+                    break
+                # Coarser sources only contribute buckets that end before the finer data starts
+                rows = [row for row in source.rows(start, boundary)
+                        if boundary == end or row[0] + source.resolution <= boundary]
+                if rows:
+                    pieces.append((source.resolution, rows))
+                    boundary = rows[0][0]
+
+        result: List[Bucket] = []
+        for tier_resolution, rows in reversed(pieces):
+            width = max(resolution, tier_resolution)
+            result.extend(_regroup(rows, width))
+        return result
+
+    def latest(self, tier: int = 0) -> Optional[Bucket]:
+        """The open bucket of a tier (by default the newest second)"""
+        with self._lock:
+            ring = self.tiers[tier]
+            return _to_bucket(ring.row(ring.size - 1), ring.resolution) if ring.size else None
+
+    @property
+    def memory_bytes(self) -> int:
+        """Bytes held by the ring arrays (fixed at construction)"""
+        return sum(column.itemsize * len(column) for tier in self.tiers for column in tier.columns)
+
+
+def _regroup(rows: Sequence[Sequence[float]], width: float) -> Iterator[Bucket]:
+    """Merge consecutive rows into buckets of `width` seconds"""
+    current: Optional[list] = None
+    for row in rows:
+        start = row[0] - row[0] % width
+        if current is not None and start == current[0]:
+            _merge_rows(current, row)
+            continue
+        if current is not None:
+            yield _to_bucket(current, width)
+        current = [start] + list(row[1:])
+    if current is not None:
+        yield _to_bucket(current, width)
+
+
+# --- Command line ---
+
+def _rss_bytes() -> Optional[int]:
+    """Current resident set size from /proc/self/statm (None where unavailable)"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def soak(days: float = 30.0, rate: float = 1.0, directory: Optional[str] = None) -> int:
+    """Feed `days` of simulated samples and check that RSS stays flat after the first day"""
+    import math
+    import tempfile
+
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        history = TieredHistory(tmp)
+        print(f"🧮 Halka bellekleri: {history.memory_bytes / 1e6:.1f} MB (sabit)")
+        start = 1_700_006_400.0  # Midnight UTC, so daily buckets line up
+        step = 1.0 / rate
+        per_day = int(86400 * rate)
+        baseline = None
+        growth = 0
+        began = time.perf_counter()
+        for day in range(int(days)):
+            t0 = start + day * 86400
+            for i in range(per_day):
+                t = t0 + i * step
+                temp = 50.0 + 10.0 * math.sin(t / 3600.0) + (i % 17) * 0.05
+                history.add(t, temp, max(0.0, min(100.0, (temp - 40.0) * 3.0)))
+            rss = _rss_bytes()
+            if rss is not None:
+                if day == 0:
+                    baseline = rss
+                else:
+                    growth = max(growth, rss - baseline)
+            if day % 7 == 6 or day == int(days) - 1:
+                print(f"📅 Gün {day + 1}: RSS {(rss or 0) / 1e6:.1f} MB, "
+                      f"arşiv {len(history.archive)} saat")
+        elapsed = time.perf_counter() - began
+        samples = int(days) * per_day
+
+        end = start + int(days) * 86400
+        week = history.query(end - 7 * 86400, end, points=168)
+        everything = history.query(start, end, resolution=86400)
+        history.close()
+
+    print(f"⚡ {samples / elapsed:,.0f} örnek/s ({elapsed / samples * 1e6:.1f} µs/örnek)")
+    print(f"🔎 Son hafta: {len(week)} kova, tüm süre: {len(everything)} günlük kova")
+    ok = growth < 1_000_000 and len(everything) == int(days)
+    print(f"✅ RSS artışı {growth / 1e3:.0f} kB" if ok else f"❌ RSS {growth / 1e3:.0f} kB arttı")
+    return 0 if ok else 1
+
+
+def main() -> int:
+    from history_index import parse_time
+
+    parser = argparse.ArgumentParser(description="ThermoPi katmanlı geçmiş")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    query = sub.add_parser("query", help="Zaman aralığını en uygun katmandan sorgula")
+    query.add_argument("directory")
+    query.add_argument("--start", type=parse_time, required=True)
+    query.add_argument("--end", type=parse_time, default=None)
+    group = query.add_mutually_exclusive_group()
+    group.add_argument("--resolution", type=float, help="Kova genişliği (s)")
+    group.add_argument("--points", type=int, help="Yaklaşık kova sayısı")
+
+    run_soak = sub.add_parser("soak", help="Simüle edilmiş uzun çalışma (RSS sabit kalmalı)")
+    run_soak.add_argument("--days", type=float, default=30.0)
+    run_soak.add_argument("--rate", type=float, default=1.0, help="Örnek/s")
+    run_soak.add_argument("--dir", help="Geçici dosya dizini")
+    args = parser.parse_args()
+
+    if args.command == "soak":
+        return soak(args.days, args.rate, args.dir)
+
+    history = TieredHistory(args.directory)
+    end = args.end if args.end is not None else time.time()
+    buckets = history.query(args.start, end, args.resolution, args.points)
+    for bucket in buckets:
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(bucket.start))
+        print(f"{stamp}  {bucket.seconds:>6g}s  {bucket.count:>6}  "
+              f"{bucket.temp_min:5.1f} / {bucket.temp_mean:5.1f} / {bucket.temp_max:5.1f}°C  "
+              f"fan ort. {bucket.duty_mean:5.1f}%")
+    print(f"📊 {len(buckets)} kova")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())